@@ -22,19 +22,23 @@ def _post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         return {'status': 'error', 'message': str(exc)}
 
 
-def import_students(spreadsheet_id: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+def import_students(spreadsheet_id: str, sheet_name: Optional[str] = None, *, full_refresh: bool = False) -> Dict[str, Any]:
     """Просит сервис Google Data импортировать студентов из указанного листа."""
     payload: Dict[str, Any] = {'spreadsheet_id': spreadsheet_id}
     if sheet_name:
         payload['sheet_name'] = sheet_name
+    if full_refresh:
+        payload['full_refresh'] = True
     return _post('/api/import/students', payload)
 
 
-def import_supervisors(spreadsheet_id: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+def import_supervisors(spreadsheet_id: str, sheet_name: Optional[str] = None, *, full_refresh: bool = False) -> Dict[str, Any]:
     """Запускает импорт наставников из таблицы Google Sheet."""
     payload: Dict[str, Any] = {'spreadsheet_id': spreadsheet_id}
     if sheet_name:
         payload['sheet_name'] = sheet_name
+    if full_refresh:
+        payload['full_refresh'] = True
     return _post('/api/import/supervisors', payload)
 
 
@@ -1,42 +1,26 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
-
-from .clients.matching_client import (
-    refresh_role_embedding,
-    refresh_student_embedding,
-    refresh_supervisor_embedding,
-    refresh_topic_embedding,
-)
-
-_queue_store: Dict[int, List[Tuple[str, int]]] = {}
-
-
-def _drain_queue(conn) -> List[Tuple[str, int]]:
-    """Забирает и очищает накопленные задачи обновления для соединения."""
-                                                            
-    return list(_queue_store.pop(id(conn), []))
+EMBEDDING_JOB_KINDS = ('student', 'supervisor', 'topic', 'role')
 
 
 def enqueue_refresh(conn, kind: str, entity_id: int) -> None:
-    """Добавляет задачу обновления эмбеддинга в очередь для текущего соединения."""
-    queue = _queue_store.setdefault(id(conn), [])
-    queue.append((kind, entity_id))
+    """Добавляет задачу пересчёта эмбеддинга в outbox-таблицу embedding_jobs в текущей транзакции."""
+    if entity_id is None or kind not in EMBEDDING_JOB_KINDS:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            '''
+            INSERT INTO embedding_jobs(kind, entity_id)
+            VALUES (%s, %s)
+            ON CONFLICT (kind, entity_id) WHERE status = 'pending' DO NOTHING
+            ''',
+            (kind, int(entity_id)),
+        )
 
 
 def commit_with_refresh(conn) -> None:
-    """Фиксирует транзакцию и инициирует обновление эмбеддингов из очереди."""
+    """Фиксирует транзакцию; записанные задачи обработает воркер сервиса Matching."""
     conn.commit()
-    queue = _drain_queue(conn)
-    for kind, entity_id in queue:
-        if kind == 'student':
-            refresh_student_embedding(entity_id)
-        elif kind == 'supervisor':
-            refresh_supervisor_embedding(entity_id)
-        elif kind == 'topic':
-            refresh_topic_embedding(entity_id)
-        elif kind == 'role':
-            refresh_role_embedding(entity_id)
 
 
-__all__ = ['enqueue_refresh', 'commit_with_refresh']
+__all__ = ['enqueue_refresh', 'commit_with_refresh', 'EMBEDDING_JOB_KINDS']
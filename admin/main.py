@@ -4,9 +4,10 @@ import os
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.templating import Jinja2Templates
 
-from .db import get_conn
+from .db import close_pool, get_conn, pool_stats
 from .router import create_admin_router
 
 load_dotenv()
@@ -16,6 +17,18 @@ templates = Jinja2Templates(directory=os.path.dirname(__file__))
 app.include_router(create_admin_router(get_conn, templates))
 
 
+@app.get('/metrics/db-pool', response_class=JSONResponse)
+def db_pool_metrics():
+    """Возвращает метрики пула соединений с базой данных."""
+    return pool_stats()
+
+
+@app.on_event('shutdown')
+def _close_db_pool():
+    """Закрывает пул соединений при остановке сервиса."""
+    close_pool()
+
+
 if __name__ == '__main__':
     import uvicorn
 
@@ -215,13 +215,20 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
         form = await request.form()
         role_updates: Dict[int, Optional[int]] = {}
         topic_updates: Dict[int, Optional[int]] = {}
+        conflicting_roles: List[int] = []
         for key, value in form.multi_items():
             if key.startswith("role_student_"):
                 try:
                     role_id = int(key[len("role_student_"):])
                 except ValueError:
                     continue
-                role_updates[role_id] = parse_optional_int(value)
+                student_id = parse_optional_int(value)
+                # roles.approved_student_user_id хранит одного студента: несколько
+                # отмеченных студентов одной роли (capacity > 1) не сохраняем молча.
+                if role_updates.get(role_id) not in (None, student_id) and student_id is not None:
+                    conflicting_roles.append(role_id)
+                if student_id is not None or role_id not in role_updates:
+                    role_updates[role_id] = student_id
             elif key.startswith("topic_supervisor_"):
                 try:
                     topic_id = int(key[len("topic_supervisor_"):])
@@ -229,6 +236,15 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
                     continue
                 topic_updates[topic_id] = parse_optional_int(value)
 
+        if conflicting_roles:
+            roles_list = ", ".join(f"#{role_id}" for role_id in sorted(set(conflicting_roles)))
+            message = (
+                f"Для роли можно утвердить только одного студента, отмечено несколько: {roles_list}."
+                " Ничего не сохранено."
+            )
+            quoted = urllib.parse.quote(message)
+            return RedirectResponse(url=f"/?msg={quoted}&tab=topics", status_code=303)
+
         message = _apply_assignment_updates(ctx, role_updates, topic_updates)
         quoted = urllib.parse.quote(message)
         return RedirectResponse(url=f"/?msg={quoted}&tab=topics", status_code=303)
@@ -307,7 +323,7 @@ def _apply_assignment_updates(
         f"обновлено руководителей: {updated_topics}",
     ]
     if sheet_synced:
-        msg_parts.append("данные выгружены в Google Sheets")
+        msg_parts.append("выгрузка в Google Sheets запланирована")
     else:
         msg_parts.append("не удалось обновить Google Sheets (проверьте настройки)")
     return "; ".join(msg_parts)
@@ -14,7 +14,12 @@ from ..context import AdminContext
 def register(router: APIRouter, ctx: AdminContext) -> None:
     """Добавляет административные маршруты для импорта данных из таблиц."""
     @router.get('/import-sheet')
-    def import_sheet(request: Request, target: Optional[str] = None, sheet_name: Optional[str] = None):
+    def import_sheet(
+        request: Request,
+        target: Optional[str] = None,
+        sheet_name: Optional[str] = None,
+        full: Optional[str] = None,
+    ):
         """Запускает импорт студентов или наставников и перенаправляет с результатом."""
         spreadsheet_id = (os.getenv('SPREADSHEET_ID') or '').strip()
         if not spreadsheet_id:
@@ -22,12 +27,14 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
             return RedirectResponse(url=f'/?tab=students&msg={notice}', status_code=303)
 
         desired = (target or 'students').strip().lower()
+        # По умолчанию импортируются только новые и изменённые строки; full=1 — весь лист.
+        full_refresh = (full or '').strip().lower() in ('1', 'true', 'yes', 'on')
         try:
             if desired == 'supervisors':
-                result = import_supervisors(spreadsheet_id, sheet_name)
+                result = import_supervisors(spreadsheet_id, sheet_name, full_refresh=full_refresh)
                 tab = 'supervisors'
             else:
-                result = import_students(spreadsheet_id, sheet_name)
+                result = import_students(spreadsheet_id, sheet_name, full_refresh=full_refresh)
                 tab = 'students'
         except Exception as exc:                                       
             detail = urllib.parse.quote(f'Ошибка импорта: {type(exc).__name__}: {exc}')
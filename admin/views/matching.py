@@ -3,10 +3,17 @@ from __future__ import annotations
 import urllib.parse
 from typing import Optional
 
-from fastapi import APIRouter, Form
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import HTMLResponse, RedirectResponse
 
-from ..clients.matching_client import match_role, match_student, match_supervisor, match_topic
+from ..clients.matching_client import (
+    assign_cohort,
+    match_role,
+    match_student,
+    match_supervisor,
+    match_topic,
+    precompute_candidates,
+)
 from ..context import AdminContext
 
 
@@ -19,6 +26,8 @@ def _status_message(result) -> str:
 
 def register(router: APIRouter, ctx: AdminContext) -> None:
     """Регистрирует ручки для запуска операций подбора из админки."""
+    templates = ctx.templates
+
     @router.post('/do-match-role')
     def do_match_role(role_id: int = Form(...)):
         """Запрашивает подбор по роли и возвращает результат уведомлением."""
@@ -46,3 +55,29 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
         result = match_supervisor(supervisor_user_id)
         notice = urllib.parse.quote(_status_message(result))
         return RedirectResponse(url=f'/supervisor/{supervisor_user_id}?msg={notice}', status_code=303)
+
+    @router.post('/precompute-candidates')
+    def do_precompute_candidates(rerank: Optional[str] = Form(None)):
+        """Запускает фоновый пересчёт кандидатов по всей когорте."""
+        result = precompute_candidates(rerank=bool(rerank))
+        if result.get('status') == 'started':
+            message = 'Пересчёт кандидатов запущен'
+        else:
+            message = result.get('message') or 'Не удалось запустить пересчёт кандидатов'
+        notice = urllib.parse.quote(message)
+        return RedirectResponse(url=f'/?msg={notice}', status_code=303)
+
+    @router.get('/assignment-proposal', response_class=HTMLResponse)
+    def assignment_proposal(request: Request, scope: str = 'all', min_score: Optional[float] = None):
+        """Показывает предложенное сервисом подбора распределение по всей когорте."""
+        result = assign_cohort(scope, min_score=min_score)
+        return templates.TemplateResponse(
+            'admin/assignment_proposal.html',
+            {
+                'request': request,
+                'scope': scope,
+                'min_score': min_score,
+                'result': result,
+                'error': None if result.get('status') == 'ok' else _status_message(result),
+            },
+        )
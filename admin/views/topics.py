@@ -3,6 +3,7 @@ from __future__ import annotations
 import urllib.parse
 from typing import Any, Dict, List, Optional
 
+import psycopg2.errors
 import psycopg2.extras
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -70,31 +71,30 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
 
             direction_val = parse_optional_int(direction)
             cur.execute(
-                'SELECT 1 FROM topics WHERE author_user_id=%s AND title=%s AND (direction IS NOT DISTINCT FROM %s)',
-                (uid, title.strip(), direction_val),
+                '''
+                INSERT INTO topics(author_user_id, title, description, expected_outcomes, required_skills, direction,
+                                   seeking_role, is_active, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, TRUE, now(), now())
+                ON CONFLICT DO NOTHING
+                RETURNING id
+                ''',
+                (
+                    uid,
+                    title.strip(),
+                    description,
+                    expected_outcomes,
+                    required_skills,
+                    direction_val,
+                    seeking_role,
+                ),
             )
-            if not cur.fetchone():
-                cur.execute(
-                    '''
-                    INSERT INTO topics(author_user_id, title, description, expected_outcomes, required_skills, direction,
-                                       seeking_role, is_active, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, TRUE, now(), now())
-                    RETURNING id
-                    ''',
-                    (
-                        uid,
-                        title.strip(),
-                        description,
-                        expected_outcomes,
-                        required_skills,
-                        direction_val,
-                        seeking_role,
-                    ),
-                )
-                inserted = cur.fetchone()
-                if inserted:
-                    topic_id_created = inserted[0]
-                    enqueue_refresh(conn, "topic", topic_id_created)
+            inserted = cur.fetchone()
+            if inserted:
+                topic_id_created = inserted[0]
+                enqueue_refresh(conn, "topic", topic_id_created)
+        if topic_id_created is None:
+            notice = urllib.parse.quote('Такая тема у автора уже есть')
+            return RedirectResponse(url=f'/?tab=topics&msg={notice}', status_code=303)
         notice = urllib.parse.quote('Тема добавлена')
         return RedirectResponse(url=f'/?tab=topics&msg={notice}', status_code=303)
 
@@ -151,32 +151,38 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
             return RedirectResponse(url=f'/edit-topic/{topic_id}?msg={notice}', status_code=303)
         with ctx.get_conn() as conn, conn.cursor() as cur:
             direction_val = parse_optional_int(direction)
-            cur.execute(
-                '''
-                UPDATE topics
-                SET author_user_id=%s,
-                    title=%s,
-                    description=%s,
-                    expected_outcomes=%s,
-                    required_skills=%s,
-                    direction=%s,
-                    seeking_role=%s,
-                    is_active=%s,
-                    updated_at=now()
-                WHERE id=%s
-                ''',
-                (
-                    author_id,
-                    title.strip(),
-                    (description or None),
-                    (expected_outcomes or None),
-                    (required_skills or None),
-                    direction_val,
-                    seeking_role,
-                    active,
-                    topic_id,
-                ),
-            )
+            try:
+                cur.execute(
+                    '''
+                    UPDATE topics
+                    SET author_user_id=%s,
+                        title=%s,
+                        description=%s,
+                        expected_outcomes=%s,
+                        required_skills=%s,
+                        direction=%s,
+                        seeking_role=%s,
+                        is_active=%s,
+                        updated_at=now()
+                    WHERE id=%s
+                    ''',
+                    (
+                        author_id,
+                        title.strip(),
+                        (description or None),
+                        (expected_outcomes or None),
+                        (required_skills or None),
+                        direction_val,
+                        seeking_role,
+                        active,
+                        topic_id,
+                    ),
+                )
+            except psycopg2.errors.UniqueViolation:
+                # uq_topics_author_title_direction: у автора уже есть тема с таким названием.
+                conn.rollback()
+                notice = urllib.parse.quote('Такая тема у автора уже есть')
+                return RedirectResponse(url=f'/edit-topic/{topic_id}?msg={notice}', status_code=303)
             enqueue_refresh(conn, "topic", topic_id)
         notice = urllib.parse.quote('Тема обновлена')
         return RedirectResponse(url=f'/?tab=topics&msg={notice}', status_code=303)
@@ -290,7 +296,7 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
             )
             new_role_row = cur.fetchone()
             if new_role_row:
-                refresh_role_embedding(conn, new_role_row[0])
+                enqueue_refresh(conn, "role", new_role_row[0])
         sync_roles_sheet()
         notice = urllib.parse.quote('Роль добавлена')
         return RedirectResponse(url=f'/topic/{topic_id}?msg={notice}', status_code=303)
@@ -3,6 +3,7 @@ from __future__ import annotations
 import urllib.parse
 from typing import Optional
 
+import psycopg2.errors
 import psycopg2.extras
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -12,6 +13,9 @@ from ..embedding_queue import enqueue_refresh, commit_with_refresh
 from ..utils import normalize_telegram_link
 from ..utils_common import parse_optional_int
 
+# uq_users_email_role: у одного email может быть только один пользователь каждой роли.
+_DUPLICATE_EMAIL = 'Пользователь с таким email и ролью уже есть'
+
 
 def register(router: APIRouter, ctx: AdminContext) -> None:
     """Подключает административные представления для управления пользователями."""
@@ -49,14 +53,19 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
             return RedirectResponse(url=f'/add-student?msg={notice}', status_code=303)
         username_normalized = normalize_telegram_link(username)
         with ctx.get_conn() as conn, conn.cursor() as cur:
-            cur.execute(
-                '''
-                INSERT INTO users(full_name, email, username, role, created_at, updated_at)
-                VALUES (%s, %s, %s, 'student', now(), now())
-                RETURNING id
-                ''',
-                (full_name, email, username_normalized),
-            )
+            try:
+                cur.execute(
+                    '''
+                    INSERT INTO users(full_name, email, username, role, created_at, updated_at)
+                    VALUES (%s, %s, %s, 'student', now(), now())
+                    RETURNING id
+                    ''',
+                    (full_name, (email or '').strip() or None, username_normalized),
+                )
+            except psycopg2.errors.UniqueViolation:
+                conn.rollback()
+                notice = urllib.parse.quote(_DUPLICATE_EMAIL)
+                return RedirectResponse(url=f'/add-student?msg={notice}', status_code=303)
             user_id = cur.fetchone()[0]
             cur.execute(
                 '''
@@ -107,28 +116,34 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
             notice = urllib.parse.quote('Укажите имя руководителя')
             return RedirectResponse(url=f'/add-supervisor?msg={notice}', status_code=303)
         username_normalized = normalize_telegram_link(username)
+        email_val = (email or '').strip() or None
         with ctx.get_conn() as conn, conn.cursor() as cur:
             cur.execute('SELECT id FROM users WHERE full_name=%s AND role=\'supervisor\' LIMIT 1', (full_name,))
             row = cur.fetchone()
-            if row:
-                user_id = row[0]
-                cur.execute(
-                    '''
-                    UPDATE users SET email=%s, username=%s, updated_at=now()
-                    WHERE id=%s
-                    ''',
-                    (email, username_normalized, user_id),
-                )
-            else:
-                cur.execute(
-                    '''
-                    INSERT INTO users(full_name, email, username, role, created_at, updated_at)
-                    VALUES (%s, %s, %s, 'supervisor', now(), now())
-                    RETURNING id
-                    ''',
-                    (full_name, email, username_normalized),
-                )
-                user_id = cur.fetchone()[0]
+            try:
+                if row:
+                    user_id = row[0]
+                    cur.execute(
+                        '''
+                        UPDATE users SET email=%s, username=%s, updated_at=now()
+                        WHERE id=%s
+                        ''',
+                        (email_val, username_normalized, user_id),
+                    )
+                else:
+                    cur.execute(
+                        '''
+                        INSERT INTO users(full_name, email, username, role, created_at, updated_at)
+                        VALUES (%s, %s, %s, 'supervisor', now(), now())
+                        RETURNING id
+                        ''',
+                        (full_name, email_val, username_normalized),
+                    )
+                    user_id = cur.fetchone()[0]
+            except psycopg2.errors.UniqueViolation:
+                conn.rollback()
+                notice = urllib.parse.quote(_DUPLICATE_EMAIL)
+                return RedirectResponse(url=f'/add-supervisor?msg={notice}', status_code=303)
 
             capacity_val = parse_optional_int(capacity)
             cur.execute('SELECT 1 FROM supervisor_profiles WHERE user_id=%s', (user_id,))
@@ -318,15 +333,20 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
         cpr = str(consent_private or '').lower() in ('1', 'true', 'on', 'yes', 'y')
         username_normalized = normalize_telegram_link(username)
         with ctx.get_conn() as conn, conn.cursor() as cur:
-            cur.execute(
-                '''
-                UPDATE users
-                SET full_name=%s, email=%s, username=%s, role=%s,
-                    consent_personal=%s, consent_private=%s, updated_at=now()
-                WHERE id=%s
-                ''',
-                (full_name.strip(), (email or None), username_normalized, role, cp, cpr, user_id),
-            )
+            try:
+                cur.execute(
+                    '''
+                    UPDATE users
+                    SET full_name=%s, email=%s, username=%s, role=%s,
+                        consent_personal=%s, consent_private=%s, updated_at=now()
+                    WHERE id=%s
+                    ''',
+                    (full_name.strip(), (email or '').strip() or None, username_normalized, role, cp, cpr, user_id),
+                )
+            except psycopg2.errors.UniqueViolation:
+                conn.rollback()
+                notice = urllib.parse.quote(_DUPLICATE_EMAIL)
+                return RedirectResponse(url=f'/edit-user/{user_id}?msg={notice}', status_code=303)
             if role == 'student':
                 enqueue_refresh(conn, "student", user_id)
             elif role == 'supervisor':
@@ -380,14 +400,19 @@ def register(router: APIRouter, ctx: AdminContext) -> None:
         username_normalized = normalize_telegram_link(username)
         with ctx.get_conn() as conn, conn.cursor() as cur:
             capacity_val = parse_optional_int(capacity)
-            cur.execute(
-                '''
-                UPDATE users
-                SET full_name=%s, email=%s, username=%s, role='supervisor', updated_at=now()
-                WHERE id=%s
-                ''',
-                (full_name.strip(), (email or None), username_normalized, user_id),
-            )
+            try:
+                cur.execute(
+                    '''
+                    UPDATE users
+                    SET full_name=%s, email=%s, username=%s, role='supervisor', updated_at=now()
+                    WHERE id=%s
+                    ''',
+                    (full_name.strip(), (email or '').strip() or None, username_normalized, user_id),
+                )
+            except psycopg2.errors.UniqueViolation:
+                conn.rollback()
+                notice = urllib.parse.quote(_DUPLICATE_EMAIL)
+                return RedirectResponse(url=f'/edit-supervisor/{user_id}?msg={notice}', status_code=303)
             cur.execute('SELECT 1 FROM supervisor_profiles WHERE user_id=%s', (user_id,))
             if cur.fetchone():
                 cur.execute(
@@ -0,0 +1 @@
+"""Standalone benchmarks for the Telegram bot (run against a running server)."""
@@ -0,0 +1,104 @@
+"""
+Click-to-reply latency benchmark for the bot's API client.
+
+Replays the API calls of one "view topic" click (``/api/topics/{id}`` and
+``/api/topics/{id}/roles``) against a running server, first with a new
+``aiohttp.ClientSession`` per request (the previous client behaviour), then
+through the shared keep-alive ``APIClient``, and prints p50/p99 per click.
+
+    python -m bot.benchmarks.api_client --base-url http://localhost:8000 \\
+        --topic-ids 1 2 3 --clicks 300 --concurrency 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, List, Sequence
+
+import aiohttp
+
+from bot.services.api_client import APIClient
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    """Выполняет функцию _percentile."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _click_paths(topic_id: int) -> List[str]:
+    """Выполняет функцию _click_paths."""
+    return [f"/api/topics/{topic_id}", f"/api/topics/{topic_id}/roles"]
+
+
+async def _get_fresh_session(base_url: str, path: str) -> None:
+    """One request on a throwaway session, as the client did before."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}{path}", timeout=aiohttp.ClientTimeout(total=20)) as response:
+            await response.read()
+
+
+async def _replay(
+    fetch: Callable[[str], Awaitable[object]],
+    topic_ids: Sequence[int],
+    clicks: int,
+    concurrency: int,
+) -> List[float]:
+    """Выполняет функцию _replay."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    timings: List[float] = []
+
+    async def _click() -> None:
+        """Выполняет функцию _click."""
+        async with semaphore:
+            started = time.perf_counter()
+            for path in _click_paths(random.choice(topic_ids)):
+                await fetch(path)
+            timings.append((time.perf_counter() - started) * 1000.0)
+
+    await asyncio.gather(*(_click() for _ in range(clicks)))
+    return timings
+
+
+async def run(base_url: str, *, topic_ids: Sequence[int], clicks: int, concurrency: int) -> None:
+    """Выполняет функцию run."""
+    base_url = base_url.rstrip("/")
+    fresh = await _replay(lambda path: _get_fresh_session(base_url, path), topic_ids, clicks, concurrency)
+
+    # cache_ttl=0: measure connection reuse, not response-cache hits.
+    client = APIClient(base_url, connection_limit=max(concurrency, 1), cache_ttl=0)
+    await client.start()
+    try:
+        await client.get(_click_paths(topic_ids[0])[0])  # warm the connection pool
+        pooled = await _replay(client.get, topic_ids, clicks, concurrency)
+        stats = client.latency_stats()
+    finally:
+        await client.close()
+
+    for label, samples in (("session per request", fresh), ("shared session", pooled)):
+        print(
+            f"{label:<20} clicks={len(samples):>5} p50={_percentile(samples, 50):7.2f}ms "
+            f"p99={_percentile(samples, 99):7.2f}ms"
+        )
+    for key, snapshot in stats["endpoints"].items():
+        print(f"  {key:<28} count={snapshot['count']:>5} avg={snapshot['avg_ms']:7.2f}ms p95<={snapshot['p95_ms']}ms")
+
+
+def main() -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--topic-ids", type=int, nargs="+", default=[1])
+    parser.add_argument("--clicks", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, topic_ids=args.topic_ids, clicks=args.clicks, concurrency=args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 """Core application setup for MentorMatch Telegram bot."""
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import signal
 from typing import Any, Optional
 
 from aiohttp import web
 from dotenv import load_dotenv
+from telegram import Update
 from telegram.ext import Application
 
 from bot import dispatcher
@@ -18,10 +21,27 @@ from bot.config import (
     truthy_flag,
 )
 from bot.services.api_client import APIClient
+from bot.services.notifier import NotificationDispatcher
+from bot.services.persistence import PostgresPersistence
 
 logger = logging.getLogger(__name__)
 
 
+class _PersistingApplication(Application):
+    """
+    Writes user_data right after each update so other replicas see it on the
+    next one. Done here rather than in a handler because handlers in later
+    groups are skipped once a handler raises ``ApplicationHandlerStop``.
+    """
+
+    async def process_update(self, update: object) -> None:
+        """Выполняет функцию process_update."""
+        try:
+            await super().process_update(update)
+        finally:
+            await self.update_persistence()
+
+
 class BotCore:
     EDIT_KEEP = "__keep__"
 
@@ -49,23 +69,78 @@ class BotCore:
         self._http_app.add_routes(
             [
                 web.get("/healthz", self._handle_healthcheck),
+                web.get("/metrics/api", self._handle_api_metrics),
                 web.post("/notify", self._handle_notify),
+                web.post("/notify/batch", self._handle_notify_batch),
             ]
         )
         self._http_runner: Optional[web.AppRunner] = None
         self._http_site: Optional[web.BaseSite] = None
 
+        self.mode = (os.getenv("BOT_MODE") or "polling").strip().lower()
+        if self.mode not in {"polling", "webhook"}:
+            raise ValueError(f"Неизвестный BOT_MODE={self.mode!r} (ожидается polling или webhook)")
+        self.webhook_url = (os.getenv("BOT_WEBHOOK_URL") or "").strip().rstrip("/")
+        self.webhook_path = "/" + (os.getenv("BOT_WEBHOOK_PATH") or "telegram/webhook").strip().strip("/")
+        self.webhook_secret = (os.getenv("BOT_WEBHOOK_SECRET") or "").strip() or None
+        self.webhook_register = truthy_flag(os.getenv("BOT_WEBHOOK_REGISTER"), default=True)
+        if self.mode == "webhook":
+            if not self.webhook_url:
+                raise ValueError("BOT_WEBHOOK_URL обязателен при BOT_MODE=webhook")
+            self._http_app.add_routes([web.post(self.webhook_path, self._handle_telegram_update)])
+
         request = create_telegram_request()
         self._telegram_request = request
-        self.app = Application.builder().token(token).request(request).build()
+        builder = Application.builder().token(token).request(request)
+        api_base_url = (os.getenv("TELEGRAM_API_BASE_URL") or "").strip().rstrip("/")
+        if api_base_url:
+            # e.g. the offline stand-in from bot/testing/fake_telegram.py
+            builder = builder.base_url(f"{api_base_url}/bot").base_file_url(f"{api_base_url}/file/bot")
+        concurrent_updates = parse_positive_int(os.getenv("BOT_CONCURRENT_UPDATES"))
+        if concurrent_updates and concurrent_updates > 1:
+            builder = builder.concurrent_updates(concurrent_updates)
+        self.persistence: Optional[PostgresPersistence] = None
+        if (os.getenv("BOT_PERSISTENCE") or "").strip().lower() == "postgres":
+            self.persistence = PostgresPersistence()
+            builder = builder.persistence(self.persistence)
+            builder = builder.application_class(_PersistingApplication)
+        if self.mode == "webhook":
+            builder = builder.updater(None)
+        self.app = builder.build()
         self.app.post_init = self._post_init
         self.app.post_shutdown = self._post_shutdown
 
-        self.api = APIClient(self.server_url)
+        self.api = APIClient(
+            self.server_url,
+            connection_limit=parse_positive_int(os.getenv("BOT_API_CONNECTION_LIMIT")) or 32,
+            keepalive_timeout=parse_positive_float(os.getenv("BOT_API_KEEPALIVE_SECONDS")) or 30.0,
+            dns_ttl=parse_positive_int(os.getenv("BOT_API_DNS_TTL_SECONDS")) or 300,
+            cache_ttl=self._api_cache_ttl(),
+            cache_max_entries=parse_positive_int(os.getenv("BOT_API_CACHE_MAX_ENTRIES")) or 1024,
+        )
+
+        self.notifier = NotificationDispatcher(
+            self.app.bot.send_message,
+            global_rate=parse_positive_float(os.getenv("BOT_NOTIFY_GLOBAL_RATE")) or 25.0,
+            per_chat_interval=parse_positive_float(os.getenv("BOT_NOTIFY_PER_CHAT_INTERVAL")) or 1.0,
+            max_concurrency=parse_positive_int(os.getenv("BOT_NOTIFY_CONCURRENCY")) or 8,
+            max_attempts=parse_positive_int(os.getenv("BOT_NOTIFY_MAX_ATTEMPTS")) or 5,
+            max_queue=parse_positive_int(os.getenv("BOT_NOTIFY_MAX_QUEUE")) or 10000,
+        )
 
         dispatcher.setup(self.app, self)
 
                                                              
+    def _api_cache_ttl(self) -> float:
+        """
+        TTL of the API response cache. The cache and its POST invalidation are
+        per process, so with several replicas (Postgres persistence or webhook
+        mode) another replica would serve a user stale screens after their own
+        edit: there the cache is off unless ``BOT_API_CACHE_TTL_SECONDS`` is set.
+        """
+        replicated = self.persistence is not None or self.mode == "webhook"
+        return float(os.getenv("BOT_API_CACHE_TTL_SECONDS", "0" if replicated else "30") or 0)
+
     def _parse_positive_float(self, value: Any) -> Optional[float]:
         """Выполняет функцию _parse_positive_float."""
         return parse_positive_float(value)
@@ -81,6 +156,8 @@ class BotCore:
                                                                            
     async def _post_init(self, _: Application) -> None:
         """Выполняет функцию _post_init."""
+        await self.api.start()
+        self.notifier.start()
         try:
             await self._start_http_server()
         except Exception:
@@ -92,6 +169,8 @@ class BotCore:
             await self._stop_http_server()
         except Exception:
             logger.exception("Ошибка при остановке внутреннего HTTP-сервера уведомлений")
+        await self.notifier.stop()
+        await self.api.close()
 
     async def _start_http_server(self) -> None:
         """Выполняет функцию _start_http_server."""
@@ -117,45 +196,37 @@ class BotCore:
 
     async def _handle_healthcheck(self, _: web.Request) -> web.Response:
         """Выполняет функцию _handle_healthcheck."""
-        return web.json_response({"status": "ok"})
+        return web.json_response(
+            {
+                "status": "ok",
+                "mode": self.mode,
+                "pending_updates": self.app.update_queue.qsize(),
+                "notifications": self.notifier.stats(),
+            }
+        )
 
-    async def _handle_notify(self, request: web.Request) -> web.Response:
-        """Выполняет функцию _handle_notify."""
-        payload: dict[str, Any] = {}
-        if request.can_read_body:
-            try:
-                if request.content_type and "json" in request.content_type:
-                    payload = await request.json()
-                else:
-                    payload = dict(await request.post())
-            except Exception as exc:
-                logger.warning("Failed to parse notify payload: %s", exc)
-                payload = {}
-        if not payload:
-            payload = dict(request.query)
+    async def _handle_api_metrics(self, _: web.Request) -> web.Response:
+        """Выполняет функцию _handle_api_metrics."""
+        return web.json_response(self.api.latency_stats())
+
+    def _parse_notification(self, payload: dict[str, Any]) -> tuple[Optional[int], Any]:
+        """Validate one notify payload; returns ``(chat_id, send_message kwargs)`` or ``(None, error)``."""
         chat_id_raw = payload.get("chat_id") or payload.get("telegram_id")
         chat_id = self._parse_positive_int(chat_id_raw)
         if chat_id is None:
-            return web.json_response(
-                {"status": "error", "message": "chat_id is required"}, status=400
-            )
+            return None, "chat_id is required"
         text_val = payload.get("text")
         if text_val is None:
-            return web.json_response(
-                {"status": "error", "message": "text is required"}, status=400
-            )
+            return None, "text is required"
         text_raw = text_val if isinstance(text_val, str) else str(text_val)
         if not str(text_raw).strip():
-            return web.json_response(
-                {"status": "error", "message": "text is required"}, status=400
-            )
+            return None, "text is required"
         reply_markup = self._build_reply_markup(payload)
         disable_preview = self._truthy_flag(
             payload.get("disable_web_page_preview"), default=True
         )
         parse_mode = payload.get("parse_mode")
         message_kwargs: dict[str, Any] = {
-            "chat_id": chat_id,
             "text": self._fix_text(text_raw),
             "disable_web_page_preview": disable_preview,
         }
@@ -163,15 +234,99 @@ class BotCore:
             message_kwargs["reply_markup"] = reply_markup
         if parse_mode:
             message_kwargs["parse_mode"] = str(parse_mode)
+        return chat_id, message_kwargs
+
+    async def _handle_notify(self, request: web.Request) -> web.Response:
+        """Выполняет функцию _handle_notify."""
+        payload: dict[str, Any] = {}
+        if request.can_read_body:
+            try:
+                if request.content_type and "json" in request.content_type:
+                    payload = await request.json()
+                else:
+                    payload = dict(await request.post())
+            except Exception as exc:
+                logger.warning("Failed to parse notify payload: %s", exc)
+                payload = {}
+        if not payload:
+            payload = dict(request.query)
+        chat_id, message_kwargs = self._parse_notification(payload)
+        if chat_id is None:
+            return web.json_response({"status": "error", "message": message_kwargs}, status=400)
+        if not self.notifier.enqueue(chat_id, message_kwargs):
+            return web.json_response({"status": "error", "message": "queue is full"}, status=503)
+        return web.json_response({"status": "ok", "queued": 1}, status=202)
+
+    async def _handle_notify_batch(self, request: web.Request) -> web.Response:
+        """Выполняет функцию _handle_notify_batch."""
+        try:
+            body = await request.json()
+        except Exception as exc:
+            logger.warning("Failed to parse notify batch payload: %s", exc)
+            return web.json_response({"status": "error", "message": "JSON body is required"}, status=400)
+        items = body.get("messages") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            return web.json_response({"status": "error", "message": "messages must be a list"}, status=400)
+        queued = 0
+        rejected: list[dict[str, Any]] = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                rejected.append({"index": index, "message": "payload must be an object"})
+                continue
+            chat_id, message_kwargs = self._parse_notification(item)
+            if chat_id is None:
+                rejected.append({"index": index, "message": message_kwargs})
+            elif not self.notifier.enqueue(chat_id, message_kwargs):
+                rejected.append({"index": index, "message": "queue is full"})
+            else:
+                queued += 1
+        return web.json_response(
+            {"status": "ok", "queued": queued, "rejected": rejected, "depth": self.notifier.depth},
+            status=202,
+        )
+
+    async def _handle_telegram_update(self, request: web.Request) -> web.Response:
+        """Выполняет функцию _handle_telegram_update."""
+        if self.webhook_secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.webhook_secret:
+            return web.json_response({"status": "error", "message": "forbidden"}, status=403)
         try:
-            await self.app.bot.send_message(**message_kwargs)
+            payload = await request.json()
         except Exception as exc:
-            logger.warning("Failed to send notification to %s: %s", chat_id, exc)
-            return web.json_response({"status": "error", "message": str(exc)}, status=502)
+            logger.warning("Failed to parse Telegram update: %s", exc)
+            return web.json_response({"status": "error", "message": "invalid JSON"}, status=400)
+        update = Update.de_json(payload, self.app.bot)
+        # Processing happens in the application loop; Telegram only needs a fast 200.
+        await self.app.update_queue.put(update)
         return web.json_response({"status": "ok"})
 
+    async def _run_webhook(self) -> None:
+        """Serve Telegram updates from the internal aiohttp server instead of long polling."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        async with self.app:
+            await self._post_init(self.app)
+            await self.app.start()
+            if self.webhook_register:
+                await self.app.bot.set_webhook(
+                    url=f"{self.webhook_url}{self.webhook_path}",
+                    secret_token=self.webhook_secret,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            logger.info("Webhook mode: receiving updates on %s", self.webhook_path)
+            await stop.wait()
+            await self.app.stop()
+            await self._post_shutdown(self.app)
+
     def run(self) -> None:
         """Выполняет функцию run."""
+        if self.mode == "webhook":
+            asyncio.run(self._run_webhook())
+            return
         self.app.run_polling()
 
                                                                           
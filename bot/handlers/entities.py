@@ -143,8 +143,9 @@ class EntityHandlers(BaseHandlers):
             sid = context.user_data.get('uid')
             if not sid:
                 return await self.cmd_start(update, context)
-        s = await self._api_get(f'/api/students/{sid}')
-        if not s:
+        view = await self._api_get(f'/api/views/user/{sid}?limit=5') or {}
+        s = view.get('user')
+        if not s or s.get('role') != 'student':
             await q.edit_message_text(self._fix_text('Не удалось загрузить профиль студента'))
             return
         viewer_id = context.user_data.get('uid')
@@ -163,7 +164,7 @@ class EntityHandlers(BaseHandlers):
             f"ID: {s.get('id')}",
         ]
                                           
-        rec = await self._api_get(f'/api/user-candidates/{sid}?limit=5') or []
+        rec = view.get('candidates') or []
         if rec:
             lines.append('')
                                                                 
@@ -229,8 +230,9 @@ class EntityHandlers(BaseHandlers):
             uid = context.user_data.get('uid')
             if not uid:
                 return await self.cmd_start(update, context)
-        s = await self._api_get(f'/api/supervisors/{uid}')
-        if not s:
+        view = await self._api_get(f'/api/views/user/{uid}?limit=5') or {}
+        s = view.get('user')
+        if not s or s.get('role') != 'supervisor':
             await q.edit_message_text(self._fix_text('Не удалось загрузить профиль научного руководителя'))
             return
         viewer_id = context.user_data.get('uid')
@@ -247,7 +249,7 @@ class EntityHandlers(BaseHandlers):
             f"Интересы: {s.get('interests') or '–'}",
             f"ID: {s.get('id')}",
         ]
-        rec = await self._api_get(f'/api/user-candidates/{uid}?limit=5') or []
+        rec = view.get('candidates') or []
         if rec:
             lines.append('')
             lines.append('Подходящие темы:')
@@ -334,7 +336,8 @@ class EntityHandlers(BaseHandlers):
         """Выполняет функцию cb_view_topic."""
         q = update.callback_query; await self._answer_callback(q)
         tid = int(q.data.split('_')[1])
-        t = await self._api_get(f'/api/topics/{tid}')
+        view = await self._api_get(f'/api/views/topic/{tid}') or {}
+        t = view.get('topic')
         if not t:
             await q.edit_message_text(self._fix_text('Не удалось загрузить тему'))
             return
@@ -361,7 +364,7 @@ class EntityHandlers(BaseHandlers):
             f"ID: {t.get('id')}\n"
         )
                               
-        roles = await self._api_get(f'/api/topics/{tid}/roles') or []
+        roles = view.get('roles') or []
         lines2: List[str] = [text, '', 'Роли:']
         kb: List[List[InlineKeyboardButton]] = []
         for r in roles:
@@ -401,7 +404,8 @@ class EntityHandlers(BaseHandlers):
         except Exception:
             await q.edit_message_text(self._fix_text('Некорректный идентификатор роли.'))
             return
-        role = await self._api_get(f'/api/roles/{rid}')
+        view = await self._api_get(f'/api/views/role/{rid}?limit=5') or {}
+        role = view.get('role')
         if not role:
             await q.edit_message_text(self._fix_text('Роль не найдена.'))
             return
@@ -430,7 +434,7 @@ class EntityHandlers(BaseHandlers):
             f'ID роли: {rid}',
         ]
 
-        candidates_resp = await self._api_get(f'/api/role-candidates/{rid}?limit=5')
+        candidates_resp = view.get('candidates')
         candidates: List[Dict[str, Any]] = []
         if isinstance(candidates_resp, list):
             candidates = [c for c in candidates_resp if isinstance(c, dict)]
@@ -1087,6 +1091,11 @@ class EntityHandlers(BaseHandlers):
                 f"Профили: +{stats.get('inserted_profiles', stats.get('upserted_profiles', 0))}\n"
                 f"Темы: +{stats.get('inserted_topics', 0)}"
             )
+            if 'rows_unchanged' in stats:
+                text += (
+                    f"\nСтроки: новых {stats.get('rows_added', 0)}, изменённых {stats.get('rows_changed', 0)},"
+                    f" без изменений {stats.get('rows_unchanged', 0)}"
+                )
         kb = [[InlineKeyboardButton('👨‍🎓 К студентам', callback_data='list_students')]]
         await q.edit_message_text(self._fix_text(text), reply_markup=self._mk(kb))
 
@@ -1984,6 +1993,9 @@ class EntityHandlers(BaseHandlers):
         context.user_data['awaiting'] = None
         context.user_data.pop('edit_topic_payload', None)
         context.user_data.pop('edit_topic_original', None)
+        if res and res.get('message') == 'duplicate':
+            await update.message.reply_text(self._fix_text('У вас уже есть тема с таким названием и направлением.'))
+            return
         if not res or res.get('status') != 'ok':
             await update.message.reply_text(self._fix_text('Не удалось обновить тему. Попробуйте позже.'))
             return
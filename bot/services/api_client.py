@@ -1,32 +1,326 @@
 """Async HTTP client wrapper for MentorMatch bot."""
 from __future__ import annotations
 
+import asyncio
+import bisect
+import copy
 import logging
-from typing import Any, Optional
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds of the latency histogram buckets, milliseconds.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# GET paths served from the response cache; inbox/outbox and configs always go to the server.
+CACHEABLE_PREFIXES: tuple[str, ...] = (
+    "/api/topics",
+    "/api/roles",
+    "/api/students",
+    "/api/supervisors",
+    "/api/user-topics/",
+    "/api/user-candidates/",
+    "/api/role-candidates/",
+    "/api/views/",
+)
+
+_CANDIDATE_PREFIXES = ("/api/user-candidates/", "/api/role-candidates/", "/api/views/role/", "/api/views/user/")
+
+# POST path -> cached path prefixes it makes stale; ``{field}`` is filled from
+# the form data and cut off when the field is absent. Unknown POSTs clear the cache.
+INVALIDATIONS: Dict[str, tuple[str, ...]] = {
+    "/api/update-topic": (
+        "/api/topics/{topic_id}", "/api/topics?", "/api/user-topics/", "/api/views/topic/{topic_id}", "/api/views/role/",
+        "/api/views/user/",
+    ),
+    "/api/add-topic": ("/api/topics?", "/api/user-topics/"),
+    "/api/update-role": (
+        "/api/roles/{role_id}", "/api/roles/stats", "/api/topics/", "/api/views/role/{role_id}", "/api/views/topic/",
+        "/api/views/user/",
+    ),
+    "/api/add-role": ("/api/roles/stats", "/api/topics/", "/api/views/topic/"),
+    "/api/update-student-profile": ("/api/students/{user_id}", "/api/students?") + _CANDIDATE_PREFIXES,
+    "/api/update-supervisor-profile": ("/api/supervisors/{user_id}", "/api/supervisors?", "/api/views/user/{user_id}"),
+    "/api/messages/send": (),
+    "/api/messages/respond": ("/api/topics/", "/api/roles/", "/api/students/", "/api/user-topics/", "/api/views/"),
+    "/api/bind-telegram": ("/api/students/", "/api/supervisors/", "/api/views/user/"),
+    "/match-topic": _CANDIDATE_PREFIXES,
+    "/match-role": _CANDIDATE_PREFIXES,
+    "/match-student": _CANDIDATE_PREFIXES,
+    "/match-supervisor": _CANDIDATE_PREFIXES,
+}
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """Collapse ids and query strings so ``/api/topics/7?x=1`` is counted as ``/api/topics/{id}``."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram of one endpoint."""
+
+    def __init__(self) -> None:
+        """Выполняет функцию __init__."""
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float, *, ok: bool) -> None:
+        """Выполняет функцию observe."""
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.errors += 0 if ok else 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (None in the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        threshold = q * self.count
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= threshold:
+                return float(bound)
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Выполняет функцию snapshot."""
+        labels = [f"le_{bound:g}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+def invalidation_prefixes(path: str, data: Optional[dict[str, Any]]) -> Optional[List[str]]:
+    """Cached prefixes made stale by a POST to ``path``; None means "drop everything"."""
+    templates = INVALIDATIONS.get(path.split("?", 1)[0])
+    if templates is None:
+        return None
+    prefixes: List[str] = []
+    for template in templates:
+        try:
+            prefixes.append(template.format(**(data or {})))
+        except (KeyError, IndexError):
+            prefixes.append(template.split("{", 1)[0])
+    return prefixes
+
+
+class ResponseCache:
+    """TTL + LRU cache of GET payloads keyed by path."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        """Выполняет функцию __init__."""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Выполняет функцию enabled."""
+        return self.ttl_seconds > 0
+
+    def get(self, path: str) -> Tuple[bool, Any]:
+        """Выполняет функцию get."""
+        entry = self._entries.get(path)
+        if entry is None:
+            return False, None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._entries[path]
+            return False, None
+        self._entries.move_to_end(path)
+        return True, payload
+
+    def put(self, path: str, payload: Any) -> None:
+        """Выполняет функцию put."""
+        self._entries[path] = (time.monotonic() + self.ttl_seconds, payload)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, prefixes: Optional[List[str]] = None) -> int:
+        """Drop entries starting with any of ``prefixes`` (all entries when None)."""
+        self.generation += 1
+        self.invalidations += 1
+        if prefixes is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        stale = [path for path in self._entries if any(path.startswith(prefix) for prefix in prefixes)]
+        for path in stale:
+            del self._entries[path]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
 
 class APIClient:
-    """Thin wrapper around aiohttp for MentorMatch REST API calls."""
+    """
+    Wrapper around one long-lived aiohttp session for MentorMatch REST API calls.
 
-    def __init__(self, base_url: str) -> None:
+    ``start()``/``close()`` are driven by the bot lifecycle; the session is also
+    created lazily on first use so ad-hoc scripts work without ``start()``.
+    GETs of ``CACHEABLE_PREFIXES`` are read through a TTL + LRU cache, and
+    concurrent identical GETs share one in-flight request. POSTs drop the
+    entries listed in ``INVALIDATIONS``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        connection_limit: int = 32,
+        keepalive_timeout: float = 30.0,
+        dns_ttl: int = 300,
+        cache_ttl: float = 30.0,
+        cache_max_entries: int = 1024,
+    ) -> None:
         """Выполняет функцию __init__."""
         self.base_url = base_url.rstrip("/")
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.cache = ResponseCache(cache_ttl, cache_max_entries)
+        self._inflight: Dict[str, "asyncio.Future[Optional[dict[str, Any]]]"] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._latency: Dict[str, LatencyHistogram] = {}
+
+    async def start(self) -> None:
+        """Выполняет функцию start."""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_ttl,
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        """Выполняет функцию close."""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Выполняет функцию _get_session."""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    def _observe(self, method: str, path: str, started: float, ok: bool) -> None:
+        """Выполняет функцию _observe."""
+        key = endpoint_key(method, path)
+        histogram = self._latency.get(key)
+        if histogram is None:
+            histogram = self._latency[key] = LatencyHistogram()
+        histogram.observe((time.perf_counter() - started) * 1000.0, ok=ok)
 
-    async def get(self, path: str, *, timeout: int = 20) -> Optional[dict[str, Any]]:
+    def latency_stats(self) -> Dict[str, Any]:
+        """Выполняет функцию latency_stats."""
+        connector = self._session.connector if self._session is not None else None
+        return {
+            "session_open": self._session is not None and not self._session.closed,
+            "connection_limit": self.connection_limit,
+            "connections_in_use": len(getattr(connector, "_acquired", ()) or ()) if connector else 0,
+            "endpoints": {key: hist.snapshot() for key, hist in sorted(self._latency.items())},
+            "cache": self.cache.stats(),
+        }
+
+    def invalidate(self, prefixes: Optional[List[str]] = None) -> int:
+        """Выполняет функцию invalidate."""
+        if prefixes is None:
+            self._inflight.clear()
+        else:
+            for path in [p for p in self._inflight if any(p.startswith(prefix) for prefix in prefixes)]:
+                del self._inflight[path]
+        return self.cache.invalidate(prefixes)
+
+    async def get(self, path: str, *, timeout: int = 20, cached: bool = True) -> Optional[dict[str, Any]]:
         """Выполняет функцию get."""
+        if not (cached and self.cache.enabled and path.startswith(CACHEABLE_PREFIXES)):
+            return await self._get(path, timeout)
+        found, payload = self.cache.get(path)
+        if found:
+            self.cache.hits += 1
+            return copy.deepcopy(payload)
+        future = self._inflight.get(path)
+        if future is None:
+            self.cache.misses += 1
+            future = asyncio.ensure_future(self._get_and_cache(path, timeout))
+            self._inflight[path] = future
+        else:
+            self.cache.coalesced += 1
+        # shield: a cancelled handler must not cancel the request other handlers wait on.
+        payload = await asyncio.shield(future)
+        return copy.deepcopy(payload)
+
+    async def _get_and_cache(self, path: str, timeout: int) -> Optional[dict[str, Any]]:
+        """Выполняет функцию _get_and_cache."""
+        generation = self.cache.generation
+        try:
+            payload = await self._get(path, timeout)
+        finally:
+            if self._inflight.get(path) is asyncio.current_task():
+                del self._inflight[path]
+        # Skip caching when a POST invalidated the cache while the request was in flight.
+        if payload is not None and generation == self.cache.generation:
+            self.cache.put(path, payload)
+        return payload
+
+    async def _get(self, path: str, timeout: int) -> Optional[dict[str, Any]]:
+        """Выполняет функцию _get."""
         url = f"{self.base_url}{path}"
+        started = time.perf_counter()
+        ok = False
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=timeout) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    logger.error("GET %s -> %s", url, response.status)
+            session = await self._get_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status == 200:
+                    payload = await response.json()
+                    ok = True
+                    return payload
+                logger.error("GET %s -> %s", url, response.status)
         except Exception as exc:
             logger.exception("GET %s failed: %s", url, exc)
+        finally:
+            self._observe("GET", path, started, ok)
         return None
 
     async def post(
@@ -38,14 +332,30 @@ class APIClient:
     ) -> Optional[dict[str, Any]]:
         """Выполняет функцию post."""
         url = f"{self.base_url}{path}"
+        started = time.perf_counter()
+        ok = False
+        # Invalidate up front: even a failed write may have been applied server-side.
+        prefixes = invalidation_prefixes(path, data)
+        self.invalidate(prefixes)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=data, timeout=timeout) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    if response.status == 303:
-                        return {"status": "success"}
-                    logger.error("POST %s -> %s", url, response.status)
+            session = await self._get_session()
+            async with session.post(
+                url, data=data, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status == 200:
+                    payload = await response.json()
+                    ok = True
+                    return payload
+                if response.status == 303:
+                    ok = True
+                    return {"status": "success"}
+                logger.error("POST %s -> %s", url, response.status)
         except Exception as exc:
             logger.exception("POST %s failed: %s", url, exc)
+        finally:
+            # And again once the write is done: a GET issued while the POST was in
+            # flight may have cached the pre-write response; bumping the generation
+            # also keeps GETs still in flight from caching it.
+            self.invalidate(prefixes)
+            self._observe("POST", path, started, ok)
         return None
@@ -0,0 +1,268 @@
+"""Rate-limited notification dispatcher for MentorMatch bot."""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from bot.services.api_client import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+@dataclass
+class Notification:
+    chat_id: int
+    kwargs: Dict[str, Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+    def can_merge(self, other: "Notification") -> bool:
+        """Plain messages with identical options are merged while they fit one Telegram message."""
+        if self.kwargs.get("reply_markup") is not None or other.kwargs.get("reply_markup") is not None:
+            return False
+        for key in ("parse_mode", "disable_web_page_preview"):
+            if self.kwargs.get(key) != other.kwargs.get(key):
+                return False
+        return len(self.kwargs["text"]) + len(other.kwargs["text"]) + 2 <= TELEGRAM_TEXT_LIMIT
+
+
+def _retry_after_seconds(exc: RetryAfter) -> float:
+    """Выполняет функцию _retry_after_seconds."""
+    value = getattr(exc, "retry_after", 1)
+    if isinstance(value, dt.timedelta):
+        return value.total_seconds()
+    try:
+        return float(value)
+    except Exception:
+        return 1.0
+
+
+class NotificationDispatcher:
+    """
+    Queue of outgoing notifications drained by one asyncio task.
+
+    Sends respect a global token bucket (``global_rate`` messages per second)
+    and a minimum interval per chat; messages to one chat keep their order and
+    consecutive plain messages to the same chat are merged. ``RetryAfter``
+    pauses all sends for the period Telegram asks for, network errors are
+    retried with backoff, other errors drop the message.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        *,
+        global_rate: float = 25.0,
+        per_chat_interval: float = 1.0,
+        max_concurrency: int = 8,
+        max_attempts: int = 5,
+        max_queue: int = 10000,
+    ) -> None:
+        """Выполняет функцию __init__."""
+        self._send = send
+        self.global_rate = max(global_rate, 0.1)
+        self.per_chat_interval = max(per_chat_interval, 0.0)
+        self.max_attempts = max(1, max_attempts)
+        self.max_queue = max(1, max_queue)
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._pending: Dict[int, Deque[Notification]] = {}
+        self._ready: "OrderedDict[int, None]" = OrderedDict()
+        self._inflight: Set[int] = set()
+        self._next_allowed: Dict[int, float] = {}
+        self._tokens = self.global_rate
+        self._refilled_at = time.monotonic()
+        self._pause_until = 0.0
+        self._depth = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self.send_latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        self.counters: Dict[str, int] = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "coalesced": 0,
+            "dropped": 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        """Выполняет функцию depth."""
+        return self._depth
+
+    def start(self) -> None:
+        """Выполняет функцию start."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="notification-dispatcher")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued messages up to ``timeout`` seconds to go out, then cancel the loop."""
+        deadline = time.monotonic() + timeout
+        while (self._depth or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._deliveries):
+            task.cancel()
+        if self._depth:
+            logger.warning("Notification dispatcher stopped with %s undelivered messages", self._depth)
+
+    def enqueue(self, chat_id: int, kwargs: Dict[str, Any]) -> bool:
+        """Выполняет функцию enqueue."""
+        if self._depth >= self.max_queue:
+            self.counters["dropped"] += 1
+            return False
+        note = Notification(chat_id=chat_id, kwargs=dict(kwargs))
+        queue = self._pending.setdefault(chat_id, deque())
+        self.counters["queued"] += 1
+        if queue and queue[-1].can_merge(note):
+            queue[-1].kwargs["text"] = f"{queue[-1].kwargs['text']}\n\n{note.kwargs['text']}"
+            self.counters["coalesced"] += 1
+            return True
+        queue.append(note)
+        self._depth += 1
+        if chat_id not in self._inflight:
+            self._ready.setdefault(chat_id, None)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def _next_chat(self, now: float) -> tuple[Optional[int], Optional[float]]:
+        """First chat allowed to send now, else the delay until one is."""
+        soonest: Optional[float] = None
+        for chat_id in self._ready:
+            allowed_at = self._next_allowed.get(chat_id, 0.0)
+            if allowed_at <= now:
+                return chat_id, None
+            soonest = allowed_at if soonest is None else min(soonest, allowed_at)
+        return None, (soonest - now if soonest is not None else None)
+
+    def _prune_intervals(self) -> None:
+        """Forget per-chat intervals that have already elapsed."""
+        if len(self._next_allowed) <= len(self._pending) + 1000:
+            return
+        now = time.monotonic()
+        self._next_allowed = {
+            chat_id: allowed_at
+            for chat_id, allowed_at in self._next_allowed.items()
+            if allowed_at > now or chat_id in self._pending
+        }
+
+    async def _take_token(self) -> None:
+        """Выполняет функцию _take_token."""
+        while True:
+            now = time.monotonic()
+            if self._pause_until > now:
+                await asyncio.sleep(self._pause_until - now)
+                continue
+            self._tokens = min(self.global_rate, self._tokens + (now - self._refilled_at) * self.global_rate)
+            self._refilled_at = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.global_rate)
+
+    async def _run(self) -> None:
+        """Выполняет функцию _run."""
+        assert self._wakeup is not None
+        while True:
+            chat_id, delay = self._next_chat(time.monotonic())
+            if chat_id is None:
+                self._prune_intervals()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._semaphore.acquire()
+            await self._take_token()
+            del self._ready[chat_id]
+            self._inflight.add(chat_id)
+            note = self._pending[chat_id].popleft()
+            self._depth -= 1
+            task = asyncio.create_task(self._deliver(note))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, note: Notification) -> None:
+        """Выполняет функцию _deliver."""
+        chat_id = note.chat_id
+        started = time.monotonic()
+        retry_in = 0.0
+        requeue = False
+        try:
+            note.attempts += 1
+            await self._send(chat_id=chat_id, **note.kwargs)
+            self.send_latency.observe((time.monotonic() - started) * 1000.0, ok=True)
+            self.queue_wait.observe((time.monotonic() - note.enqueued_at) * 1000.0, ok=True)
+            self.counters["sent"] += 1
+        except RetryAfter as exc:
+            # Flood control applies to the whole bot, so every chat waits.
+            self.counters["rate_limited"] += 1
+            self._pause_until = max(self._pause_until, time.monotonic() + _retry_after_seconds(exc))
+            requeue = True
+        except (TimedOut, NetworkError) as exc:
+            self.send_latency.observe((time.monotonic() - started) * 1000.0, ok=False)
+            if note.attempts < self.max_attempts:
+                requeue = True
+                retry_in = min(30.0, 0.5 * 2 ** note.attempts)
+            else:
+                self.counters["failed"] += 1
+                logger.warning("Dropping notification to %s after %s attempts: %s", chat_id, note.attempts, exc)
+        except Exception as exc:
+            self.send_latency.observe((time.monotonic() - started) * 1000.0, ok=False)
+            self.counters["failed"] += 1
+            logger.warning("Failed to send notification to %s: %s", chat_id, exc)
+        finally:
+            self._semaphore.release()
+            if requeue:
+                self.counters["retried"] += 1
+                self._pending.setdefault(chat_id, deque()).appendleft(note)
+                self._depth += 1
+            self._inflight.discard(chat_id)
+            self._next_allowed[chat_id] = time.monotonic() + max(self.per_chat_interval, retry_in)
+            if self._pending.get(chat_id):
+                self._ready[chat_id] = None
+            else:
+                self._pending.pop(chat_id, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        now = time.monotonic()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "depth": self._depth,
+            "chats_waiting": len(self._ready),
+            "in_flight": len(self._inflight),
+            "paused_for": round(max(0.0, self._pause_until - now), 2),
+            "global_rate": self.global_rate,
+            "per_chat_interval": self.per_chat_interval,
+            **self.counters,
+            "send_latency": self.send_latency.snapshot(),
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+
+__all__ = ["Notification", "NotificationDispatcher"]
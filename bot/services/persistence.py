@@ -0,0 +1,254 @@
+"""Postgres-backed ``context.user_data`` store shared by all bot replicas."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from psycopg2 import pool as pg_pool
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS bot_user_data (
+  user_id    BIGINT PRIMARY KEY,
+  data       JSONB NOT NULL DEFAULT '{}'::jsonb,
+  version    BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+
+_MAX_WRITE_ATTEMPTS = 5
+
+
+def _dump(data: Dict[Any, Any]) -> str:
+    """Выполняет функцию _dump."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _merge(base: Dict[str, Any], ours: Dict[str, Any], theirs: Dict[str, Any]) -> Dict[str, Any]:
+    """Three-way merge of top-level keys: our changes relative to ``base`` are applied on top of ``theirs``."""
+    merged = dict(theirs)
+    for key in set(base) | set(ours):
+        if key not in ours:
+            if key in base:
+                merged.pop(key, None)
+        elif key not in base or base[key] != ours[key]:
+            merged[key] = ours[key]
+    return merged
+
+
+def build_db_dsn() -> str:
+    """Выполняет функцию build_db_dsn."""
+    dsn = os.getenv("DATABASE_URL")
+    if dsn:
+        return dsn
+    user = os.getenv("POSTGRES_USER", "mentormatch")
+    password = os.getenv("POSTGRES_PASSWORD", "secret")
+    host = os.getenv("POSTGRES_HOST", "postgres")
+    port = os.getenv("POSTGRES_PORT", "5432")
+    db = os.getenv("POSTGRES_DB", "mentormatch")
+    return f"postgresql://{user}:{password}@{host}:{port}/{db}"
+
+
+class PostgresPersistence(BasePersistence):
+    """
+    Keeps only ``user_data`` (chat/bot/callback data and conversations are not
+    used by the bot) in the ``bot_user_data`` table.
+
+    Each row carries a version: ``refresh_user_data`` reloads a user's dict
+    before every update only when another replica wrote a newer version, and
+    ``update_user_data`` skips writes when the serialized dict did not change
+    and otherwise writes only if the row is still at the version it read
+    (merging and retrying on a conflict). Together with ``BotCore`` flushing
+    after every update this lets several replicas serve the same users behind
+    a load balancer.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, *, update_interval: float = 60, max_connections: int = 4) -> None:
+        """Выполняет функцию __init__."""
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._dsn = dsn or build_db_dsn()
+        self._max_connections = max(1, max_connections)
+        self._pool: Optional[pg_pool.ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        self._written: Dict[int, str] = {}
+
+    @contextmanager
+    def _conn(self) -> Iterator[Any]:
+        """Выполняет функцию _conn."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pg_pool.ThreadedConnectionPool(1, self._max_connections, self._dsn)
+                conn = self._pool.getconn()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(_CREATE_TABLE_SQL)
+                    conn.commit()
+                finally:
+                    self._pool.putconn(conn)
+        conn = self._pool.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            broken = conn.closed != 0
+            if not broken:
+                conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn, close=broken)
+
+    def _load(self, user_id: int, known_version: int) -> Optional[tuple[int, Dict[Any, Any]]]:
+        """Выполняет функцию _load."""
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT version, data FROM bot_user_data WHERE user_id = %s AND version > %s",
+                (user_id, known_version),
+            )
+            row = cur.fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _store(self, user_id: int, payload: str, expected_version: int) -> Optional[int]:
+        """Writes ``payload`` only if the row is still at ``expected_version``; ``None`` means a conflict."""
+        with self._conn() as conn, conn.cursor() as cur:
+            if expected_version > 0:
+                cur.execute(
+                    """
+                    UPDATE bot_user_data
+                    SET data = %s::jsonb, version = version + 1, updated_at = now()
+                    WHERE user_id = %s AND version = %s
+                    RETURNING version
+                    """,
+                    (payload, user_id, expected_version),
+                )
+            else:
+                cur.execute(
+                    """
+                    INSERT INTO bot_user_data(user_id, data, version, updated_at)
+                    VALUES (%s, %s::jsonb, 1, now())
+                    ON CONFLICT (user_id) DO NOTHING
+                    RETURNING version
+                    """,
+                    (user_id, payload),
+                )
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _delete(self, user_id: int) -> None:
+        """Выполняет функцию _delete."""
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM bot_user_data WHERE user_id = %s", (user_id,))
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        """Users are loaded lazily by ``refresh_user_data``."""
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        """Выполняет функцию refresh_user_data."""
+        try:
+            loaded = await asyncio.to_thread(self._load, user_id, self._versions.get(user_id, 0))
+        except Exception as exc:
+            logger.warning("Failed to load user_data for %s: %s", user_id, exc)
+            return
+        if loaded is None:
+            return
+        version, data = loaded
+        user_data.clear()
+        user_data.update(data or {})
+        self._versions[user_id] = version
+        self._written[user_id] = _dump(data or {})
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        """
+        Writes ``data`` against the version it was loaded at. When another
+        replica wrote in between, the stored dict is re-read and merged key by
+        key: keys this replica changed win, everything else is taken from the
+        newer row, and the write is retried.
+        """
+        payload = _dump(data)
+        if self._written.get(user_id) == payload:
+            return
+        base = json.loads(self._written.get(user_id) or "{}")
+        expected = self._versions.get(user_id, 0)
+        try:
+            for _ in range(_MAX_WRITE_ATTEMPTS):
+                version = await asyncio.to_thread(self._store, user_id, payload, expected)
+                if version is not None:
+                    self._versions[user_id] = version
+                    self._written[user_id] = payload
+                    return
+                current = await asyncio.to_thread(self._load, user_id, 0)
+                expected, theirs = current if current else (0, {})
+                merged = _merge(base, json.loads(payload), theirs or {})
+                base = theirs or {}
+                payload = _dump(merged)
+                data.clear()
+                data.update(merged)
+        except Exception as exc:
+            logger.warning("Failed to persist user_data for %s: %s", user_id, exc)
+            return
+        logger.warning("Gave up persisting user_data for %s after %s version conflicts", user_id, _MAX_WRITE_ATTEMPTS)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        """Выполняет функцию drop_user_data."""
+        self._versions.pop(user_id, None)
+        self._written.pop(user_id, None)
+        await asyncio.to_thread(self._delete, user_id)
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        """Выполняет функцию get_chat_data."""
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        """Выполняет функцию get_bot_data."""
+        return {}
+
+    async def get_callback_data(self) -> None:
+        """Выполняет функцию get_callback_data."""
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Any, Any]:
+        """Выполняет функцию get_conversations."""
+        return {}
+
+    async def update_conversation(self, name: str, key: Any, new_state: Optional[object]) -> None:
+        """Выполняет функцию update_conversation."""
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        """Выполняет функцию update_chat_data."""
+
+    async def update_bot_data(self, data: Any) -> None:
+        """Выполняет функцию update_bot_data."""
+
+    async def update_callback_data(self, data: Any) -> None:
+        """Выполняет функцию update_callback_data."""
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        """Выполняет функцию drop_chat_data."""
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        """Выполняет функцию refresh_chat_data."""
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        """Выполняет функцию refresh_bot_data."""
+
+    async def flush(self) -> None:
+        """Выполняет функцию flush."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.closeall)
+
+
+__all__ = ["PostgresPersistence", "build_db_dsn"]
@@ -0,0 +1 @@
+"""Local stand-ins used to exercise the bot without network access."""
@@ -0,0 +1,184 @@
+"""
+Offline stand-in for the Telegram Bot API.
+
+Implements the methods the bot calls (``getMe``, ``setWebhook``,
+``sendMessage``, ``editMessageText``, ``answerCallbackQuery`` …), records
+every outgoing call and can push synthetic updates to the registered webhook,
+so webhook mode, persistence and several replicas can be tried locally:
+
+    python -m bot.testing.fake_telegram --port 8081
+    TELEGRAM_API_BASE_URL=http://localhost:8081 BOT_MODE=webhook \\
+        BOT_WEBHOOK_URL=http://localhost:5000 python -m bot.run_bot
+    curl -X POST localhost:8081/_updates -d '{"user_id": 42, "text": "/start"}'
+    curl localhost:8081/_sent
+
+``POST /_updates`` accepts ``text`` (a message) or ``callback_data`` (a button
+press on the last message sent to that user), plus optional ``webhook`` to
+target one replica directly instead of the URL passed to ``setWebhook``.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+BOT_USER = {"id": 1000001, "is_bot": True, "first_name": "MentorMatch", "username": "mentormatch_test_bot"}
+
+
+class FakeTelegram:
+    """In-memory Bot API state: webhook registration, sent messages and ids."""
+
+    def __init__(self) -> None:
+        """Выполняет функцию __init__."""
+        self.webhook_url: Optional[str] = None
+        self.webhook_secret: Optional[str] = None
+        self.sent: List[Dict[str, Any]] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._last_message: Dict[int, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        """Выполняет функцию _user."""
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def _message(self, chat_id: int, text: str, *, sender: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+        """Выполняет функцию _message."""
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": sender,
+            "text": text,
+        }
+        message.update({key: value for key, value in extra.items() if value is not None})
+        return message
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        """Result of one Bot API method call."""
+        method = method.lower()
+        if method == "getme":
+            return BOT_USER
+        if method == "setwebhook":
+            self.webhook_url = params.get("url")
+            self.webhook_secret = params.get("secret_token")
+            return True
+        if method == "deletewebhook":
+            self.webhook_url = None
+            return True
+        if method == "getwebhookinfo":
+            return {"url": self.webhook_url or "", "has_custom_certificate": False, "pending_update_count": 0}
+        if method == "getupdates":
+            return []
+        if method in {"sendmessage", "editmessagetext"}:
+            self.sent.append({"method": method, **params})
+            chat_id = int(params.get("chat_id") or 0)
+            message = self._message(chat_id, str(params.get("text") or ""), sender=BOT_USER,
+                                    reply_markup=params.get("reply_markup"))
+            if method == "editmessagetext" and params.get("message_id"):
+                message["message_id"] = int(params["message_id"])
+            self._last_message[chat_id] = message
+            return message
+        self.sent.append({"method": method, **params})
+        return True
+
+    def build_update(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполняет функцию build_update."""
+        user_id = int(payload.get("user_id") or 1)
+        user = self._user(user_id)
+        update: Dict[str, Any] = {"update_id": next(self._update_ids)}
+        if payload.get("callback_data"):
+            message = self._last_message.get(user_id) or self._message(user_id, "", sender=BOT_USER)
+            update["callback_query"] = {
+                "id": str(update["update_id"]),
+                "from": user,
+                "chat_instance": str(user_id),
+                "message": message,
+                "data": str(payload["callback_data"]),
+            }
+            return update
+        text = str(payload.get("text") or "")
+        entities = None
+        if text.startswith("/"):
+            entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        update["message"] = self._message(user_id, text, sender=user, entities=entities)
+        return update
+
+
+def _decode_params(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """PTB sends every parameter as a form field holding JSON."""
+    params: Dict[str, Any] = {}
+    for key, value in raw.items():
+        if isinstance(value, str):
+            try:
+                params[key] = json.loads(value)
+                continue
+            except ValueError:
+                pass
+        params[key] = value
+    return params
+
+
+def create_app(state: Optional[FakeTelegram] = None) -> web.Application:
+    """Выполняет функцию create_app."""
+    fake = state or FakeTelegram()
+    app = web.Application()
+    app["fake"] = fake
+
+    async def bot_method(request: web.Request) -> web.Response:
+        """Выполняет функцию bot_method."""
+        if request.content_type == "application/json":
+            raw = await request.json()
+        else:
+            raw = dict(await request.post())
+        result = fake.call(request.match_info["method"], _decode_params(raw))
+        return web.json_response({"ok": True, "result": result})
+
+    async def push_update(request: web.Request) -> web.Response:
+        """Выполняет функцию push_update."""
+        payload = await request.json()
+        target = payload.get("webhook") or fake.webhook_url
+        if not target:
+            return web.json_response({"ok": False, "description": "no webhook registered"}, status=409)
+        update = fake.build_update(payload)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": fake.webhook_secret} if fake.webhook_secret else {}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(target, json=update, headers=headers) as response:
+                return web.json_response({"ok": response.status == 200, "status": response.status, "update": update})
+
+    async def list_sent(_: web.Request) -> web.Response:
+        """Выполняет функцию list_sent."""
+        return web.json_response({"webhook_url": fake.webhook_url, "sent": fake.sent})
+
+    async def clear_sent(_: web.Request) -> web.Response:
+        """Выполняет функцию clear_sent."""
+        fake.sent.clear()
+        return web.json_response({"ok": True})
+
+    app.add_routes(
+        [
+            web.route("*", "/bot{token}/{method}", bot_method),
+            web.post("/_updates", push_update),
+            web.get("/_sent", list_sent),
+            web.delete("/_sent", clear_sent),
+        ]
+    )
+    return app
+
+
+def main() -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,9 @@ from pydantic import BaseModel
 
 from .routes.import_students import create_students_import_router
 from .routes.import_supervisors import create_supervisors_import_router
-from .services.db import get_conn
-from .workflows.sheet_pairs import sync_roles_sheet
+from .services.cv_fetcher import cv_fetcher
+from .services.db import close_pool, get_conn, pool_stats
+from .workflows.sheet_pairs import pairs_export
 
 
                                                      
@@ -37,6 +38,8 @@ app.include_router(create_supervisors_import_router(get_conn))
 class ExportPairsPayload(BaseModel):
     spreadsheet_id: Optional[str] = None
     service_account_file: Optional[str] = None
+    full: bool = False
+    wait: bool = False
 
 
 @app.get("/health", response_class=JSONResponse)
@@ -46,6 +49,32 @@ def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics/db-pool", response_class=JSONResponse)
+def db_pool_metrics() -> dict[str, object]:
+    """Возвращает метрики пула соединений с базой данных."""
+    return pool_stats()
+
+
+@app.get("/api/media/cv-fetch/status", response_class=JSONResponse)
+def cv_fetch_status() -> dict[str, object]:
+    """Возвращает прогресс фоновой загрузки резюме: статусы media_files и счётчики фетчера."""
+    return cv_fetcher.status()
+
+
+@app.on_event("startup")
+def _start_cv_fetcher() -> None:
+    """Запускает фоновую загрузку резюме, оставшихся после импорта."""
+    cv_fetcher.start()
+
+
+@app.on_event("shutdown")
+def _close_db_pool() -> None:
+    """Останавливает фетчер резюме, выгружает отложенные пары и закрывает пул соединений."""
+    cv_fetcher.stop()
+    pairs_export.stop()
+    close_pool()
+
+
 @app.post("/api/export/pairs", response_class=JSONResponse)
                                                        
 def export_pairs(payload: ExportPairsPayload) -> JSONResponse:
@@ -64,15 +93,19 @@ def export_pairs(payload: ExportPairsPayload) -> JSONResponse:
         service_account_file,
     )
 
-    success = sync_roles_sheet(
-        get_conn,
-        spreadsheet_id=spreadsheet_id,
-        service_account_file=service_account_file,
-    )
-    if not success:
+    # Все экспорты идут через один поток планировщика: подтверждения пар
+    # схлопываются в фоне, а wait=true выполняется без паузы и ждёт результата.
+    result = pairs_export.request(spreadsheet_id, service_account_file, full=payload.full, wait=payload.wait)
+    if not payload.wait:
+        return JSONResponse({"status": "ok", "spreadsheet_id": spreadsheet_id, "queued": True})
+    if not result:
         raise HTTPException(status_code=500, detail="Failed to export data to Google Sheets")
     return JSONResponse({"status": "ok", "spreadsheet_id": spreadsheet_id})
 
+@app.get("/api/export/pairs/status", response_class=JSONResponse)
+def export_pairs_status() -> dict[str, object]:
+    """Возвращает состояние отложенного экспорта пар."""
+    return pairs_export.status()
 
 if __name__ == "__main__":
     import uvicorn
@@ -8,11 +8,14 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from psycopg2.extensions import connection
 
+from ..services.cv_fetcher import cv_fetcher
 from ..services.google_sheets import (
     ensure_service_account_file,
     google_tls_preflight,
-    load_student_rows,
+    load_student_sheet,
 )
+from ..services.import_ledger import plan_sheet_delta, record_sheet_delta
+from ..utils.parse_gform import normalize_student_rows
 from ..workflows.topic_import import import_students
 
 
@@ -20,6 +23,7 @@ class ImportSheetPayload(BaseModel):
     spreadsheet_id: str
     sheet_name: Optional[str] = None
     service_account_file: Optional[str] = None
+    full_refresh: bool = False
 
 
                                                            
@@ -39,16 +43,34 @@ def create_students_import_router(get_conn: Callable[[], connection]) -> APIRout
             return JSONResponse({"status": "error", "message": str(exc)}, status_code=400)
 
         google_tls_preflight()
-        rows = load_student_rows(
+        sheet_title, headers, data_rows = load_student_sheet(
             spreadsheet_id=payload.spreadsheet_id,
             sheet_name=payload.sheet_name,
             service_account_file=service_account_file,
         )
 
-        rows_list = list(rows)
         with get_conn() as conn:
-            result = import_students(conn, rows_list)
-        result.setdefault("stats", {})["total_rows_in_sheet"] = len(rows_list)
+            delta = plan_sheet_delta(
+                conn,
+                "students",
+                payload.spreadsheet_id,
+                sheet_title,
+                headers,
+                data_rows,
+                full=payload.full_refresh,
+            )
+            # Нормализуются и импортируются только новые и изменённые строки.
+            record_sheet_delta(conn, delta)
+            result = import_students(conn, normalize_student_rows(headers, delta.rows))
+        if result.get("stats", {}).get("pending_cvs"):
+            cv_fetcher.kick()
+        stats = result.setdefault("stats", {})
+        stats.update(delta.stats())
+        stats["total_rows_in_sheet"] = len(data_rows)
+        result["message"] = (
+            f"{result.get('message', '')} Строк в листе: {len(data_rows)}, новых: {delta.added},"
+            f" изменённых: {delta.changed}, без изменений: {delta.unchanged}."
+        ).strip()
         return JSONResponse(result)
 
     return router
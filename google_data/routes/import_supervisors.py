@@ -11,15 +11,18 @@ from psycopg2.extensions import connection
 from ..services.google_sheets import (
     ensure_service_account_file,
     google_tls_preflight,
-    load_supervisor_rows,
+    load_supervisor_sheet,
 )
-from ..workflows.topic_import import import_supervisors
+from ..services.import_ledger import plan_sheet_delta, record_sheet_delta
+from ..utils.parse_gform import normalize_supervisor_rows
+from ..workflows.topic_import import extract_supervisor_topics, import_supervisors
 
 
 class ImportSupervisorsPayload(BaseModel):
     spreadsheet_id: str
     sheet_name: Optional[str] = None
     service_account_file: Optional[str] = None
+    full_refresh: bool = False
 
 
                                                              
@@ -39,16 +42,42 @@ def create_supervisors_import_router(get_conn: Callable[[], connection]) -> APIR
             return JSONResponse({"status": "error", "message": str(exc)}, status_code=400)
 
         google_tls_preflight()
-        rows = load_supervisor_rows(
+        sheet_title, headers, data_rows = load_supervisor_sheet(
             spreadsheet_id=payload.spreadsheet_id,
             sheet_name=payload.sheet_name,
             service_account_file=service_account_file,
         )
 
-        rows_list = list(rows)
         with get_conn() as conn:
-            result = import_supervisors(conn, rows_list)
-        result.setdefault("stats", {})["total_rows_in_sheet"] = len(rows_list)
+            delta = plan_sheet_delta(
+                conn,
+                "supervisors",
+                payload.spreadsheet_id,
+                sheet_title,
+                headers,
+                data_rows,
+                full=payload.full_refresh,
+            )
+        # Нормализуются и импортируются только новые и изменённые строки;
+        # темы извлекаются через LLM до того, как открывается транзакция импорта.
+        rows = normalize_supervisor_rows(headers, delta.rows)
+        topics = extract_supervisor_topics(rows)
+        # Строки с резервным разбором тем (ошибка LLM, дедлайн, бюджет) импортируются,
+        # но не попадают в журнал, чтобы следующий импорт запланировал их снова.
+        deferred = set(topics.degraded_rows)
+        if deferred:
+            delta.entries = [entry for row_no, entry in enumerate(delta.entries) if row_no not in deferred]
+        with get_conn() as conn:
+            record_sheet_delta(conn, delta)
+            result = import_supervisors(conn, rows, topics)
+        stats = result.setdefault("stats", {})
+        stats.update(delta.stats())
+        stats["rows_deferred"] = len(deferred)
+        stats["total_rows_in_sheet"] = len(data_rows)
+        result["message"] = (
+            f"{result.get('message', '')} Строк в листе: {len(data_rows)}, новых: {delta.added},"
+            f" изменённых: {delta.changed}, без изменений: {delta.unchanged}."
+        ).strip()
         return JSONResponse(result)
 
     return router
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
+from requests.exceptions import HTTPError
+
+from .db import get_conn as default_get_conn
+from .media_store import download_media_file, normalize_media_url
+
+logger = logging.getLogger(__name__)
+
+CV_FETCH_WORKERS = int(os.getenv("CV_FETCH_WORKERS", "4"))
+CV_FETCH_BATCH = int(os.getenv("CV_FETCH_BATCH", "32"))
+CV_FETCH_POLL_SECONDS = float(os.getenv("CV_FETCH_POLL_SECONDS", "30"))
+CV_FETCH_MAX_ATTEMPTS = int(os.getenv("CV_FETCH_MAX_ATTEMPTS", "3"))
+CV_FETCH_LEASE_SECONDS = int(os.getenv("CV_FETCH_LEASE_SECONDS", "600"))
+
+# (media_id, owner_user_id, source_url)
+PendingMedia = Tuple[int, Optional[int], str]
+
+
+def pending_media_counts(conn: connection) -> Dict[str, int]:
+    """Возвращает число записей media_files по статусам загрузки."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT status, COUNT(*) FROM media_files GROUP BY status")
+        return {status: count for status, count in cur.fetchall()}
+
+
+class CVFetcher:
+    """
+    Фоновая загрузка резюме, импортированных ссылками.
+
+    Импорт только создаёт в ``media_files`` запись ``status='pending'`` с
+    ``source_url`` и сразу фиксирует транзакцию. Поток-фетчер забирает такие
+    записи пачками (``FOR UPDATE SKIP LOCKED``), скачивает уникальные адреса
+    параллельно в пуле из ``CV_FETCH_WORKERS`` потоков — одинаковые ссылки
+    качаются один раз — и заполняет ``object_key``/``size_bytes``/``mime_type``.
+    Сетевые ошибки повторяются до ``CV_FETCH_MAX_ATTEMPTS`` раз с паузой
+    30 с × номер попытки, HTTP-ошибки сразу переводят запись в ``failed``, а
+    профилю студента возвращается исходная ссылка. Запись в ``fetching``
+    арендуется на ``CV_FETCH_LEASE_SECONDS``: если реплика упала, запись
+    забирает другая только после истечения аренды.
+    """
+
+    def __init__(
+        self,
+        get_conn: Callable[[], ContextManager[connection]] = default_get_conn,
+        *,
+        workers: int = CV_FETCH_WORKERS,
+        batch_size: int = CV_FETCH_BATCH,
+        poll_interval: float = CV_FETCH_POLL_SECONDS,
+        max_attempts: int = CV_FETCH_MAX_ATTEMPTS,
+        lease_seconds: int = CV_FETCH_LEASE_SECONDS,
+    ) -> None:
+        """Сохраняет настройки; поток запускается методом ``start``."""
+        self._get_conn = get_conn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = max(1.0, poll_interval)
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = max(1, lease_seconds)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._last_error: Optional[str] = None
+        self._last_batch_at: Optional[float] = None
+        self._counters: Dict[str, int] = {
+            "downloaded": 0,
+            "deduplicated": 0,
+            "retried": 0,
+            "failed": 0,
+            "bytes": 0,
+            "batches": 0,
+        }
+
+    def start(self) -> None:
+        """Запускает поток; зависшие записи других реплик подбираются по истечении аренды."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cv-fetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Останавливает поток после текущей пачки."""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def kick(self) -> None:
+        """Будит фетчер сразу после импорта, не дожидаясь очередного опроса."""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        """Основной цикл: обрабатывает пачки, пока они есть, затем ждёт сигнала или таймаута."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cv-download") as pool:
+            while not self._stop.is_set():
+                try:
+                    processed = self.run_once(pool)
+                except Exception as exc:
+                    self._last_error = str(exc)
+                    logger.warning("CV fetch batch failed: %s", exc)
+                    processed = 0
+                if processed:
+                    continue
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self) -> Tuple[List[PendingMedia], Dict[int, int]]:
+        """
+        Арендует очередную пачку: ожидающие записи после паузы повтора и
+        записи ``fetching`` с истёкшей арендой (``fetched_at`` — её начало).
+        Возвращает пачку и номера попыток.
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE media_files
+                SET status = 'fetching', attempts = attempts + 1, fetched_at = now()
+                WHERE id IN (
+                    SELECT id FROM media_files
+                    WHERE (
+                            status = 'pending'
+                            AND (fetched_at IS NULL OR fetched_at < now() - make_interval(secs => 30 * attempts))
+                          )
+                       OR (status = 'fetching' AND fetched_at < now() - make_interval(secs => %s))
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, owner_user_id, source_url, attempts
+                """,
+                (self.lease_seconds, self.batch_size),
+            )
+            rows = sorted(cur.fetchall())
+        return [(row[0], row[1], row[2]) for row in rows], {row[0]: row[3] for row in rows}
+
+    def run_once(self, pool: ThreadPoolExecutor) -> int:
+        """Скачивает одну пачку; возвращает число обработанных записей."""
+        claimed, attempts = self._claim()
+        if not claimed:
+            return 0
+        groups: Dict[str, List[PendingMedia]] = {}
+        for item in claimed:
+            groups.setdefault(normalize_media_url(item[2] or ""), []).append(item)
+        with self._lock:
+            self._in_flight += len(claimed)
+            self._counters["deduplicated"] += len(claimed) - len(groups)
+
+        try:
+            futures = {
+                url: pool.submit(download_media_file, url, items[0][0], "cv")
+                for url, items in groups.items()
+                if url
+            }
+            updates: List[Tuple[int, Optional[str], Optional[int], Optional[str], str, Optional[str]]] = []
+            for url, items in groups.items():
+                future = futures.get(url)
+                try:
+                    if future is None:
+                        raise ValueError("empty url")
+                    key, size, mime_type = future.result()
+                except Exception as exc:
+                    permanent = isinstance(exc, (HTTPError, ValueError))
+                    for media_id, _, _ in items:
+                        retry = not permanent and attempts.get(media_id, 1) < self.max_attempts
+                        updates.append((media_id, None, None, None, "pending" if retry else "failed", str(exc)[:500]))
+                        with self._lock:
+                            self._counters["retried" if retry else "failed"] += 1
+                    self._last_error = f"{url}: {exc}"
+                    logger.warning("Failed to download CV %s: %s", url, exc)
+                    continue
+                with self._lock:
+                    self._counters["downloaded"] += 1
+                    self._counters["bytes"] += size
+                for media_id, _, _ in items:
+                    updates.append((media_id, key, size, mime_type, "ready", None))
+
+            with self._get_conn() as conn, conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    UPDATE media_files AS m
+                    SET object_key = COALESCE(v.object_key, m.object_key),
+                        size_bytes = COALESCE(v.size_bytes, m.size_bytes),
+                        mime_type = COALESCE(v.mime_type, m.mime_type),
+                        status = v.status,
+                        error = v.error,
+                        fetched_at = now()
+                    FROM (VALUES %s) AS v(id, object_key, size_bytes, mime_type, status, error)
+                    WHERE m.id = v.id AND m.status = 'fetching'
+                    """,
+                    updates,
+                    template="(%s::bigint, %s::text, %s::bigint, %s::text, %s::text, %s::text)",
+                    page_size=len(updates),
+                )
+                failed_ids = [update[0] for update in updates if update[4] == "failed"]
+                if failed_ids:
+                    # Заглушка так и не скачалась: профиль снова получает исходную ссылку.
+                    cur.execute(
+                        """
+                        UPDATE student_profiles AS sp
+                        SET cv = m.source_url
+                        FROM media_files AS m
+                        WHERE m.id = ANY(%s) AND m.status = 'failed'
+                          AND m.source_url IS NOT NULL AND sp.cv = '/media/' || m.id
+                        """,
+                        (failed_ids,),
+                    )
+        finally:
+            with self._lock:
+                self._in_flight -= len(claimed)
+        with self._lock:
+            self._counters["batches"] += 1
+        self._last_batch_at = time.time()
+        return len(claimed)
+
+    def status(self) -> Dict[str, Any]:
+        """Возвращает прогресс загрузки: очередь в базе и счётчики процесса."""
+        try:
+            with self._get_conn() as conn:
+                counts = pending_media_counts(conn)
+        except Exception as exc:
+            counts = {"error": str(exc)}
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = self._in_flight
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "media": counts,
+            **counters,
+            "last_error": self._last_error,
+            "last_batch_at": self._last_batch_at,
+        }
+
+
+cv_fetcher = CVFetcher()
+
+
+__all__ = ["CVFetcher", "cv_fetcher", "pending_media_counts"]
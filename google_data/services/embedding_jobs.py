@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
+
+
+def enqueue_embedding_jobs(conn: connection, kind: str, ids: Iterable[int]) -> int:
+    """Записывает задачи пересчёта эмбеддингов в outbox embedding_jobs в текущей транзакции."""
+    unique_ids = list(dict.fromkeys(int(entity_id) for entity_id in ids))
+    if not unique_ids:
+        return 0
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO embedding_jobs(kind, entity_id)
+            VALUES %s
+            ON CONFLICT (kind, entity_id) WHERE status = 'pending' DO NOTHING
+            """,
+            [(kind, entity_id) for entity_id in unique_ids],
+            page_size=len(unique_ids),
+        )
+    return len(unique_ids)
+
+
+__all__ = ["enqueue_embedding_jobs"]
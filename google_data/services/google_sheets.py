@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from ..utils.parse_gform import fetch_normalized_rows, fetch_supervisor_rows
+from ..utils.parse_gform import (
+    fetch_normalized_rows,
+    fetch_supervisor_rows,
+    read_student_sheet,
+    read_supervisor_sheet,
+)
 from ..utils.utils import resolve_service_account_path
 
 
@@ -57,9 +62,41 @@ def load_supervisor_rows(
     )
 
 
+                                                         
+def load_student_sheet(
+    spreadsheet_id: str,
+    *,
+    sheet_name: Optional[str],
+    service_account_file: str,
+) -> Tuple[str, List[str], List[List[str]]]:
+    """Загружает лист студентов без нормализации: название, заголовки и строки."""
+    return read_student_sheet(
+        spreadsheet_id=spreadsheet_id,
+        sheet_name=sheet_name,
+        service_account_file=service_account_file,
+    )
+
+
+                                                           
+def load_supervisor_sheet(
+    spreadsheet_id: str,
+    *,
+    sheet_name: Optional[str],
+    service_account_file: str,
+) -> Tuple[str, List[str], List[List[str]]]:
+    """Загружает лист наставников без нормализации: название, заголовки и строки."""
+    return read_supervisor_sheet(
+        spreadsheet_id=spreadsheet_id,
+        sheet_name=sheet_name,
+        service_account_file=service_account_file,
+    )
+
+
 __all__ = [
     "ensure_service_account_file",
     "google_tls_preflight",
     "load_student_rows",
     "load_supervisor_rows",
+    "load_student_sheet",
+    "load_supervisor_sheet",
 ]
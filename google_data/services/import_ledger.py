@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
+
+from ..utils.parse_gform import sheet_timestamp_column
+
+
+def row_fingerprint(headers: List[str], row: List[str]) -> str:
+    """Хэш сырой строки вместе с заголовками: смена колонок тоже считается изменением."""
+    payload = json.dumps([headers, [(cell or "").strip() for cell in row]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def row_keys(rows: List[List[str]], timestamp_index: Optional[int]) -> List[str]:
+    """
+    Ключи строк анкеты: «Отметка времени» Google Forms (с номером повтора, если
+    отметки совпали), а без неё — позиция строки на листе.
+    """
+    keys: List[str] = []
+    seen: Dict[str, int] = {}
+    for position, row in enumerate(rows):
+        stamp = ""
+        if timestamp_index is not None and timestamp_index < len(row):
+            stamp = (row[timestamp_index] or "").strip()
+        if not stamp:
+            keys.append(f"row:{position}")
+            continue
+        repeat = seen.get(stamp, 0)
+        seen[stamp] = repeat + 1
+        keys.append(f"ts:{stamp}" if not repeat else f"ts:{stamp}#{repeat}")
+    return keys
+
+
+@dataclass
+class SheetDelta:
+    """Строки листа, которые нужно импортировать, и счётчики сравнения с журналом."""
+
+    source: str
+    spreadsheet_id: str
+    sheet: str
+    headers: List[str]
+    rows: List[List[str]] = field(default_factory=list)
+    entries: List[Tuple[str, str]] = field(default_factory=list)
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счётчики для ответа API."""
+        return {"rows_added": self.added, "rows_changed": self.changed, "rows_unchanged": self.unchanged}
+
+
+def plan_sheet_delta(
+    conn: connection,
+    source: str,
+    spreadsheet_id: str,
+    sheet: str,
+    headers: List[str],
+    rows: List[List[str]],
+    *,
+    full: bool = False,
+) -> SheetDelta:
+    """
+    Сравнивает строки листа с журналом ``sheet_import_ledger`` и оставляет
+    только новые и изменённые; ``full=True`` принудительно берёт все строки.
+    """
+    delta = SheetDelta(source=source, spreadsheet_id=spreadsheet_id, sheet=sheet, headers=headers)
+    known: Dict[str, str] = {}
+    if not full:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT row_key, fingerprint
+                FROM sheet_import_ledger
+                WHERE source = %s AND spreadsheet_id = %s AND sheet = %s
+                """,
+                (source, spreadsheet_id, sheet),
+            )
+            known = dict(cur.fetchall())
+    for key, row in zip(row_keys(rows, sheet_timestamp_column(headers)), rows):
+        fingerprint = row_fingerprint(headers, row)
+        previous = known.get(key)
+        if previous == fingerprint:
+            delta.unchanged += 1
+            continue
+        if previous is None:
+            delta.added += 1
+        else:
+            delta.changed += 1
+        delta.rows.append(row)
+        delta.entries.append((key, fingerprint))
+    return delta
+
+
+def record_sheet_delta(conn: connection, delta: SheetDelta) -> int:
+    """Записывает отпечатки импортированных строк в журнал в текущей транзакции."""
+    if not delta.entries:
+        return 0
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO sheet_import_ledger(source, spreadsheet_id, sheet, row_key, fingerprint, imported_at)
+            VALUES %s
+            ON CONFLICT (source, spreadsheet_id, sheet, row_key) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint, imported_at = EXCLUDED.imported_at
+            """,
+            [(delta.source, delta.spreadsheet_id, delta.sheet, key, fingerprint) for key, fingerprint in delta.entries],
+            template="(%s, %s, %s, %s, %s, now())",
+            page_size=1000,
+        )
+    return len(delta.entries)
+
+
+__all__ = ["SheetDelta", "plan_sheet_delta", "record_sheet_delta", "row_fingerprint", "row_keys"]
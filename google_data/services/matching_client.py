@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
 import httpx
 
@@ -11,11 +11,11 @@ logger = logging.getLogger(__name__)
 
 
                                                                 
-def _post(path: str, payload: Dict[str, Any]) -> None:
+def _post(path: str, payload: Dict[str, Any], *, timeout: float = 30) -> None:
     """Отправляет запрос на сервис Matching для выполнения фоновой задачи."""
     url = f"{MATCHING_SERVICE_URL.rstrip('/')}{path}"
     try:
-        response = httpx.post(url, json=payload, timeout=30)
+        response = httpx.post(url, json=payload, timeout=timeout)
         response.raise_for_status()
     except Exception as exc:
         logger.warning("Matching service call to %s failed: %s", url, exc)
@@ -45,9 +45,18 @@ def refresh_role_embedding(role_id: int) -> None:
     _post("/api/embeddings/role/refresh", {"role_id": role_id})
 
 
+def refresh_embeddings_batch(kind: str, ids: Iterable[int]) -> None:
+    """Пересчитывает эмбеддинги всех переданных сущностей одного типа одним запросом."""
+    unique_ids = list(dict.fromkeys(int(entity_id) for entity_id in ids))
+    if not unique_ids:
+        return
+    _post("/api/embeddings/batch", {"kind": kind, "ids": unique_ids}, timeout=600)
+
+
 __all__ = [
     "refresh_student_embedding",
     "refresh_supervisor_embedding",
     "refresh_topic_embedding",
     "refresh_role_embedding",
+    "refresh_embeddings_batch",
 ]
@@ -78,17 +78,20 @@ def _download_with_retries(url: str, *, attempts: int = 3, timeout: int = 30) ->
     raise RuntimeError("Download failed without an explicit requests exception")
 
 
-def persist_media_from_url(conn, owner_user_id: Optional[int], url: str, category: str = "cv") -> Tuple[int, str]:
-    """Скачивает файл, сохраняет его локально и регистрирует запись в базе."""
-    if not url or not url.strip():
-        raise ValueError("empty url")
-    url = url.strip()
+def normalize_media_url(url: str) -> str:
+    """Приводит ссылку к адресу, по которому файл реально скачивается."""
+    url = (url or "").strip()
     if "drive.google.com" in url:
         url = _normalize_drive_url(url)
+    return url
 
-    _ensure_media_root()
 
-    response = _download_with_retries(url)
+def download_media_file(url: str, media_id: int, category: str = "cv") -> Tuple[str, int, str]:
+    """
+    Скачивает файл в ``MEDIA_ROOT`` под ключом ``{category}/{media_id}_{имя}``
+    и возвращает ``(object_key, size_bytes, mime_type)``; к базе не обращается.
+    """
+    response = _download_with_retries(normalize_media_url(url))
     content_type = response.headers.get("Content-Type") or "application/octet-stream"
     filename = _safe_name(_guess_filename(url, response.headers.get("Content-Disposition")))
     if not os.path.splitext(filename)[1]:
@@ -96,17 +99,6 @@ def persist_media_from_url(conn, owner_user_id: Optional[int], url: str, categor
         if extension:
             filename = f"{filename}{extension}"
 
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO media_files(owner_user_id, object_key, provider, mime_type, size_bytes, created_at)
-            VALUES (%s, %s, 'local', %s, NULL, now())
-            RETURNING id
-            """,
-            (owner_user_id, "", content_type),
-        )
-        media_id = cur.fetchone()[0]
-
     key = f"{category}/{media_id}_{filename}"
     path = _ensure_media_root() / key
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -117,15 +109,41 @@ def persist_media_from_url(conn, owner_user_id: Optional[int], url: str, categor
             if chunk:
                 handle.write(chunk)
                 size += len(chunk)
+    return key, size, content_type
+
+
+def persist_media_from_url(conn, owner_user_id: Optional[int], url: str, category: str = "cv") -> Tuple[int, str]:
+    """Скачивает файл, сохраняет его локально и регистрирует запись в базе."""
+    if not url or not url.strip():
+        raise ValueError("empty url")
+    url = normalize_media_url(url)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO media_files(owner_user_id, object_key, provider, mime_type, size_bytes, source_url, created_at)
+            VALUES (%s, %s, 'local', %s, NULL, %s, now())
+            RETURNING id
+            """,
+            (owner_user_id, "", "application/octet-stream", url),
+        )
+        media_id = cur.fetchone()[0]
+
+    try:
+        key, size, content_type = download_media_file(url, media_id, category)
+    except Exception:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM media_files WHERE id=%s", (media_id,))
+        raise
 
     with conn.cursor() as cur:
         cur.execute(
-            "UPDATE media_files SET object_key=%s, size_bytes=%s WHERE id=%s",
-            (key, size, media_id),
+            "UPDATE media_files SET object_key=%s, size_bytes=%s, mime_type=%s, fetched_at=now() WHERE id=%s",
+            (key, size, content_type, media_id),
         )
 
     public_path = f"/media/{media_id}"
     return media_id, public_path
 
 
-__all__ = ["persist_media_from_url", "MEDIA_ROOT"]
+__all__ = ["persist_media_from_url", "download_media_file", "normalize_media_url", "MEDIA_ROOT"]
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import io
+from typing import Any, Iterable, Sequence
+
+from psycopg2 import sql
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_field(value: Any) -> str:
+    """Кодирует значение для текстового формата COPY (NULL — ``\\N``)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Загружает строки во временную таблицу одной командой ``COPY ... FROM STDIN``
+    и возвращает их количество.
+    """
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(copy_field(value) for value in row))
+        buffer.write("\n")
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    statement = sql.SQL("COPY {table} ({columns}) FROM STDIN").format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+    )
+    cur.copy_expert(statement.as_string(cur), buffer)
+    return count
+
+
+__all__ = ["copy_field", "copy_rows"]
@@ -6,7 +6,7 @@ from typing import Optional
 from psycopg2.extensions import connection
 
 from ..services.media_store import MEDIA_ROOT
-from .text_extract import extract_text_from_file
+from .text_extract import extract_text_with_timeout
 
 
                                                                     
@@ -35,10 +35,8 @@ def resolve_cv_text(conn: connection, cv_value: Optional[str]) -> Optional[str]:
 
     object_key, mime_type = row
     file_path = (MEDIA_ROOT / object_key).resolve()
-    try:
-        text = extract_text_from_file(file_path, mime_type)
-    except Exception:
-        return value
+    result = extract_text_with_timeout(file_path, mime_type)
+    text = result.text
 
     if not text:
         return value
@@ -3,7 +3,7 @@ import os
 import re
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import gspread
 from google.oauth2.service_account import Credentials
@@ -285,31 +285,64 @@ def _select_worksheet(sh, sheet_name: Optional[str]):
     return sh.worksheets()[0]
 
 
-                                                                           
-def fetch_normalized_rows(
-    spreadsheet_id: str,
-    sheet_name: Optional[str],
-    service_account_file: Union[str, Path] = 'service-account.json'
-) -> List[Dict[str, Any]]:
-    """Загружает и нормализует ответы студентов из Google Forms."""
+                                                            
+def _open_spreadsheet(spreadsheet_id: str, service_account_file: Union[str, Path]):
+    """Открывает таблицу Google Sheets с правами только на чтение."""
     scopes = ['https://www.googleapis.com/auth/spreadsheets.readonly']
     creds = Credentials.from_service_account_file(str(service_account_file), scopes=scopes)
     gc = gspread.authorize(creds)
+    return gc.open_by_key(spreadsheet_id)
 
-    sh = gc.open_by_key(spreadsheet_id)
-    ws = _select_worksheet(sh, sheet_name)
 
-    values: List[List[str]] = ws.get_all_values()
+                                                         
+def _split_values(values: List[List[str]]) -> Tuple[List[str], List[List[str]]]:
+    """Отделяет строку заголовков и отбрасывает полностью пустые строки."""
     if not values:
-        return []
-
+        return [], []
     headers = values[0]
     data_rows = [r for r in values[1:] if any((c or '').strip() for c in r)]
+    return headers, data_rows
+
+
+                                                              
+def sheet_timestamp_column(headers: List[str]) -> Optional[int]:
+    """Возвращает индекс колонки «Отметка времени» Google Forms, если она есть."""
+    for i, h in enumerate(headers):
+        if 'отметка времени' in _simplify(h):
+            return i
+    return None
+
+
+                                                        
+def read_student_sheet(
+    spreadsheet_id: str,
+    sheet_name: Optional[str],
+    service_account_file: Union[str, Path] = 'service-account.json'
+) -> Tuple[str, List[str], List[List[str]]]:
+    """Читает лист студентов как есть: название листа, заголовки и непустые строки."""
+    ws = _select_worksheet(_open_spreadsheet(spreadsheet_id, service_account_file), sheet_name)
+    headers, data_rows = _split_values(ws.get_all_values())
+    return ws.title, headers, data_rows
+
+
+                                                            
+def normalize_student_rows(headers: List[str], rows: List[List[str]]) -> List[Dict[str, Any]]:
+    """Нормализует сырые строки анкеты студентов."""
+    if not rows:
+        return []
     cols = _build_col_index(headers)
+    return [_normalize_row(r, cols) for r in rows]
 
-    normalized = [_normalize_row(r, cols) for r in data_rows]
-    return normalized
 
+                                                                           
+def fetch_normalized_rows(
+    spreadsheet_id: str,
+    sheet_name: Optional[str],
+    service_account_file: Union[str, Path] = 'service-account.json'
+) -> List[Dict[str, Any]]:
+    """Загружает и нормализует ответы студентов из Google Forms."""
+    _, headers, data_rows = read_student_sheet(spreadsheet_id, sheet_name, service_account_file)
+    return normalize_student_rows(headers, data_rows)
 
 
 SUP_HEADER_ALIASES: Dict[str, List[str]] = {
@@ -408,27 +441,34 @@ def _select_worksheet_second(sh) -> Any:
         return sh.sheet1
 
 
-                                                                             
-def fetch_supervisor_rows(
+                                                           
+def read_supervisor_sheet(
     spreadsheet_id: str,
     sheet_name: Optional[str] = None,
     service_account_file: Union[str, Path] = 'service-account.json'
-) -> List[Dict[str, Any]]:
-    """Загружает и нормализует ответы наставников из Google Forms."""
-    scopes = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-    creds = Credentials.from_service_account_file(str(service_account_file), scopes=scopes)
-    gc = gspread.authorize(creds)
-
-    sh = gc.open_by_key(spreadsheet_id)
+) -> Tuple[str, List[str], List[List[str]]]:
+    """Читает лист наставников (по умолчанию второй лист) без нормализации."""
+    sh = _open_spreadsheet(spreadsheet_id, service_account_file)
     ws = _select_worksheet(sh, sheet_name) if sheet_name else _select_worksheet_second(sh)
+    headers, data_rows = _split_values(ws.get_all_values())
+    return ws.title, headers, data_rows
 
-    values: List[List[str]] = ws.get_all_values()
-    if not values:
-        return []
 
-    headers = values[0]
-    data_rows = [r for r in values[1:] if any((c or '').strip() for c in r)]
+                                                               
+def normalize_supervisor_rows(headers: List[str], rows: List[List[str]]) -> List[Dict[str, Any]]:
+    """Нормализует сырые строки анкеты наставников."""
+    if not rows:
+        return []
     cols = _build_col_index_sup(headers)
+    return [_normalize_supervisor_row(r, cols) for r in rows]
+
 
-    normalized = [_normalize_supervisor_row(r, cols) for r in data_rows]
-    return normalized
+                                                                             
+def fetch_supervisor_rows(
+    spreadsheet_id: str,
+    sheet_name: Optional[str] = None,
+    service_account_file: Union[str, Path] = 'service-account.json'
+) -> List[Dict[str, Any]]:
+    """Загружает и нормализует ответы наставников из Google Forms."""
+    _, headers, data_rows = read_supervisor_sheet(spreadsheet_id, sheet_name, service_account_file)
+    return normalize_supervisor_rows(headers, data_rows)
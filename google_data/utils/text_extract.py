@@ -1,69 +1,342 @@
+"""
+Извлечение текста резюме (pdf, docx, txt) с ограничениями.
+
+Чтение останавливается, как только набрано ``char_budget`` символов; PDF
+читается не дальше ``TEXT_EXTRACT_MAX_PAGES`` страниц, слишком большие файлы
+пропускаются. ``extract_text_with_timeout`` и ``extract_many`` выполняют
+разбор в пуле процессов с тайм-аутом на файл, чтобы тяжёлый или битый
+документ не блокировал импорт.
+"""
 from __future__ import annotations
 
+import math
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from xml.etree import ElementTree
 
+TEXT_EXTRACT_CHAR_BUDGET = int(os.getenv("TEXT_EXTRACT_CHAR_BUDGET", "20000"))
+TEXT_EXTRACT_MAX_PAGES = int(os.getenv("TEXT_EXTRACT_MAX_PAGES", "50"))
+TEXT_EXTRACT_MAX_BYTES = int(os.getenv("TEXT_EXTRACT_MAX_BYTES", str(20 * 1024 * 1024)))
+TEXT_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("TEXT_EXTRACT_TIMEOUT_SECONDS", "15"))
+TEXT_EXTRACT_WORKERS = int(os.getenv("TEXT_EXTRACT_WORKERS", "2"))
 
-                                                    
-def _read_text_file(p: Path) -> str:
-    """Читает текстовый файл, подбирая подходящую кодировку."""
-    try:
-        return p.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@dataclass
+class ExtractionResult:
+    """Результат извлечения текста вместе с метриками разбора."""
+
+    text: str = ""
+    kind: str = ""
+    pages_read: int = 0
+    truncated: bool = False
+    timed_out: bool = False
+    error: Optional[str] = None
+    seconds: float = 0.0
+    # Тайм-аут или упавший процесс: ошибка временная, кэшировать нельзя.
+    retry: bool = False
+
+
+def _read_text_file(p: Path, budget: int) -> Tuple[str, bool]:
+    """Читает текстовый файл в пределах бюджета символов."""
+    # В UTF-8 на символ приходится не больше 4 байт — больше не читаем.
+    with open(p, "rb") as handle:
+        raw = handle.read(budget * 4 + 1)
+    text = raw.decode("utf-8", errors="ignore")
+    return text[:budget], len(text) > budget
+
+
+def _read_pdf(p: Path, budget: int) -> Tuple[str, bool, int]:
+    """Извлекает текст PDF постранично, пока не исчерпан бюджет или лимит страниц."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(p))
+    parts: List[str] = []
+    collected = 0
+    pages_read = 0
+    for page in reader.pages:
+        if pages_read >= TEXT_EXTRACT_MAX_PAGES or collected >= budget:
+            return "\n".join(parts)[:budget], True, pages_read
+        pages_read += 1
         try:
-            return p.read_text(encoding="cp1251", errors="ignore")
+            text = page.extract_text() or ""
         except Exception:
-            return ""
+            continue
+        if text:
+            parts.append(text)
+            collected += len(text) + 1
+    text = "\n".join(parts).strip()
+    return text[:budget], len(text) > budget, pages_read
 
 
-                                              
-def _read_pdf(p: Path) -> str:
-    """Извлекает текст из PDF-документа, объединяя содержимое страниц."""
-    try:
-        from pypdf import PdfReader
+def _read_docx(p: Path, budget: int) -> Tuple[str, bool]:
+    """Потоково читает абзацы ``word/document.xml`` через ``iterparse`` без построения модели python-docx."""
+    parts: List[str] = []
+    collected = 0
+    with zipfile.ZipFile(p) as archive, archive.open("word/document.xml") as document:
+        runs: List[str] = []
+        for _, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{_W_NS}t":
+                runs.append(element.text or "")
+            elif element.tag == f"{_W_NS}tab":
+                runs.append("\t")
+            elif element.tag == f"{_W_NS}p":
+                paragraph = "".join(runs)
+                runs = []
+                parts.append(paragraph)
+                collected += len(paragraph) + 1
+                element.clear()
+                if collected >= budget:
+                    return "\n".join(parts)[:budget], True
+    text = "\n".join(parts).strip()
+    return text[:budget], len(text) > budget
 
-        reader = PdfReader(str(p))
-        parts = []
-        for page in reader.pages:
-            try:
-                parts.append(page.extract_text() or "")
-            except Exception:
-                continue
-        return "\n".join([text for text in parts if text]).strip()
-    except Exception:
-        return ""
 
+def _kind(p: Path, mime_type: Optional[str]) -> str:
+    """Определяет тип документа по MIME-типу и расширению."""
+    mt = (mime_type or "").lower()
+    ext = p.suffix.lower()
+    if "pdf" in mt or ext == ".pdf":
+        return "pdf"
+    if "word" in mt or ext in (".docx",):
+        return "docx"
+    if "text" in mt or ext in (".txt", ".md"):
+        return "text"
+    return ""
+
+
+def _extract(p: Path, kind: str, budget: int) -> ExtractionResult:
+    """Запускает чтение файла выбранным способом."""
+    if kind == "pdf":
+        text, truncated, pages = _read_pdf(p, budget)
+        return ExtractionResult(text=text, kind=kind, pages_read=pages, truncated=truncated)
+    if kind == "docx":
+        text, truncated = _read_docx(p, budget)
+        return ExtractionResult(text=text, kind=kind, truncated=truncated)
+    text, truncated = _read_text_file(p, budget)
+    return ExtractionResult(text=text, kind="text", truncated=truncated)
 
-                                               
-def _read_docx(p: Path) -> str:
-    """Получает текст из документа DOCX построчно."""
-    try:
-        import docx
 
-        document = docx.Document(str(p))
-        parts = []
-        for paragraph in document.paragraphs:
-            parts.append(paragraph.text or "")
-        return "\n".join(parts).strip()
-    except Exception:
-        return ""
+def extract_text(
+    path: Path,
+    mime_type: Optional[str] = None,
+    *,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> ExtractionResult:
+    """Извлекает до ``char_budget`` символов в текущем процессе."""
+    started = time.perf_counter()
+    if not path or not Path(path).exists():
+        return ExtractionResult(error="missing file")
+    p = Path(path)
+    if p.stat().st_size > TEXT_EXTRACT_MAX_BYTES:
+        return ExtractionResult(error="file too large", seconds=time.perf_counter() - started)
+
+    kind = _kind(p, mime_type)
+    # Сначала заявленный тип, затем остальные способы как запасные.
+    order = ["text", "pdf", "docx"]
+    if kind:
+        order = [kind] + [name for name in order if name != kind]
+    result = ExtractionResult(kind=kind)
+    for candidate in order:
+        try:
+            result = _extract(p, candidate, char_budget)
+        except Exception as exc:
+            result = ExtractionResult(kind=candidate, error=f"{type(exc).__name__}: {exc}")
+            continue
+        if result.text.strip():
+            break
+    result.seconds = time.perf_counter() - started
+    return result
 
 
-                                                           
 def extract_text_from_file(path: Path, mime_type: Optional[str] = None) -> str:
     """Определяет тип файла и извлекает из него текстовое содержимое."""
-    if not path or not Path(path).exists():
-        return ""
-    file_path = Path(path)
-    normalized_mime = (mime_type or "").lower()
-    extension = file_path.suffix.lower()
+    return extract_text(path, mime_type).text
 
-    if "pdf" in normalized_mime or extension == ".pdf":
-        text = _read_pdf(file_path)
-        if text:
-            return text
-    if "word" in normalized_mime or extension in (".docx",):
-        text = _read_docx(file_path)
-        if text:
-            return text
-    return _read_text_file(file_path)
+
+def _extract_in_worker(path: str, mime_type: Optional[str], char_budget: int) -> ExtractionResult:
+    """Точка входа рабочего процесса пула."""
+    return extract_text(Path(path), mime_type, char_budget=char_budget)
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {
+    "files": 0,
+    "timeouts": 0,
+    "errors": 0,
+    "truncated": 0,
+    "pages": 0,
+    "chars": 0,
+    "worker_seconds": 0.0,
+    "wall_seconds": 0.0,
+    "pools_killed": 0,
+}
+
+
+@dataclass(eq=False)
+class _PoolLease:
+    """Общий пул процессов и число вызовов ``extract_many``, которые его ждут."""
+
+    pool: ProcessPoolExecutor
+    users: int = 0
+    retired: bool = False
+
+
+_pool_lock = threading.Lock()
+_current: Optional[_PoolLease] = None
+_retired: Set[_PoolLease] = set()
+
+
+def _acquire_pool() -> _PoolLease:
+    """Возвращает долгоживущий пул, создавая его при первом вызове или после замены прежнего."""
+    global _current
+    with _pool_lock:
+        if _current is None:
+            # spawn: в родителе работают потоки БД и HTTP, их нельзя форкать.
+            _current = _PoolLease(
+                ProcessPoolExecutor(
+                    max_workers=max(1, TEXT_EXTRACT_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            )
+        _current.users += 1
+        return _current
+
+
+def _release_pool(lease: _PoolLease, broken: bool) -> None:
+    """
+    Освобождает пул после вызова. Тайм-аут или упавший процесс выводят пул из
+    работы: новые вызовы получают свежий пул, а процессы старого завершаются,
+    как только его перестают ждать другие вызовы.
+    """
+    global _current
+    with _pool_lock:
+        lease.users -= 1
+        if broken and not lease.retired:
+            lease.retired = True
+            _retired.add(lease)
+            if _current is lease:
+                _current = None
+        kill = lease.retired and lease.users == 0 and lease in _retired
+        if kill:
+            _retired.discard(lease)
+    if kill:
+        _kill_pool(lease.pool)
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Завершает процессы выведенного из работы пула; его уже никто не ждёт."""
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    with _stats_lock:
+        _stats["pools_killed"] += 1
+
+
+def _record(result: ExtractionResult) -> None:
+    """Учитывает результат в накопленных метриках."""
+    with _stats_lock:
+        _stats["files"] += 1
+        _stats["timeouts"] += int(result.timed_out)
+        _stats["errors"] += int(bool(result.error) and not result.timed_out)
+        _stats["truncated"] += int(result.truncated)
+        _stats["pages"] += result.pages_read
+        _stats["chars"] += len(result.text)
+        _stats["worker_seconds"] += result.seconds
+
+
+def extract_many(
+    items: Sequence[Tuple[Path, Optional[str]]],
+    *,
+    timeout: float = TEXT_EXTRACT_TIMEOUT_SECONDS,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> List[ExtractionResult]:
+    """
+    Извлекает текст нескольких файлов в долгоживущем пуле процессов сервиса.
+    На каждый файл отводится ``timeout`` секунд; не успевшие файлы помечаются
+    как прерванные по тайм-ауту, а пул заменяется новым, и его процессы
+    завершаются, когда их перестают ждать другие вызовы. Тайм-ауты и падения
+    процессов возвращаются с ``retry=True``.
+    """
+    if not items:
+        return []
+    started = time.perf_counter()
+    workers = max(1, min(TEXT_EXTRACT_WORKERS, len(items)))
+    lease = _acquire_pool()
+    results: List[ExtractionResult] = []
+    broken = False
+    try:
+        futures = [lease.pool.submit(_extract_in_worker, str(path), mime, char_budget) for path, mime in items]
+        _, pending = wait(futures, timeout=timeout * math.ceil(len(futures) / workers))
+        for future in futures:
+            if future in pending:
+                broken = True
+                results.append(ExtractionResult(timed_out=True, error="timeout", seconds=timeout, retry=True))
+                continue
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                broken = True
+                results.append(ExtractionResult(error=f"{type(exc).__name__}: {exc}", retry=True))
+    except Exception as exc:
+        # submit() on a pool whose worker died raises BrokenProcessPool.
+        broken = True
+        results = [ExtractionResult(error=f"{type(exc).__name__}: {exc}", retry=True) for _ in items]
+    finally:
+        _release_pool(lease, broken or len(results) < len(items))
+    for result in results:
+        _record(result)
+    with _stats_lock:
+        _stats["wall_seconds"] += time.perf_counter() - started
+    return results
+
+
+def extract_text_with_timeout(
+    path: Path,
+    mime_type: Optional[str] = None,
+    *,
+    timeout: float = TEXT_EXTRACT_TIMEOUT_SECONDS,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> ExtractionResult:
+    """Извлекает текст одного файла в пуле процессов с тайм-аутом."""
+    return extract_many([(path, mime_type)], timeout=timeout, char_budget=char_budget)[0]
+
+
+def extraction_stats() -> Dict[str, Any]:
+    """Возвращает накопленные метрики извлечения."""
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    stats["workers"] = TEXT_EXTRACT_WORKERS
+    stats["timeout_seconds"] = TEXT_EXTRACT_TIMEOUT_SECONDS
+    stats["char_budget"] = TEXT_EXTRACT_CHAR_BUDGET
+    return stats
+
+
+def shutdown_extraction_pool() -> None:
+    """Завершает текущий пул и ещё работающие выведенные из работы пулы."""
+    global _current
+    with _pool_lock:
+        leases = list(_retired) + ([_current] if _current is not None else [])
+        _retired.clear()
+        _current = None
+    for lease in leases:
+        _kill_pool(lease.pool)
+
+
+__all__ = [
+    "ExtractionResult",
+    "extract_text",
+    "extract_text_from_file",
+    "extract_many",
+    "extract_text_with_timeout",
+    "extraction_stats",
+    "shutdown_extraction_pool",
+]
@@ -1,70 +1,82 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from psycopg2.extras import execute_values
+
+from ..services.db import get_conn
 
 PROXY_API_KEY = os.getenv("PROXY_API_KEY")
 PROXY_BASE_URL = os.getenv("PROXY_BASE_URL")
 PROXY_MODEL = os.getenv("PROXY_MODEL", "gpt-4o-mini")
 LLM_TEMPERATURE = float(os.getenv("MATCHING_LLM_TEMPERATURE", "0.2"))
+TOPIC_LLM_CONCURRENCY = int(os.getenv("TOPIC_LLM_CONCURRENCY", "4"))
+TOPIC_LLM_TIMEOUT_SECONDS = float(os.getenv("TOPIC_LLM_TIMEOUT_SECONDS", "30"))
+TOPIC_LLM_DEADLINE_SECONDS = float(os.getenv("TOPIC_LLM_DEADLINE_SECONDS", "180"))
+TOPIC_LLM_MAX_CALLS = int(os.getenv("TOPIC_LLM_MAX_CALLS", "300"))
+TOPIC_CACHE_ENABLED = os.getenv("TOPIC_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
 
 logger = logging.getLogger(__name__)
 
 
+_FUNCTIONS = [
+    {
+        "name": "extract_topics",
+        "description": "Extract structured topics from free-form text",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "topics": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "title": {"type": "string"},
+                            "description": {"type": "string"},
+                            "expected_outcomes": {"type": "string"},
+                            "required_skills": {"type": "string"},
+                        },
+                        "required": ["title"],
+                    },
+                }
+            },
+            "required": ["topics"],
+        },
+    }
+]
+
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+
+
                                                        
 def _create_openai_client() -> Optional[OpenAI]:
-    """Создаёт клиента OpenAI через прокси-конфигурацию для извлечения тем."""
+    """Возвращает общий для процесса клиент OpenAI (создаётся при первом вызове)."""
+    global _client
     if not (PROXY_API_KEY and PROXY_BASE_URL):
         return None
-    try:
-        return OpenAI(api_key=PROXY_API_KEY, base_url=PROXY_BASE_URL)
-    except Exception as exc:
-        logger.warning("Unable to create OpenAI client for topic extraction: %s", exc)
-        return None
-
-
-                                                          
-def extract_topics_from_text(text: str) -> Optional[List[Dict[str, Any]]]:
-    """Выделяет структурированные темы из произвольного текста через LLM."""
-    clean = (text or "").strip()
-    if not clean:
-        return None
-    client = _create_openai_client()
-    if client is None:
-        return None
+    with _client_lock:
+        if _client is None:
+            try:
+                _client = OpenAI(api_key=PROXY_API_KEY, base_url=PROXY_BASE_URL)
+            except Exception as exc:
+                logger.warning("Unable to create OpenAI client for topic extraction: %s", exc)
+                return None
+    return _client
 
-    functions = [
-        {
-            "name": "extract_topics",
-            "description": "Extract structured topics from free-form text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "topics": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "title": {"type": "string"},
-                                "description": {"type": "string"},
-                                "expected_outcomes": {"type": "string"},
-                                "required_skills": {"type": "string"},
-                            },
-                            "required": ["title"],
-                        },
-                    }
-                },
-                "required": ["topics"],
-            },
-        }
-    ]
 
-    messages = [
+                                                        
+def _build_messages(clean: str) -> List[Dict[str, str]]:
+    """Формирует сообщения для запроса извлечения тем."""
+    return [
         {
             "role": "system",
             "content": (
@@ -82,18 +94,10 @@ def extract_topics_from_text(text: str) -> Optional[List[Dict[str, Any]]]:
         },
     ]
 
-    try:
-        response = client.chat.completions.create(
-            model=PROXY_MODEL,
-            messages=messages,
-            functions=functions,
-            function_call={"name": "extract_topics"},
-            temperature=LLM_TEMPERATURE,
-        )
-    except Exception as exc:
-        logger.warning("Topic extraction request failed: %s", exc)
-        return None
 
+                                                           
+def _parse_topics(response: Any) -> Optional[List[Dict[str, Any]]]:
+    """Разбирает ответ LLM; None — ответ не удалось разобрать, [] — тем нет."""
     if not response.choices or not response.choices[0].message:
         return None
     call = getattr(response.choices[0].message, "function_call", None)
@@ -126,8 +130,210 @@ def extract_topics_from_text(text: str) -> Optional[List[Dict[str, Any]]]:
                 "required_skills": (raw.get("required_skills") or "").strip() or None,
             }
         )
+    return normalised
+
 
-    return normalised or None
+                                                          
+def extract_topics_from_text(text: str) -> Optional[List[Dict[str, Any]]]:
+    """Выделяет структурированные темы из произвольного текста через LLM."""
+    clean = (text or "").strip()
+    if not clean:
+        return None
+    client = _create_openai_client()
+    if client is None:
+        return None
+
+    try:
+        response = client.chat.completions.create(
+            model=PROXY_MODEL,
+            messages=_build_messages(clean),
+            functions=_FUNCTIONS,
+            function_call={"name": "extract_topics"},
+            temperature=LLM_TEMPERATURE,
+        )
+    except Exception as exc:
+        logger.warning("Topic extraction request failed: %s", exc)
+        return None
+
+    return _parse_topics(response) or None
+
+
+                                                   
+def topic_text_hash(text: str) -> str:
+    """Ключ кэша: хэш модели, температуры и очищенного текста блока."""
+    material = json.dumps([PROXY_MODEL, round(LLM_TEMPERATURE, 4), (text or "").strip()], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+                                                         
+def _load_cached_topics(hashes: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Достаёт закэшированные результаты одним запросом и отмечает попадания."""
+    if not (TOPIC_CACHE_ENABLED and hashes):
+        return {}
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE llm_topic_cache
+                SET hits = hits + 1, last_hit_at = now()
+                WHERE text_hash = ANY(%s)
+                RETURNING text_hash, result
+                """,
+                (hashes,),
+            )
+            rows = cur.fetchall()
+    except Exception as exc:
+        logger.warning("Topic cache lookup failed: %s", exc)
+        return {}
+    return {key: (result if isinstance(result, list) else json.loads(result)) for key, result in rows}
+
+
+                                                        
+def _store_cached_topics(entries: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Сохраняет ответы LLM в кэш одним запросом."""
+    if not (TOPIC_CACHE_ENABLED and entries):
+        return
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO llm_topic_cache(text_hash, model, result)
+                VALUES %s
+                ON CONFLICT (text_hash) DO UPDATE
+                SET result = EXCLUDED.result, created_at = now(), last_hit_at = now()
+                """,
+                [(key, PROXY_MODEL, json.dumps(topics, ensure_ascii=False)) for key, topics in entries.items()],
+                template="(%s, %s, %s::jsonb)",
+                page_size=len(entries),
+            )
+    except Exception as exc:
+        logger.warning("Topic cache store failed: %s", exc)
+
+
+async def _extract_missing(
+    texts: Dict[str, str],
+    stats: Dict[str, int],
+    *,
+    concurrency: int,
+    request_timeout: float,
+    deadline: float,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Запрашивает LLM для некэшированных блоков с ограничением параллелизма и общим дедлайном."""
+    client = AsyncOpenAI(api_key=PROXY_API_KEY, base_url=PROXY_BASE_URL, timeout=request_timeout, max_retries=1)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def _one(key: str, clean: str) -> None:
+        """Выполняет один запрос извлечения тем."""
+        async with semaphore:
+            stats["llm_calls"] += 1
+            try:
+                response = await client.chat.completions.create(
+                    model=PROXY_MODEL,
+                    messages=_build_messages(clean),
+                    functions=_FUNCTIONS,
+                    function_call={"name": "extract_topics"},
+                    temperature=LLM_TEMPERATURE,
+                )
+            except Exception as exc:
+                stats["llm_errors"] += 1
+                logger.warning("Topic extraction request failed: %s", exc)
+                return
+        topics = _parse_topics(response)
+        if topics is not None:
+            results[key] = topics
+
+    tasks = [asyncio.create_task(_one(key, clean)) for key, clean in texts.items()]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            stats["deadline_exceeded"] += len(pending)
+            logger.warning("Topic extraction deadline %.0fs exceeded for %s blocks", deadline, len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        await client.close()
+    return results
+
+
+                                                         
+def extract_topics_many(
+    texts: Sequence[str],
+    *,
+    concurrency: int = TOPIC_LLM_CONCURRENCY,
+    request_timeout: float = TOPIC_LLM_TIMEOUT_SECONDS,
+    deadline: float = TOPIC_LLM_DEADLINE_SECONDS,
+    max_calls: int = TOPIC_LLM_MAX_CALLS,
+) -> Tuple[List[List[Dict[str, Any]]], List[bool], Dict[str, int]]:
+    """
+    Извлекает темы из набора текстовых блоков за один проход.
+
+    Одинаковые блоки обрабатываются один раз; результаты берутся из кэша
+    ``llm_topic_cache`` по хэшу текста, остальные запрашиваются у LLM
+    параллельно (не более ``concurrency`` запросов) одним клиентом. Блоки сверх
+    бюджета ``max_calls``, не успевшие к ``deadline`` или с ошибкой LLM
+    разбираются ``fallback_extract_topics``. Возвращает темы по каждому блоку,
+    признаки блоков, которые должны были пойти в LLM, но получили резервный
+    разбор (их стоит переобработать при следующем импорте), и счётчики.
+    """
+    stats = {
+        "blocks": len(texts),
+        "unique": 0,
+        "cache_hits": 0,
+        "llm_calls": 0,
+        "llm_errors": 0,
+        "deadline_exceeded": 0,
+        "over_budget": 0,
+        "fallbacks": 0,
+    }
+    unique: Dict[str, str] = {}
+    keys: List[Optional[str]] = []
+    for text in texts:
+        clean = (text or "").strip()
+        if not clean:
+            keys.append(None)
+            continue
+        key = topic_text_hash(clean)
+        unique.setdefault(key, clean)
+        keys.append(key)
+    stats["unique"] = len(unique)
+
+    resolved = _load_cached_topics(list(unique))
+    stats["cache_hits"] = len(resolved)
+    missing = {key: clean for key, clean in unique.items() if key not in resolved}
+    llm_enabled = bool(PROXY_API_KEY and PROXY_BASE_URL)
+    if missing and llm_enabled:
+        allowed = dict(list(missing.items())[: max(0, max_calls)])
+        stats["over_budget"] = len(missing) - len(allowed)
+        if allowed:
+            fetched = asyncio.run(
+                _extract_missing(
+                    allowed,
+                    stats,
+                    concurrency=concurrency,
+                    request_timeout=request_timeout,
+                    deadline=deadline,
+                )
+            )
+            _store_cached_topics(fetched)
+            resolved.update(fetched)
+
+    results: List[List[Dict[str, Any]]] = []
+    degraded: List[bool] = []
+    for key in keys:
+        if key is None:
+            results.append([])
+            degraded.append(False)
+            continue
+        topics = resolved.get(key)
+        if not topics:
+            stats["fallbacks"] += 1
+            topics = fallback_extract_topics(unique[key])
+        results.append(topics)
+        degraded.append(llm_enabled and key not in resolved)
+    return results, degraded, stats
 
 
                                                          
@@ -157,4 +363,4 @@ def fallback_extract_topics(text: str) -> List[Dict[str, Any]]:
     return result
 
 
-__all__ = ["extract_topics_from_text", "fallback_extract_topics"]
+__all__ = ["extract_topics_from_text", "extract_topics_many", "fallback_extract_topics", "topic_text_hash"]
@@ -2,16 +2,25 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Callable, List, Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
 
 import gspread
 from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
 
+from ..services.db import get_conn as default_get_conn
 from ..utils.utils import resolve_service_account_path
 
 logger = logging.getLogger(__name__)
 
 HEADERS_RU = ["Тема", "Роль", "Студент", "Наставник"]
+PAIRS_EXPORT_DEBOUNCE_SECONDS = float(os.getenv("PAIRS_EXPORT_DEBOUNCE_SECONDS", "5"))
+PAIRS_EXPORT_MAX_DELAY_SECONDS = float(os.getenv("PAIRS_EXPORT_MAX_DELAY_SECONDS", "60"))
+PAIRS_EXPORT_FULL_REFRESH_SECONDS = float(os.getenv("PAIRS_EXPORT_FULL_REFRESH_SECONDS", "3600"))
+PAIRS_EXPORT_WAIT_SECONDS = float(os.getenv("PAIRS_EXPORT_WAIT_SECONDS", "120"))
 
 
                                                                 
@@ -28,15 +37,30 @@ def _open_ws(spreadsheet_id: str, service_account_file: str):
     return ws
 
 
-                                                                   
-def export_pairs_from_db(conn, spreadsheet_id: str, service_account_file: str) -> int:
-    """Выгружает пары тема-рólь-студент-наставник из базы в таблицу."""
-    rows: List[List[str]] = [HEADERS_RU]
-    samples: List[List[str]] = []
+# (role_id, [тема, роль, студент, наставник])
+PairRow = Tuple[int, List[str]]
+
+# spreadsheet_id -> (time.monotonic() последней полной перезаписи, строки последней выгрузки)
+_SNAPSHOTS: Dict[str, Tuple[float, List[PairRow]]] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+_SHEET_LOCKS: Dict[str, threading.RLock] = {}
+
+
+                                                          
+def _sheet_lock(spreadsheet_id: str) -> threading.RLock:
+    """Возвращает блокировку таблицы: чтение снимка, запросы к Google и запись снимка идут под ней."""
+    with _SNAPSHOTS_LOCK:
+        return _SHEET_LOCKS.setdefault(spreadsheet_id, threading.RLock())
+
+
+                                                               
+def fetch_pair_rows(conn) -> List[PairRow]:
+    """Читает из базы строки листа пар в порядке выгрузки вместе с id роли."""
     with conn.cursor() as cur:
         cur.execute(
             """
-            SELECT t.title AS topic_title,
+            SELECT r.id,
+                   t.title AS topic_title,
                    r.name AS role_name,
                    stu.full_name AS student_name,
                    sup.full_name AS supervisor_name
@@ -47,35 +71,177 @@ def export_pairs_from_db(conn, spreadsheet_id: str, service_account_file: str) -
             ORDER BY t.created_at DESC, r.id ASC
             """
         )
-        for topic_title, role_name, student_name, supervisor_name in cur.fetchall():
-            row = [
-                topic_title or "",
-                role_name or "",
-                student_name or "",
-                supervisor_name or "",
-            ]
-            rows.append(row)
-            if len(samples) < 5:
-                samples.append(row)
-
-    data_rows = max(0, len(rows) - 1)
-    logger.info("Preparing roles export: rows=%s", data_rows)
-    if samples:
-        for idx, sample_row in enumerate(samples, start=1):
-            logger.debug(
-                "Export sample %s: topic=%s | role=%s | student=%s | supervisor=%s",
-                idx,
-                sample_row[0],
-                sample_row[1],
-                sample_row[2],
-                sample_row[3],
-            )
-
-    ws = _open_ws(spreadsheet_id, service_account_file)
-    ws.clear()
-    ws.update("A1", rows)
-    logger.info("Roles exported to spreadsheet %s (rows=%s)", spreadsheet_id, data_rows)
-    return data_rows
+        return [
+            (role_id, [topic_title or "", role_name or "", student_name or "", supervisor_name or ""])
+            for role_id, topic_title, role_name, student_name, supervisor_name in cur.fetchall()
+        ]
+
+
+                                                    
+def _runs(indexes: List[int]) -> List[Tuple[int, int]]:
+    """Группирует отсортированные индексы в отрезки подряд идущих (начало, конец включительно)."""
+    runs: List[Tuple[int, int]] = []
+    for index in indexes:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+@dataclass
+class PairsDiff:
+    """Минимальный набор изменений листа пар относительно прошлой выгрузки."""
+
+    deleted: List[int] = field(default_factory=list)
+    inserted: List[int] = field(default_factory=list)
+    updated: List[int] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        """Проверяет, что лист уже совпадает с базой."""
+        return not (self.deleted or self.inserted or self.updated)
+
+
+                                                            
+def plan_pairs_diff(previous: List[PairRow], current: List[PairRow]) -> Optional[PairsDiff]:
+    """
+    Сравнивает прошлую выгрузку с текущей по id роли.
+
+    ``deleted`` — позиции удалённых ролей в прошлом снимке, ``inserted`` и
+    ``updated`` — позиции новых и изменённых строк в текущем. Возвращает
+    ``None``, если сохранившиеся роли поменяли взаимный порядок: такой лист
+    проще переписать целиком.
+    """
+    previous_values = dict(previous)
+    current_values = dict(current)
+    survivors_before = [key for key, _ in previous if key in current_values]
+    survivors_after = [key for key, _ in current if key in previous_values]
+    if survivors_before != survivors_after:
+        return None
+    diff = PairsDiff()
+    diff.deleted = [index for index, (key, _) in enumerate(previous) if key not in current_values]
+    for index, (key, values) in enumerate(current):
+        if key not in previous_values:
+            diff.inserted.append(index)
+        elif previous_values[key] != values:
+            diff.updated.append(index)
+    return diff
+
+
+                                                              
+def _apply_pairs_diff(ws, diff: PairsDiff, current: List[PairRow]) -> None:
+    """
+    Применяет разницу двумя запросами: структурный ``batch_update`` удаляет и
+    вставляет строки, затем ``batch_update`` значений заполняет только новые и
+    изменённые. Строка 1 листа — заголовок, поэтому данные начинаются с индекса 1.
+    """
+    requests: List[Dict[str, Any]] = []
+    for start, end in reversed(_runs(diff.deleted)):
+        requests.append(
+            {
+                "deleteDimension": {
+                    "range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": start + 1, "endIndex": end + 2}
+                }
+            }
+        )
+    for start, end in _runs(diff.inserted):
+        requests.append(
+            {
+                "insertDimension": {
+                    "range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": start + 1, "endIndex": end + 2},
+                    "inheritFromBefore": start > 0,
+                }
+            }
+        )
+    if requests:
+        ws.spreadsheet.batch_update({"requests": requests})
+
+    last_column = rowcol_to_a1(1, len(HEADERS_RU)).rstrip("0123456789")
+    data = [
+        {
+            "range": f"A{start + 2}:{last_column}{end + 2}",
+            "values": [current[index][1] for index in range(start, end + 1)],
+        }
+        for start, end in _runs(sorted(diff.inserted + diff.updated))
+    ]
+    if data:
+        ws.batch_update(data, value_input_option="RAW")
+
+
+                                                               
+def export_pair_rows(
+    current: List[PairRow],
+    spreadsheet_id: str,
+    service_account_file: str,
+    *,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    Выгружает подготовленные строки пар в таблицу.
+
+    Последняя выгрузка хранится в памяти процесса по id роли, и в лист
+    отправляются только вставленные, изменённые и удалённые строки. Перед
+    применением разницы колонка A листа сверяется со снимком: если лист
+    правили вручную, он переписывается целиком. Полная перезапись также
+    выполняется при первом экспорте после старта, раз в
+    ``PAIRS_EXPORT_FULL_REFRESH_SECONDS``, при ``full=True`` и при смене
+    порядка существующих ролей; после ошибки снимок сбрасывается. Экспорты в
+    одну таблицу выполняются строго по очереди.
+    """
+    with _sheet_lock(spreadsheet_id):
+        with _SNAPSHOTS_LOCK:
+            snapshot = None if full else _SNAPSHOTS.get(spreadsheet_id)
+        previous: Optional[List[PairRow]] = None
+        refreshed_at = time.monotonic()
+        if snapshot is not None and refreshed_at - snapshot[0] < PAIRS_EXPORT_FULL_REFRESH_SECONDS:
+            refreshed_at, previous = snapshot
+        diff = plan_pairs_diff(previous, current) if previous is not None else None
+        stats: Dict[str, Any] = {"rows": len(current), "mode": "diff" if diff is not None else "full"}
+        if diff is not None:
+            stats.update(inserted=len(diff.inserted), updated=len(diff.updated), deleted=len(diff.deleted))
+            if diff.is_empty():
+                logger.info("Roles sheet %s is up to date (rows=%s)", spreadsheet_id, len(current))
+                return stats
+
+        logger.info("Preparing roles export: %s", stats)
+        try:
+            ws = _open_ws(spreadsheet_id, service_account_file)
+            if diff is not None and not _sheet_matches(ws, previous or []):
+                logger.warning("Roles sheet %s was changed outside the exporter; rewriting it", spreadsheet_id)
+                diff = None
+                stats = {"rows": len(current), "mode": "full", "drift": True}
+            if diff is None:
+                ws.clear()
+                ws.update("A1", [HEADERS_RU] + [values for _, values in current])
+                refreshed_at = time.monotonic()
+            else:
+                _apply_pairs_diff(ws, diff, current)
+        except Exception:
+            with _SNAPSHOTS_LOCK:
+                _SNAPSHOTS.pop(spreadsheet_id, None)
+            raise
+        with _SNAPSHOTS_LOCK:
+            _SNAPSHOTS[spreadsheet_id] = (refreshed_at, current)
+    logger.info("Roles exported to spreadsheet %s: %s", spreadsheet_id, stats)
+    return stats
+
+
+                                                        
+def _sheet_matches(ws, previous: List[PairRow]) -> bool:
+    """Сверяет колонку A листа (заголовок и темы) с прошлой выгрузкой одним запросом."""
+    expected = [HEADERS_RU[0]] + [values[0] for _, values in previous]
+    actual = list(ws.col_values(1))
+    while expected and not expected[-1]:
+        expected.pop()
+    while actual and not actual[-1]:
+        actual.pop()
+    return actual == expected
+
+
+                                                                   
+def export_pairs_from_db(conn, spreadsheet_id: str, service_account_file: str, *, full: bool = False) -> Dict[str, Any]:
+    """Выгружает пары тема-роль-студент-наставник из базы в таблицу."""
+    return export_pair_rows(fetch_pair_rows(conn), spreadsheet_id, service_account_file, full=full)
 
 
                                                             
@@ -85,6 +251,7 @@ def sync_roles_sheet(
     service_account_file: Optional[str] = None,
     *,
     conn=None,
+    full: bool = False,
 ) -> bool:
     """Организует экспорт пар в Google Sheet, создавая соединение при необходимости."""
     sid = (spreadsheet_id or os.getenv("PAIRS_SPREADSHEET_ID") or "").strip()
@@ -102,12 +269,16 @@ def sync_roles_sheet(
     logger.info("Starting roles sheet sync (spreadsheet=%s, reuse_conn=%s)", sid, reuse_conn)
     logger.debug("Using service account file: %s", service_account_path)
     try:
-        if conn is not None:
-            rows_written = export_pairs_from_db(conn, sid, service_account_path)
-        else:
-            with get_conn() as fresh_conn:
-                rows_written = export_pairs_from_db(fresh_conn, sid, service_account_path)
-        logger.info("Roles sheet sync completed (spreadsheet=%s, rows=%s)", sid, rows_written)
+        # Соединение нужно только для чтения строк; запросы к Google идут уже без него.
+        # Строки читаются под блокировкой таблицы, чтобы более старые данные не легли поверх новых.
+        with _sheet_lock(sid):
+            if conn is not None:
+                rows = fetch_pair_rows(conn)
+            else:
+                with get_conn() as fresh_conn:
+                    rows = fetch_pair_rows(fresh_conn)
+            stats = export_pair_rows(rows, sid, service_account_path, full=full)
+        logger.info("Roles sheet sync completed (spreadsheet=%s, stats=%s)", sid, stats)
         return True
     except Exception as exc:
         logger.warning(
@@ -119,4 +290,158 @@ def sync_roles_sheet(
         return False
 
 
-__all__ = ["sync_roles_sheet", "HEADERS_RU"]
+class PairsExportScheduler:
+    """
+    Отложенный экспорт листа пар в фоновом потоке.
+
+    Каждое подтверждение пары вызывает ``request``; запросы к одной таблице,
+    пришедшие в течение ``PAIRS_EXPORT_DEBOUNCE_SECONDS``, схлопываются в один
+    экспорт, но не откладываются дольше ``PAIRS_EXPORT_MAX_DELAY_SECONDS`` от
+    первого запроса. HTTP-ответы не ждут Google; запрос с ``wait=True``
+    выполняется в том же потоке без паузы и дожидается результата. При
+    остановке сервиса отложенные экспорты выполняются сразу.
+    """
+
+    def __init__(
+        self,
+        get_conn: Callable[[], ContextManager[Any]] = default_get_conn,
+        *,
+        debounce: float = PAIRS_EXPORT_DEBOUNCE_SECONDS,
+        max_delay: float = PAIRS_EXPORT_MAX_DELAY_SECONDS,
+    ) -> None:
+        """Сохраняет настройки; поток запускается методом ``start`` или первым запросом."""
+        self._get_conn = get_conn
+        self.debounce = max(0.0, debounce)
+        self.max_delay = max(self.debounce, max_delay)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (spreadsheet_id, service_account_file) -> {"first": ..., "due": ..., "full": ..., "waiters": [...]}
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._last_error: Optional[str] = None
+        self._last_export_at: Optional[float] = None
+        self._counters: Dict[str, int] = {"requested": 0, "coalesced": 0, "exported": 0, "failed": 0}
+
+    def start(self) -> None:
+        """Запускает фоновый поток, если он ещё не работает."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pairs-export", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Выполняет отложенные экспорты и останавливает поток."""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def request(
+        self,
+        spreadsheet_id: str,
+        service_account_file: str,
+        *,
+        full: bool = False,
+        wait: bool = False,
+        timeout: float = PAIRS_EXPORT_WAIT_SECONDS,
+    ) -> Optional[bool]:
+        """
+        Ставит экспорт в очередь или продлевает окно уже ожидающего. С
+        ``wait=True`` экспорт выполняется сразу, а метод возвращает его
+        успешность (``False`` и по истечении ``timeout``).
+        """
+        now = time.monotonic()
+        key = (spreadsheet_id, service_account_file)
+        waiter: Optional[Dict[str, Any]] = {"done": threading.Event(), "ok": False} if wait else None
+        with self._lock:
+            self._counters["requested"] += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = {"first": now, "due": now + self.debounce, "full": full, "waiters": []}
+                self._pending[key] = entry
+            else:
+                self._counters["coalesced"] += 1
+                entry["due"] = min(now + self.debounce, entry["first"] + self.max_delay)
+                entry["full"] = entry["full"] or full
+            if waiter is not None:
+                entry["due"] = now
+                entry["waiters"].append(waiter)
+        self.start()
+        self._wakeup.set()
+        if waiter is None:
+            return None
+        if not waiter["done"].wait(timeout):
+            return False
+        return waiter["ok"]
+
+    def _take_due(self, flush: bool) -> Tuple[List[Tuple[Tuple[str, str], Dict[str, Any]]], Optional[float]]:
+        """Забирает экспорты, срок которых наступил; возвращает их и паузу до следующего."""
+        now = time.monotonic()
+        due: List[Tuple[Tuple[str, str], Dict[str, Any]]] = []
+        wait: Optional[float] = None
+        with self._lock:
+            for key, entry in list(self._pending.items()):
+                if flush or entry["due"] <= now:
+                    due.append((key, entry))
+                    del self._pending[key]
+                else:
+                    left = entry["due"] - now
+                    wait = left if wait is None else min(wait, left)
+        return due, wait
+
+    def _run(self) -> None:
+        """Основной цикл: ждёт окончания окна, затем выгружает накопленные таблицы."""
+        while True:
+            stopping = self._stop.is_set()
+            due, wait = self._take_due(flush=stopping)
+            for (spreadsheet_id, service_account_file), entry in due:
+                ok = False
+                try:
+                    ok = sync_roles_sheet(self._get_conn, spreadsheet_id, service_account_file, full=entry["full"])
+                finally:
+                    with self._lock:
+                        self._counters["exported" if ok else "failed"] += 1
+                        if ok:
+                            self._last_export_at = time.time()
+                        else:
+                            self._last_error = f"export to {spreadsheet_id} failed"
+                    for waiter in entry["waiters"]:
+                        waiter["ok"] = ok
+                        waiter["done"].set()
+            if stopping:
+                return
+            if not due:
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+
+    def status(self) -> Dict[str, Any]:
+        """Возвращает состояние очереди экспорта и счётчики процесса."""
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "pending": [key[0] for key in self._pending],
+                "debounce_seconds": self.debounce,
+                "max_delay_seconds": self.max_delay,
+                **self._counters,
+                "last_error": self._last_error,
+                "last_export_at": self._last_export_at,
+            }
+
+
+pairs_export = PairsExportScheduler()
+
+
+__all__ = [
+    "sync_roles_sheet",
+    "fetch_pair_rows",
+    "plan_pairs_diff",
+    "PairsDiff",
+    "PairsExportScheduler",
+    "pairs_export",
+    "HEADERS_RU",
+]
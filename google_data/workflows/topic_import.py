@@ -2,17 +2,16 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from psycopg2 import sql
 from psycopg2.extensions import connection
 
+from ..services.embedding_jobs import enqueue_embedding_jobs
 from ..services.media_store import persist_media_from_url
-from ..services.matching_client import (
-    refresh_student_embedding,
-    refresh_supervisor_embedding,
-    refresh_topic_embedding,
-)
-from ..utils.topic_extraction import extract_topics_from_text, fallback_extract_topics
+from ..services.staging import copy_rows
+from ..utils.topic_extraction import extract_topics_many
 
 logger = logging.getLogger(__name__)
 
@@ -82,354 +81,640 @@ def _comma_join(items: Optional[Sequence[str]]) -> Optional[str]:
     return ", ".join(parts) or None
 
 
+_STUDENT_ROWS_SQL = """
+CREATE TEMP TABLE import_student_rows (
+  row_no INTEGER NOT NULL,
+  full_name TEXT NOT NULL,
+  email TEXT,
+  username TEXT,
+  consent_personal BOOLEAN,
+  consent_private BOOLEAN,
+  program TEXT,
+  skills TEXT,
+  interests TEXT,
+  cv TEXT,
+  requirements TEXT,
+  skills_to_learn TEXT,
+  achievements TEXT,
+  supervisor_pref TEXT,
+  groundwork TEXT,
+  wants_team BOOLEAN,
+  team_role TEXT,
+  team_has TEXT,
+  team_needs TEXT,
+  apply_master BOOLEAN,
+  workplace TEXT,
+  preferred_team_track TEXT,
+  dev_track SMALLINT,
+  science_track SMALLINT,
+  startup_track SMALLINT,
+  final_work_pref TEXT,
+  topic_title TEXT,
+  topic_description TEXT,
+  topic_expected_outcomes TEXT,
+  match_key TEXT GENERATED ALWAYS AS (COALESCE('e:' || LOWER(email), 'n:' || full_name)) STORED
+) ON COMMIT DROP
+"""
+
+_SUPERVISOR_ROWS_SQL = """
+CREATE TEMP TABLE import_supervisor_rows (
+  row_no INTEGER NOT NULL,
+  full_name TEXT NOT NULL,
+  email TEXT,
+  username TEXT,
+  interests TEXT,
+  requirements TEXT,
+  match_key TEXT GENERATED ALWAYS AS (COALESCE('e:' || LOWER(email), 'n:' || full_name)) STORED
+) ON COMMIT DROP
+"""
+
+_SUPERVISOR_TOPICS_SQL = """
+CREATE TEMP TABLE import_supervisor_topics (
+  row_no INTEGER NOT NULL,
+  position INTEGER NOT NULL,
+  full_name TEXT NOT NULL,
+  email TEXT,
+  title TEXT NOT NULL,
+  description TEXT,
+  expected_outcomes TEXT,
+  required_skills TEXT,
+  direction SMALLINT,
+  match_key TEXT GENERATED ALWAYS AS (COALESCE('e:' || LOWER(email), 'n:' || full_name)) STORED
+) ON COMMIT DROP
+"""
+
+_STUDENT_PROFILE_COLUMNS = (
+    "program",
+    "skills",
+    "interests",
+    "cv",
+    "requirements",
+    "skills_to_learn",
+    "achievements",
+    "supervisor_pref",
+    "groundwork",
+    "wants_team",
+    "team_role",
+    "team_has",
+    "team_needs",
+    "apply_master",
+    "workplace",
+    "preferred_team_track",
+    "dev_track",
+    "science_track",
+    "startup_track",
+    "final_work_pref",
+)
+
+_STUDENT_ROW_COLUMNS = (
+    "row_no",
+    "full_name",
+    "email",
+    "username",
+    "consent_personal",
+    "consent_private",
+    *_STUDENT_PROFILE_COLUMNS,
+    "topic_title",
+    "topic_description",
+    "topic_expected_outcomes",
+)
+
+
+                                                         
+def _create_stage(cur, rows_table: str, stage_table: str) -> int:
+    """
+    Оставляет по одной строке на пользователя (последняя анкета побеждает) и
+    добавляет колонки ``user_id``/``user_inserted``; возвращает число строк.
+    """
+    cur.execute(
+        sql.SQL(
+            """
+            CREATE TEMP TABLE {stage} ON COMMIT DROP AS
+            SELECT DISTINCT ON (match_key) *, NULL::BIGINT AS user_id, FALSE AS user_inserted
+            FROM {rows}
+            ORDER BY match_key, row_no DESC
+            """
+        ).format(stage=sql.Identifier(stage_table), rows=sql.Identifier(rows_table))
+    )
+    return cur.rowcount
+
+
+                                                          
+def _merge_users(cur, stage_table: str, role: str, attributes: Sequence[str]) -> Dict[str, int]:
+    """
+    Проставляет в staging-таблице ``user_id`` пользователей роли ``role``.
+
+    Строки с email сливаются одним ``INSERT ... ON CONFLICT (LOWER(email), role)``,
+    строки без email сопоставляются по ФИО, недостающие пользователи создаются
+    одной вставкой. Непустые значения ``attributes`` переносятся в ``users``.
+    """
+    stage = sql.Identifier(stage_table)
+    columns = [sql.Identifier(name) for name in attributes]
+    column_list = sql.SQL(", ").join(columns)
+    params = {"role": role}
+
+    cur.execute(
+        sql.SQL(
+            """
+            WITH merged AS (
+                INSERT INTO users(full_name, email, role, {columns}, created_at, updated_at)
+                SELECT full_name, email, %(role)s, {columns}, now(), now()
+                FROM {stage}
+                WHERE email IS NOT NULL
+                ON CONFLICT ((LOWER(email)), role) DO UPDATE
+                SET {assignments},
+                    updated_at = CASE WHEN {changed} THEN now() ELSE users.updated_at END
+                RETURNING id, LOWER(email) AS email_key, (xmax = 0) AS inserted
+            )
+            UPDATE {stage} AS s
+            SET user_id = m.id, user_inserted = m.inserted
+            FROM merged AS m
+            WHERE s.email IS NOT NULL AND LOWER(s.email) = m.email_key
+            """
+        ).format(
+            columns=column_list,
+            stage=stage,
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{col} = COALESCE(EXCLUDED.{col}, users.{col})").format(col=col) for col in columns
+            ),
+            changed=sql.SQL(" OR ").join(sql.SQL("EXCLUDED.{col} IS NOT NULL").format(col=col) for col in columns),
+        ),
+        params,
+    )
+
+    cur.execute(
+        sql.SQL(
+            """
+            UPDATE {stage} AS s
+            SET user_id = u.id
+            FROM (
+                SELECT DISTINCT ON (full_name) id, full_name
+                FROM users
+                WHERE role = %(role)s AND full_name IN (SELECT full_name FROM {stage} WHERE email IS NULL)
+                ORDER BY full_name, id
+            ) AS u
+            WHERE s.email IS NULL AND s.full_name = u.full_name
+            """
+        ).format(stage=stage),
+        params,
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            UPDATE users AS u
+            SET {assignments}, updated_at = now()
+            FROM {stage} AS s
+            WHERE s.email IS NULL AND s.user_id = u.id AND ({changed})
+            """
+        ).format(
+            stage=stage,
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{col} = COALESCE(s.{col}, u.{col})").format(col=col) for col in columns
+            ),
+            changed=sql.SQL(" OR ").join(sql.SQL("s.{col} IS NOT NULL").format(col=col) for col in columns),
+        )
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            WITH created AS (
+                INSERT INTO users(full_name, role, {columns}, created_at, updated_at)
+                SELECT full_name, %(role)s, {columns}, now(), now()
+                FROM {stage}
+                WHERE email IS NULL AND user_id IS NULL
+                RETURNING id, full_name
+            )
+            UPDATE {stage} AS s
+            SET user_id = c.id, user_inserted = TRUE
+            FROM created AS c
+            WHERE s.email IS NULL AND s.user_id IS NULL AND s.full_name = c.full_name
+            """
+        ).format(columns=column_list, stage=stage),
+        params,
+    )
+
+    cur.execute(
+        sql.SQL(
+            "SELECT COUNT(*) FILTER (WHERE user_inserted), COUNT(*) FILTER (WHERE NOT user_inserted) FROM {stage}"
+        ).format(stage=stage)
+    )
+    inserted, matched = cur.fetchone()
+    return {"inserted_users": inserted, "updated_users": matched}
+
+
+                                                             
+def _stage_pending_cvs(cur, stage_table: str) -> int:
+    """
+    Заменяет ссылки на резюме в staging-таблице путями ``/media/<id>`` без
+    скачивания: переиспользует запись ``media_files`` того же пользователя с
+    той же ссылкой, иначе создаёт заглушку ``status='pending'`` для фонового
+    фетчера (``services/cv_fetcher.py``). Возвращает число новых заглушек.
+    """
+    stage = sql.Identifier(stage_table)
+    cur.execute(
+        sql.SQL(
+            """
+            UPDATE {stage} AS s
+            SET cv = '/media/' || m.id
+            FROM (
+                SELECT DISTINCT ON (owner_user_id, source_url) id, owner_user_id, source_url
+                FROM media_files
+                WHERE status <> 'failed'
+                  AND source_url IS NOT NULL
+                  AND owner_user_id IN (SELECT user_id FROM {stage} WHERE cv ~* '^https?://')
+                ORDER BY owner_user_id, source_url, id DESC
+            ) AS m
+            WHERE s.cv ~* '^https?://' AND m.owner_user_id = s.user_id AND m.source_url = s.cv
+            """
+        ).format(stage=stage)
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            WITH created AS (
+                INSERT INTO media_files(owner_user_id, object_key, provider, mime_type, status, source_url, created_at)
+                SELECT user_id, '', 'local', 'application/octet-stream', 'pending', cv, now()
+                FROM {stage}
+                WHERE cv ~* '^https?://'
+                RETURNING id, owner_user_id
+            )
+            UPDATE {stage} AS s
+            SET cv = '/media/' || c.id
+            FROM created AS c
+            WHERE s.user_id = c.owner_user_id
+            """
+        ).format(stage=stage)
+    )
+    return cur.rowcount
+
+
+                                                               
+def _student_topic_description(row: Dict[str, Any]) -> Optional[str]:
+    """Собирает описание темы студента с заделом и практической значимостью."""
+    topic_payload = row.get("topic") or {}
+    description = (topic_payload.get("description") or "").strip()
+    groundwork = row.get("groundwork")
+    if groundwork:
+        tail = f"\n\nИмеющийся задел: {groundwork}".strip()
+        description = f"{description}\n{tail}" if description else tail
+    practical = topic_payload.get("practical_importance") or None
+    if practical:
+        tail = f"\n\nПрактическая значимость: {practical}".strip()
+        description = f"{description}\n{tail}" if description else tail
+    return description or None
+
+
+                                                       
+def _student_copy_row(row_no: int, row: Dict[str, Any], full_name: str, email: Optional[str]) -> tuple:
+    """Нормализует анкету студента в строку для COPY в import_student_rows."""
+    skills_have = _comma_join(row.get("hard_skills_have"))
+    topic_payload = row.get("topic") or {}
+    title = (topic_payload.get("title") or "").strip() if row.get("has_own_topic") else ""
+    return (
+        row_no,
+        full_name,
+        email,
+        normalize_telegram_link(row.get("telegram")),
+        row.get("consent_personal"),
+        row.get("consent_private"),
+        row.get("program"),
+        skills_have,
+        _comma_join(row.get("interests")),
+        (row.get("cv") or "").strip() or None,
+        row.get("supervisor_preference"),
+        _comma_join(row.get("hard_skills_want")),
+        row.get("achievements"),
+        row.get("supervisor_preference"),
+        row.get("groundwork"),
+        row.get("wants_team"),
+        row.get("team_role"),
+        row.get("team_has"),
+        row.get("team_needs"),
+        row.get("apply_master"),
+        row.get("workplace"),
+        row.get("preferred_team_track"),
+        row.get("dev_track"),
+        row.get("science_track"),
+        row.get("startup_track"),
+        row.get("final_work_preference"),
+        title or None,
+        _student_topic_description(row) if title else None,
+        topic_payload.get("expected_outcomes") if title else None,
+    )
+
+
                                                     
 def import_students(
     conn: connection,
     rows: Iterable[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    """Импортирует студентов из анкет, создавая пользователей, профили и темы."""
-    inserted_users = 0
+    """
+    Импортирует студентов из анкет, создавая пользователей, профили и темы.
+
+    Нормализованные строки загружаются через COPY во временную таблицу, после
+    чего пользователи, профили и темы сливаются несколькими set-based запросами
+    ``INSERT ... ON CONFLICT`` вместо нескольких запросов на каждую строку.
+    Повторные анкеты одного студента схлопываются: побеждает последняя.
+    Резюме по ссылкам не скачиваются внутри транзакции: профиль получает
+    ``/media/<id>`` заглушки, которую после коммита заполняет фоновый фетчер.
+    """
+    copy_rows_list: List[tuple] = []
+    skipped_rows = 0
+    for row_no, row in enumerate(rows):
+        full_name = (row.get("full_name") or "").strip()
+        email = (row.get("email") or "").strip() or None
+        if not (full_name or email):
+            skipped_rows += 1
+            continue
+        copy_rows_list.append(_student_copy_row(row_no, row, full_name, email))
+
     inserted_profiles = 0
     inserted_topics = 0
-    student_refresh_queue: Set[int] = set()
-    topic_refresh_queue: Set[int] = set()
-
-    with conn.cursor() as cur:
-        for idx, row in enumerate(rows):
-            full_name = (row.get("full_name") or "").strip()
-            email = (row.get("email") or "").strip()
-            if not (full_name or email):
-                continue
-            needs_student_refresh = False
-
-            if email:
-                cur.execute(
-                    "SELECT id FROM users WHERE LOWER(email)=LOWER(%s) AND role='student' LIMIT 1",
-                    (email,),
-                )
-            else:
-                cur.execute(
-                    "SELECT id FROM users WHERE full_name=%s AND role='student' LIMIT 1",
-                    (full_name,),
-                )
-            existing = cur.fetchone()
-            if existing:
-                user_id = existing[0]
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO users(full_name, email, role, created_at, updated_at)
-                    VALUES (%s, %s, 'student', now(), now())
-                    RETURNING id
-                    """,
-                    (full_name, email or None),
-                )
-                user_id = cur.fetchone()[0]
-                inserted_users += 1
-                needs_student_refresh = True
-
-            updates: List[str] = []
-            params: List[Any] = []
-            telegram = row.get("telegram")
-            if telegram:
-                tg_link = normalize_telegram_link(telegram)
-                if tg_link:
-                    updates.append("username=%s")
-                    params.append(tg_link)
-            if row.get("consent_personal") is not None:
-                updates.append("consent_personal=%s")
-                params.append(row["consent_personal"])
-            if row.get("consent_private") is not None:
-                updates.append("consent_private=%s")
-                params.append(row["consent_private"])
-            if updates:
-                params.append(user_id)
-                cur.execute(
-                    f"UPDATE users SET {', '.join(updates)}, updated_at=now() WHERE id=%s",
-                    tuple(params),
-                )
-                needs_student_refresh = True
-
-            cur.execute("SELECT 1 FROM student_profiles WHERE user_id=%s", (user_id,))
-            profile_exists = cur.fetchone() is not None
-            skills_have = _comma_join(row.get("hard_skills_have"))
-            skills_want = _comma_join(row.get("hard_skills_want"))
-            interests = _comma_join(row.get("interests"))
-            requirements = row.get("supervisor_preference")
-            cv_value = process_cv(conn, user_id, row.get("cv"))
-
-            profile_args = (
-                row.get("program"),
-                skills_have,
-                interests,
-                cv_value,
-                requirements,
-                skills_want,
-                row.get("achievements"),
-                row.get("supervisor_preference"),
-                row.get("groundwork"),
-                row.get("wants_team"),
-                row.get("team_role"),
-                row.get("team_has"),
-                row.get("team_needs"),
-                row.get("apply_master"),
-                row.get("workplace"),
-                row.get("preferred_team_track"),
-                row.get("dev_track"),
-                row.get("science_track"),
-                row.get("startup_track"),
-                row.get("final_work_preference"),
+    pending_cvs = 0
+    user_stats = {"inserted_users": 0, "updated_users": 0}
+    student_ids: List[int] = []
+    topic_ids: List[int] = []
+    staged = 0
+    if copy_rows_list:
+        with conn.cursor() as cur:
+            cur.execute(_STUDENT_ROWS_SQL)
+            copy_rows(cur, "import_student_rows", _STUDENT_ROW_COLUMNS, copy_rows_list)
+            staged = _create_stage(cur, "import_student_rows", "import_student_stage")
+            user_stats = _merge_users(
+                cur,
+                "import_student_stage",
+                "student",
+                ("username", "consent_personal", "consent_private"),
             )
+            pending_cvs = _stage_pending_cvs(cur, "import_student_stage")
 
-            if profile_exists:
-                cur.execute(
+            profile_columns = sql.SQL(", ").join(sql.Identifier(name) for name in _STUDENT_PROFILE_COLUMNS)
+            cur.execute(
+                sql.SQL(
                     """
-                    UPDATE student_profiles
-                    SET program=%s, skills=%s, interests=%s, cv=%s, requirements=%s,
-                        skills_to_learn=%s, achievements=%s, supervisor_pref=%s, groundwork=%s,
-                        wants_team=%s, team_role=%s, team_has=%s, team_needs=%s,
-                        apply_master=%s, workplace=%s,
-                        preferred_team_track=%s, dev_track=%s, science_track=%s, startup_track=%s,
-                        final_work_pref=%s
-                    WHERE user_id=%s
-                    """,
-                    (*profile_args, user_id),
-                )
-                needs_student_refresh = True
-            else:
-                cur.execute(
+                    INSERT INTO student_profiles(user_id, {columns})
+                    SELECT user_id, {columns}
+                    FROM import_student_stage
+                    ON CONFLICT (user_id) DO UPDATE SET {assignments}
+                    RETURNING user_id
                     """
-                    INSERT INTO student_profiles(
-                        user_id, program, skills, interests, cv, requirements,
-                        skills_to_learn, achievements, supervisor_pref, groundwork,
-                        wants_team, team_role, team_has, team_needs, apply_master, workplace,
-                        preferred_team_track, dev_track, science_track, startup_track, final_work_pref
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s,
-                            %s, %s, %s, %s,
-                            %s, %s, %s, %s, %s,
-                            %s, %s, %s, %s, %s, %s)
-                    """,
-                    (user_id, *profile_args),
-                )
-                needs_student_refresh = True
-            inserted_profiles += 1
-
-            topic_payload = row.get("topic") or {}
-            has_topic = row.get("has_own_topic")
-            title = (topic_payload.get("title") or "").strip()
-            if has_topic and title:
-                cur.execute(
-                    "SELECT 1 FROM topics WHERE author_user_id=%s AND title=%s",
-                    (user_id, title),
+                ).format(
+                    columns=profile_columns,
+                    assignments=sql.SQL(", ").join(
+                        sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(name))
+                        for name in _STUDENT_PROFILE_COLUMNS
+                    ),
                 )
-                if not cur.fetchone():
-                    description = (topic_payload.get("description") or "").strip()
-                    groundwork = row.get("groundwork")
-                    if groundwork:
-                        tail = f"\n\nИмеющийся задел: {groundwork}".strip()
-                        description = f"{description}\n{tail}" if description else tail
-                    practical = topic_payload.get("practical_importance") or None
-                    if practical:
-                        tail = f"\n\nПрактическая значимость: {practical}".strip()
-                        description = f"{description}\n{tail}" if description else tail
-                    cur.execute(
-                        """
-                        INSERT INTO topics(author_user_id, title, description, expected_outcomes,
-                                           required_skills, seeking_role, is_active, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, 'supervisor', TRUE, now(), now())
-                        RETURNING id
-                        """,
-                        (
-                            user_id,
-                            title,
-                            description or None,
-                            topic_payload.get("expected_outcomes"),
-                            skills_have,
-                        ),
-                    )
-                    topic_row = cur.fetchone()
-                    if topic_row:
-                        topic_refresh_queue.add(topic_row[0])
-                    inserted_topics += 1
-            if needs_student_refresh:
-                student_refresh_queue.add(user_id)
+            )
+            student_ids = [row[0] for row in cur.fetchall()]
+            inserted_profiles = len(student_ids)
+
+            # Темы берутся из всех анкет, включая схлопнутые повторы.
+            cur.execute(
+                """
+                INSERT INTO topics(author_user_id, title, description, expected_outcomes,
+                                   required_skills, seeking_role, is_active, created_at, updated_at)
+                SELECT DISTINCT ON (s.user_id, r.topic_title)
+                       s.user_id, r.topic_title, r.topic_description, r.topic_expected_outcomes,
+                       r.skills, 'supervisor', TRUE, now(), now()
+                FROM import_student_rows AS r
+                JOIN import_student_stage AS s ON s.match_key = r.match_key
+                WHERE r.topic_title IS NOT NULL
+                ORDER BY s.user_id, r.topic_title, r.row_no
+                ON CONFLICT (author_user_id, title, (COALESCE(direction, 0))) DO NOTHING
+                RETURNING id
+                """
+            )
+            topic_ids = [row[0] for row in cur.fetchall()]
+            inserted_topics = len(topic_ids)
 
+    enqueue_embedding_jobs(conn, "student", sorted(student_ids))
+    enqueue_embedding_jobs(conn, "topic", sorted(topic_ids))
     conn.commit()
-    for student_id in student_refresh_queue:
-        refresh_student_embedding(student_id)
-    for topic_id in topic_refresh_queue:
-        refresh_topic_embedding(topic_id)
     return {
         "status": "success",
         "message": (
             "Импорт завершён: добавлено пользователей: {users}, обновлено профилей: {profiles},"
             " создано тем: {topics}."
         ).format(
-            users=inserted_users,
+            users=user_stats["inserted_users"],
             profiles=inserted_profiles,
             topics=inserted_topics,
         ),
         "stats": {
-            "inserted_users": inserted_users,
+            "inserted_users": user_stats["inserted_users"],
+            "updated_users": user_stats["updated_users"],
             "inserted_profiles": inserted_profiles,
             "inserted_topics": inserted_topics,
+            "pending_cvs": pending_cvs,
+            "skipped_rows": skipped_rows,
+            "duplicate_rows": len(copy_rows_list) - staged,
         },
     }
 
+
+                                                                  
+def _supervisor_topic_sources(row: Dict[str, Any]) -> List[Tuple[str, Optional[int]]]:
+    """Возвращает непустые тексты тем анкеты наставника с направлениями."""
+    sources = [(row.get("topics_09"), 9), (row.get("topics_11"), 11), (row.get("topics_45"), 45)]
+    if not any(text for text, _ in sources):
+        sources = [(row.get("topics_text"), None)]
+    return [(str(text), direction) for text, direction in sources if text and str(text).strip()]
+
+
+@dataclass
+class SupervisorTopics:
+    """Темы, извлечённые из анкет наставников: по строке — пары (направление, темы)."""
+
+    by_row: List[List[Tuple[Optional[int], List[Dict[str, Any]]]]] = field(default_factory=list)
+    degraded_rows: List[int] = field(default_factory=list)
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+                                                              
+def extract_supervisor_topics(rows: Sequence[Dict[str, Any]]) -> SupervisorTopics:
+    """
+    Извлекает темы из всех анкет наставников одним проходом, без соединения с базой.
+
+    Все тексты направлений собираются вместе и передаются в
+    ``extract_topics_many``: одинаковые блоки обрабатываются один раз, уже
+    разобранные берутся из кэша, остальные уходят в LLM параллельно. В
+    ``degraded_rows`` попадают номера строк, хотя бы один блок которых получил
+    резервный разбор из-за ошибки LLM, дедлайна или бюджета.
+    """
+    sources = [_supervisor_topic_sources(row) for row in rows]
+    texts = [text for row_sources in sources for text, _ in row_sources]
+    topics, degraded, stats = extract_topics_many(texts)
+    extracted = SupervisorTopics(stats=stats)
+    cursor = 0
+    for row_no, row_sources in enumerate(sources):
+        row_topics = []
+        row_degraded = False
+        for _, direction in row_sources:
+            row_topics.append((direction, topics[cursor]))
+            row_degraded = row_degraded or degraded[cursor]
+            cursor += 1
+        extracted.by_row.append(row_topics)
+        if row_degraded:
+            extracted.degraded_rows.append(row_no)
+    return extracted
+
+
+                                                                
+def _supervisor_topic_rows(
+    row_no: int,
+    extracted: List[Tuple[Optional[int], List[Dict[str, Any]]]],
+    full_name: str,
+    email: Optional[str],
+) -> List[tuple]:
+    """Преобразует извлечённые темы наставника в строки для COPY."""
+    result: List[tuple] = []
+    for direction, topics in extracted:
+        for topic in topics:
+            title = (topic.get("title") or "").strip()
+            if not title:
+                continue
+            result.append(
+                (
+                    row_no,
+                    len(result),
+                    full_name,
+                    email,
+                    title,
+                    topic.get("description"),
+                    topic.get("expected_outcomes"),
+                    topic.get("required_skills"),
+                    direction,
+                )
+            )
+    return result
+
+
                                                    
 def import_supervisors(
     conn: connection,
     rows: Iterable[Dict[str, Any]],
+    topics: Optional[SupervisorTopics] = None,
 ) -> Dict[str, Any]:
-    """Импортирует наставников и их темы из анкет Google Forms."""
-    inserted_users = 0
+    """
+    Импортирует наставников и их темы из анкет Google Forms.
+
+    Темы лучше извлечь заранее через ``extract_supervisor_topics`` и передать
+    в ``topics``, чтобы запросы к LLM не выполнялись при открытом соединении;
+    без них извлечение выполняется здесь же. Анкеты и темы загружаются через
+    COPY во временные таблицы и сливаются set-based запросами так же, как в
+    ``import_students``.
+    """
+    rows = list(rows)
+    if topics is None:
+        topics = extract_supervisor_topics(rows)
+    supervisor_rows: List[tuple] = []
+    topic_rows: List[tuple] = []
+    skipped_rows = 0
+    for row_no, row in enumerate(rows):
+        full_name = (row.get("full_name") or "").strip()
+        email = (row.get("email") or "").strip() or None
+        if not (full_name or email):
+            skipped_rows += 1
+            continue
+        supervisor_rows.append(
+            (
+                row_no,
+                full_name,
+                email,
+                normalize_telegram_link(row.get("telegram")),
+                row.get("area") or None,
+                row.get("extra_info") or None,
+            )
+        )
+        topic_rows.extend(_supervisor_topic_rows(row_no, topics.by_row[row_no], full_name, email))
+
     upserted_profiles = 0
     inserted_topics = 0
-    supervisor_refresh_queue: Set[int] = set()
-    topic_refresh_queue: Set[int] = set()
-
-    with conn.cursor() as cur:
-        for row in rows:
-            full_name = (row.get("full_name") or "").strip()
-            email = (row.get("email") or "").strip() or None
-            if not (full_name or email):
-                continue
-            needs_supervisor_refresh = False
-
-            if email:
-                cur.execute(
-                    "SELECT id FROM users WHERE LOWER(email)=LOWER(%s) AND role='supervisor' LIMIT 1",
-                    (email,),
-                )
-            else:
-                cur.execute(
-                    "SELECT id FROM users WHERE full_name=%s AND role='supervisor' LIMIT 1",
-                    (full_name,),
-                )
-            existing = cur.fetchone()
-            if existing:
-                user_id = existing[0]
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO users(full_name, email, role, created_at, updated_at)
-                    VALUES (%s, %s, 'supervisor', now(), now())
-                    RETURNING id
-                    """,
-                    (full_name, email),
-                )
-                user_id = cur.fetchone()[0]
-                inserted_users += 1
-                needs_supervisor_refresh = True
-
-            updates: List[str] = []
-            params: List[Any] = []
-            telegram = row.get("telegram")
-            if telegram:
-                tg_link = normalize_telegram_link(telegram)
-                if tg_link:
-                    updates.append("username=%s")
-                    params.append(tg_link)
-            if updates:
-                params.append(user_id)
-                cur.execute(
-                    f"UPDATE users SET {', '.join(updates)}, updated_at=now() WHERE id=%s",
-                    tuple(params),
-                )
-                needs_supervisor_refresh = True
-
-            cur.execute("SELECT 1 FROM supervisor_profiles WHERE user_id=%s", (user_id,))
-            profile_exists = cur.fetchone() is not None
-            interests = row.get("area") or None
-            requirements = row.get("extra_info") or None
-
-            if profile_exists:
-                cur.execute(
-                    """
-                    UPDATE supervisor_profiles
-                    SET interests=%s, requirements=%s
-                    WHERE user_id=%s
-                    """,
-                    (interests, requirements, user_id),
-                )
-                needs_supervisor_refresh = True
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO supervisor_profiles(user_id, position, degree, capacity, interests, requirements)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (user_id, None, None, None, interests, requirements),
-                )
-                needs_supervisor_refresh = True
-            upserted_profiles += 1
-
-                                                                      
-            def _insert_from_text(text: Optional[str], direction: Optional[int]) -> None:
-                """Разбирает текст описания и добавляет темы наставника в базу."""
-                nonlocal inserted_topics
-                if not text or not text.strip():
-                    return
-                topics = extract_topics_from_text(text) or fallback_extract_topics(text)
-                for topic in topics:
-                    title = (topic.get("title") or "").strip()
-                    if not title:
-                        continue
-                    cur.execute(
-                        "SELECT 1 FROM topics WHERE author_user_id=%s AND title=%s AND (direction IS NOT DISTINCT FROM %s)",
-                        (user_id, title, direction),
-                    )
-                    if cur.fetchone():
-                        continue
-                    cur.execute(
-                        """
-                        INSERT INTO topics(author_user_id, title, description, expected_outcomes,
-                                           required_skills, direction, seeking_role, is_active, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, 'student', TRUE, now(), now())
-                        RETURNING id
-                        """,
-                        (
-                            user_id,
-                            title,
-                            topic.get("description"),
-                            topic.get("expected_outcomes"),
-                            topic.get("required_skills"),
-                            direction,
-                        ),
-                    )
-                    inserted_topic_row = cur.fetchone()
-                    if inserted_topic_row:
-                        topic_refresh_queue.add(inserted_topic_row[0])
-                    inserted_topics += 1
-
-            _insert_from_text(row.get("topics_09"), 9)
-            _insert_from_text(row.get("topics_11"), 11)
-            _insert_from_text(row.get("topics_45"), 45)
-            if not any((row.get("topics_09"), row.get("topics_11"), row.get("topics_45"))):
-                _insert_from_text(row.get("topics_text"), None)
-            if needs_supervisor_refresh:
-                supervisor_refresh_queue.add(user_id)
+    user_stats = {"inserted_users": 0, "updated_users": 0}
+    supervisor_ids: List[int] = []
+    topic_ids: List[int] = []
+    staged = 0
+    if supervisor_rows:
+        with conn.cursor() as cur:
+            cur.execute(_SUPERVISOR_ROWS_SQL)
+            cur.execute(_SUPERVISOR_TOPICS_SQL)
+            copy_rows(
+                cur,
+                "import_supervisor_rows",
+                ("row_no", "full_name", "email", "username", "interests", "requirements"),
+                supervisor_rows,
+            )
+            copy_rows(
+                cur,
+                "import_supervisor_topics",
+                (
+                    "row_no",
+                    "position",
+                    "full_name",
+                    "email",
+                    "title",
+                    "description",
+                    "expected_outcomes",
+                    "required_skills",
+                    "direction",
+                ),
+                topic_rows,
+            )
+            staged = _create_stage(cur, "import_supervisor_rows", "import_supervisor_stage")
+            user_stats = _merge_users(cur, "import_supervisor_stage", "supervisor", ("username",))
+
+            cur.execute(
+                """
+                INSERT INTO supervisor_profiles(user_id, interests, requirements)
+                SELECT user_id, interests, requirements
+                FROM import_supervisor_stage
+                ON CONFLICT (user_id) DO UPDATE
+                SET interests = EXCLUDED.interests, requirements = EXCLUDED.requirements
+                RETURNING user_id
+                """
+            )
+            supervisor_ids = [row[0] for row in cur.fetchall()]
+            upserted_profiles = len(supervisor_ids)
+
+            cur.execute(
+                """
+                INSERT INTO topics(author_user_id, title, description, expected_outcomes,
+                                   required_skills, direction, seeking_role, is_active, created_at, updated_at)
+                SELECT DISTINCT ON (s.user_id, t.title, COALESCE(t.direction, 0))
+                       s.user_id, t.title, t.description, t.expected_outcomes,
+                       t.required_skills, t.direction, 'student', TRUE, now(), now()
+                FROM import_supervisor_topics AS t
+                JOIN import_supervisor_stage AS s ON s.match_key = t.match_key
+                ORDER BY s.user_id, t.title, COALESCE(t.direction, 0), t.row_no, t.position
+                ON CONFLICT (author_user_id, title, (COALESCE(direction, 0))) DO NOTHING
+                RETURNING id
+                """
+            )
+            topic_ids = [row[0] for row in cur.fetchall()]
+            inserted_topics = len(topic_ids)
 
+    enqueue_embedding_jobs(conn, "supervisor", sorted(supervisor_ids))
+    enqueue_embedding_jobs(conn, "topic", sorted(topic_ids))
     conn.commit()
-    for supervisor_id in supervisor_refresh_queue:
-        refresh_supervisor_embedding(supervisor_id)
-    for topic_id in topic_refresh_queue:
-        refresh_topic_embedding(topic_id)
     return {
         "status": "success",
         "message": (
             "Импорт научруков завершён: новых пользователей {users}, обновлено профилей {profiles},"
             " добавлено тем {topics}."
         ).format(
-            users=inserted_users,
+            users=user_stats["inserted_users"],
             profiles=upserted_profiles,
             topics=inserted_topics,
         ),
         "stats": {
-            "inserted_users": inserted_users,
+            "inserted_users": user_stats["inserted_users"],
+            "updated_users": user_stats["updated_users"],
             "upserted_profiles": upserted_profiles,
             "inserted_topics": inserted_topics,
+            "skipped_rows": skipped_rows,
+            "duplicate_rows": len(supervisor_rows) - staged,
+            "topic_extraction": topics.stats,
         },
     }
 
@@ -440,4 +725,6 @@ __all__ = [
     "process_cv",
     "import_students",
     "import_supervisors",
+    "extract_supervisor_topics",
+    "SupervisorTopics",
 ]
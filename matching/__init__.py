@@ -1,15 +1,36 @@
 """Matching service package exposing orchestration helpers."""
-from .llm import MatchingLLMClient, create_matching_llm_client
-from .service import (
-    handle_match,
-    handle_match_role,
-    handle_match_student,
-    handle_match_supervisor_user,
-)
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any
+
+# Resolved on first access: the text extraction pool spawns workers that
+# import this package, and they must not pay for openai/torch start-up.
+_EXPORTS = {
+    "MatchingLLMClient": ".llm",
+    "create_matching_llm_client": ".llm",
+    "get_matching_llm_client": ".llm",
+    "handle_match": ".service",
+    "handle_match_role": ".service",
+    "handle_match_student": ".service",
+    "handle_match_supervisor_user": ".service",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Выполняет функцию __getattr__."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "MatchingLLMClient",
     "create_matching_llm_client",
+    "get_matching_llm_client",
     "handle_match",
     "handle_match_role",
     "handle_match_student",
@@ -0,0 +1,328 @@
+"""
+Cohort-wide capacity-constrained assignment.
+
+Scores every student against every open role slot (and every supervisor
+against every topic looking for one) with stored embeddings, keeps the top-k
+candidates per row and solves a min-cost bipartite matching in which each
+capacity unit is a separate column. Results are proposals only: nothing is
+written to the database.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import psycopg2.extras
+from psycopg2.extensions import connection
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from .settings import ASSIGNMENT_MIN_SCORE, ASSIGNMENT_TOP_K
+
+logger = logging.getLogger(__name__)
+
+# Cosine scores lie in [-1, 1]; shifting them keeps every edge weight positive
+# because scipy treats explicit zeros in the sparse matrix as missing edges.
+_COST_SHIFT = 2.0
+# Leaving a row unassigned costs more than any real edge, so the solver first
+# maximises the number of pairs and then their total score.
+_UNASSIGNED_COST = _COST_SHIFT + 1.0 + 1e-3
+
+
+@dataclass
+class _Side:
+    ids: List[int]
+    labels: List[str]
+    vectors: np.ndarray
+    capacity: np.ndarray
+
+
+def _parse_vector(text: str) -> np.ndarray:
+    """Выполняет функцию _parse_vector."""
+    return np.fromstring(text.strip()[1:-1], sep=",", dtype=np.float32)
+
+
+def _load_side(conn: connection, query: str, label_key: str) -> _Side:
+    """Выполняет функцию _load_side."""
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(query)
+        rows = cur.fetchall()
+    ids = [int(row["id"]) for row in rows]
+    labels = [row.get(label_key) or f"#{row['id']}" for row in rows]
+    if rows:
+        vectors = np.vstack([_parse_vector(row["embeddings"]) for row in rows])
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    capacity = np.array([max(0, int(row.get("slots") or 0)) for row in rows], dtype=np.int64)
+    return _Side(ids=ids, labels=labels, vectors=vectors, capacity=capacity)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    """Выполняет функцию _normalized."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def top_k_scores(
+    left: np.ndarray,
+    right: np.ndarray,
+    top_k: int,
+    *,
+    chunk_size: int = 1024,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine top-k of every left row against all right rows, computed in chunks so
+    the full similarity matrix is never materialised. Returns ``(indices, scores)``
+    of shape ``(len(left), k)``.
+    """
+    k = min(top_k, right.shape[0])
+    left_n, right_n = _normalized(left), _normalized(right)
+    indices = np.empty((left.shape[0], k), dtype=np.int64)
+    scores = np.empty((left.shape[0], k), dtype=np.float32)
+    for start in range(0, left.shape[0], chunk_size):
+        block = left_n[start : start + chunk_size] @ right_n.T
+        if k < block.shape[1]:
+            part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            part = np.tile(np.arange(block.shape[1]), (block.shape[0], 1))
+        indices[start : start + block.shape[0]] = part
+        scores[start : start + block.shape[0]] = np.take_along_axis(block, part, axis=1)
+    return indices, scores
+
+
+def solve_assignment(
+    left: np.ndarray,
+    right: np.ndarray,
+    right_capacity: Sequence[int],
+    *,
+    top_k: int = ASSIGNMENT_TOP_K,
+    min_score: float = ASSIGNMENT_MIN_SCORE,
+) -> List[tuple[int, int, float]]:
+    """
+    Assign each left row to at most one right row, respecting ``right_capacity``.
+    Right rows are replicated into one column per capacity unit and every left
+    row gets a private "unassigned" column, so a full matching always exists.
+    Returns ``(left_index, right_index, score)`` triples.
+    """
+    capacity = np.asarray(right_capacity, dtype=np.int64)
+    if left.shape[0] == 0 or right.shape[0] == 0 or capacity.sum() == 0:
+        return []
+    open_right = np.flatnonzero(capacity > 0)
+    indices, scores = top_k_scores(left, right[open_right], top_k)
+    indices = open_right[indices]
+
+    slot_offsets = np.concatenate(([0], np.cumsum(capacity)))
+    total_slots = int(slot_offsets[-1])
+    n_left = left.shape[0]
+
+    keep = scores >= min_score
+    rows = np.repeat(np.arange(n_left), indices.shape[1])[keep.ravel()]
+    targets = indices.ravel()[keep.ravel()]
+    weights = (_COST_SHIFT - scores.ravel()[keep.ravel()]).astype(np.float64)
+
+    # Expand every (left, right) edge into one edge per capacity slot of the right row.
+    repeats = capacity[targets]
+    edge_rows = np.repeat(rows, repeats)
+    edge_weights = np.repeat(weights, repeats)
+    starts = np.repeat(slot_offsets[targets], repeats)
+    within = np.arange(edge_rows.shape[0]) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    edge_cols = starts + within
+
+    dummy_rows = np.arange(n_left)
+    graph = csr_matrix(
+        (
+            np.concatenate((edge_weights, np.full(n_left, _UNASSIGNED_COST))),
+            (
+                np.concatenate((edge_rows, dummy_rows)),
+                np.concatenate((edge_cols, total_slots + dummy_rows)),
+            ),
+        ),
+        shape=(n_left, total_slots + n_left),
+    )
+    matched_rows, matched_cols = min_weight_full_bipartite_matching(graph)
+
+    slot_owner = np.repeat(np.arange(right.shape[0]), capacity)
+    pairs: List[tuple[int, int, float]] = []
+    for row, col in zip(matched_rows.tolist(), matched_cols.tolist()):
+        if col >= total_slots:
+            continue
+        right_index = int(slot_owner[col])
+        pairs.append((row, right_index, float(_COST_SHIFT - graph[row, col])))
+    pairs.sort(key=lambda item: item[2], reverse=True)
+    return pairs
+
+
+def _assign(
+    left: _Side,
+    right: _Side,
+    *,
+    left_key: str,
+    right_key: str,
+    top_k: int,
+    min_score: float,
+) -> Dict[str, Any]:
+    """Выполняет функцию _assign."""
+    started = time.perf_counter()
+    if left.vectors.size and right.vectors.size and left.vectors.shape[1] != right.vectors.shape[1]:
+        raise ValueError("Embedding dimensions of the two sides differ; refresh embeddings first.")
+    pairs = solve_assignment(
+        left.vectors,
+        right.vectors,
+        right.capacity,
+        top_k=top_k,
+        min_score=min_score,
+    )
+    elapsed = time.perf_counter() - started
+    assigned_left = {left_index for left_index, _, _ in pairs}
+    return {
+        "pairs": [
+            {
+                left_key: left.ids[left_index],
+                f"{left_key}_label": left.labels[left_index],
+                right_key: right.ids[right_index],
+                f"{right_key}_label": right.labels[right_index],
+                "score": round(score, 4),
+            }
+            for left_index, right_index, score in pairs
+        ],
+        f"unassigned_{left_key}s": [
+            left.ids[index] for index in range(len(left.ids)) if index not in assigned_left
+        ],
+        "open_slots": int(right.capacity.sum()) - len(pairs),
+        "stats": {
+            "left": len(left.ids),
+            "right": len(right.ids),
+            "slots": int(right.capacity.sum()),
+            "assigned": len(pairs),
+            "mean_score": round(float(np.mean([p[2] for p in pairs])), 4) if pairs else None,
+            "seconds": round(elapsed, 3),
+        },
+    }
+
+
+def assign_students_to_roles(
+    conn: connection,
+    *,
+    top_k: int = ASSIGNMENT_TOP_K,
+    min_score: float = ASSIGNMENT_MIN_SCORE,
+) -> Dict[str, Any]:
+    """
+    Propose a student for every open role across active topics seeking students.
+
+    Approval is stored in the single ``roles.approved_student_user_id`` column,
+    so every role offers one slot regardless of ``capacity`` and roles that
+    already have an approved student are left out.
+    """
+    students = _load_side(
+        conn,
+        """
+        SELECT u.id, u.full_name, u.embeddings::text AS embeddings, 1 AS slots
+        FROM users u
+        WHERE LOWER(u.role) = 'student'
+          AND u.embeddings IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM roles r WHERE r.approved_student_user_id = u.id)
+        ORDER BY u.id
+        """,
+        "full_name",
+    )
+    roles = _load_side(
+        conn,
+        """
+        SELECT r.id, t.title || ' — ' || r.name AS label, r.embeddings::text AS embeddings, 1 AS slots
+        FROM roles r
+        JOIN topics t ON t.id = r.topic_id
+        WHERE t.is_active = TRUE
+          AND t.seeking_role = 'student'
+          AND r.approved_student_user_id IS NULL
+          AND r.embeddings IS NOT NULL
+        ORDER BY r.id
+        """,
+        "label",
+    )
+    return _assign(
+        students,
+        roles,
+        left_key="student_user_id",
+        right_key="role_id",
+        top_k=top_k,
+        min_score=min_score,
+    )
+
+
+def assign_supervisors_to_topics(
+    conn: connection,
+    *,
+    top_k: int = ASSIGNMENT_TOP_K,
+    min_score: float = ASSIGNMENT_MIN_SCORE,
+) -> Dict[str, Any]:
+    """Propose a supervisor for every active topic still looking for one."""
+    topics = _load_side(
+        conn,
+        """
+        SELECT t.id, t.title, t.embeddings::text AS embeddings, 1 AS slots
+        FROM topics t
+        WHERE t.is_active = TRUE
+          AND t.seeking_role = 'supervisor'
+          AND t.approved_supervisor_user_id IS NULL
+          AND t.embeddings IS NOT NULL
+        ORDER BY t.id
+        """,
+        "title",
+    )
+    supervisors = _load_side(
+        conn,
+        """
+        SELECT u.id, u.full_name, u.embeddings::text AS embeddings,
+               GREATEST(COALESCE(sp.capacity, 1), 1) - COALESCE(busy.cnt, 0) AS slots
+        FROM users u
+        LEFT JOIN supervisor_profiles sp ON sp.user_id = u.id
+        LEFT JOIN (
+            SELECT approved_supervisor_user_id AS user_id, COUNT(*) AS cnt
+            FROM topics
+            WHERE approved_supervisor_user_id IS NOT NULL
+            GROUP BY approved_supervisor_user_id
+        ) busy ON busy.user_id = u.id
+        WHERE LOWER(u.role) = 'supervisor' AND u.embeddings IS NOT NULL
+        ORDER BY u.id
+        """,
+        "full_name",
+    )
+    return _assign(
+        topics,
+        supervisors,
+        left_key="topic_id",
+        right_key="supervisor_user_id",
+        top_k=top_k,
+        min_score=min_score,
+    )
+
+
+def assign_cohort(
+    conn: connection,
+    *,
+    scope: str = "all",
+    top_k: int = ASSIGNMENT_TOP_K,
+    min_score: float = ASSIGNMENT_MIN_SCORE,
+) -> Dict[str, Any]:
+    """Выполняет функцию assign_cohort."""
+    scope = (scope or "all").strip().lower()
+    if scope not in {"all", "roles", "topics"}:
+        raise ValueError(f"Unsupported assignment scope: {scope}")
+    result: Dict[str, Any] = {"status": "ok", "scope": scope}
+    if scope in {"all", "roles"}:
+        result["roles"] = assign_students_to_roles(conn, top_k=top_k, min_score=min_score)
+    if scope in {"all", "topics"}:
+        result["topics"] = assign_supervisors_to_topics(conn, top_k=top_k, min_score=min_score)
+    return result
+
+
+__all__ = [
+    "top_k_scores",
+    "solve_assignment",
+    "assign_students_to_roles",
+    "assign_supervisors_to_topics",
+    "assign_cohort",
+]
@@ -0,0 +1 @@
+"""Standalone benchmarks for the matching service (run against a scratch database)."""
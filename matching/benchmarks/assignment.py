@@ -0,0 +1,61 @@
+"""
+Timing of the cohort assignment solver on synthetic embeddings.
+
+Generates clustered random vectors for students and roles (no database
+needed), then times top-k scoring and the min-cost matching separately.
+
+    python -m matching.benchmarks.assignment --students 5000 --roles 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from ..assignment import solve_assignment, top_k_scores
+
+
+def _clustered(rng: np.random.Generator, centers: np.ndarray, size: int, noise: float) -> np.ndarray:
+    """Выполняет функцию _clustered."""
+    picks = rng.integers(0, centers.shape[0], size=size)
+    return (centers[picks] + noise * rng.standard_normal((size, centers.shape[1]))).astype(np.float32)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description="Benchmark the capacity-constrained assignment solver.")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--roles", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--max-capacity", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--clusters", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(11)
+    centers = rng.standard_normal((args.clusters, args.dim))
+    students = _clustered(rng, centers, args.students, 0.8)
+    roles = _clustered(rng, centers, args.roles, 0.8)
+    capacity = rng.integers(1, args.max_capacity + 1, size=args.roles)
+
+    started = time.perf_counter()
+    top_k_scores(students, roles, args.top_k)
+    scoring = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pairs = solve_assignment(students, roles, capacity, top_k=args.top_k, min_score=-1.0)
+    total = time.perf_counter() - started
+
+    used = np.bincount(np.array([right for _, right, _ in pairs], dtype=np.int64), minlength=args.roles)
+    assert np.all(used <= capacity), "capacity violated"
+    print(f"students={args.students} roles={args.roles} slots={int(capacity.sum())} top_k={args.top_k}")
+    print(f"top-k scoring: {scoring:.2f}s; scoring + matching: {total:.2f}s")
+    print(
+        f"assigned={len(pairs)} mean score={np.mean([p[2] for p in pairs]) if pairs else 0:.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
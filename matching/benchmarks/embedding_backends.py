@@ -0,0 +1,145 @@
+"""
+Parity and throughput check for embedding backends.
+
+For every whitelisted model (or the ones passed via ``--models``) encodes the
+same synthetic corpus with the torch backend and with ONNX Runtime (fp32 and
+int8), then reports the cosine similarity between the torch and ONNX vectors,
+texts/s and peak resident memory. Each backend runs in its own process so the
+RSS numbers are not polluted by previously loaded models. Exits non-zero when
+the minimum cosine similarity falls below ``--min-cosine``.
+
+    python -m matching.benchmarks.embedding_backends --models intfloat/multilingual-e5-base
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..embeddings import ALLOWED_REPO_IDS
+
+_WORDS = (
+    "машинное обучение анализ данных веб разработка backend frontend python go "
+    "компьютерное зрение nlp стартап исследование рекомендательные системы "
+    "базы данных postgres микросервисы mobile ios android devops kubernetes"
+).split()
+
+
+def _corpus(size: int, seed: int = 13) -> List[str]:
+    """Выполняет функцию _corpus."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(size):
+        length = int(rng.integers(8, 64))
+        texts.append("passage: " + " ".join(rng.choice(_WORDS, size=length)))
+    return texts
+
+
+def _peak_rss_mb() -> float:
+    """Выполняет функцию _peak_rss_mb."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_backend(
+    repo_id: str,
+    config: Dict[str, Any],
+    texts: Sequence[str],
+    batch_size: int,
+    queue: "mp.Queue[Dict[str, Any]]",
+) -> None:
+    """Выполняет функцию _run_backend."""
+    from ..embeddings import load_embedding_model
+
+    try:
+        started = time.perf_counter()
+        model = load_embedding_model(repo_id, **config)
+        load_seconds = time.perf_counter() - started
+        model.encode(list(texts[:batch_size]), batch_size=batch_size)
+        started = time.perf_counter()
+        vectors = model.encode(list(texts), batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        queue.put(
+            {
+                "vectors": np.asarray(vectors, dtype=np.float32),
+                "load_s": load_seconds,
+                "texts_per_s": len(texts) / elapsed if elapsed else 0.0,
+                "rss_mb": _peak_rss_mb(),
+            }
+        )
+    except Exception as exc:
+        queue.put({"error": f"{type(exc).__name__}: {exc}"})
+
+
+def _measure(
+    repo_id: str, config: Dict[str, Any], texts: Sequence[str], batch_size: int
+) -> Dict[str, Any]:
+    """Выполняет функцию _measure."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_backend, args=(repo_id, config, texts, batch_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Выполняет функцию _cosine."""
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return np.sum(a * b, axis=1)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX Runtime embedding backends.")
+    parser.add_argument("--models", nargs="+", default=sorted(ALLOWED_REPO_IDS))
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    texts = _corpus(args.texts)
+    variants = (
+        ("torch", {"backend": "auto"}),
+        ("onnx-fp32", {"backend": "onnx", "quantize": False, "num_threads": args.threads}),
+        ("onnx-int8", {"backend": "onnx", "quantize": True, "num_threads": args.threads}),
+    )
+    failed = False
+    print(
+        f"{'model':<60} {'backend':<10} {'load s':>8} {'texts/s':>9} {'rss MB':>8} "
+        f"{'cos min':>8} {'cos mean':>9}"
+    )
+    for repo_id in args.models:
+        reference: Optional[np.ndarray] = None
+        for name, config in variants:
+            result = _measure(repo_id, config, texts, args.batch_size)
+            if "error" in result:
+                print(f"{repo_id:<60} {name:<10} error: {result['error']}")
+                failed = True
+                continue
+            vectors = result["vectors"]
+            cos_min = cos_mean = 1.0
+            if reference is None and name == "torch":
+                reference = vectors
+            elif reference is not None:
+                cosines = _cosine(reference, vectors)
+                cos_min, cos_mean = float(cosines.min()), float(cosines.mean())
+                failed = failed or cos_min < args.min_cosine
+            print(
+                f"{repo_id:<60} {name:<10} {result['load_s']:>8.1f} {result['texts_per_s']:>9.1f} "
+                f"{result['rss_mb']:>8.0f} {cos_min:>8.4f} {cos_mean:>9.4f}"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
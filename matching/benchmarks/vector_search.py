@@ -0,0 +1,148 @@
+"""
+Latency benchmark for candidate retrieval: exact scan vs HNSW index.
+
+Builds synthetic ``bench_vector.users`` tables of 1k/10k/100k rows in a scratch
+schema, then times the same nearest-neighbour query used by
+``repository.fetch_candidates`` with and without the index and reports
+p50/p99 latency and recall@k.
+
+    python -m matching.benchmarks.vector_search --sizes 1000 10000 100000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Dict, List, Sequence, Set
+
+from ..db import get_conn
+from ..settings import HNSW_EF_CONSTRUCTION, HNSW_M
+from ..vector_index import ef_search_for_limit
+
+SCHEMA = "bench_vector"
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    """Выполняет функцию _percentile."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _prepare(conn, size: int, dim: int) -> None:
+    """Выполняет функцию _prepare."""
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(
+            f"""
+            CREATE TABLE {SCHEMA}.users (
+              id BIGSERIAL PRIMARY KEY,
+              role VARCHAR(20) NOT NULL,
+              embeddings VECTOR({dim})
+            )
+            """
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {SCHEMA}.users(role, embeddings)
+            SELECT CASE WHEN g %% 5 = 0 THEN 'supervisor' ELSE 'student' END,
+                   (SELECT array_agg(random() - 0.5)::real[] FROM generate_series(1, %s) WHERE g > 0)::vector
+            FROM generate_series(1, %s) AS g
+            """,
+            (dim, size),
+        )
+        cur.execute(f"ANALYZE {SCHEMA}.users")
+    conn.commit()
+
+
+def _build_index(conn) -> float:
+    """Выполняет функцию _build_index."""
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE INDEX bench_users_student_hnsw ON {SCHEMA}.users
+            USING hnsw (embeddings vector_cosine_ops) WITH (m = %s, ef_construction = %s)
+            WHERE LOWER(role) = 'student'
+            """,
+            (HNSW_M, HNSW_EF_CONSTRUCTION),
+        )
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def _run_queries(conn, queries: List[str], limit: int, *, use_index: bool) -> Dict[str, object]:
+    """Выполняет функцию _run_queries."""
+    timings: List[float] = []
+    results: List[Set[int]] = []
+    with conn.cursor() as cur:
+        for query_vector in queries:
+            if use_index:
+                cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search_for_limit(limit)),))
+            else:
+                cur.execute("SET LOCAL enable_indexscan = off")
+            started = time.perf_counter()
+            cur.execute(
+                f"""
+                SELECT id FROM {SCHEMA}.users
+                WHERE LOWER(role) = 'student' AND embeddings IS NOT NULL
+                ORDER BY embeddings <=> %s::vector
+                LIMIT %s
+                """,
+                (query_vector, limit),
+            )
+            ids = {row[0] for row in cur.fetchall()}
+            timings.append((time.perf_counter() - started) * 1000.0)
+            results.append(ids)
+            conn.rollback()
+    return {"timings": timings, "results": results}
+
+
+def run(sizes: Sequence[int], *, dim: int, queries: int, limit: int) -> None:
+    """Выполняет функцию run."""
+    with get_conn() as conn:
+        for size in sizes:
+            _prepare(conn, size, dim)
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT embeddings::text FROM {SCHEMA}.users ORDER BY random() LIMIT %s",
+                    (queries,),
+                )
+                query_vectors = [row[0] for row in cur.fetchall()]
+            conn.rollback()
+
+            exact = _run_queries(conn, query_vectors, limit, use_index=False)
+            build_seconds = _build_index(conn)
+            approx = _run_queries(conn, query_vectors, limit, use_index=True)
+
+            recall = statistics.mean(
+                len(a & e) / max(1, len(e)) for a, e in zip(approx["results"], exact["results"])
+            )
+            print(
+                f"users={size:>7} | seq scan p50={_percentile(exact['timings'], 50):8.2f}ms "
+                f"p99={_percentile(exact['timings'], 99):8.2f}ms | "
+                f"hnsw p50={_percentile(approx['timings'], 50):7.2f}ms "
+                f"p99={_percentile(approx['timings'], 99):7.2f}ms | "
+                f"recall@{limit}={recall:.3f} | index build {build_seconds:.1f}s"
+            )
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+
+
+def main() -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, dim=args.dim, queries=args.queries, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Write-path benchmark for embedding vectors.
+
+Compares the previous text path (per-component ``f"{x:.8f}"`` formatting plus
+``UPDATE ... FROM (VALUES ...)`` through ``execute_values``) with the binary
+``COPY`` path from ``matching.vector_io`` on a scratch ``bench_vector.items``
+table. Reports wall time, client CPU time and payload bytes per run.
+
+    python -m matching.benchmarks.vector_writes --rows 1000 10000 --dim 768
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from ..db import get_conn
+from ..vector_io import copy_update_vectors, encode_copy_rows
+
+SCHEMA = "bench_vector"
+
+
+def _legacy_literal(vector: np.ndarray) -> str:
+    """Выполняет функцию _legacy_literal."""
+    return "[" + ",".join(f"{float(x):.8f}" for x in vector.tolist()) + "]"
+
+
+def _prepare(conn, rows: int, dim: int) -> None:
+    """Выполняет функцию _prepare."""
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        cur.execute(f"DROP TABLE IF EXISTS {SCHEMA}.items")
+        cur.execute(
+            f"""
+            CREATE TABLE {SCHEMA}.items (
+              id BIGINT PRIMARY KEY,
+              embeddings VECTOR({dim}),
+              embedding_source_hash TEXT,
+              embedding_model TEXT,
+              updated_at TIMESTAMPTZ
+            )
+            """
+        )
+        cur.execute(f"INSERT INTO {SCHEMA}.items(id) SELECT g FROM generate_series(1, %s) AS g", (rows,))
+    conn.commit()
+
+
+def _legacy_write(conn, ids: Sequence[int], vectors: np.ndarray) -> int:
+    """Выполняет функцию _legacy_write."""
+    rows = [(entity_id, _legacy_literal(vector), "hash", "model") for entity_id, vector in zip(ids, vectors)]
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            f"""
+            UPDATE {SCHEMA}.items AS t
+            SET embeddings = v.embedding::vector, embedding_source_hash = v.source_hash,
+                embedding_model = v.model, updated_at = now()
+            FROM (VALUES %s) AS v(id, embedding, source_hash, model)
+            WHERE t.id = v.id
+            """,
+            rows,
+            page_size=len(rows),
+        )
+    conn.commit()
+    return sum(len(row[1]) + 8 + len(row[2]) + len(row[3]) for row in rows)
+
+
+def _copy_write(conn, ids: Sequence[int], vectors: np.ndarray) -> int:
+    """Выполняет функцию _copy_write."""
+    rows = [(entity_id, vector, "hash", "model") for entity_id, vector in zip(ids, vectors)]
+    with conn.cursor() as cur:
+        copy_update_vectors(cur, f"{SCHEMA}.items", "id", rows)
+    conn.commit()
+    # Size of the binary COPY stream without encoding it a second time.
+    per_row = 2 + (4 + 8) + (4 + 4 + 4 * vectors.shape[1]) + (4 + len("hash")) + (4 + len("model"))
+    return len(encode_copy_rows([])) + per_row * len(rows)
+
+
+def _measure(
+    writer: Callable[..., int], conn, ids: Sequence[int], vectors: np.ndarray, repeats: int
+) -> Tuple[float, float, int]:
+    """Выполняет функцию _measure."""
+    walls: List[float] = []
+    cpus: List[float] = []
+    payload = 0
+    for _ in range(repeats):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        payload = writer(conn, ids, vectors)
+        cpus.append(time.process_time() - cpu_start)
+        walls.append(time.perf_counter() - wall_start)
+    return statistics.median(walls), statistics.median(cpus), payload
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description="Benchmark vector write paths.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(7)
+    writers: Dict[str, Callable[..., int]] = {"text": _legacy_write, "copy": _copy_write}
+    print(f"{'rows':>7} {'path':<6} {'wall s':>8} {'cpu s':>8} {'payload MB':>11}")
+    with get_conn() as conn:
+        for rows in args.rows:
+            _prepare(conn, rows, args.dim)
+            ids = list(range(1, rows + 1))
+            vectors = rng.standard_normal((rows, args.dim)).astype(np.float32)
+            for name, writer in writers.items():
+                wall, cpu, payload = _measure(writer, conn, ids, vectors, args.repeats)
+                print(f"{rows:>7} {name:<6} {wall:>8.3f} {cpu:>8.3f} {payload / 1e6:>11.2f}")
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Persistence of ranked candidates.
+
+Every write replaces the previous ranking of its anchors: the new rows are
+upserted with one ``execute_values`` statement tagged with a fresh
+``match_run_id``, and rows of the same anchors left over from earlier runs are
+deleted in the same transaction. Approved pairs are never rewritten or
+removed.
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
+
+# table -> (anchor column, candidate column)
+CANDIDATE_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "topic_candidates": ("topic_id", "user_id"),
+    "role_candidates": ("role_id", "user_id"),
+    "student_candidates": ("user_id", "role_id"),
+    "supervisor_candidates": ("user_id", "topic_id"),
+}
+
+# (candidate id, score, rank)
+RankedRow = Tuple[int, float, int]
+
+
+def store_rankings(
+    conn: connection,
+    table: str,
+    rankings: Mapping[int, Sequence[RankedRow]],
+    *,
+    run_id: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Replace the stored ranking of every anchor in ``rankings``. The caller
+    owns the transaction. Returns the run id and the written/removed counts.
+    """
+    if table not in CANDIDATE_COLUMNS:
+        raise ValueError(f"Unsupported candidate table: {table}")
+    anchor_column, candidate_column = CANDIDATE_COLUMNS[table]
+    run_id = run_id or str(uuid.uuid4())
+    rows = [
+        (anchor_id, candidate_id, score, rank == 1, rank, run_id)
+        for anchor_id, ranked in rankings.items()
+        for candidate_id, score, rank in ranked
+    ]
+    with conn.cursor() as cur:
+        if rows:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {table}({anchor_column}, {candidate_column}, score, is_primary, approved, rank,
+                                    match_run_id, created_at, ranked_at)
+                VALUES %s
+                ON CONFLICT ({anchor_column}, {candidate_column})
+                DO UPDATE SET score = EXCLUDED.score,
+                              is_primary = EXCLUDED.is_primary,
+                              rank = EXCLUDED.rank,
+                              match_run_id = EXCLUDED.match_run_id,
+                              ranked_at = EXCLUDED.ranked_at
+                WHERE NOT {table}.approved
+                """,
+                rows,
+                template="(%s, %s, %s, %s, FALSE, %s, %s::uuid, now(), now())",
+                page_size=1000,
+            )
+        removed = 0
+        if rankings:
+            cur.execute(
+                f"""
+                DELETE FROM {table}
+                WHERE {anchor_column} = ANY(%s)
+                  AND match_run_id IS DISTINCT FROM %s::uuid
+                  AND NOT approved
+                """,
+                (list(rankings), run_id),
+            )
+            removed = cur.rowcount
+    return {"match_run_id": run_id, "written": len(rows), "removed": removed}
+
+
+def store_ranking(
+    conn: connection,
+    table: str,
+    anchor_id: int,
+    ranked: Sequence[RankedRow],
+    *,
+    run_id: Optional[str] = None,
+) -> Dict[str, object]:
+    """Выполняет функцию store_ranking."""
+    return store_rankings(conn, table, {anchor_id: ranked}, run_id=run_id)
+
+
+__all__ = ["CANDIDATE_COLUMNS", "RankedRow", "store_rankings", "store_ranking"]
@@ -1,55 +1,167 @@
 """Helpers for resolving CV text content."""
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
 
-from .text_extract import extract_text_from_file
+from .text_extract import extract_many
+
+logger = logging.getLogger(__name__)
 
 MEDIA_ROOT = Path(
     os.getenv("MEDIA_ROOT", str(Path(__file__).resolve().parents[1] / "data" / "media"))
 ).resolve()
 MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
 
+_CV_CHAR_LIMIT = 20000
+
+# (media_id, source_hash, text, error)
+MediaText = Tuple[int, str, Optional[str], Optional[str]]
 
-def resolve_cv_text(conn: connection, cv_value: Optional[str]) -> Optional[str]:
-    """Выполняет функцию resolve_cv_text."""
-    value = (cv_value or "").strip()
-    if not value:
-        return None
-    if not value.startswith("/media/"):
-        return value
 
+def _media_id(value: str) -> Optional[int]:
+    """Выполняет функцию _media_id."""
+    if not value.startswith("/media/"):
+        return None
     try:
-        media_id = int(value.split("/")[-1])
+        return int(value.split("/")[-1])
     except Exception:
-        return value
+        return None
 
+
+def media_fingerprint(path: Path) -> Optional[str]:
+    """Hash of the file name, size and mtime; changes whenever the object is rewritten."""
     try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT object_key, mime_type FROM media_files WHERE id=%s", (media_id,))
-            row = cur.fetchone()
-    except Exception:
-        return value
+        stat = path.stat()
+    except OSError:
+        return None
+    return hashlib.sha256(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+
+def extract_media_texts(items: Sequence[Tuple[int, str, Optional[str]]]) -> List[Optional[MediaText]]:
+    """
+    Extract ``(media_id, object_key, mime_type)`` documents in the
+    extraction process pool. Returns one entry per item, None when the file is missing.
+    Reader failures are returned with ``text=None`` and an error so they are
+    cached and not retried until the file changes; timeouts and crashed
+    workers get an empty ``source_hash`` so the next lookup retries them.
+    """
+    paths = [(MEDIA_ROOT / object_key).resolve() for _, object_key, _ in items]
+    hashes = [media_fingerprint(path) for path in paths]
+    present = [index for index, source_hash in enumerate(hashes) if source_hash is not None]
+    results = extract_many([(paths[index], items[index][2]) for index in present])
+    extracted: List[Optional[MediaText]] = [None] * len(items)
+    for index, result in zip(present, results):
+        source_hash = "" if result.retry else hashes[index]
+        extracted[index] = (items[index][0], source_hash, result.text or None, result.error)
+    return extracted
 
-    if not row:
-        return value
 
-    object_key, mime_type = row
-    file_path = (MEDIA_ROOT / object_key).resolve()
+def store_media_texts(conn: connection, rows: Sequence[MediaText]) -> None:
+    """Выполняет функцию store_media_texts."""
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO media_texts(media_id, source_hash, text, error, extracted_at)
+            VALUES %s
+            ON CONFLICT (media_id) DO UPDATE
+            SET source_hash = EXCLUDED.source_hash, text = EXCLUDED.text,
+                error = EXCLUDED.error, extracted_at = EXCLUDED.extracted_at
+            """,
+            rows,
+            template="(%s, %s, %s, %s, now())",
+        )
+
+
+def _load_media(conn: connection, media_ids: Iterable[int]) -> Dict[int, Tuple[str, str, Optional[str], Optional[str]]]:
+    """Downloaded media only: import placeholders (``status<>'ready'``) have no file yet."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT mf.id, mf.object_key, mf.mime_type, mt.source_hash, mt.text
+            FROM media_files mf
+            LEFT JOIN media_texts mt ON mt.media_id = mf.id
+            WHERE mf.id = ANY(%s) AND mf.status = 'ready' AND mf.object_key <> ''
+            """,
+            (list(media_ids),),
+        )
+        return {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+
+def _format_cv(object_key: str, text: str) -> str:
+    """Выполняет функцию _format_cv."""
+    header = f"CV (из файла {Path(object_key).name}):\n"
+    return (header + text)[:_CV_CHAR_LIMIT]
+
+
+def resolve_cv_texts(conn: connection, cv_values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """
+    Resolve a list of ``cv`` values at once. ``/media/<id>`` references are
+    looked up with a single query; cached texts whose file fingerprint still
+    matches are used as is, the rest are extracted in the process pool (with
+    a per-file timeout) and cached.
+    """
+    values = [(value or "").strip() for value in cv_values]
+    media_ids = {media_id for media_id in map(_media_id, values) if media_id is not None}
+    if not media_ids:
+        return [value or None for value in values]
+
     try:
-        text = extract_text_from_file(file_path, mime_type)
-    except Exception:
-        return value
+        media = _load_media(conn, media_ids)
+    except Exception as exc:
+        logger.warning("Failed to load media texts: %s", exc)
+        conn.rollback()
+        return [value or None for value in values]
+
+    texts: Dict[int, Optional[str]] = {}
+    misses: List[Tuple[int, str, Optional[str]]] = []
+    for media_id, (object_key, mime_type, cached_hash, cached_text) in media.items():
+        if cached_hash and cached_hash == media_fingerprint((MEDIA_ROOT / object_key).resolve()):
+            texts[media_id] = cached_text
+        else:
+            misses.append((media_id, object_key, mime_type))
+    fresh = [row for row in extract_media_texts(misses) if row is not None] if misses else []
+    for media_id, _, text, _ in fresh:
+        texts[media_id] = text
+
+    if fresh:
+        try:
+            store_media_texts(conn, fresh)
+            conn.commit()
+        except Exception as exc:
+            logger.warning("Failed to cache extracted media texts: %s", exc)
+            conn.rollback()
 
-    if not text:
-        return value
+    resolved: List[Optional[str]] = []
+    for value in values:
+        media_id = _media_id(value)
+        if media_id is None:
+            resolved.append(value or None)
+            continue
+        text = texts.get(media_id)
+        resolved.append(_format_cv(media[media_id][0], text) if text else value)
+    return resolved
 
-    header = f"CV (из файла {Path(file_path).name}):\n"
-    return (header + text)[:20000]
+
+def resolve_cv_text(conn: connection, cv_value: Optional[str]) -> Optional[str]:
+    """Выполняет функцию resolve_cv_text."""
+    return resolve_cv_texts(conn, [cv_value])[0]
 
 
-__all__ = ["resolve_cv_text"]
+__all__ = [
+    "MEDIA_ROOT",
+    "media_fingerprint",
+    "extract_media_texts",
+    "store_media_texts",
+    "resolve_cv_texts",
+    "resolve_cv_text",
+]
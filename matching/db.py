@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 
 import psycopg2
-from psycopg2.extensions import connection
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'matching'
+POOL_ENABLED = (os.getenv("DB_POOL_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on"))
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
 
 
 def build_db_dsn() -> str:
@@ -19,9 +34,176 @@ def build_db_dsn() -> str:
     return f"postgresql://{user}:{password}@{host}:{port}/{db}"
 
 
-def get_conn() -> connection:
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with blocking checkout, health checks and counters."""
+
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        minconn: int,
+        maxconn: int,
+        timeout: float,
+        healthcheck_idle: float,
+    ) -> None:
+        """Выполняет функцию __init__."""
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn, self.minconn)
+        self._pool = pg_pool.ThreadedConnectionPool(self.minconn, self.maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._timeout = timeout
+        self._healthcheck_idle = healthcheck_idle
+        self._last_used: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "checkouts": 0,
+            "in_use": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _is_healthy(self, conn: connection) -> bool:
+        """Выполняет функцию _is_healthy."""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self._healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn: connection) -> None:
+        """Выполняет функцию _discard."""
+        self._last_used.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=True)
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["discarded"] += 1
+
+    def getconn(self) -> connection:
+        """Выполняет функцию getconn."""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self._timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise pg_pool.PoolError(
+                f"{SERVICE_NAME}: no free DB connection within {self._timeout}s"
+            )
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                logger.info("Discarding unhealthy pooled connection")
+                self._discard(conn)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000.0
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+        return conn
+
+    def putconn(self, conn: connection) -> None:
+        """Выполняет функцию putconn."""
+        try:
+            if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        with self._lock:
+            data: Dict[str, Any] = dict(self._stats)
+        checkouts = data["checkouts"] or 1
+        data["wait_ms_avg"] = round(data["wait_ms_total"] / checkouts, 3)
+        data["wait_ms_total"] = round(data["wait_ms_total"], 3)
+        data["wait_ms_max"] = round(data["wait_ms_max"], 3)
+        data["idle"] = len(getattr(self._pool, "_pool", []))
+        data["min_size"] = self.minconn
+        data["max_size"] = self.maxconn
+        return data
+
+    def closeall(self) -> None:
+        """Выполняет функцию closeall."""
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Выполняет функцию get_pool."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ConnectionPool(
+                    build_db_dsn(),
+                    minconn=POOL_MIN_SIZE,
+                    maxconn=POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    healthcheck_idle=POOL_HEALTHCHECK_IDLE,
+                )
+    return _POOL
+
+
+@contextmanager
+def get_conn() -> Iterator[connection]:
     """Выполняет функцию get_conn."""
-    return psycopg2.connect(build_db_dsn())
+    if not POOL_ENABLED:
+        conn = psycopg2.connect(build_db_dsn())
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+        return
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Выполняет функцию pool_stats."""
+    if not POOL_ENABLED:
+        return {"service": SERVICE_NAME, "enabled": False}
+    return {"service": SERVICE_NAME, "enabled": True, **get_pool().stats()}
+
+
+def close_pool() -> None:
+    """Выполняет функцию close_pool."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.closeall()
+            _POOL = None
 
 
-__all__ = ["build_db_dsn", "get_conn"]
+__all__ = ["build_db_dsn", "get_conn", "get_pool", "pool_stats", "close_pool", "ConnectionPool"]
@@ -0,0 +1,197 @@
+"""Background worker draining the embedding_jobs outbox."""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extensions import connection
+
+from .db import get_conn
+from .embeddings import refresh_embeddings_bulk
+from .settings import (
+    EMBEDDING_JOB_BACKOFF_BASE,
+    EMBEDDING_JOB_BACKOFF_MAX,
+    EMBEDDING_JOB_BATCH,
+    EMBEDDING_JOB_LEASE_SECONDS,
+    EMBEDDING_JOB_MAX_ATTEMPTS,
+    EMBEDDING_JOB_POLL_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+ClaimedJob = Tuple[int, str, int, int]
+
+
+def claim_jobs(conn: connection, limit: int = EMBEDDING_JOB_BATCH) -> List[ClaimedJob]:
+    """
+    Lock ready jobs with FOR UPDATE SKIP LOCKED and mark them as processing.
+    Jobs stuck in processing longer than the lease are picked up again.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH picked AS (
+                SELECT id
+                FROM embedding_jobs
+                WHERE (status = 'pending' AND run_after <= now())
+                   OR (status = 'processing' AND locked_at < now() - make_interval(secs => %s))
+                ORDER BY run_after, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE embedding_jobs j
+            SET status = 'processing', locked_at = now(), attempts = j.attempts + 1
+            FROM picked
+            WHERE j.id = picked.id
+            RETURNING j.id, j.kind, j.entity_id, j.attempts
+            """,
+            (EMBEDDING_JOB_LEASE_SECONDS, limit),
+        )
+        rows = [tuple(row) for row in cur.fetchall()]
+    conn.commit()
+    return rows
+
+
+def _coalesce(jobs: List[ClaimedJob]) -> Dict[str, Dict[int, List[ClaimedJob]]]:
+    """Выполняет функцию _coalesce."""
+    grouped: Dict[str, Dict[int, List[ClaimedJob]]] = {}
+    for job in jobs:
+        _, kind, entity_id, _ = job
+        grouped.setdefault(kind, {}).setdefault(entity_id, []).append(job)
+    return grouped
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """Выполняет функцию _backoff_seconds."""
+    delay = min(EMBEDDING_JOB_BACKOFF_MAX, EMBEDDING_JOB_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _complete(conn: connection, job_ids: List[int]) -> None:
+    """Выполняет функцию _complete."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM embedding_jobs WHERE id = ANY(%s)", (job_ids,))
+
+
+def _reschedule(conn: connection, jobs: List[ClaimedJob], error: str) -> None:
+    """Выполняет функцию _reschedule."""
+    with conn.cursor() as cur:
+        for job_id, kind, entity_id, attempts in jobs:
+            if attempts >= EMBEDDING_JOB_MAX_ATTEMPTS:
+                cur.execute(
+                    "UPDATE embedding_jobs SET status = 'failed', last_error = %s, locked_at = NULL WHERE id = %s",
+                    (error[:2000], job_id),
+                )
+                logger.error("Embedding job %s (%s #%s) failed permanently: %s", job_id, kind, entity_id, error)
+                continue
+            # A newer pending job for the same entity already covers this one.
+            cur.execute(
+                """
+                UPDATE embedding_jobs
+                SET status = 'pending', last_error = %s, locked_at = NULL,
+                    run_after = now() + make_interval(secs => %s)
+                WHERE id = %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM embedding_jobs other
+                      WHERE other.kind = %s AND other.entity_id = %s
+                        AND other.status = 'pending' AND other.id <> %s
+                  )
+                """,
+                (error[:2000], _backoff_seconds(attempts), job_id, kind, entity_id, job_id),
+            )
+            if cur.rowcount == 0:
+                cur.execute("DELETE FROM embedding_jobs WHERE id = %s", (job_id,))
+
+
+def process_batch(conn: connection, limit: int = EMBEDDING_JOB_BATCH) -> Dict[str, int]:
+    """Claim one batch of jobs, refresh embeddings per kind and settle the jobs."""
+    jobs = claim_jobs(conn, limit)
+    stats = {"claimed": len(jobs), "entities": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    if not jobs:
+        return stats
+    for kind, by_entity in _coalesce(jobs).items():
+        kind_jobs = [job for entity_jobs in by_entity.values() for job in entity_jobs]
+        stats["entities"] += len(by_entity)
+        try:
+            result = refresh_embeddings_bulk(conn, kind, list(by_entity.keys()), commit=False)
+            _complete(conn, [job[0] for job in kind_jobs])
+            conn.commit()
+            stats["updated"] += result.get("updated", 0)
+            stats["unchanged"] += result.get("unchanged", 0)
+        except Exception as exc:
+            conn.rollback()
+            logger.warning("Embedding refresh for %s %s failed: %s", len(by_entity), kind, exc)
+            _reschedule(conn, kind_jobs, f"{type(exc).__name__}: {exc}")
+            conn.commit()
+            stats["failed"] += len(kind_jobs)
+    return stats
+
+
+def job_counts(conn: connection) -> Dict[str, Any]:
+    """Выполняет функцию job_counts."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT status, COUNT(*), MIN(created_at)
+            FROM embedding_jobs
+            GROUP BY status
+            """
+        )
+        rows = cur.fetchall()
+    return {
+        status: {"count": count, "oldest": oldest.isoformat() if oldest else None}
+        for status, count, oldest in rows
+    }
+
+
+class EmbeddingJobWorker:
+    """Daemon thread polling the outbox until stopped."""
+
+    def __init__(self, poll_interval: float = EMBEDDING_JOB_POLL_INTERVAL) -> None:
+        """Выполняет функцию __init__."""
+        self._poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed = 0
+        self.failed = 0
+        self.unchanged = 0
+
+    def start(self) -> None:
+        """Выполняет функцию start."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="embedding-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Выполняет функцию stop."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        """Выполняет функцию running."""
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self) -> None:
+        """Выполняет функцию _run."""
+        while not self._stop.is_set():
+            claimed = 0
+            try:
+                with get_conn() as conn:
+                    stats = process_batch(conn)
+                claimed = stats["claimed"]
+                self.processed += stats["claimed"] - stats["failed"]
+                self.failed += stats["failed"]
+                self.unchanged += stats["unchanged"]
+            except Exception as exc:
+                logger.warning("Embedding job worker iteration failed: %s", exc)
+            if not claimed:
+                self._stop.wait(self._poll_interval)
+
+
+__all__ = ["claim_jobs", "process_batch", "job_counts", "EmbeddingJobWorker"]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -12,7 +13,16 @@ from psycopg2.extensions import connection
 from sentence_transformers import SentenceTransformer
 from transformers import AutoModel, AutoTokenizer
 
-DEFAULT_MODEL_REPO_ID = "intfloat/multilingual-e5-base"
+from .settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MODEL,
+    EMBEDDING_ONNX_QUANTIZE,
+    EMBEDDING_ONNX_THREADS,
+)
+from .vector_io import Vector, copy_update_vectors
+
+DEFAULT_MODEL_REPO_ID = EMBEDDING_MODEL
 
 ALLOWED_REPO_IDS = {
     "intfloat/multilingual-e5-small",
@@ -31,6 +41,10 @@ else:
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 _MODEL_CACHE: Dict[str, "EmbeddingModel"] = {}
 
+SUPPORTED_BACKENDS = ("sentence-transformers", "transformers", "onnx")
+# Models whose sentence-transformers pooling is the CLS token rather than the mean.
+_CLS_POOLING_REPO_IDS = {"BAAI/bge-m3"}
+
 
 def _should_use_sentence_transformers(repo_id: str) -> bool:
     """Выполняет функцию _should_use_sentence_transformers."""
@@ -38,6 +52,32 @@ def _should_use_sentence_transformers(repo_id: str) -> bool:
     return "cointegrated/rubert-tiny2" not in name
 
 
+def _resolve_backend(repo_id: str, backend: Optional[str]) -> str:
+    """Выполняет функцию _resolve_backend."""
+    requested = (backend or EMBEDDING_BACKEND or "auto").strip().lower()
+    if requested == "auto":
+        return (
+            "sentence-transformers"
+            if _should_use_sentence_transformers(repo_id)
+            else "transformers"
+        )
+    if requested not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {requested}")
+    return requested
+
+
+def embedding_model_key(repo_id: str, backend: Optional[str] = None, quantize: Optional[bool] = None) -> str:
+    """
+    Marker stored in ``embedding_model``: the repo id plus the backend and, for
+    ONNX, int8 quantization, so switching either re-embeds stored vectors
+    instead of mixing them with the old ones in one index.
+    """
+    resolved = _resolve_backend(repo_id, backend)
+    if resolved == "onnx" and (EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize):
+        resolved = "onnx-int8"
+    return f"{repo_id}|{resolved}"
+
+
 def _model_cache_dir(repo_id: str) -> Path:
     """Выполняет функцию _model_cache_dir."""
     safe_name = repo_id.replace("/", "__")
@@ -51,16 +91,20 @@ class EmbeddingModel:
     repo_id: str
     backend: str
     local_dir: Path
-    model: Union[SentenceTransformer, AutoModel]
+    model: Union[SentenceTransformer, AutoModel, Any]
     tokenizer: Optional[AutoTokenizer] = None
+    quantized: bool = False
 
     def __post_init__(self) -> None:
         """Выполняет функцию __post_init__."""
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if self.backend == "onnx":
+            self.device = torch.device("cpu")
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         if self.backend == "sentence-transformers":
                                                                         
             self.model.to(str(self.device))
-        else:
+        elif self.backend == "transformers":
             self.model.to(self.device)
         self.output_dimension = self._infer_output_dimension()
 
@@ -68,6 +112,11 @@ class EmbeddingModel:
         """Выполняет функцию _infer_output_dimension."""
         if self.backend == "sentence-transformers":
             return self.model.get_sentence_embedding_dimension()
+        if self.backend == "onnx":
+            hidden = self.model.get_outputs()[0].shape[-1]
+            if isinstance(hidden, int):
+                return hidden
+            return int(self._encode_with_onnx(["query: probe"], normalize=False).shape[1])
         return int(getattr(self.model.config, "hidden_size", 0))
 
     @classmethod
@@ -77,15 +126,30 @@ class EmbeddingModel:
         *,
         revision: Optional[str] = None,
         token: Optional[str] = None,
+        backend: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        num_threads: Optional[int] = None,
     ) -> "EmbeddingModel":
         """Выполняет функцию from_pretrained."""
-        backend = (
-            "sentence-transformers"
-            if _should_use_sentence_transformers(repo_id)
-            else "transformers"
-        )
+        backend = _resolve_backend(repo_id, backend)
         local_dir = _model_cache_dir(repo_id)
-        if backend == "sentence-transformers":
+        quantized = backend == "onnx" and (EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize)
+        if backend == "onnx":
+            tokenizer = AutoTokenizer.from_pretrained(
+                repo_id,
+                revision=revision,
+                token=token,
+                cache_dir=str(local_dir),
+            )
+            model = _load_onnx_session(
+                repo_id,
+                local_dir,
+                revision=revision,
+                token=token,
+                quantize=quantized,
+                num_threads=EMBEDDING_ONNX_THREADS if num_threads is None else num_threads,
+            )
+        elif backend == "sentence-transformers":
             model = SentenceTransformer(
                 repo_id,
                 revision=revision,
@@ -112,8 +176,14 @@ class EmbeddingModel:
             local_dir=local_dir,
             model=model,
             tokenizer=tokenizer,
+            quantized=quantized,
         )
 
+    @property
+    def model_key(self) -> str:
+        """Выполняет функцию model_key."""
+        return embedding_model_key(self.repo_id, self.backend, self.quantized)
+
     def encode(
         self,
         texts: Union[str, Sequence[str]],
@@ -133,9 +203,23 @@ class EmbeddingModel:
                 encode_kwargs["batch_size"] = batch_size
             embeddings = self.model.encode(batched_texts, **encode_kwargs)
         else:
-            embeddings = self._encode_with_transformers(
-                batched_texts,
-                normalize=normalize,
+            step = batch_size or len(batched_texts) or 1
+            encode_chunk = (
+                self._encode_with_onnx
+                if self.backend == "onnx"
+                else self._encode_with_transformers
+            )
+            chunks = [
+                encode_chunk(
+                    batched_texts[start : start + step],
+                    normalize=normalize,
+                )
+                for start in range(0, len(batched_texts), step)
+            ]
+            embeddings = (
+                np.concatenate(chunks, axis=0)
+                if chunks
+                else np.zeros((0, self.output_dimension), dtype=np.float32)
             )
         if single_input:
             return embeddings[0]
@@ -170,6 +254,135 @@ class EmbeddingModel:
             )
         return pooled_embeddings.cpu().numpy()
 
+    def _encode_with_onnx(
+        self,
+        texts: Sequence[str],
+        *,
+        normalize: bool,
+    ) -> np.ndarray:
+        """Выполняет функцию _encode_with_onnx."""
+        if self.tokenizer is None:
+            raise RuntimeError("Tokenizer is not initialised for onnx backend.")
+        inputs = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            return_tensors="np",
+        )
+        feed = {
+            node.name: np.asarray(inputs[node.name], dtype=np.int64)
+            for node in self.model.get_inputs()
+            if node.name in inputs
+        }
+        last_hidden_state = self.model.run(None, feed)[0]
+        if self.repo_id in _CLS_POOLING_REPO_IDS:
+            pooled = last_hidden_state[:, 0]
+        else:
+            mask = feed["attention_mask"][..., None].astype(last_hidden_state.dtype)
+            pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize:
+            pooled = _normalize_rows(pooled)
+        return pooled.astype(np.float32, copy=False)
+
+
+class _OnnxExportWrapper(torch.nn.Module):
+    """Maps positional ONNX inputs to keyword arguments of the HF model."""
+
+    def __init__(self, model: AutoModel, input_names: Sequence[str]) -> None:
+        """Выполняет функцию __init__."""
+        super().__init__()
+        self.model = model
+        self.input_names = list(input_names)
+
+    def forward(self, *inputs: torch.Tensor) -> torch.Tensor:
+        """Выполняет функцию forward."""
+        return self.model(**dict(zip(self.input_names, inputs))).last_hidden_state
+
+
+def _export_onnx(
+    repo_id: str,
+    local_dir: Path,
+    *,
+    revision: Optional[str] = None,
+    token: Optional[str] = None,
+) -> Path:
+    """
+    Export the encoder to ``<local_dir>/onnx/model.onnx`` once; later loads
+    reuse the file.
+    """
+    onnx_dir = local_dir / "onnx"
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+    target = onnx_dir / "model.onnx"
+    if target.exists():
+        return target
+    tokenizer = AutoTokenizer.from_pretrained(
+        repo_id, revision=revision, token=token, cache_dir=str(local_dir)
+    )
+    model = AutoModel.from_pretrained(
+        repo_id, revision=revision, token=token, cache_dir=str(local_dir)
+    ).eval()
+    sample = tokenizer(["query: onnx export"], return_tensors="pt")
+    input_names = [
+        name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    tmp_target = onnx_dir / "model.onnx.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _OnnxExportWrapper(model, input_names),
+            tuple(sample[name] for name in input_names),
+            str(tmp_target),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    tmp_target.replace(target)
+    return target
+
+
+def _quantize_onnx(source: Path) -> Path:
+    """Выполняет функцию _quantize_onnx."""
+    target = source.with_name("model.int8.onnx")
+    if target.exists():
+        return target
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_target = source.with_name("model.int8.onnx.tmp")
+    quantize_dynamic(str(source), str(tmp_target), weight_type=QuantType.QInt8)
+    tmp_target.replace(target)
+    return target
+
+
+def _load_onnx_session(
+    repo_id: str,
+    local_dir: Path,
+    *,
+    revision: Optional[str] = None,
+    token: Optional[str] = None,
+    quantize: bool = True,
+    num_threads: int = 0,
+) -> Any:
+    """Выполняет функцию _load_onnx_session."""
+    try:
+        import onnxruntime as ort
+    except ImportError as exc:
+        raise RuntimeError("onnxruntime is required for the onnx embedding backend.") from exc
+
+    model_path = _export_onnx(repo_id, local_dir, revision=revision, token=token)
+    if quantize:
+        model_path = _quantize_onnx(model_path)
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads > 0:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(
+        str(model_path),
+        sess_options=options,
+        providers=["CPUExecutionProvider"],
+    )
+
 
 def _ensure_batched(texts: Union[str, Sequence[str]]) -> Tuple[Sequence[str], bool]:
     """Выполняет функцию _ensure_batched."""
@@ -178,11 +391,6 @@ def _ensure_batched(texts: Union[str, Sequence[str]]) -> Tuple[Sequence[str], bo
     return list(texts), False
 
 
-def _vector_to_pgvector(vector: np.ndarray) -> str:
-    """Выполняет функцию _vector_to_pgvector."""
-    return "[" + ",".join(f"{float(x):.8f}" for x in vector.tolist()) + "]"
-
-
 def _mean_pooling(
     last_hidden_state: torch.Tensor,
     attention_mask: torch.Tensor,
@@ -200,6 +408,9 @@ def load_embedding_model(
     *,
     revision: Optional[str] = None,
     token: Optional[str] = None,
+    backend: Optional[str] = None,
+    quantize: Optional[bool] = None,
+    num_threads: Optional[int] = None,
 ) -> EmbeddingModel:
     """Выполняет функцию load_embedding_model."""
     if repo_id not in ALLOWED_REPO_IDS:
@@ -209,6 +420,9 @@ def load_embedding_model(
         repo_id,
         revision=revision,
         token=token,
+        backend=backend,
+        quantize=quantize,
+        num_threads=num_threads,
     )
 
 
@@ -377,6 +591,28 @@ def _resolve_storage(
     return table, column, entity_id
 
 
+def _source_hash(text: str) -> str:
+    """Выполняет функцию _source_hash."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _is_unchanged(
+    entity: Union[Mapping[str, Any], Any], source_hash: str, model_key: str
+) -> bool:
+    """Выполняет функцию _is_unchanged."""
+    return (
+        bool(_extract_value(entity, "has_embedding"))
+        and _extract_value(entity, "embedding_source_hash") == source_hash
+        and _extract_value(entity, "embedding_model") == model_key
+    )
+
+
+def _count(stats: Optional[Dict[str, int]], key: str) -> None:
+    """Выполняет функцию _count."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
+
+
 def generate_and_store_embedding(
     conn: connection,
     entity: Union[Mapping[str, Any], Any],
@@ -386,31 +622,151 @@ def generate_and_store_embedding(
     model_repo_id: str = DEFAULT_MODEL_REPO_ID,
     normalize: bool = True,
     commit: bool = True,
-) -> np.ndarray:
+    force: bool = False,
+    stats: Optional[Dict[str, int]] = None,
+) -> Optional[np.ndarray]:
     """
     Build textual representation of the entity, compute its embedding and persist to DB.
+    Returns None without touching the row when the stored source hash and model
+    already match the current text, unless ``force`` is set.
     """
 
     text = _build_entity_text(entity, entity_type)
+    embedding_model_id = model.model_key if model is not None else embedding_model_key(model_repo_id)
+    source_hash = _source_hash(text)
+    if not force and _is_unchanged(entity, source_hash, embedding_model_id):
+        _count(stats, "unchanged")
+        return None
+
     embedding_model = model or _get_cached_model(model_repo_id)
     vector = embedding_model.encode(text, normalize=normalize)
     norm = float(np.linalg.norm(vector))
     if norm > 0:
         vector = vector / norm
-    payload = _vector_to_pgvector(vector)
-
     table, id_column, entity_id = _resolve_storage(entity, entity_type)
     query = sql.SQL(
-        "UPDATE {table} SET embeddings=%s::vector, updated_at=now() WHERE {id_column}=%s"
+        "UPDATE {table} SET embeddings=%s, embedding_source_hash=%s, "
+        "embedding_model=%s, updated_at=now() WHERE {id_column}=%s"
     ).format(table=sql.Identifier(table), id_column=sql.Identifier(id_column))
 
     with conn.cursor() as cur:
-        cur.execute(query, (payload, entity_id))
+        cur.execute(query, (Vector(vector), source_hash, embedding_model_id, entity_id))
     if commit:
         conn.commit()
+    _count(stats, "updated")
     return vector
 
 
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Выполняет функцию _normalize_rows."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.array(vectors, copy=True), where=norms > 0)
+
+
+def _store_embeddings_bulk(
+    conn: connection,
+    table: str,
+    id_column: str,
+    entity_ids: Sequence[Any],
+    vectors: np.ndarray,
+    source_hashes: Sequence[str],
+    model_key: str,
+) -> None:
+    """Выполняет функцию _store_embeddings_bulk."""
+    rows = [
+        (entity_id, vector, source_hash, model_key)
+        for entity_id, vector, source_hash in zip(entity_ids, vectors, source_hashes)
+    ]
+    with conn.cursor() as cur:
+        copy_update_vectors(cur, table, id_column, rows)
+
+
+def refresh_embeddings_bulk(
+    conn: connection,
+    kind: str,
+    ids: Sequence[int],
+    *,
+    model_repo_id: str = DEFAULT_MODEL_REPO_ID,
+    normalize: bool = True,
+    batch_size: Optional[int] = None,
+    commit: bool = False,
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    Recompute embeddings for many entities of one kind: one SELECT, mini-batched
+    encoding, a binary COPY of all vectors and a single UPDATE. Entities whose source hash and
+    model match the stored ones are counted as ``unchanged`` and not re-encoded.
+    """
+    from .repository import (
+        fetch_roles_by_ids,
+        fetch_students_by_ids,
+        fetch_supervisors_by_ids,
+        fetch_topics_by_ids,
+    )
+
+    fetchers = {
+        "student": fetch_students_by_ids,
+        "supervisor": fetch_supervisors_by_ids,
+        "topic": fetch_topics_by_ids,
+        "role": fetch_roles_by_ids,
+    }
+    entity_type = (kind or "").strip().lower()
+    fetcher = fetchers.get(entity_type)
+    if fetcher is None:
+        raise ValueError(f"Unsupported entity type: {kind}")
+
+    unique_ids = list(dict.fromkeys(int(entity_id) for entity_id in ids))
+    entities = fetcher(conn, unique_ids)
+    model_key = embedding_model_key(model_repo_id)
+
+    texts: List[str] = []
+    entity_ids: List[Any] = []
+    source_hashes: List[str] = []
+    table = id_column = ""
+    skipped = 0
+    unchanged = 0
+    for entity in entities:
+        try:
+            text = _build_entity_text(entity, entity_type)
+        except ValueError:
+            skipped += 1
+            continue
+        source_hash = _source_hash(text)
+        if not force and _is_unchanged(entity, source_hash, model_key):
+            unchanged += 1
+            continue
+        table, id_column, entity_id = _resolve_storage(entity, entity_type)
+        texts.append(text)
+        entity_ids.append(entity_id)
+        source_hashes.append(source_hash)
+
+    if texts:
+        embedding_model = _get_cached_model(model_repo_id)
+        vectors = embedding_model.encode(
+            texts,
+            normalize=normalize,
+            batch_size=batch_size or EMBEDDING_BATCH_SIZE,
+        )
+        _store_embeddings_bulk(
+            conn,
+            table,
+            id_column,
+            entity_ids,
+            _normalize_rows(vectors),
+            source_hashes,
+            embedding_model.model_key,
+        )
+    if commit:
+        conn.commit()
+    return {
+        "requested": len(unique_ids),
+        "found": len(entities),
+        "updated": len(entity_ids),
+        "unchanged": unchanged,
+        "skipped": skipped,
+    }
+
+
 def refresh_student_embedding(
     conn: connection,
     student_user_id: int,
@@ -418,9 +774,11 @@ def refresh_student_embedding(
     model_repo_id: str = DEFAULT_MODEL_REPO_ID,
     normalize: bool = True,
     commit: bool = False,
+    force: bool = False,
+    stats: Optional[Dict[str, int]] = None,
 ) -> Optional[np.ndarray]:
     """Выполняет функцию refresh_student_embedding."""
-    from .repository import fetch_student                                              
+    from .repository import fetch_student
 
     student = fetch_student(conn, student_user_id)
     if not student:
@@ -432,6 +790,8 @@ def refresh_student_embedding(
         model_repo_id=model_repo_id,
         normalize=normalize,
         commit=commit,
+        force=force,
+        stats=stats,
     )
 
 
@@ -442,6 +802,8 @@ def refresh_supervisor_embedding(
     model_repo_id: str = DEFAULT_MODEL_REPO_ID,
     normalize: bool = True,
     commit: bool = False,
+    force: bool = False,
+    stats: Optional[Dict[str, int]] = None,
 ) -> Optional[np.ndarray]:
     """Выполняет функцию refresh_supervisor_embedding."""
     from .repository import fetch_supervisor
@@ -456,6 +818,8 @@ def refresh_supervisor_embedding(
         model_repo_id=model_repo_id,
         normalize=normalize,
         commit=commit,
+        force=force,
+        stats=stats,
     )
 
 
@@ -466,6 +830,8 @@ def refresh_topic_embedding(
     model_repo_id: str = DEFAULT_MODEL_REPO_ID,
     normalize: bool = True,
     commit: bool = False,
+    force: bool = False,
+    stats: Optional[Dict[str, int]] = None,
 ) -> Optional[np.ndarray]:
     """Выполняет функцию refresh_topic_embedding."""
     from .repository import fetch_topic
@@ -480,6 +846,8 @@ def refresh_topic_embedding(
         model_repo_id=model_repo_id,
         normalize=normalize,
         commit=commit,
+        force=force,
+        stats=stats,
     )
 
 
@@ -490,6 +858,8 @@ def refresh_role_embedding(
     model_repo_id: str = DEFAULT_MODEL_REPO_ID,
     normalize: bool = True,
     commit: bool = False,
+    force: bool = False,
+    stats: Optional[Dict[str, int]] = None,
 ) -> Optional[np.ndarray]:
     """Выполняет функцию refresh_role_embedding."""
     from .repository import fetch_role
@@ -504,6 +874,8 @@ def refresh_role_embedding(
         model_repo_id=model_repo_id,
         normalize=normalize,
         commit=commit,
+        force=force,
+        stats=stats,
     )
 
 
@@ -530,11 +902,14 @@ def pull_model(
 
 __all__ = [
     "EmbeddingModel",
+    "SUPPORTED_BACKENDS",
     "load_embedding_model",
+    "embedding_model_key",
     "generate_and_store_embedding",
     "refresh_student_embedding",
     "refresh_supervisor_embedding",
     "refresh_topic_embedding",
     "refresh_role_embedding",
+    "refresh_embeddings_bulk",
     "pull_model",
 ]
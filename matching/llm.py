@@ -1,29 +1,144 @@
-"""OpenAI client wrapper used by matching services."""
+"""Async OpenAI client wrapper used by matching services."""
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import random
+import time
 from typing import Any, Callable, Dict, List, Optional
 
-from openai import OpenAI
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, RateLimitError
 
-from .settings import LLM_TEMPERATURE, PROXY_API_KEY, PROXY_BASE_URL, PROXY_MODEL
+from .llm_cache import RankCache, cache_key, rank_cache
+from .settings import (
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_DEADLINE_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_TEMPERATURE,
+    PROXY_API_KEY,
+    PROXY_BASE_URL,
+    PROXY_MODEL,
+)
 
 logger = logging.getLogger(__name__)
 
 ParsedItem = Dict[str, Any]
 ItemParser = Callable[[Dict[str, Any]], Optional[ParsedItem]]
 
+_RETRY_MAX_SLEEP = 8.0
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After ``failure_threshold`` failed calls it
+    opens for ``cooldown_seconds``; then a single probe is let through and its
+    outcome either closes the breaker or re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        """Выполняет функцию __init__."""
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.trips = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """Выполняет функцию state."""
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Выполняет функцию allow."""
+        if self._opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self._opened_at < self.cooldown_seconds:
+            return False
+        self._probing = True
+        return True
+
+    @property
+    def probing(self) -> bool:
+        """Выполняет функцию probing."""
+        return self._probing
+
+    def release_probe(self) -> None:
+        """Probe ended without an outcome (e.g. cancelled): let the next call probe instead."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Выполняет функцию record_success."""
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Выполняет функцию record_failure."""
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                self.trips += 1
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """Выполняет функцию _is_retryable."""
+    if isinstance(exc, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code >= 500
+
 
 class MatchingLLMClient:
-    """Thin wrapper above OpenAI Chat Completions with shared configuration."""
+    """
+    Long-lived wrapper above ``AsyncOpenAI`` Chat Completions: bounded
+    concurrency, a deadline per rank call, jittered retries on 429/5xx and
+    a circuit breaker. Every failure path returns None so callers fall back
+    to their embedding-only ranking.
+    """
 
-    def __init__(self, client: OpenAI, model: str) -> None:
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        cache: Optional[RankCache] = None,
+        *,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_seconds: float = LLM_RETRY_BASE_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
         """Выполняет функцию __init__."""
         self._client = client
         self._model = model
+        self._cache = cache if cache is not None else rank_cache
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._deadline_seconds = deadline_seconds
+        self._max_retries = max(0, max_retries)
+        self._retry_base_seconds = retry_base_seconds
+        self._breaker = breaker or CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS)
+        self._in_flight = 0
+        self._stats: Dict[str, float] = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "deadline_exceeded": 0,
+            "short_circuited": 0,
+        }
 
-    def _call_rank(
+    async def _call_rank(
         self,
         *,
         function_name: str,
@@ -32,8 +147,74 @@ class MatchingLLMClient:
         user_prompt: str,
         schema: Dict[str, Any],
         parser: ItemParser,
+        payload_json: str,
     ) -> Optional[List[ParsedItem]]:
         """Выполняет функцию _call_rank."""
+        key = cache_key(function_name, self._model, LLM_TEMPERATURE, payload_json)
+        cached = await asyncio.to_thread(self._cache.get, key)
+        if cached is not None:
+            return cached
+
+        if not self._breaker.allow():
+            self._stats["short_circuited"] += 1
+            return None
+        probe = self._breaker.probing
+
+        self._stats["calls"] += 1
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._request_with_retries(
+                    function_name=function_name,
+                    description=description,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    schema=schema,
+                ),
+                timeout=self._deadline_seconds,
+            )
+        except asyncio.TimeoutError:
+            self._stats["deadline_exceeded"] += 1
+            self._stats["failed"] += 1
+            self._breaker.record_failure()
+            logger.warning("LLM %s exceeded the %.0fs deadline", function_name, self._deadline_seconds)
+            return None
+        except Exception as exc:
+            self._stats["failed"] += 1
+            self._breaker.record_failure()
+            logger.warning("LLM request failed: %s", exc)
+            return None
+        except BaseException:
+            # Cancelled caller: without this a half-open breaker would stay probing forever.
+            if probe:
+                self._breaker.release_probe()
+            raise
+
+        self._stats["succeeded"] += 1
+        self._breaker.record_success()
+        items = _parse_items(response, parser)
+        if items is not None:
+            await asyncio.to_thread(
+                self._cache.put,
+                key,
+                function_name=function_name,
+                model=self._model,
+                temperature=LLM_TEMPERATURE,
+                items=items,
+                latency_ms=(time.perf_counter() - started) * 1000.0,
+            )
+        return items
+
+    async def _request_with_retries(
+        self,
+        *,
+        function_name: str,
+        description: str,
+        system_prompt: str,
+        user_prompt: str,
+        schema: Dict[str, Any],
+    ) -> Any:
+        """Выполняет функцию _request_with_retries."""
         functions = [
             {
                 "name": function_name,
@@ -45,46 +226,46 @@ class MatchingLLMClient:
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
-        try:
-            response = self._client.chat.completions.create(
-                model=self._model,
-                messages=messages,
-                functions=functions,
-                function_call={"name": function_name},
-                temperature=LLM_TEMPERATURE,
-            )
-        except Exception as exc:                                        
-            logger.warning("LLM request failed: %s", exc)
-            return None
-
-        if not response.choices or not response.choices[0].message:
-            return None
-
-        message = response.choices[0].message
-        function_call = getattr(message, "function_call", None)
-        arguments = getattr(function_call, "arguments", None)
-        if not arguments:
-            return None
-
-        try:
-            parsed = json.loads(arguments)
-        except Exception:
-            logger.debug("Failed to decode LLM function arguments: %s", arguments)
-            return None
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self._in_flight += 1
+                    try:
+                        return await self._client.chat.completions.create(
+                            model=self._model,
+                            messages=messages,
+                            functions=functions,
+                            function_call={"name": function_name},
+                            temperature=LLM_TEMPERATURE,
+                        )
+                    finally:
+                        self._in_flight -= 1
+            except Exception as exc:
+                if attempt >= self._max_retries or not _is_retryable(exc):
+                    raise
+                # Full jitter keeps concurrent callers from retrying in lockstep.
+                delay = random.uniform(0, min(_RETRY_MAX_SLEEP, self._retry_base_seconds * 2**attempt))
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.info("LLM %s attempt %s failed (%s); retrying in %.2fs", function_name, attempt, exc, delay)
+                await asyncio.sleep(delay)
 
-        raw_items = parsed.get("top", []) if isinstance(parsed, dict) else []
-        items: List[ParsedItem] = []
-        for raw in raw_items[:5]:
-            if not isinstance(raw, dict):
-                continue
-            parsed_item = parser(raw)
-            if parsed_item is None:
-                continue
-            items.append(parsed_item)
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        return {
+            **self._stats,
+            "in_flight": self._in_flight,
+            "breaker_state": self._breaker.state,
+            "breaker_failures": self._breaker.failures,
+            "breaker_trips": self._breaker.trips,
+        }
 
-        return items if len(items) == 5 else None
+    async def aclose(self) -> None:
+        """Выполняет функцию aclose."""
+        await self._client.close()
 
-    def rank_candidates(self, payload_json: str) -> Optional[List[ParsedItem]]:
+    async def rank_candidates(self, payload_json: str) -> Optional[List[ParsedItem]]:
         """Выполняет функцию rank_candidates."""
         schema = {
             "type": "object",
@@ -118,7 +299,7 @@ class MatchingLLMClient:
             except Exception:
                 return None
 
-        return self._call_rank(
+        return await self._call_rank(
             function_name="rank_candidates",
             description="Верни пять кандидатов с краткими пояснениями.",
             system_prompt=(
@@ -132,9 +313,10 @@ class MatchingLLMClient:
             ),
             schema=schema,
             parser=_parse,
+            payload_json=payload_json,
         )
 
-    def rank_topics(self, payload_json: str) -> Optional[List[ParsedItem]]:
+    async def rank_topics(self, payload_json: str) -> Optional[List[ParsedItem]]:
         """Выполняет функцию rank_topics."""
         schema = {
             "type": "object",
@@ -168,7 +350,7 @@ class MatchingLLMClient:
             except Exception:
                 return None
 
-        return self._call_rank(
+        return await self._call_rank(
             function_name="rank_topics",
             description="Предложи пять тем и объясни выбор.",
             system_prompt=(
@@ -182,9 +364,10 @@ class MatchingLLMClient:
             ),
             schema=schema,
             parser=_parse,
+            payload_json=payload_json,
         )
 
-    def rank_roles(self, payload_json: str) -> Optional[List[ParsedItem]]:
+    async def rank_roles(self, payload_json: str) -> Optional[List[ParsedItem]]:
         """Выполняет функцию rank_roles."""
         schema = {
             "type": "object",
@@ -218,7 +401,7 @@ class MatchingLLMClient:
             except Exception:
                 return None
 
-        return self._call_rank(
+        return await self._call_rank(
             function_name="rank_roles",
             description="Выбери пять ролей для студента и добавь пояснения.",
             system_prompt=(
@@ -232,15 +415,81 @@ class MatchingLLMClient:
             ),
             schema=schema,
             parser=_parse,
+            payload_json=payload_json,
         )
 
 
+def _parse_items(response: Any, parser: ItemParser) -> Optional[List[ParsedItem]]:
+    """Выполняет функцию _parse_items."""
+    if not response.choices or not response.choices[0].message:
+        return None
+
+    message = response.choices[0].message
+    function_call = getattr(message, "function_call", None)
+    arguments = getattr(function_call, "arguments", None)
+    if not arguments:
+        return None
+
+    try:
+        parsed = json.loads(arguments)
+    except Exception:
+        logger.debug("Failed to decode LLM function arguments: %s", arguments)
+        return None
+
+    raw_items = parsed.get("top", []) if isinstance(parsed, dict) else []
+    items: List[ParsedItem] = []
+    for raw in raw_items[:5]:
+        if not isinstance(raw, dict):
+            continue
+        parsed_item = parser(raw)
+        if parsed_item is None:
+            continue
+        items.append(parsed_item)
+
+    return items if len(items) == 5 else None
+
+
 def create_matching_llm_client() -> Optional[MatchingLLMClient]:
     """Выполняет функцию create_matching_llm_client."""
     if not (PROXY_API_KEY and PROXY_BASE_URL):
         return None
-    client = OpenAI(api_key=PROXY_API_KEY, base_url=PROXY_BASE_URL)
+    # Retries are handled by MatchingLLMClient so the breaker sees every failure.
+    client = AsyncOpenAI(
+        api_key=PROXY_API_KEY,
+        base_url=PROXY_BASE_URL,
+        timeout=LLM_REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
     return MatchingLLMClient(client, PROXY_MODEL)
 
 
-__all__ = ["MatchingLLMClient", "create_matching_llm_client"]
+_shared_client: Optional[MatchingLLMClient] = None
+
+
+def get_matching_llm_client() -> Optional[MatchingLLMClient]:
+    """Return the process-wide client, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        try:
+            _shared_client = create_matching_llm_client()
+        except Exception as exc:
+            logger.warning("Failed to create LLM client: %s", exc)
+            return None
+    return _shared_client
+
+
+async def close_matching_llm_client() -> None:
+    """Выполняет функцию close_matching_llm_client."""
+    global _shared_client
+    client, _shared_client = _shared_client, None
+    if client is not None:
+        await client.aclose()
+
+
+__all__ = [
+    "CircuitBreaker",
+    "MatchingLLMClient",
+    "create_matching_llm_client",
+    "get_matching_llm_client",
+    "close_matching_llm_client",
+]
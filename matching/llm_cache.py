@@ -0,0 +1,172 @@
+"""
+Postgres-backed cache for LLM rerank results.
+
+Entries are keyed by ``sha256(function_name, model, temperature, payload_json)``.
+The payload already embeds every candidate profile and the anchor topic or
+role text, so any change to those inputs produces a new key and the stale entry
+simply ages out; ``invalidate()`` drops entries explicitly. Expired entries and
+entries beyond ``LLM_CACHE_MAX_ENTRIES`` (least recently hit first) are purged
+periodically on write.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .db import get_conn
+from .settings import LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_PURGE_EVERY = 50
+
+
+def cache_key(function_name: str, model: str, temperature: float, payload_json: str) -> str:
+    """Выполняет функцию cache_key."""
+    digest = hashlib.sha256(payload_json.encode("utf-8")).hexdigest()
+    material = json.dumps([function_name, model, round(float(temperature), 4), digest])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class RankCache:
+    """Read-through cache used by ``MatchingLLMClient`` with process-local counters."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = LLM_CACHE_ENABLED,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """Выполняет функцию __init__."""
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats: Dict[str, float] = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0,
+            "saved_latency_ms": 0.0,
+        }
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        """Выполняет функцию _count."""
+        with self._lock:
+            self._stats[key] += amount
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached items for ``key`` or None; refreshes the entry's hit stats."""
+        if not self.enabled:
+            return None
+        try:
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE llm_rank_cache
+                    SET hits = hits + 1, last_hit_at = now()
+                    WHERE cache_key = %s
+                      AND created_at > now() - make_interval(secs => %s)
+                    RETURNING result, latency_ms
+                    """,
+                    (key, self.ttl_seconds),
+                )
+                row = cur.fetchone()
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("LLM cache lookup failed: %s", exc)
+            return None
+        if not row:
+            self._count("misses")
+            return None
+        result, latency_ms = row
+        self._count("hits")
+        self._count("saved_latency_ms", float(latency_ms or 0))
+        return result if isinstance(result, list) else json.loads(result)
+
+    def put(
+        self,
+        key: str,
+        *,
+        function_name: str,
+        model: str,
+        temperature: float,
+        items: List[Dict[str, Any]],
+        latency_ms: float,
+    ) -> None:
+        """Выполняет функцию put."""
+        if not self.enabled:
+            return
+        try:
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO llm_rank_cache(cache_key, function_name, model, temperature, result, latency_ms)
+                    VALUES (%s, %s, %s, %s, %s::jsonb, %s)
+                    ON CONFLICT (cache_key) DO UPDATE
+                    SET result = EXCLUDED.result,
+                        latency_ms = EXCLUDED.latency_ms,
+                        created_at = now(),
+                        last_hit_at = now()
+                    """,
+                    (key, function_name, model, temperature, json.dumps(items, ensure_ascii=False), latency_ms),
+                )
+                with self._lock:
+                    self._writes += 1
+                    purge = self._writes % _PURGE_EVERY == 0
+                if purge:
+                    self._purge(cur)
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("LLM cache store failed: %s", exc)
+            return
+        self._count("stores")
+
+    def _purge(self, cur) -> None:
+        """Выполняет функцию _purge."""
+        cur.execute(
+            "DELETE FROM llm_rank_cache WHERE created_at <= now() - make_interval(secs => %s)",
+            (self.ttl_seconds,),
+        )
+        cur.execute(
+            """
+            DELETE FROM llm_rank_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM llm_rank_cache
+                ORDER BY last_hit_at DESC
+                OFFSET %s
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def invalidate(self, function_name: Optional[str] = None) -> int:
+        """Drop all entries, or only those of one rank function."""
+        with get_conn() as conn, conn.cursor() as cur:
+            if function_name:
+                cur.execute("DELETE FROM llm_rank_cache WHERE function_name = %s", (function_name,))
+            else:
+                cur.execute("DELETE FROM llm_rank_cache")
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["enabled"] = self.enabled
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+rank_cache = RankCache()
+
+
+__all__ = ["RankCache", "rank_cache", "cache_key"]
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from typing import Optional
+from typing import List, Optional
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from .db import get_conn
+from .assignment import assign_cohort
+from .db import build_db_dsn, close_pool, get_conn, pool_stats
+from .embedding_worker import EmbeddingJobWorker, job_counts
 from .embeddings import (
+    refresh_embeddings_bulk,
     refresh_role_embedding,
     refresh_student_embedding,
     refresh_supervisor_embedding,
@@ -22,7 +26,24 @@ from .service import (
     handle_match_student,
     handle_match_supervisor_user,
 )
-from .llm import MatchingLLMClient, create_matching_llm_client
+from .llm import close_matching_llm_client, get_matching_llm_client
+from .llm_cache import rank_cache
+from .media_text_worker import MediaTextWorker, media_text_counts
+from .memory_index import ensure_change_triggers, memory_index
+from .text_extract import extraction_stats, shutdown_extraction_pool
+from .precompute import CANDIDATE_TABLES, precompute_runner
+from .settings import (
+    ASSIGNMENT_MIN_SCORE,
+    ASSIGNMENT_TOP_K,
+    EMBEDDING_WORKER_ENABLED,
+    MEDIA_TEXT_WORKER_ENABLED,
+    PRECOMPUTE_INTERVAL_SECONDS,
+    PRECOMPUTE_RERANK,
+    PRECOMPUTE_TOP_K,
+    RETRIEVAL_BACKEND,
+    VECTOR_SCHEMA_AUTOMIGRATE,
+)
+from .vector_index import ensure_vector_schema
 
 
 def _configure_logging() -> logging.Logger:
@@ -39,26 +60,40 @@ load_dotenv()
 logger = _configure_logging()
 
 app = FastAPI(title="MentorMatch Matching Service")
+embedding_worker = EmbeddingJobWorker()
+media_text_worker = MediaTextWorker()
 
 
 class StudentEmbeddingPayload(BaseModel):
     student_user_id: int
     model_repo_id: Optional[str] = None
+    force: bool = False
 
 
 class SupervisorEmbeddingPayload(BaseModel):
     supervisor_user_id: int
     model_repo_id: Optional[str] = None
+    force: bool = False
 
 
 class TopicEmbeddingPayload(BaseModel):
     topic_id: int
     model_repo_id: Optional[str] = None
+    force: bool = False
 
 
 class RoleEmbeddingPayload(BaseModel):
     role_id: int
     model_repo_id: Optional[str] = None
+    force: bool = False
+
+
+class BatchEmbeddingPayload(BaseModel):
+    kind: str
+    ids: List[int]
+    model_repo_id: Optional[str] = None
+    batch_size: Optional[int] = Field(default=None, ge=1, le=1024)
+    force: bool = False
 
 
 class TopicMatchPayload(BaseModel):
@@ -74,18 +109,91 @@ class UserMatchPayload(BaseModel):
     user_id: int
 
 
+class PrecomputePayload(BaseModel):
+    top_k: int = Field(default=PRECOMPUTE_TOP_K, ge=1, le=200)
+    tables: Optional[List[str]] = None
+    rerank: bool = False
+
+
+class CohortAssignmentPayload(BaseModel):
+    scope: str = "all"
+    top_k: int = Field(default=ASSIGNMENT_TOP_K, ge=1, le=500)
+    min_score: float = Field(default=ASSIGNMENT_MIN_SCORE, ge=-1.0, le=1.0)
+
+
 def _model_args(model_repo_id: Optional[str]) -> dict[str, object]:
     """Выполняет функцию _model_args."""
     return {"model_repo_id": model_repo_id} if model_repo_id else {}
 
 
-def _llm_client() -> MatchingLLMClient | None:
-    """Выполняет функцию _llm_client."""
+@app.on_event("startup")
+def _ensure_vector_schema() -> None:
+    """Выполняет функцию _ensure_vector_schema."""
+    try:
+        with get_conn() as conn:
+            ensure_vector_schema(conn, alter=VECTOR_SCHEMA_AUTOMIGRATE)
+    except Exception as exc:
+        logger.warning("Vector schema migration skipped: %s", exc)
+
+
+@app.on_event("startup")
+def _start_embedding_worker() -> None:
+    """Выполняет функцию _start_embedding_worker."""
+    if EMBEDDING_WORKER_ENABLED:
+        embedding_worker.start()
+
+
+@app.on_event("startup")
+def _start_media_text_worker() -> None:
+    """Выполняет функцию _start_media_text_worker."""
+    if MEDIA_TEXT_WORKER_ENABLED:
+        media_text_worker.start()
+
+
+@app.on_event("startup")
+def _start_memory_index() -> None:
+    """Выполняет функцию _start_memory_index."""
+    if RETRIEVAL_BACKEND != "memory":
+        return
     try:
-        return create_matching_llm_client()
-    except Exception as exc:                                        
-        logger.warning("Failed to create LLM client: %s", exc)
-        return None
+        with get_conn() as conn:
+            ensure_change_triggers(conn)
+    except Exception as exc:
+        logger.warning("Memory index triggers not installed: %s", exc)
+    memory_index.start(build_db_dsn())
+
+
+async def _precompute_schedule() -> None:
+    """Выполняет функцию _precompute_schedule."""
+    while True:
+        await asyncio.sleep(PRECOMPUTE_INTERVAL_SECONDS)
+        await precompute_runner.run(rerank=PRECOMPUTE_RERANK)
+
+
+@app.on_event("startup")
+async def _start_precompute_schedule() -> None:
+    """Выполняет функцию _start_precompute_schedule."""
+    if PRECOMPUTE_INTERVAL_SECONDS > 0:
+        app.state.precompute_task = asyncio.create_task(_precompute_schedule())
+
+
+@app.on_event("shutdown")
+def _on_shutdown() -> None:
+    """Выполняет функцию _on_shutdown."""
+    embedding_worker.stop()
+    media_text_worker.stop()
+    shutdown_extraction_pool()
+    memory_index.stop()
+    close_pool()
+
+
+@app.on_event("shutdown")
+async def _close_llm_client() -> None:
+    """Выполняет функцию _close_llm_client."""
+    task = getattr(app.state, "precompute_task", None)
+    if task is not None:
+        task.cancel()
+    await close_matching_llm_client()
 
 
 @app.get("/health", response_class=JSONResponse)
@@ -94,107 +202,230 @@ def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics/db-pool", response_class=JSONResponse)
+def db_pool_metrics() -> dict[str, object]:
+    """Выполняет функцию db_pool_metrics."""
+    return pool_stats()
+
+
+@app.get("/metrics/memory-index", response_class=JSONResponse)
+def memory_index_metrics() -> dict[str, object]:
+    """Выполняет функцию memory_index_metrics."""
+    return {"backend": RETRIEVAL_BACKEND, **memory_index.stats()}
+
+
+@app.get("/metrics/media-texts", response_class=JSONResponse)
+def media_text_metrics() -> dict[str, object]:
+    """Выполняет функцию media_text_metrics."""
+    with get_conn() as conn:
+        counts = media_text_counts(conn)
+    return {
+        "worker_running": media_text_worker.running,
+        "extracted": media_text_worker.extracted,
+        "failed": media_text_worker.failed,
+        "cache": counts,
+        "extraction": extraction_stats(),
+    }
+
+
+@app.get("/metrics/llm", response_class=JSONResponse)
+def llm_metrics() -> dict[str, object]:
+    """Выполняет функцию llm_metrics."""
+    llm = get_matching_llm_client()
+    return {"configured": llm is not None, **(llm.stats() if llm else {})}
+
+
+@app.get("/metrics/llm-cache", response_class=JSONResponse)
+def llm_cache_metrics() -> dict[str, object]:
+    """Выполняет функцию llm_cache_metrics."""
+    return rank_cache.stats()
+
+
+@app.delete("/api/llm-cache", response_class=JSONResponse)
+def llm_cache_invalidate(function_name: Optional[str] = None) -> JSONResponse:
+    """Выполняет функцию llm_cache_invalidate."""
+    removed = rank_cache.invalidate(function_name)
+    return JSONResponse({"status": "ok", "removed": removed})
+
+
 @app.post("/api/embeddings/student/refresh", response_class=JSONResponse)
 def refresh_student(payload: StudentEmbeddingPayload) -> JSONResponse:
     """Выполняет функцию refresh_student."""
+    stats = {"updated": 0, "unchanged": 0}
     with get_conn() as conn:
         refresh_student_embedding(
             conn,
             payload.student_user_id,
             commit=True,
+            force=payload.force,
+            stats=stats,
             **_model_args(payload.model_repo_id),
         )
-    return JSONResponse({"status": "ok", "student_user_id": payload.student_user_id})
+    return JSONResponse({"status": "ok", "student_user_id": payload.student_user_id, **stats})
 
 
 @app.post("/api/embeddings/supervisor/refresh", response_class=JSONResponse)
 def refresh_supervisor(payload: SupervisorEmbeddingPayload) -> JSONResponse:
     """Выполняет функцию refresh_supervisor."""
+    stats = {"updated": 0, "unchanged": 0}
     with get_conn() as conn:
         refresh_supervisor_embedding(
             conn,
             payload.supervisor_user_id,
             commit=True,
+            force=payload.force,
+            stats=stats,
             **_model_args(payload.model_repo_id),
         )
-    return JSONResponse({"status": "ok", "supervisor_user_id": payload.supervisor_user_id})
+    return JSONResponse({"status": "ok", "supervisor_user_id": payload.supervisor_user_id, **stats})
 
 
 @app.post("/api/embeddings/topic/refresh", response_class=JSONResponse)
 def refresh_topic(payload: TopicEmbeddingPayload) -> JSONResponse:
     """Выполняет функцию refresh_topic."""
+    stats = {"updated": 0, "unchanged": 0}
     with get_conn() as conn:
         refresh_topic_embedding(
             conn,
             payload.topic_id,
             commit=True,
+            force=payload.force,
+            stats=stats,
             **_model_args(payload.model_repo_id),
         )
-    return JSONResponse({"status": "ok", "topic_id": payload.topic_id})
+    return JSONResponse({"status": "ok", "topic_id": payload.topic_id, **stats})
 
 
 @app.post("/api/embeddings/role/refresh", response_class=JSONResponse)
 def refresh_role(payload: RoleEmbeddingPayload) -> JSONResponse:
     """Выполняет функцию refresh_role."""
+    stats = {"updated": 0, "unchanged": 0}
     with get_conn() as conn:
         refresh_role_embedding(
             conn,
             payload.role_id,
             commit=True,
+            force=payload.force,
+            stats=stats,
             **_model_args(payload.model_repo_id),
         )
-    return JSONResponse({"status": "ok", "role_id": payload.role_id})
+    return JSONResponse({"status": "ok", "role_id": payload.role_id, **stats})
+
+
+@app.post("/api/embeddings/batch", response_class=JSONResponse)
+def refresh_batch(payload: BatchEmbeddingPayload) -> JSONResponse:
+    """Выполняет функцию refresh_batch."""
+    with get_conn() as conn:
+        try:
+            stats = refresh_embeddings_bulk(
+                conn,
+                payload.kind,
+                payload.ids,
+                batch_size=payload.batch_size,
+                commit=True,
+                force=payload.force,
+                **_model_args(payload.model_repo_id),
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JSONResponse({"status": "ok", "kind": payload.kind, **stats})
+
+
+@app.get("/api/embeddings/jobs", response_class=JSONResponse)
+def embedding_jobs_status() -> JSONResponse:
+    """Выполняет функцию embedding_jobs_status."""
+    with get_conn() as conn:
+        counts = job_counts(conn)
+    return JSONResponse(
+        {
+            "status": "ok",
+            "worker_running": embedding_worker.running,
+            "processed": embedding_worker.processed,
+            "failed": embedding_worker.failed,
+            "unchanged": embedding_worker.unchanged,
+            "jobs": counts,
+        }
+    )
 
 
 @app.post("/api/match/topic", response_class=JSONResponse)
-def match_topic(payload: TopicMatchPayload) -> JSONResponse:
+async def match_topic(payload: TopicMatchPayload) -> JSONResponse:
     """Выполняет функцию match_topic."""
-    llm = _llm_client()
-    with get_conn() as conn:
-        result = handle_match(
-            conn,
-            topic_id=payload.topic_id,
-            target_role=payload.target_role,
-            llm_client=llm,
-        )
+    result = await handle_match(
+        topic_id=payload.topic_id,
+        target_role=payload.target_role,
+        llm_client=get_matching_llm_client(),
+    )
     if result.get("status") != "ok":
         raise HTTPException(status_code=404, detail=result.get("message"))
     return JSONResponse(result)
 
 
 @app.post("/api/match/role", response_class=JSONResponse)
-def match_role(payload: RoleMatchPayload) -> JSONResponse:
+async def match_role(payload: RoleMatchPayload) -> JSONResponse:
     """Выполняет функцию match_role."""
-    llm = _llm_client()
-    with get_conn() as conn:
-        result = handle_match_role(conn, role_id=payload.role_id, llm_client=llm)
+    result = await handle_match_role(role_id=payload.role_id, llm_client=get_matching_llm_client())
     if result.get("status") != "ok":
         raise HTTPException(status_code=404, detail=result.get("message"))
     return JSONResponse(result)
 
 
 @app.post("/api/match/student", response_class=JSONResponse)
-def match_student(payload: UserMatchPayload) -> JSONResponse:
+async def match_student(payload: UserMatchPayload) -> JSONResponse:
     """Выполняет функцию match_student."""
-    llm = _llm_client()
-    with get_conn() as conn:
-        result = handle_match_student(conn, student_user_id=payload.user_id, llm_client=llm)
+    result = await handle_match_student(student_user_id=payload.user_id, llm_client=get_matching_llm_client())
     if result.get("status") != "ok":
         raise HTTPException(status_code=404, detail=result.get("message"))
     return JSONResponse(result)
 
 
 @app.post("/api/match/supervisor", response_class=JSONResponse)
-def match_supervisor(payload: UserMatchPayload) -> JSONResponse:
+async def match_supervisor(payload: UserMatchPayload) -> JSONResponse:
     """Выполняет функцию match_supervisor."""
-    llm = _llm_client()
-    with get_conn() as conn:
-        result = handle_match_supervisor_user(conn, supervisor_user_id=payload.user_id, llm_client=llm)
+    result = await handle_match_supervisor_user(
+        supervisor_user_id=payload.user_id,
+        llm_client=get_matching_llm_client(),
+    )
     if result.get("status") != "ok":
         raise HTTPException(status_code=404, detail=result.get("message"))
     return JSONResponse(result)
 
 
+@app.post("/api/assign/cohort", response_class=JSONResponse)
+def assign_cohort_endpoint(payload: CohortAssignmentPayload) -> JSONResponse:
+    """Выполняет функцию assign_cohort_endpoint."""
+    with get_conn() as conn:
+        try:
+            result = assign_cohort(
+                conn,
+                scope=payload.scope,
+                top_k=payload.top_k,
+                min_score=payload.min_score,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JSONResponse(result)
+
+
+@app.post("/api/precompute/candidates", response_class=JSONResponse)
+async def precompute_candidates_endpoint(payload: PrecomputePayload) -> JSONResponse:
+    """Выполняет функцию precompute_candidates_endpoint."""
+    if precompute_runner.running:
+        raise HTTPException(status_code=409, detail="Candidate precompute is already running")
+    if payload.tables and not set(payload.tables) <= set(CANDIDATE_TABLES):
+        raise HTTPException(status_code=400, detail="Unsupported candidate tables")
+    app.state.precompute_manual_task = asyncio.create_task(
+        precompute_runner.run(top_k=payload.top_k, tables=payload.tables, rerank=payload.rerank)
+    )
+    return JSONResponse({"status": "started", "top_k": payload.top_k, "rerank": payload.rerank}, status_code=202)
+
+
+@app.get("/api/precompute/status", response_class=JSONResponse)
+def precompute_status() -> JSONResponse:
+    """Выполняет функцию precompute_status."""
+    return JSONResponse({"status": "ok", **precompute_runner.status()})
+
+
 if __name__ == "__main__":
     import uvicorn
 
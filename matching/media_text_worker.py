@@ -0,0 +1,130 @@
+"""Background extraction of CV plaintext into the media_texts cache."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extensions import connection
+
+from .cv import extract_media_texts, store_media_texts
+from .db import get_conn
+from .settings import MEDIA_TEXT_BATCH, MEDIA_TEXT_POLL_INTERVAL, MEDIA_TEXT_RETRY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def pending_media(conn: connection, limit: int = MEDIA_TEXT_BATCH) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Downloaded documents that have no cached text yet, oldest first, plus
+    rows stored for retry (empty ``source_hash``: missing file, timeout,
+    crashed worker) once ``MEDIA_TEXT_RETRY_SECONDS`` have passed.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT mf.id, mf.object_key, mf.mime_type
+            FROM media_files mf
+            LEFT JOIN media_texts mt ON mt.media_id = mf.id
+            WHERE (
+                    mt.media_id IS NULL
+                    OR (mt.source_hash = '' AND mt.extracted_at < now() - make_interval(secs => %s))
+                  )
+              AND mf.status = 'ready'
+              AND mf.object_key <> ''
+              AND mf.mime_type NOT LIKE 'image/%%'
+              AND mf.mime_type NOT LIKE 'video/%%'
+              AND mf.mime_type NOT LIKE 'audio/%%'
+            ORDER BY mf.id
+            LIMIT %s
+            """,
+            (MEDIA_TEXT_RETRY_SECONDS, limit),
+        )
+        return [tuple(row) for row in cur.fetchall()]
+
+
+def media_text_counts(conn: connection) -> Dict[str, Any]:
+    """Выполняет функцию media_text_counts."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*) FILTER (WHERE text IS NOT NULL),
+                   COUNT(*) FILTER (WHERE text IS NULL),
+                   MAX(extracted_at)
+            FROM media_texts
+            """
+        )
+        extracted, empty, last = cur.fetchone()
+    return {"extracted": extracted, "empty": empty, "last_extracted_at": last.isoformat() if last else None}
+
+
+class MediaTextWorker:
+    """
+    Daemon thread that polls for newly stored documents and extracts their
+    text in the extraction process pool, so PDF/DOCX parsing never runs
+    on the request path for files that were uploaded before the first match.
+    """
+
+    def __init__(self, poll_interval: float = MEDIA_TEXT_POLL_INTERVAL) -> None:
+        """Выполняет функцию __init__."""
+        self._poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.extracted = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Выполняет функцию start."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="media-texts", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Выполняет функцию stop."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        """Выполняет функцию running."""
+        return bool(self._thread and self._thread.is_alive())
+
+    def process_batch(self, conn: connection) -> int:
+        """Extract one batch of pending documents; returns how many were claimed."""
+        pending = pending_media(conn)
+        conn.commit()
+        if not pending:
+            return 0
+        rows = []
+        for (media_id, _, _), result in zip(pending, extract_media_texts(pending)):
+            if result is None:
+                # File is not on this volume (yet); retried after MEDIA_TEXT_RETRY_SECONDS.
+                rows.append((media_id, "", None, "missing file"))
+                self.failed += 1
+                continue
+            rows.append(result)
+            if result[3]:
+                self.failed += 1
+            else:
+                self.extracted += 1
+        store_media_texts(conn, rows)
+        conn.commit()
+        return len(pending)
+
+    def _run(self) -> None:
+        """Выполняет функцию _run."""
+        while not self._stop.is_set():
+            claimed = 0
+            try:
+                with get_conn() as conn:
+                    claimed = self.process_batch(conn)
+            except Exception as exc:
+                logger.warning("Media text worker iteration failed: %s", exc)
+            if not claimed:
+                self._stop.wait(self._poll_interval)
+
+
+__all__ = ["pending_media", "media_text_counts", "MediaTextWorker"]
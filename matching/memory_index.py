@@ -0,0 +1,393 @@
+"""
+In-process similarity index over stored embeddings.
+
+Keeps one contiguous, L2-normalised float32 matrix per table (users, topics,
+roles) together with id arrays and boolean filter masks, so nearest-neighbour
+retrieval is a single matrix-vector product plus ``argpartition``. The index is
+loaded at startup and kept fresh through LISTEN/NOTIFY: triggers on the three
+tables publish changed ids on commit and a listener thread reloads just those
+rows. A periodic full reload covers anything missed while disconnected.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import psycopg2
+import psycopg2.extras
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, connection
+
+from .settings import MEMORY_INDEX_RELOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "mm_vector_changes"
+
+_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION mm_notify_vector_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify(
+    '{NOTIFY_CHANNEL}',
+    json_build_object(
+      't', TG_TABLE_NAME,
+      'id', CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END
+    )::text
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# table -> columns whose update must refresh the in-memory row
+_WATCHED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("embeddings", "role"),
+    "topics": ("embeddings", "is_active", "seeking_role", "author_user_id"),
+    "roles": ("embeddings", "topic_id"),
+}
+
+_LOAD_SQL: Dict[str, str] = {
+    "users": """
+        SELECT u.id, u.embeddings::text AS embeddings,
+               LOWER(u.role) = 'student' AS student,
+               LOWER(u.role) = 'supervisor' AS supervisor
+        FROM users u
+        WHERE u.embeddings IS NOT NULL {filter}
+    """,
+    "topics": """
+        SELECT t.id, t.embeddings::text AS embeddings, t.author_user_id,
+               (t.is_active AND t.seeking_role = 'supervisor') AS needs_supervisor,
+               (t.is_active AND t.seeking_role = 'student') AS needs_students
+        FROM topics t
+        WHERE t.embeddings IS NOT NULL {filter}
+    """,
+    "roles": """
+        SELECT r.id, r.embeddings::text AS embeddings, r.topic_id,
+               (t.is_active AND t.seeking_role = 'student') AS needs_students
+        FROM roles r
+        JOIN topics t ON t.id = r.topic_id
+        WHERE r.embeddings IS NOT NULL {filter}
+    """,
+}
+
+_FILTER_SQL: Dict[str, str] = {
+    "users": "AND u.id = ANY(%s)",
+    "topics": "AND t.id = ANY(%s)",
+    "roles": "AND r.id = ANY(%s)",
+}
+
+_MASK_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": ("student", "supervisor"),
+    "topics": ("needs_supervisor", "needs_students"),
+    "roles": ("needs_students",),
+}
+
+_VALUE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": (),
+    "topics": ("author_user_id",),
+    "roles": ("topic_id",),
+}
+
+
+def _parse_vector(text: str) -> np.ndarray:
+    """Выполняет функцию _parse_vector."""
+    return np.fromstring(text.strip()[1:-1], sep=",", dtype=np.float32)
+
+
+class _TableIndex:
+    """Rows of one table; dense arrays are rebuilt lazily after changes."""
+
+    def __init__(self, name: str) -> None:
+        """Выполняет функцию __init__."""
+        self.name = name
+        self._rows: Dict[int, Tuple[np.ndarray, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def replace(self, rows: Dict[int, Tuple[np.ndarray, Dict[str, Any]]]) -> None:
+        """Выполняет функцию replace."""
+        with self._lock:
+            self._rows = rows
+            self._snapshot = None
+
+    def apply(self, changed: Dict[int, Tuple[np.ndarray, Dict[str, Any]]], requested: Iterable[int]) -> None:
+        """Upsert ``changed`` and drop requested ids that no longer have a vector."""
+        with self._lock:
+            for entity_id in requested:
+                if entity_id not in changed:
+                    self._rows.pop(entity_id, None)
+            self._rows.update(changed)
+            self._snapshot = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Dense, immutable view of the table; safe to use without the lock."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build()
+            return self._snapshot
+
+    def _build(self) -> Dict[str, Any]:
+        """Выполняет функцию _build."""
+        ids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+        if len(ids):
+            matrix = np.ascontiguousarray(np.vstack([self._rows[i][0] for i in ids.tolist()]))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        attrs = [self._rows[i][1] for i in ids.tolist()]
+        masks = {
+            column: np.array([bool(a.get(column)) for a in attrs], dtype=bool)
+            for column in _MASK_COLUMNS[self.name]
+        }
+        values = {
+            column: np.array([a.get(column) or 0 for a in attrs], dtype=np.int64)
+            for column in _VALUE_COLUMNS[self.name]
+        }
+        return {
+            "ids": ids,
+            "matrix": matrix,
+            "positions": {entity_id: pos for pos, entity_id in enumerate(ids.tolist())},
+            "masks": masks,
+            "values": values,
+        }
+
+
+class MemoryIndex:
+    """Per-process similarity index for users, topics and roles."""
+
+    def __init__(self) -> None:
+        """Выполняет функцию __init__."""
+        self._tables = {name: _TableIndex(name) for name in _LOAD_SQL}
+        self._loaded = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.loaded_at: Optional[float] = None
+        self.incremental_updates = 0
+
+    @property
+    def loaded(self) -> bool:
+        """Выполняет функцию loaded."""
+        return self._loaded
+
+    # -- loading -----------------------------------------------------------------
+
+    def _fetch(
+        self, conn: connection, table: str, ids: Optional[Sequence[int]] = None
+    ) -> Dict[int, Tuple[np.ndarray, Dict[str, Any]]]:
+        """Выполняет функцию _fetch."""
+        query = _LOAD_SQL[table].format(filter=_FILTER_SQL[table] if ids is not None else "")
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(query, (list(ids),) if ids is not None else None)
+            rows = cur.fetchall()
+        loaded: Dict[int, Tuple[np.ndarray, Dict[str, Any]]] = {}
+        for row in rows:
+            vector = _parse_vector(row.pop("embeddings"))
+            norm = float(np.linalg.norm(vector))
+            if norm > 0:
+                vector = vector / norm
+            loaded[int(row["id"])] = (vector.astype(np.float32, copy=False), dict(row))
+        return loaded
+
+    def load(self, conn: connection) -> Dict[str, int]:
+        """Full reload of all three tables."""
+        counts: Dict[str, int] = {}
+        for name, table in self._tables.items():
+            rows = self._fetch(conn, name)
+            table.replace(rows)
+            counts[name] = len(rows)
+        conn.commit()
+        self._loaded = True
+        self.loaded_at = time.time()
+        logger.info("Memory index loaded: %s", counts)
+        return counts
+
+    def refresh(self, conn: connection, changes: Dict[str, Set[int]]) -> None:
+        """Reload only the given ids; topic changes also refresh their roles' masks."""
+        topic_ids = changes.get("topics") or set()
+        if topic_ids:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id FROM roles WHERE topic_id = ANY(%s)", (list(topic_ids),))
+                changes.setdefault("roles", set()).update(int(row[0]) for row in cur.fetchall())
+        for name, ids in changes.items():
+            if name not in self._tables or not ids:
+                continue
+            self._tables[name].apply(self._fetch(conn, name, sorted(ids)), ids)
+            self.incremental_updates += len(ids)
+        conn.commit()
+
+    # -- queries -----------------------------------------------------------------
+
+    def vector(self, table: str, entity_id: int) -> Optional[np.ndarray]:
+        """Выполняет функцию vector."""
+        snapshot = self._tables[table].snapshot()
+        position = snapshot["positions"].get(int(entity_id))
+        return None if position is None else snapshot["matrix"][position]
+
+    def value(self, table: str, entity_id: int, column: str) -> Optional[int]:
+        """Выполняет функцию value."""
+        snapshot = self._tables[table].snapshot()
+        position = snapshot["positions"].get(int(entity_id))
+        return None if position is None else int(snapshot["values"][column][position])
+
+    def search(
+        self,
+        table: str,
+        query: np.ndarray,
+        limit: int,
+        *,
+        mask: Optional[str] = None,
+        exclude: Optional[Callable[[Dict[str, Any]], np.ndarray]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-``limit`` rows of ``table`` by cosine similarity to ``query``.
+        Returns ``(id, cosine distance)`` pairs ordered by distance.
+        """
+        snapshot = self._tables[table].snapshot()
+        matrix = snapshot["matrix"]
+        if not len(snapshot["ids"]) or matrix.shape[1] != query.shape[0]:
+            return []
+        scores = matrix @ query.astype(np.float32, copy=False)
+        allowed = snapshot["masks"][mask] if mask else np.ones(len(scores), dtype=bool)
+        if exclude is not None:
+            allowed = allowed & ~exclude(snapshot)
+        candidates = np.flatnonzero(allowed)
+        if not len(candidates) or limit <= 0:
+            return []
+        subset = scores[candidates]
+        k = min(limit, len(candidates))
+        top = np.argpartition(-subset, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(-subset[top])]
+        ids = snapshot["ids"][candidates[top]]
+        return [(int(i), float(1.0 - s)) for i, s in zip(ids.tolist(), subset[top].tolist())]
+
+    def all_pairs(
+        self,
+        left_table: str,
+        right_table: str,
+        top_k: int,
+        *,
+        left_mask: Optional[str] = None,
+        right_mask: Optional[str] = None,
+        chunk_size: int = 1024,
+    ) -> Dict[int, List[Tuple[int, float]]]:
+        """Top-k right rows for every left row, scored in chunked matrix products."""
+        left, right = self._tables[left_table].snapshot(), self._tables[right_table].snapshot()
+        left_rows = np.flatnonzero(left["masks"][left_mask]) if left_mask else np.arange(len(left["ids"]))
+        right_rows = (
+            np.flatnonzero(right["masks"][right_mask]) if right_mask else np.arange(len(right["ids"]))
+        )
+        result: Dict[int, List[Tuple[int, float]]] = {}
+        if not len(left_rows) or not len(right_rows):
+            return result
+        right_matrix = right["matrix"][right_rows]
+        k = min(top_k, len(right_rows))
+        for start in range(0, len(left_rows), chunk_size):
+            rows = left_rows[start : start + chunk_size]
+            block = left["matrix"][rows] @ right_matrix.T
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k] if k < block.shape[1] else np.tile(
+                np.arange(block.shape[1]), (block.shape[0], 1)
+            )
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            right_ids = right["ids"][right_rows[top]]
+            for left_id, ids, scores in zip(left["ids"][rows].tolist(), right_ids.tolist(), top_scores.tolist()):
+                result[left_id] = [(rid, 1.0 - score) for rid, score in zip(ids, scores)]
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Выполняет функцию stats."""
+        return {
+            "loaded": self._loaded,
+            "loaded_at": self.loaded_at,
+            "incremental_updates": self.incremental_updates,
+            "listener_running": bool(self._thread and self._thread.is_alive()),
+            "rows": {name: len(table.snapshot()["ids"]) for name, table in self._tables.items()},
+        }
+
+    # -- change feed ---------------------------------------------------------------
+
+    def start(self, dsn: str) -> None:
+        """Выполняет функцию start."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, args=(dsn,), name="memory-index", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Выполняет функцию stop."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _listen(self, dsn: str) -> None:
+        """Выполняет функцию _listen."""
+        while not self._stop.is_set():
+            listener: Optional[connection] = None
+            worker: Optional[connection] = None
+            try:
+                listener = psycopg2.connect(dsn)
+                listener.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with listener.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                worker = psycopg2.connect(dsn)
+                # Reload after (re)subscribing so nothing committed in between is lost.
+                self.load(worker)
+                next_full = time.monotonic() + MEMORY_INDEX_RELOAD_SECONDS
+                while not self._stop.is_set():
+                    if select.select([listener], [], [], 1.0)[0]:
+                        listener.poll()
+                    changes: Dict[str, Set[int]] = {}
+                    while listener.notifies:
+                        note = listener.notifies.pop(0)
+                        try:
+                            payload = json.loads(note.payload)
+                            changes.setdefault(payload["t"], set()).add(int(payload["id"]))
+                        except (ValueError, KeyError, TypeError):
+                            continue
+                    if changes:
+                        self.refresh(worker, changes)
+                    if time.monotonic() >= next_full:
+                        self.load(worker)
+                        next_full = time.monotonic() + MEMORY_INDEX_RELOAD_SECONDS
+            except Exception as exc:
+                logger.warning("Memory index listener failed, reconnecting: %s", exc)
+                self._stop.wait(5.0)
+            finally:
+                for conn in (listener, worker):
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+
+
+def ensure_change_triggers(conn: connection, *, commit: bool = True) -> None:
+    """Install the NOTIFY triggers that keep the in-memory index fresh."""
+    with conn.cursor() as cur:
+        cur.execute(_TRIGGER_SQL)
+        for table, columns in _WATCHED_COLUMNS.items():
+            trigger = f"trg_{table}_vector_notify"
+            cur.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            cur.execute(
+                f"""
+                CREATE TRIGGER {trigger}
+                AFTER INSERT OR DELETE OR UPDATE OF {", ".join(columns)} ON {table}
+                FOR EACH ROW EXECUTE FUNCTION mm_notify_vector_change()
+                """
+            )
+    if commit:
+        conn.commit()
+
+
+memory_index = MemoryIndex()
+
+__all__ = ["MemoryIndex", "memory_index", "ensure_change_triggers", "NOTIFY_CHANNEL"]
@@ -0,0 +1,260 @@
+"""
+Cohort-wide precomputation of the candidate tables.
+
+One vectorised pass over the stored embeddings fills ``topic_candidates``,
+``role_candidates``, ``student_candidates`` and ``supervisor_candidates`` with
+the vector top-k of every active anchor, so the read endpoints never wait for
+a live match. LLM reranking of the same anchors can follow in the background
+with bounded concurrency; it goes through the regular ``handle_match*`` flows.
+
+    python -m matching.precompute --top-k 20 [--rerank]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from psycopg2.extensions import connection
+
+from .candidate_store import RankedRow, store_rankings
+from .db import get_conn
+from .llm import close_matching_llm_client
+from .memory_index import MemoryIndex, memory_index
+from .service import (
+    handle_match,
+    handle_match_role,
+    handle_match_student,
+    handle_match_supervisor_user,
+)
+from .settings import PRECOMPUTE_RERANK_CONCURRENCY, PRECOMPUTE_TOP_K
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _Target:
+    left_table: str
+    left_mask: str
+    right_table: str
+    right_mask: str
+    exclude_author: bool = False
+
+
+_TARGETS: Dict[str, _Target] = {
+    "topic_candidates": _Target("topics", "needs_supervisor", "users", "supervisor", exclude_author=True),
+    "role_candidates": _Target("roles", "needs_students", "users", "student"),
+    "student_candidates": _Target("users", "student", "roles", "needs_students"),
+    "supervisor_candidates": _Target("users", "supervisor", "topics", "needs_supervisor"),
+}
+
+CANDIDATE_TABLES = tuple(_TARGETS)
+
+
+def _ready_index(conn: connection, index: Optional[MemoryIndex]) -> MemoryIndex:
+    """Выполняет функцию _ready_index."""
+    if index is not None and index.loaded:
+        return index
+    if memory_index.loaded:
+        return memory_index
+    fresh = MemoryIndex()
+    fresh.load(conn)
+    return fresh
+
+
+def _candidate_rows(index: MemoryIndex, target: _Target, top_k: int) -> Dict[int, List[RankedRow]]:
+    """Выполняет функцию _candidate_rows."""
+    extra = 1 if target.exclude_author else 0
+    pairs = index.all_pairs(
+        target.left_table,
+        target.right_table,
+        top_k + extra,
+        left_mask=target.left_mask,
+        right_mask=target.right_mask,
+    )
+    rows: Dict[int, List[RankedRow]] = {}
+    for left_id, ranked in pairs.items():
+        author = index.value(target.left_table, left_id, "author_user_id") if target.exclude_author else None
+        kept = [(right_id, distance) for right_id, distance in ranked if right_id != author][:top_k]
+        rows[left_id] = [
+            (right_id, round(1.0 - distance, 6), rank)
+            for rank, (right_id, distance) in enumerate(kept, start=1)
+        ]
+    return rows
+
+
+def precompute_candidates(
+    conn: connection,
+    *,
+    top_k: int = PRECOMPUTE_TOP_K,
+    tables: Optional[Sequence[str]] = None,
+    index: Optional[MemoryIndex] = None,
+    commit: bool = True,
+) -> Dict[str, Any]:
+    """
+    Replace the stored ranking of every active anchor of the selected
+    candidate tables with its vector top-k. Approved pairs are never touched. Returns per-table counts and the
+    anchors each table covered (used to schedule reranking).
+    """
+    selected = list(tables or _TARGETS)
+    unknown = [name for name in selected if name not in _TARGETS]
+    if unknown:
+        raise ValueError(f"Unsupported candidate tables: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    source = _ready_index(conn, index)
+    result: Dict[str, Any] = {"tables": {}, "anchors": {}}
+    for name in selected:
+        table_started = time.perf_counter()
+        target = _TARGETS[name]
+        per_anchor = _candidate_rows(source, target, top_k)
+        written = store_rankings(conn, name, per_anchor)
+        result["anchors"][name] = sorted(per_anchor)
+        result["tables"][name] = {
+            "anchors": len(per_anchor),
+            "rows": written["written"],
+            "removed": written["removed"],
+            "match_run_id": written["match_run_id"],
+            "seconds": round(time.perf_counter() - table_started, 3),
+        }
+    if commit:
+        conn.commit()
+    result["top_k"] = top_k
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+_RERANKERS: Dict[str, Callable[[int], Awaitable[Dict[str, Any]]]] = {
+    "topic_candidates": lambda anchor: handle_match(anchor, target_role="supervisor"),
+    "role_candidates": lambda anchor: handle_match_role(anchor),
+    "student_candidates": lambda anchor: handle_match_student(anchor),
+    "supervisor_candidates": lambda anchor: handle_match_supervisor_user(anchor),
+}
+
+
+async def rerank_anchors(
+    anchors: Dict[str, Sequence[int]],
+    *,
+    concurrency: int = PRECOMPUTE_RERANK_CONCURRENCY,
+) -> Dict[str, int]:
+    """Run the LLM match flow for every anchor, at most ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    counts = {"reranked": 0, "failed": 0}
+
+    async def _one(table: str, anchor: int) -> None:
+        """Выполняет функцию _one."""
+        async with semaphore:
+            try:
+                result = await _RERANKERS[table](anchor)
+            except Exception as exc:
+                logger.warning("Rerank of %s #%s failed: %s", table, anchor, exc)
+                counts["failed"] += 1
+                return
+        counts["reranked" if result.get("status") == "ok" else "failed"] += 1
+
+    await asyncio.gather(
+        *(_one(table, anchor) for table, ids in anchors.items() for anchor in ids)
+    )
+    return counts
+
+
+class PrecomputeRunner:
+    """Single-flight wrapper used by the HTTP trigger and the in-process schedule."""
+
+    def __init__(self) -> None:
+        """Выполняет функцию __init__."""
+        self._lock = asyncio.Lock()
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        """Выполняет функцию running."""
+        return self._lock.locked()
+
+    async def run(
+        self,
+        *,
+        top_k: int = PRECOMPUTE_TOP_K,
+        tables: Optional[Sequence[str]] = None,
+        rerank: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Выполняет функцию run."""
+        if self._lock.locked():
+            return None
+        async with self._lock:
+            self.started_at = time.time()
+            self.last_error = None
+            try:
+                result = await asyncio.to_thread(self._vector_pass, top_k, tables)
+                anchors = result.pop("anchors")
+                if rerank:
+                    result["rerank"] = await rerank_anchors(anchors)
+            except Exception as exc:
+                logger.exception("Candidate precompute failed")
+                self.last_error = str(exc)
+                return None
+            result["finished_at"] = time.time()
+            self.last_result = result
+            logger.info("Candidate precompute finished: %s", result["tables"])
+            return result
+
+    @staticmethod
+    def _vector_pass(top_k: int, tables: Optional[Sequence[str]]) -> Dict[str, Any]:
+        """Выполняет функцию _vector_pass."""
+        with get_conn() as conn:
+            return precompute_candidates(conn, top_k=top_k, tables=tables)
+
+    def status(self) -> Dict[str, Any]:
+        """Выполняет функцию status."""
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+        }
+
+
+precompute_runner = PrecomputeRunner()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Выполняет функцию main."""
+    parser = argparse.ArgumentParser(description="Precompute candidate tables for the whole cohort.")
+    parser.add_argument("--top-k", type=int, default=PRECOMPUTE_TOP_K)
+    parser.add_argument("--tables", nargs="+", choices=sorted(_TARGETS), default=None)
+    parser.add_argument("--rerank", action="store_true", help="Rerank every anchor with the LLM afterwards")
+    args = parser.parse_args(argv)
+
+    async def _run() -> Optional[Dict[str, Any]]:
+        """Выполняет функцию _run."""
+        try:
+            return await PrecomputeRunner().run(top_k=args.top_k, tables=args.tables, rerank=args.rerank)
+        finally:
+            await close_matching_llm_client()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    result = asyncio.run(_run())
+    if result is None:
+        raise SystemExit(1)
+    for name, counts in result["tables"].items():
+        print(f"{name:<22} anchors={counts['anchors']:>6} rows={counts['rows']:>7} {counts['seconds']:.2f}s")
+    if "rerank" in result:
+        print(f"rerank: {result['rerank']}")
+
+
+__all__ = [
+    "CANDIDATE_TABLES",
+    "precompute_candidates",
+    "rerank_anchors",
+    "PrecomputeRunner",
+    "precompute_runner",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,51 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import psycopg2.extras
 from psycopg2.extensions import connection
 
+from .memory_index import memory_index
+from .settings import RETRIEVAL_BACKEND
+from .vector_index import set_ef_search
+
 logger = logging.getLogger(__name__)
 
 
+def _query_vector(conn: connection, query: str, params: Sequence[Any]) -> Optional[str]:
+    """Выполняет функцию _query_vector."""
+    with conn.cursor() as cur:
+        cur.execute(query, tuple(params))
+        row = cur.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+def _memory_enabled() -> bool:
+    """Выполняет функцию _memory_enabled."""
+    return RETRIEVAL_BACKEND == "memory" and memory_index.loaded
+
+
+def _ranked_params(ranked: List[Tuple[int, float]]) -> Dict[str, Any]:
+    """Выполняет функцию _ranked_params."""
+    return {
+        "ids": [entity_id for entity_id, _ in ranked],
+        "distances": [distance for _, distance in ranked],
+    }
+
+
+# Nearest-neighbour sources: either pgvector ANN inside Postgres or ids ranked by
+# the in-memory index, unnested in rank order. Both yield (id, distance).
+_RANKED_SOURCE = "SELECT * FROM unnest(%(ids)s::bigint[], %(distances)s::float8[])"
+
+
 def fetch_topic(conn: connection, topic_id: int) -> Optional[Dict[str, Any]]:
     """Выполняет функцию fetch_topic."""
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         cur.execute(
             """
-            SELECT t.*, u.full_name AS author_name, u.id AS author_id
+            SELECT t.*, u.full_name AS author_name, u.id AS author_id,
+                   t.embeddings IS NOT NULL AS has_embedding
             FROM topics t
             JOIN users u ON u.id = t.author_user_id
             WHERE t.id = %s
@@ -33,7 +64,8 @@ def fetch_role(conn: connection, role_id: int) -> Optional[Dict[str, Any]]:
             """
             SELECT r.*, t.title AS topic_title, t.description AS topic_description,
                    t.required_skills AS topic_required_skills, t.expected_outcomes AS topic_expected_outcomes,
-                   t.seeking_role, t.direction, t.author_user_id, u.full_name AS author_name
+                   t.seeking_role, t.direction, t.author_user_id, u.full_name AS author_name,
+                   r.embeddings IS NOT NULL AS has_embedding
             FROM roles r
             JOIN topics t ON t.id = r.topic_id
             JOIN users u ON u.id = t.author_user_id
@@ -44,7 +76,11 @@ def fetch_role(conn: connection, role_id: int) -> Optional[Dict[str, Any]]:
         row = cur.fetchone()
     if not row:
         return None
-    data = dict(row)
+    return _with_role_topic(dict(row))
+
+
+def _with_role_topic(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Выполняет функцию _with_role_topic."""
     data["topic"] = {
         "id": data.get("topic_id"),
         "title": data.get("topic_title"),
@@ -66,7 +102,56 @@ def fetch_candidates(
     role = (target_role or "student").lower()
     role = role if role in ("student", "supervisor") else "student"
 
+    ranked: Optional[List[Tuple[int, float]]] = None
+    if _memory_enabled():
+        query = memory_index.vector("topics", topic_id)
+        author_user_id = memory_index.value("topics", topic_id, "author_user_id")
+        if query is not None:
+            ranked = memory_index.search(
+                "users",
+                query,
+                limit,
+                mask=role,
+                exclude=(lambda snap: snap["ids"] == author_user_id) if role == "supervisor" else None,
+            )
+
+    if ranked is not None:
+        source = _RANKED_SOURCE
+        params: Dict[str, Any] = _ranked_params(ranked)
+    else:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT embeddings::text, author_user_id FROM topics WHERE id = %s AND embeddings IS NOT NULL",
+                (topic_id,),
+            )
+            anchor = cur.fetchone()
+        if not anchor:
+            return []
+        query_vector, author_user_id = anchor
+        params = {"query": query_vector, "author": author_user_id, "limit": limit}
+        if role == "student":
+            source = """
+                SELECT u.id, u.embeddings <=> %(query)s::vector
+                FROM users u
+                WHERE LOWER(u.role) = 'student'
+                  AND u.embeddings IS NOT NULL
+                ORDER BY u.embeddings <=> %(query)s::vector
+                LIMIT %(limit)s
+            """
+        else:
+            source = """
+                SELECT u.id, u.embeddings <=> %(query)s::vector
+                FROM users u
+                WHERE LOWER(u.role) = 'supervisor'
+                  AND u.embeddings IS NOT NULL
+                  AND u.id <> %(author)s
+                ORDER BY u.embeddings <=> %(query)s::vector
+                LIMIT %(limit)s
+            """
+
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if ranked is None:
+            set_ef_search(cur, limit)
         if role == "student":
             cur.execute(
                 """
@@ -76,7 +161,7 @@ def fetch_candidates(
                     u.username,
                     u.email,
                     u.created_at,
-                    (u.embeddings <=> t.embeddings) AS distance,
+                    nn.distance,
                     sp.program,
                     sp.skills,
                     sp.interests,
@@ -88,15 +173,14 @@ def fetch_candidates(
                     sp.dev_track,
                     sp.science_track,
                     sp.startup_track
-                FROM topics t
-                JOIN users u ON LOWER(u.role) = 'student' AND u.embeddings IS NOT NULL
-                LEFT JOIN student_profiles sp ON sp.user_id = u.id
-                WHERE t.id = %s
-                  AND t.embeddings IS NOT NULL
-                ORDER BY u.embeddings <=> t.embeddings ASC
-                LIMIT %s
+                FROM ("""
+                + source
+                + """) AS nn(user_id, distance)
+                JOIN users u ON u.id = nn.user_id
+                LEFT JOIN student_profiles sp ON sp.user_id = nn.user_id
+                ORDER BY nn.distance ASC
                 """,
-                (topic_id, limit),
+                params,
             )
         else:
             cur.execute(
@@ -107,22 +191,19 @@ def fetch_candidates(
                     u.username,
                     u.email,
                     u.created_at,
-                    (u.embeddings <=> t.embeddings) AS distance,
+                    nn.distance,
                     sp.position,
                     sp.degree,
                     sp.capacity,
                     sp.interests
-                FROM topics t
-                JOIN users u ON LOWER(u.role) = 'supervisor'
-                    AND u.embeddings IS NOT NULL
-                    AND u.id <> t.author_user_id
-                LEFT JOIN supervisor_profiles sp ON sp.user_id = u.id
-                WHERE t.id = %s
-                  AND t.embeddings IS NOT NULL
-                ORDER BY u.embeddings <=> t.embeddings ASC
-                LIMIT %s
+                FROM ("""
+                + source
+                + """) AS nn(user_id, distance)
+                JOIN users u ON u.id = nn.user_id
+                LEFT JOIN supervisor_profiles sp ON sp.user_id = nn.user_id
+                ORDER BY nn.distance ASC
                 """,
-                (topic_id, limit),
+                params,
             )
         rows = cur.fetchall()
 
@@ -166,7 +247,8 @@ def fetch_student(conn: connection, student_user_id: int) -> Optional[Dict[str,
             SELECT u.id AS user_id, u.full_name, u.username, u.email,
                    sp.program, sp.skills, sp.interests, sp.cv,
                    sp.skills_to_learn, sp.preferred_team_track, sp.team_has AS team_role, sp.team_needs,
-                   sp.dev_track, sp.science_track, sp.startup_track
+                   sp.dev_track, sp.science_track, sp.startup_track,
+                   u.embedding_source_hash, u.embedding_model, u.embeddings IS NOT NULL AS has_embedding
             FROM users u
             LEFT JOIN student_profiles sp ON sp.user_id = u.id
             WHERE u.id = %s AND (LOWER(u.role) = 'student' OR sp.user_id IS NOT NULL)
@@ -199,7 +281,44 @@ def fetch_roles_needing_students(
     conn: connection, student_user_id: int, limit: int = 40
 ) -> List[Dict[str, Any]]:
     """Выполняет функцию fetch_roles_needing_students."""
+    ranked: Optional[List[Tuple[int, float]]] = None
+    if _memory_enabled():
+        query = memory_index.vector("users", student_user_id)
+        if query is not None:
+            ranked = memory_index.search("roles", query, limit, mask="needs_students")
+
+    if ranked is not None:
+        source = _RANKED_SOURCE
+        params: Dict[str, Any] = _ranked_params(ranked)
+    else:
+        query_vector = _query_vector(
+            conn,
+            """
+            SELECT embeddings::text FROM users
+            WHERE id = %s AND embeddings IS NOT NULL AND LOWER(role) = 'student'
+            """,
+            (student_user_id,),
+        )
+        if query_vector is None:
+            return []
+        source = """
+            SELECT r.id, r.embeddings <=> %(query)s::vector
+            FROM roles r
+            WHERE r.embeddings IS NOT NULL
+              AND EXISTS (
+                  SELECT 1 FROM topics t
+                  WHERE t.id = r.topic_id
+                    AND t.is_active = TRUE
+                    AND t.seeking_role = 'student'
+              )
+            ORDER BY r.embeddings <=> %(query)s::vector
+            LIMIT %(limit)s
+        """
+        params = {"query": query_vector, "limit": limit}
+
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if ranked is None:
+            set_ef_search(cur, limit, filtered=True)
         cur.execute(
             """
             SELECT
@@ -213,20 +332,16 @@ def fetch_roles_needing_students(
                 t.direction,
                 t.author_user_id,
                 author.full_name AS author_name,
-                (r.embeddings <=> su.embeddings) AS distance
-            FROM users su
-            JOIN roles r ON r.embeddings IS NOT NULL
+                nn.distance
+            FROM ("""
+            + source
+            + """) AS nn(id, distance)
+            JOIN roles r ON r.id = nn.id
             JOIN topics t ON t.id = r.topic_id
-                AND t.is_active = TRUE
-                AND t.seeking_role = 'student'
             JOIN users author ON author.id = t.author_user_id
-            WHERE su.id = %s
-              AND su.embeddings IS NOT NULL
-              AND LOWER(su.role) = 'student'
-            ORDER BY r.embeddings <=> su.embeddings ASC
-            LIMIT %s
+            ORDER BY nn.distance ASC
             """,
-            (student_user_id, limit),
+            params,
         )
         rows = cur.fetchall()
 
@@ -267,7 +382,8 @@ def fetch_supervisor(conn: connection, supervisor_user_id: int) -> Optional[Dict
         cur.execute(
             """
             SELECT u.id AS user_id, u.full_name, u.username, u.email,
-                   sp.position, sp.degree, sp.capacity, sp.interests, sp.requirements
+                   sp.position, sp.degree, sp.capacity, sp.interests, sp.requirements,
+                   u.embedding_source_hash, u.embedding_model, u.embeddings IS NOT NULL AS has_embedding
             FROM users u
             LEFT JOIN supervisor_profiles sp ON sp.user_id = u.id
             WHERE u.id = %s AND LOWER(u.role) = 'supervisor'
@@ -282,7 +398,40 @@ def fetch_topics_needing_supervisors(
     conn: connection, supervisor_user_id: int, limit: int = 20
 ) -> List[Dict[str, Any]]:
     """Выполняет функцию fetch_topics_needing_supervisors."""
+    ranked: Optional[List[Tuple[int, float]]] = None
+    if _memory_enabled():
+        query = memory_index.vector("users", supervisor_user_id)
+        if query is not None:
+            ranked = memory_index.search("topics", query, limit, mask="needs_supervisor")
+
+    if ranked is not None:
+        source = _RANKED_SOURCE
+        params: Dict[str, Any] = _ranked_params(ranked)
+    else:
+        query_vector = _query_vector(
+            conn,
+            """
+            SELECT embeddings::text FROM users
+            WHERE id = %s AND embeddings IS NOT NULL AND LOWER(role) = 'supervisor'
+            """,
+            (supervisor_user_id,),
+        )
+        if query_vector is None:
+            return []
+        source = """
+            SELECT t.id, t.embeddings <=> %(query)s::vector
+            FROM topics t
+            WHERE t.embeddings IS NOT NULL
+              AND t.is_active = TRUE
+              AND t.seeking_role = 'supervisor'
+            ORDER BY t.embeddings <=> %(query)s::vector
+            LIMIT %(limit)s
+        """
+        params = {"query": query_vector, "limit": limit}
+
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if ranked is None:
+            set_ef_search(cur, limit)
         cur.execute(
             """
             SELECT
@@ -293,19 +442,15 @@ def fetch_topics_needing_supervisors(
                 t.expected_outcomes,
                 t.author_user_id,
                 author.full_name AS author_name,
-                (t.embeddings <=> sup.embeddings) AS distance
-            FROM users sup
-            JOIN topics t ON t.embeddings IS NOT NULL
-                AND t.is_active = TRUE
-                AND t.seeking_role = 'supervisor'
+                nn.distance
+            FROM ("""
+            + source
+            + """) AS nn(id, distance)
+            JOIN topics t ON t.id = nn.id
             JOIN users author ON author.id = t.author_user_id
-            WHERE sup.id = %s
-              AND sup.embeddings IS NOT NULL
-              AND LOWER(sup.role) = 'supervisor'
-            ORDER BY t.embeddings <=> sup.embeddings ASC
-            LIMIT %s
+            ORDER BY nn.distance ASC
             """,
-            (supervisor_user_id, limit),
+            params,
         )
         rows = cur.fetchall()
 
@@ -340,6 +485,89 @@ def fetch_topics_needing_supervisors(
     return topics
 
 
+def fetch_students_by_ids(
+    conn: connection, student_user_ids: Sequence[int]
+) -> List[Dict[str, Any]]:
+    """Выполняет функцию fetch_students_by_ids."""
+    if not student_user_ids:
+        return []
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT u.id AS user_id, u.full_name, u.username, u.email,
+                   sp.program, sp.skills, sp.interests, sp.cv,
+                   sp.skills_to_learn, sp.preferred_team_track, sp.team_has AS team_role, sp.team_needs,
+                   sp.dev_track, sp.science_track, sp.startup_track,
+                   u.embedding_source_hash, u.embedding_model, u.embeddings IS NOT NULL AS has_embedding
+            FROM users u
+            LEFT JOIN student_profiles sp ON sp.user_id = u.id
+            WHERE u.id = ANY(%s) AND (LOWER(u.role) = 'student' OR sp.user_id IS NOT NULL)
+            """,
+            (list(student_user_ids),),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def fetch_supervisors_by_ids(
+    conn: connection, supervisor_user_ids: Sequence[int]
+) -> List[Dict[str, Any]]:
+    """Выполняет функцию fetch_supervisors_by_ids."""
+    if not supervisor_user_ids:
+        return []
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT u.id AS user_id, u.full_name, u.username, u.email,
+                   sp.position, sp.degree, sp.capacity, sp.interests, sp.requirements,
+                   u.embedding_source_hash, u.embedding_model, u.embeddings IS NOT NULL AS has_embedding
+            FROM users u
+            LEFT JOIN supervisor_profiles sp ON sp.user_id = u.id
+            WHERE u.id = ANY(%s) AND LOWER(u.role) = 'supervisor'
+            """,
+            (list(supervisor_user_ids),),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def fetch_topics_by_ids(conn: connection, topic_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Выполняет функцию fetch_topics_by_ids."""
+    if not topic_ids:
+        return []
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT t.*, u.full_name AS author_name, u.id AS author_id,
+                   t.embeddings IS NOT NULL AS has_embedding
+            FROM topics t
+            JOIN users u ON u.id = t.author_user_id
+            WHERE t.id = ANY(%s)
+            """,
+            (list(topic_ids),),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def fetch_roles_by_ids(conn: connection, role_ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Выполняет функцию fetch_roles_by_ids."""
+    if not role_ids:
+        return []
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT r.*, t.title AS topic_title, t.description AS topic_description,
+                   t.required_skills AS topic_required_skills, t.expected_outcomes AS topic_expected_outcomes,
+                   t.seeking_role, t.direction, t.author_user_id, u.full_name AS author_name,
+                   r.embeddings IS NOT NULL AS has_embedding
+            FROM roles r
+            JOIN topics t ON t.id = r.topic_id
+            JOIN users u ON u.id = t.author_user_id
+            WHERE r.id = ANY(%s)
+            """,
+            (list(role_ids),),
+        )
+        return [_with_role_topic(dict(r)) for r in cur.fetchall()]
+
+
 __all__ = [
     "fetch_topic",
     "fetch_role",
@@ -349,4 +577,8 @@ __all__ = [
     "fetch_roles_needing_students",
     "fetch_supervisor",
     "fetch_topics_needing_supervisors",
+    "fetch_students_by_ids",
+    "fetch_supervisors_by_ids",
+    "fetch_topics_by_ids",
+    "fetch_roles_by_ids",
 ]
@@ -1,14 +1,17 @@
 """High level orchestration for matching flows."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import psycopg2.extras
 from psycopg2.extensions import connection
 
-from .cv import resolve_cv_text
-from .llm import MatchingLLMClient, create_matching_llm_client
+from .candidate_store import store_ranking
+from .cv import resolve_cv_text, resolve_cv_texts
+from .db import get_conn
+from .llm import MatchingLLMClient, create_matching_llm_client, get_matching_llm_client
 from .payloads import (
     build_candidates_payload,
     build_role_candidates_payload,
@@ -31,13 +34,29 @@ logger = logging.getLogger(__name__)
 
 def _pick_llm(llm: Optional[MatchingLLMClient]) -> Optional[MatchingLLMClient]:
     """Выполняет функцию _pick_llm."""
-    return llm or create_matching_llm_client()
+    return llm or get_matching_llm_client()
+
+
+async def _in_db(func: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """
+    Run ``func(conn, *args)`` on a worker thread with a pooled connection.
+    The connection is released before the LLM call so a slow rerank does not
+    pin it.
+    """
+
+    def _run() -> Dict[str, Any]:
+        """Выполняет функцию _run."""
+        with get_conn() as conn:
+            return func(conn, *args)
+
+    return await asyncio.to_thread(_run)
 
 
 def _enrich_cv(conn: connection, candidates: List[Dict[str, Any]]) -> None:
     """Выполняет функцию _enrich_cv."""
-    for candidate in candidates:
-        candidate["cv"] = resolve_cv_text(conn, candidate.get("cv"))
+    texts = resolve_cv_texts(conn, [candidate.get("cv") for candidate in candidates])
+    for candidate, text in zip(candidates, texts):
+        candidate["cv"] = text
 
 
 def _fallback_top5(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -76,14 +95,8 @@ def _fallback_top5_roles(roles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     ]
 
 
-def handle_match(
-    conn: connection,
-    topic_id: int,
-    *,
-    target_role: Optional[str] = None,
-    llm_client: Optional[MatchingLLMClient] = None,
-) -> Dict[str, Any]:
-    """Выполняет функцию handle_match."""
+def _prepare_topic_match(conn: connection, topic_id: int, target_role: Optional[str]) -> Dict[str, Any]:
+    """Выполняет функцию _prepare_topic_match."""
     topic = fetch_topic(conn, topic_id)
     if not topic:
         return {"status": "error", "message": f"Topic #{topic_id} not found"}
@@ -95,13 +108,39 @@ def handle_match(
     candidates = fetch_candidates(conn, topic_id, role, limit=20)
     _enrich_cv(conn, candidates)
 
-    ranked = _fallback_top5(candidates)
+    payload_json = None
     if len(candidates) >= 5:
         payload_json = dumps_payload(build_candidates_payload(topic, candidates, role))
+    return {"topic": topic, "role": role, "candidates": candidates, "payload_json": payload_json}
+
+
+async def handle_match(
+    topic_id: int,
+    *,
+    target_role: Optional[str] = None,
+    llm_client: Optional[MatchingLLMClient] = None,
+) -> Dict[str, Any]:
+    """Выполняет функцию handle_match."""
+    prepared = await _in_db(_prepare_topic_match, topic_id, target_role)
+    if "status" in prepared:
+        return prepared
+
+    ranked = _fallback_top5(prepared["candidates"])
+    if prepared["payload_json"]:
         llm = _pick_llm(llm_client)
         if llm:
-            ranked = llm.rank_candidates(payload_json) or ranked
+            ranked = await llm.rank_candidates(prepared["payload_json"]) or ranked
+    return await _in_db(_finish_topic_match, topic_id, prepared, ranked)
+
 
+def _finish_topic_match(
+    conn: connection,
+    topic_id: int,
+    prepared: Dict[str, Any],
+    ranked: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Выполняет функцию _finish_topic_match."""
+    topic, role, candidates = prepared["topic"], prepared["role"], prepared["candidates"]
     by_id = {c.get("user_id"): c for c in candidates}
     items: List[Dict[str, Any]] = []
     for position, result in enumerate(ranked, start=1):
@@ -125,24 +164,12 @@ def handle_match(
 
     if role == "supervisor" and items:
         try:
-            with conn.cursor() as cur:
-                for row in items:
-                    score = float(6 - row["rank"])
-                    cur.execute(
-                        """
-                        INSERT INTO topic_candidates(topic_id, user_id, score, is_primary, approved, rank, created_at)
-                        VALUES (%s, %s, %s, %s, FALSE, %s, now())
-                        ON CONFLICT (topic_id, user_id)
-                        DO UPDATE SET score=EXCLUDED.score, is_primary=EXCLUDED.is_primary, rank=EXCLUDED.rank
-                        """,
-                        (
-                            topic_id,
-                            row["user_id"],
-                            score,
-                            row["rank"] == 1,
-                            row["rank"],
-                        ),
-                    )
+            store_ranking(
+                conn,
+                "topic_candidates",
+                topic_id,
+                [(row["user_id"], float(6 - row["rank"]), row["rank"]) for row in items],
+            )
             conn.commit()
         except Exception as exc:                                                 
             logger.warning("Failed to persist supervisor candidates: %s", exc)
@@ -156,13 +183,8 @@ def handle_match(
     }
 
 
-def handle_match_role(
-    conn: connection,
-    role_id: int,
-    *,
-    llm_client: Optional[MatchingLLMClient] = None,
-) -> Dict[str, Any]:
-    """Выполняет функцию handle_match_role."""
+def _prepare_role_match(conn: connection, role_id: int) -> Dict[str, Any]:
+    """Выполняет функцию _prepare_role_match."""
     role_row = fetch_role(conn, role_id)
     if not role_row:
         return {"status": "error", "message": f"Role #{role_id} not found"}
@@ -190,15 +212,39 @@ def handle_match_role(
         candidates = [dict(row) for row in cur.fetchall()]
 
     _enrich_cv(conn, candidates)
-    ranked = _fallback_top5(candidates)
+    payload_json = None
     if len(candidates) >= 5:
         payload_json = dumps_payload(
             build_role_candidates_payload(topic, role_row, candidates)
         )
+    return {"candidates": candidates, "payload_json": payload_json}
+
+
+async def handle_match_role(
+    role_id: int,
+    *,
+    llm_client: Optional[MatchingLLMClient] = None,
+) -> Dict[str, Any]:
+    """Выполняет функцию handle_match_role."""
+    prepared = await _in_db(_prepare_role_match, role_id)
+    if "status" in prepared:
+        return prepared
+
+    ranked = _fallback_top5(prepared["candidates"])
+    if prepared["payload_json"]:
         llm = _pick_llm(llm_client)
         if llm:
-            ranked = llm.rank_candidates(payload_json) or ranked
+            ranked = await llm.rank_candidates(prepared["payload_json"]) or ranked
+    return await _in_db(_finish_role_match, role_id, prepared["candidates"], ranked)
 
+
+def _finish_role_match(
+    conn: connection,
+    role_id: int,
+    candidates: List[Dict[str, Any]],
+    ranked: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Выполняет функцию _finish_role_match."""
     by_id = {c.get("user_id"): c for c in candidates}
     items: List[Dict[str, Any]] = []
     for position, result in enumerate(ranked, start=1):
@@ -221,24 +267,12 @@ def handle_match_role(
 
     if items:
         try:
-            with conn.cursor() as cur:
-                for row in items:
-                    score = float(6 - row["rank"])
-                    cur.execute(
-                        """
-                        INSERT INTO role_candidates(role_id, user_id, score, is_primary, approved, rank, created_at)
-                        VALUES (%s, %s, %s, %s, FALSE, %s, now())
-                        ON CONFLICT (role_id, user_id)
-                        DO UPDATE SET score=EXCLUDED.score, is_primary=EXCLUDED.is_primary, rank=EXCLUDED.rank
-                        """,
-                        (
-                            role_id,
-                            row["user_id"],
-                            score,
-                            row["rank"] == 1,
-                            row["rank"],
-                        ),
-                    )
+            store_ranking(
+                conn,
+                "role_candidates",
+                role_id,
+                [(row["user_id"], float(6 - row["rank"]), row["rank"]) for row in items],
+            )
             conn.commit()
         except Exception as exc:                    
             logger.warning("Failed to persist role candidates: %s", exc)
@@ -246,13 +280,8 @@ def handle_match_role(
     return {"status": "ok", "role_id": role_id, "items": items}
 
 
-def handle_match_student(
-    conn: connection,
-    student_user_id: int,
-    *,
-    llm_client: Optional[MatchingLLMClient] = None,
-) -> Dict[str, Any]:
-    """Выполняет функцию handle_match_student."""
+def _prepare_student_match(conn: connection, student_user_id: int) -> Dict[str, Any]:
+    """Выполняет функцию _prepare_student_match."""
     student = fetch_student(conn, student_user_id)
     if not student:
         return {"status": "error", "message": f"Student #{student_user_id} not found"}
@@ -263,9 +292,32 @@ def handle_match_student(
         return {"status": "ok", "student_user_id": student_user_id, "items": []}
 
     payload_json = dumps_payload(build_roles_for_student_payload(student, roles))
+    return {"roles": roles, "payload_json": payload_json}
+
+
+async def handle_match_student(
+    student_user_id: int,
+    *,
+    llm_client: Optional[MatchingLLMClient] = None,
+) -> Dict[str, Any]:
+    """Выполняет функцию handle_match_student."""
+    prepared = await _in_db(_prepare_student_match, student_user_id)
+    if "status" in prepared:
+        return prepared
+
+    roles = prepared["roles"]
     llm = _pick_llm(llm_client)
-    ranked = (llm.rank_roles(payload_json) if llm else None) or _fallback_top5_roles(roles)
+    ranked = (await llm.rank_roles(prepared["payload_json"]) if llm else None) or _fallback_top5_roles(roles)
+    return await _in_db(_finish_student_match, student_user_id, roles, ranked)
+
 
+def _finish_student_match(
+    conn: connection,
+    student_user_id: int,
+    roles: List[Dict[str, Any]],
+    ranked: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Выполняет функцию _finish_student_match."""
     by_id = {role.get("id"): role for role in roles}
     items: List[Dict[str, Any]] = []
     for position, result in enumerate(ranked, start=1):
@@ -292,24 +344,12 @@ def handle_match_student(
 
     if items:
         try:
-            with conn.cursor() as cur:
-                for row in items:
-                    score = float(6 - row["rank"])
-                    cur.execute(
-                        """
-                        INSERT INTO student_candidates(user_id, role_id, score, is_primary, approved, rank, created_at)
-                        VALUES (%s, %s, %s, %s, FALSE, %s, now())
-                        ON CONFLICT (user_id, role_id)
-                        DO UPDATE SET score=EXCLUDED.score, is_primary=EXCLUDED.is_primary, rank=EXCLUDED.rank
-                        """,
-                        (
-                            student_user_id,
-                            row["role_id"],
-                            score,
-                            row["rank"] == 1,
-                            row["rank"],
-                        ),
-                    )
+            store_ranking(
+                conn,
+                "student_candidates",
+                student_user_id,
+                [(row["role_id"], float(6 - row["rank"]), row["rank"]) for row in items],
+            )
             conn.commit()
         except Exception as exc:                    
             logger.warning("Failed to persist roles for student %s: %s", student_user_id, exc)
@@ -317,13 +357,8 @@ def handle_match_student(
     return {"status": "ok", "student_user_id": student_user_id, "items": items}
 
 
-def handle_match_supervisor_user(
-    conn: connection,
-    supervisor_user_id: int,
-    *,
-    llm_client: Optional[MatchingLLMClient] = None,
-) -> Dict[str, Any]:
-    """Выполняет функцию handle_match_supervisor_user."""
+def _prepare_supervisor_match(conn: connection, supervisor_user_id: int) -> Dict[str, Any]:
+    """Выполняет функцию _prepare_supervisor_match."""
     supervisor = fetch_supervisor(conn, supervisor_user_id)
     if not supervisor:
         return {"status": "error", "message": f"Supervisor #{supervisor_user_id} not found"}
@@ -333,9 +368,32 @@ def handle_match_supervisor_user(
         return {"status": "ok", "supervisor_user_id": supervisor_user_id, "items": []}
 
     payload_json = dumps_payload(build_topics_for_supervisor_payload(supervisor, topics))
+    return {"topics": topics, "payload_json": payload_json}
+
+
+async def handle_match_supervisor_user(
+    supervisor_user_id: int,
+    *,
+    llm_client: Optional[MatchingLLMClient] = None,
+) -> Dict[str, Any]:
+    """Выполняет функцию handle_match_supervisor_user."""
+    prepared = await _in_db(_prepare_supervisor_match, supervisor_user_id)
+    if "status" in prepared:
+        return prepared
+
+    topics = prepared["topics"]
     llm = _pick_llm(llm_client)
-    ranked = (llm.rank_topics(payload_json) if llm else None) or _fallback_top5_topics(topics)
+    ranked = (await llm.rank_topics(prepared["payload_json"]) if llm else None) or _fallback_top5_topics(topics)
+    return await _in_db(_finish_supervisor_match, supervisor_user_id, topics, ranked)
 
+
+def _finish_supervisor_match(
+    conn: connection,
+    supervisor_user_id: int,
+    topics: List[Dict[str, Any]],
+    ranked: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Выполняет функцию _finish_supervisor_match."""
     by_id = {topic.get("id"): topic for topic in topics}
     items: List[Dict[str, Any]] = []
     for position, result in enumerate(ranked, start=1):
@@ -360,24 +418,12 @@ def handle_match_supervisor_user(
 
     if items:
         try:
-            with conn.cursor() as cur:
-                for row in items:
-                    score = float(6 - row["rank"])
-                    cur.execute(
-                        """
-                        INSERT INTO supervisor_candidates(user_id, topic_id, score, is_primary, approved, rank, created_at)
-                        VALUES (%s, %s, %s, %s, FALSE, %s, now())
-                        ON CONFLICT (user_id, topic_id)
-                        DO UPDATE SET score=EXCLUDED.score, is_primary=EXCLUDED.is_primary, rank=EXCLUDED.rank
-                        """,
-                        (
-                            supervisor_user_id,
-                            row["topic_id"],
-                            score,
-                            row["rank"] == 1,
-                            row["rank"],
-                        ),
-                    )
+            store_ranking(
+                conn,
+                "supervisor_candidates",
+                supervisor_user_id,
+                [(row["topic_id"], float(6 - row["rank"]), row["rank"]) for row in items],
+            )
             conn.commit()
         except Exception as exc:                    
             logger.warning(
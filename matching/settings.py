@@ -12,10 +12,100 @@ PROXY_API_KEY: Final[str | None] = os.getenv("PROXY_API_KEY")
 PROXY_BASE_URL: Final[str | None] = os.getenv("PROXY_BASE_URL")
 PROXY_MODEL: Final[str] = os.getenv("PROXY_MODEL", "gpt-4o-mini")
 LLM_TEMPERATURE: Final[float] = float(os.getenv("MATCHING_LLM_TEMPERATURE", "0.2"))
+LLM_MAX_CONCURRENCY: Final[int] = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUEST_TIMEOUT_SECONDS: Final[float] = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "20"))
+LLM_DEADLINE_SECONDS: Final[float] = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+LLM_MAX_RETRIES: Final[int] = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS: Final[float] = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_BREAKER_FAILURES: Final[int] = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS: Final[float] = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+EMBEDDING_MODEL: Final[str] = os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-base").strip()
+EMBEDDING_BATCH_SIZE: Final[int] = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BACKEND: Final[str] = os.getenv("EMBEDDING_BACKEND", "auto").strip().lower()
+EMBEDDING_ONNX_QUANTIZE: Final[bool] = (
+    os.getenv("EMBEDDING_ONNX_QUANTIZE", "true").strip().lower() in ("1", "true", "yes", "on")
+)
+EMBEDDING_ONNX_THREADS: Final[int] = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+HNSW_M: Final[int] = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION: Final[int] = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH: Final[int] = int(os.getenv("HNSW_EF_SEARCH", "40"))
+HNSW_FILTER_OVERFETCH: Final[int] = int(os.getenv("HNSW_FILTER_OVERFETCH", "5"))
+VECTOR_SCHEMA_AUTOMIGRATE: Final[bool] = (
+    os.getenv("VECTOR_SCHEMA_AUTOMIGRATE", "false").strip().lower() in ("1", "true", "yes", "on")
+)
+EMBEDDING_WORKER_ENABLED: Final[bool] = (
+    os.getenv("EMBEDDING_WORKER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+)
+EMBEDDING_JOB_BATCH: Final[int] = int(os.getenv("EMBEDDING_JOB_BATCH", "256"))
+EMBEDDING_JOB_POLL_INTERVAL: Final[float] = float(os.getenv("EMBEDDING_JOB_POLL_INTERVAL", "2"))
+EMBEDDING_JOB_LEASE_SECONDS: Final[int] = int(os.getenv("EMBEDDING_JOB_LEASE_SECONDS", "600"))
+EMBEDDING_JOB_MAX_ATTEMPTS: Final[int] = int(os.getenv("EMBEDDING_JOB_MAX_ATTEMPTS", "8"))
+EMBEDDING_JOB_BACKOFF_BASE: Final[float] = float(os.getenv("EMBEDDING_JOB_BACKOFF_BASE", "5"))
+EMBEDDING_JOB_BACKOFF_MAX: Final[float] = float(os.getenv("EMBEDDING_JOB_BACKOFF_MAX", "900"))
+MEDIA_TEXT_WORKER_ENABLED: Final[bool] = (
+    os.getenv("MEDIA_TEXT_WORKER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+)
+MEDIA_TEXT_POLL_INTERVAL: Final[float] = float(os.getenv("MEDIA_TEXT_POLL_INTERVAL", "5"))
+MEDIA_TEXT_BATCH: Final[int] = int(os.getenv("MEDIA_TEXT_BATCH", "16"))
+MEDIA_TEXT_RETRY_SECONDS: Final[int] = int(os.getenv("MEDIA_TEXT_RETRY_SECONDS", "300"))
+LLM_CACHE_ENABLED: Final[bool] = (
+    os.getenv("LLM_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+)
+LLM_CACHE_TTL_SECONDS: Final[int] = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+PRECOMPUTE_TOP_K: Final[int] = int(os.getenv("PRECOMPUTE_TOP_K", "20"))
+PRECOMPUTE_INTERVAL_SECONDS: Final[int] = int(os.getenv("PRECOMPUTE_INTERVAL_SECONDS", "0"))
+PRECOMPUTE_RERANK: Final[bool] = (
+    os.getenv("PRECOMPUTE_RERANK", "false").strip().lower() in ("1", "true", "yes", "on")
+)
+PRECOMPUTE_RERANK_CONCURRENCY: Final[int] = int(os.getenv("PRECOMPUTE_RERANK_CONCURRENCY", "4"))
+RETRIEVAL_BACKEND: Final[str] = os.getenv("RETRIEVAL_BACKEND", "pgvector").strip().lower()
+MEMORY_INDEX_RELOAD_SECONDS: Final[float] = float(os.getenv("MEMORY_INDEX_RELOAD_SECONDS", "600"))
+ASSIGNMENT_TOP_K: Final[int] = int(os.getenv("ASSIGNMENT_TOP_K", "20"))
+ASSIGNMENT_MIN_SCORE: Final[float] = float(os.getenv("ASSIGNMENT_MIN_SCORE", "0.0"))
 
 __all__ = [
     "PROXY_API_KEY",
     "PROXY_BASE_URL",
     "PROXY_MODEL",
     "LLM_TEMPERATURE",
+    "LLM_MAX_CONCURRENCY",
+    "LLM_REQUEST_TIMEOUT_SECONDS",
+    "LLM_DEADLINE_SECONDS",
+    "LLM_MAX_RETRIES",
+    "LLM_RETRY_BASE_SECONDS",
+    "LLM_BREAKER_FAILURES",
+    "LLM_BREAKER_COOLDOWN_SECONDS",
+    "EMBEDDING_MODEL",
+    "EMBEDDING_BATCH_SIZE",
+    "EMBEDDING_BACKEND",
+    "EMBEDDING_ONNX_QUANTIZE",
+    "EMBEDDING_ONNX_THREADS",
+    "HNSW_M",
+    "HNSW_EF_CONSTRUCTION",
+    "HNSW_EF_SEARCH",
+    "HNSW_FILTER_OVERFETCH",
+    "VECTOR_SCHEMA_AUTOMIGRATE",
+    "EMBEDDING_WORKER_ENABLED",
+    "EMBEDDING_JOB_BATCH",
+    "EMBEDDING_JOB_POLL_INTERVAL",
+    "EMBEDDING_JOB_LEASE_SECONDS",
+    "EMBEDDING_JOB_MAX_ATTEMPTS",
+    "EMBEDDING_JOB_BACKOFF_BASE",
+    "EMBEDDING_JOB_BACKOFF_MAX",
+    "MEDIA_TEXT_WORKER_ENABLED",
+    "MEDIA_TEXT_POLL_INTERVAL",
+    "MEDIA_TEXT_BATCH",
+    "MEDIA_TEXT_RETRY_SECONDS",
+    "LLM_CACHE_ENABLED",
+    "LLM_CACHE_TTL_SECONDS",
+    "LLM_CACHE_MAX_ENTRIES",
+    "PRECOMPUTE_TOP_K",
+    "PRECOMPUTE_INTERVAL_SECONDS",
+    "PRECOMPUTE_RERANK",
+    "PRECOMPUTE_RERANK_CONCURRENCY",
+    "RETRIEVAL_BACKEND",
+    "MEMORY_INDEX_RELOAD_SECONDS",
+    "ASSIGNMENT_TOP_K",
+    "ASSIGNMENT_MIN_SCORE",
 ]
@@ -1,79 +1,345 @@
+"""
+Budgeted text extraction for CV files (pdf, docx, txt).
+
+Readers stop as soon as ``char_budget`` characters are collected, PDFs are
+read for at most ``TEXT_EXTRACT_MAX_PAGES`` pages and oversized files are
+skipped. ``extract_text_with_timeout``/``extract_many`` run the readers in a
+spawn-based process pool with a per-file timeout, so a huge or malformed
+document cannot hold the GIL of the calling service or stall it.
+"""
 from __future__ import annotations
 
+import math
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from xml.etree import ElementTree
+
+TEXT_EXTRACT_CHAR_BUDGET = int(os.getenv("TEXT_EXTRACT_CHAR_BUDGET", "20000"))
+TEXT_EXTRACT_MAX_PAGES = int(os.getenv("TEXT_EXTRACT_MAX_PAGES", "50"))
+TEXT_EXTRACT_MAX_BYTES = int(os.getenv("TEXT_EXTRACT_MAX_BYTES", str(20 * 1024 * 1024)))
+TEXT_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("TEXT_EXTRACT_TIMEOUT_SECONDS", "15"))
+TEXT_EXTRACT_WORKERS = int(os.getenv("TEXT_EXTRACT_WORKERS", "2"))
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@dataclass
+class ExtractionResult:
+    """Extracted text plus what the reader did to get it."""
 
+    text: str = ""
+    kind: str = ""
+    pages_read: int = 0
+    truncated: bool = False
+    timed_out: bool = False
+    error: Optional[str] = None
+    seconds: float = 0.0
+    # Timeout or a crashed worker: transient, callers must not cache it.
+    retry: bool = False
 
-def _read_text_file(p: Path) -> str:
+
+def _read_text_file(p: Path, budget: int) -> Tuple[str, bool]:
     """Выполняет функцию _read_text_file."""
-    try:
-        return p.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        try:
-            return p.read_text(encoding="cp1251", errors="ignore")
-        except Exception:
-            return ""
+    # Up to 4 bytes per character in UTF-8; never read more than that.
+    with open(p, "rb") as handle:
+        raw = handle.read(budget * 4 + 1)
+    text = raw.decode("utf-8", errors="ignore")
+    return text[:budget], len(text) > budget
 
 
-def _read_pdf(p: Path) -> str:
+def _read_pdf(p: Path, budget: int) -> Tuple[str, bool, int]:
     """Выполняет функцию _read_pdf."""
-    try:
-        from pypdf import PdfReader
-
-        reader = PdfReader(str(p))
-        parts = []
-        for page in reader.pages:
-            try:
-                parts.append(page.extract_text() or "")
-            except Exception:
-                continue
-        return "\n".join([t for t in parts if t]).strip()
-    except Exception:
-        return ""
+    from pypdf import PdfReader
 
+    reader = PdfReader(str(p))
+    parts: List[str] = []
+    collected = 0
+    pages_read = 0
+    for page in reader.pages:
+        if pages_read >= TEXT_EXTRACT_MAX_PAGES or collected >= budget:
+            return "\n".join(parts)[:budget], True, pages_read
+        pages_read += 1
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            continue
+        if text:
+            parts.append(text)
+            collected += len(text) + 1
+    text = "\n".join(parts).strip()
+    return text[:budget], len(text) > budget, pages_read
 
-def _read_docx(p: Path) -> str:
-    """Выполняет функцию _read_docx."""
-    try:
-        import docx               
 
-        doc = docx.Document(str(p))
-        parts = []
-        for para in doc.paragraphs:
-            parts.append(para.text or "")
-        return "\n".join(parts).strip()
-    except Exception:
-        return ""
+def _read_docx(p: Path, budget: int) -> Tuple[str, bool]:
+    """
+    Stream paragraphs out of ``word/document.xml`` with ``iterparse`` instead
+    of building the whole python-docx object model.
+    """
+    parts: List[str] = []
+    collected = 0
+    with zipfile.ZipFile(p) as archive, archive.open("word/document.xml") as document:
+        runs: List[str] = []
+        for _, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{_W_NS}t":
+                runs.append(element.text or "")
+            elif element.tag == f"{_W_NS}tab":
+                runs.append("\t")
+            elif element.tag == f"{_W_NS}p":
+                paragraph = "".join(runs)
+                runs = []
+                parts.append(paragraph)
+                collected += len(paragraph) + 1
+                element.clear()
+                if collected >= budget:
+                    return "\n".join(parts)[:budget], True
+    text = "\n".join(parts).strip()
+    return text[:budget], len(text) > budget
 
 
-def extract_text_from_file(path: Path, mime_type: Optional[str] = None) -> str:
-    """Best-effort text extraction for CV files (pdf, docx, txt)."""
-    if not path or not Path(path).exists():
-        return ""
-    p = Path(path)
+def _kind(p: Path, mime_type: Optional[str]) -> str:
+    """Выполняет функцию _kind."""
     mt = (mime_type or "").lower()
     ext = p.suffix.lower()
-
-                                
     if "pdf" in mt or ext == ".pdf":
-        text = _read_pdf(p)
-        if text:
-            return text
+        return "pdf"
     if "word" in mt or ext in (".docx",):
-        text = _read_docx(p)
-        if text:
-            return text
+        return "docx"
     if "text" in mt or ext in (".txt", ".md"):
-        text = _read_text_file(p)
-        if text:
-            return text
-
-                    
-    text = _read_text_file(p)
-    if text:
-        return text
-    text = _read_pdf(p)
-    if text:
-        return text
-    text = _read_docx(p)
-    return text
+        return "text"
+    return ""
+
+
+def _extract(p: Path, kind: str, budget: int) -> ExtractionResult:
+    """Выполняет функцию _extract."""
+    if kind == "pdf":
+        text, truncated, pages = _read_pdf(p, budget)
+        return ExtractionResult(text=text, kind=kind, pages_read=pages, truncated=truncated)
+    if kind == "docx":
+        text, truncated = _read_docx(p, budget)
+        return ExtractionResult(text=text, kind=kind, truncated=truncated)
+    text, truncated = _read_text_file(p, budget)
+    return ExtractionResult(text=text, kind="text", truncated=truncated)
+
+
+def extract_text(
+    path: Path,
+    mime_type: Optional[str] = None,
+    *,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> ExtractionResult:
+    """Extract up to ``char_budget`` characters in the current process."""
+    started = time.perf_counter()
+    if not path or not Path(path).exists():
+        return ExtractionResult(error="missing file")
+    p = Path(path)
+    if p.stat().st_size > TEXT_EXTRACT_MAX_BYTES:
+        return ExtractionResult(error="file too large", seconds=time.perf_counter() - started)
+
+    kind = _kind(p, mime_type)
+    # The declared type goes first, then every reader is tried as a fallback.
+    order = ["text", "pdf", "docx"]
+    if kind:
+        order = [kind] + [name for name in order if name != kind]
+    result = ExtractionResult(kind=kind)
+    for candidate in order:
+        try:
+            result = _extract(p, candidate, char_budget)
+        except Exception as exc:
+            result = ExtractionResult(kind=candidate, error=f"{type(exc).__name__}: {exc}")
+            continue
+        if result.text.strip():
+            break
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def extract_text_from_file(path: Path, mime_type: Optional[str] = None) -> str:
+    """Best-effort text extraction for CV files (pdf, docx, txt)."""
+    return extract_text(path, mime_type).text
+
+
+def _extract_in_worker(path: str, mime_type: Optional[str], char_budget: int) -> ExtractionResult:
+    """Выполняет функцию _extract_in_worker."""
+    return extract_text(Path(path), mime_type, char_budget=char_budget)
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, float] = {
+    "files": 0,
+    "timeouts": 0,
+    "errors": 0,
+    "truncated": 0,
+    "pages": 0,
+    "chars": 0,
+    "worker_seconds": 0.0,
+    "wall_seconds": 0.0,
+    "pools_killed": 0,
+}
+
+
+@dataclass(eq=False)
+class _PoolLease:
+    """The shared pool plus the number of ``extract_many`` calls waiting on it."""
+
+    pool: ProcessPoolExecutor
+    users: int = 0
+    retired: bool = False
+
+
+_pool_lock = threading.Lock()
+_current: Optional[_PoolLease] = None
+_retired: Set[_PoolLease] = set()
+
+
+def _acquire_pool() -> _PoolLease:
+    """Return the long-lived pool, spawning it on first use or after the previous one was retired."""
+    global _current
+    with _pool_lock:
+        if _current is None:
+            # spawn: callers hold DB/HTTP threads and model weights that must not be forked.
+            _current = _PoolLease(
+                ProcessPoolExecutor(
+                    max_workers=max(1, TEXT_EXTRACT_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            )
+        _current.users += 1
+        return _current
+
+
+def _release_pool(lease: _PoolLease, broken: bool) -> None:
+    """
+    Drop one call's use of ``lease``. A timeout or a crashed worker retires the
+    pool: new calls get a fresh one and the old workers are killed as soon as
+    no call waits on them any more.
+    """
+    global _current
+    with _pool_lock:
+        lease.users -= 1
+        if broken and not lease.retired:
+            lease.retired = True
+            _retired.add(lease)
+            if _current is lease:
+                _current = None
+        kill = lease.retired and lease.users == 0 and lease in _retired
+        if kill:
+            _retired.discard(lease)
+    if kill:
+        _kill_pool(lease.pool)
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Kill the workers of a retired pool; no call waits on it any more."""
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    with _stats_lock:
+        _stats["pools_killed"] += 1
+
+
+def _record(result: ExtractionResult) -> None:
+    """Выполняет функцию _record."""
+    with _stats_lock:
+        _stats["files"] += 1
+        _stats["timeouts"] += int(result.timed_out)
+        _stats["errors"] += int(bool(result.error) and not result.timed_out)
+        _stats["truncated"] += int(result.truncated)
+        _stats["pages"] += result.pages_read
+        _stats["chars"] += len(result.text)
+        _stats["worker_seconds"] += result.seconds
+
+
+def extract_many(
+    items: Sequence[Tuple[Path, Optional[str]]],
+    *,
+    timeout: float = TEXT_EXTRACT_TIMEOUT_SECONDS,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> List[ExtractionResult]:
+    """
+    Extract several files in the service's long-lived process pool. Every
+    file gets ``timeout`` seconds of pool time; files still running after
+    that are reported as timed out and the pool is replaced, its workers are
+    killed once no other call waits on them. Timeouts and worker crashes
+    come back with ``retry=True``.
+    """
+    if not items:
+        return []
+    started = time.perf_counter()
+    workers = max(1, min(TEXT_EXTRACT_WORKERS, len(items)))
+    lease = _acquire_pool()
+    results: List[ExtractionResult] = []
+    broken = False
+    try:
+        futures = [lease.pool.submit(_extract_in_worker, str(path), mime, char_budget) for path, mime in items]
+        _, pending = wait(futures, timeout=timeout * math.ceil(len(futures) / workers))
+        for future in futures:
+            if future in pending:
+                broken = True
+                results.append(ExtractionResult(timed_out=True, error="timeout", seconds=timeout, retry=True))
+                continue
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                broken = True
+                results.append(ExtractionResult(error=f"{type(exc).__name__}: {exc}", retry=True))
+    except Exception as exc:
+        # submit() on a pool whose worker died raises BrokenProcessPool.
+        broken = True
+        results = [ExtractionResult(error=f"{type(exc).__name__}: {exc}", retry=True) for _ in items]
+    finally:
+        _release_pool(lease, broken or len(results) < len(items))
+    for result in results:
+        _record(result)
+    with _stats_lock:
+        _stats["wall_seconds"] += time.perf_counter() - started
+    return results
+
+
+def extract_text_with_timeout(
+    path: Path,
+    mime_type: Optional[str] = None,
+    *,
+    timeout: float = TEXT_EXTRACT_TIMEOUT_SECONDS,
+    char_budget: int = TEXT_EXTRACT_CHAR_BUDGET,
+) -> ExtractionResult:
+    """Выполняет функцию extract_text_with_timeout."""
+    return extract_many([(path, mime_type)], timeout=timeout, char_budget=char_budget)[0]
+
+
+def extraction_stats() -> Dict[str, Any]:
+    """Выполняет функцию extraction_stats."""
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    stats["workers"] = TEXT_EXTRACT_WORKERS
+    stats["timeout_seconds"] = TEXT_EXTRACT_TIMEOUT_SECONDS
+    stats["char_budget"] = TEXT_EXTRACT_CHAR_BUDGET
+    return stats
+
+
+def shutdown_extraction_pool() -> None:
+    """Kill the current pool and the retired ones that are still running."""
+    global _current
+    with _pool_lock:
+        leases = list(_retired) + ([_current] if _current is not None else [])
+        _retired.clear()
+        _current = None
+    for lease in leases:
+        _kill_pool(lease.pool)
+
+
+__all__ = [
+    "ExtractionResult",
+    "extract_text",
+    "extract_text_from_file",
+    "extract_many",
+    "extract_text_with_timeout",
+    "extraction_stats",
+    "shutdown_extraction_pool",
+]
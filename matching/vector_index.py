@@ -0,0 +1,210 @@
+"""Typed pgvector columns and ANN indexes used for candidate retrieval."""
+from __future__ import annotations
+
+import argparse
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+from psycopg2.extensions import connection
+
+from .embeddings import DEFAULT_MODEL_REPO_ID
+from .settings import HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, HNSW_FILTER_OVERFETCH, HNSW_M
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIMENSIONS: Dict[str, int] = {
+    "intfloat/multilingual-e5-small": 384,
+    "intfloat/multilingual-e5-base": 768,
+    "cointegrated/rubert-tiny2": 312,
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2": 384,
+    "ai-forever/sbert_large_nlu_ru": 1024,
+    "BAAI/bge-m3": 1024,
+}
+
+VECTOR_TABLES: Tuple[str, ...] = ("users", "topics", "roles")
+
+# (index name, table, partial index predicate). The roles index cannot be
+# partial: its search filter (active topic seeking students) lives in topics,
+# so filtered role searches over-fetch through ``set_ef_search(filtered=True)``.
+HNSW_INDEXES: Tuple[Tuple[str, str, Optional[str]], ...] = (
+    ("idx_users_student_embeddings_hnsw", "users", "LOWER(role) = 'student'"),
+    ("idx_users_supervisor_embeddings_hnsw", "users", "LOWER(role) = 'supervisor'"),
+    (
+        "idx_topics_supervisor_embeddings_hnsw",
+        "topics",
+        "is_active = TRUE AND seeking_role = 'supervisor'",
+    ),
+    ("idx_roles_embeddings_hnsw", "roles", None),
+)
+
+
+def dimension_for_model(model_repo_id: str) -> int:
+    """Выполняет функцию dimension_for_model."""
+    try:
+        return MODEL_DIMENSIONS[model_repo_id]
+    except KeyError:
+        raise ValueError(f"Unknown embedding dimension for model {model_repo_id}") from None
+
+
+def ef_search_for_limit(limit: int, *, filtered: bool = False) -> int:
+    """
+    Size of the HNSW candidate list for ``limit`` results. Rows rejected by a
+    filter the index does not cover are dropped after the scan, so filtered
+    searches widen the list by ``HNSW_FILTER_OVERFETCH`` (pgvector caps it at 1000).
+    """
+    ef_search = max(HNSW_EF_SEARCH, int(limit) * 4)
+    if filtered:
+        ef_search = min(1000, ef_search * max(1, HNSW_FILTER_OVERFETCH))
+    return ef_search
+
+
+def set_ef_search(cur, limit: int, *, filtered: bool = False) -> None:
+    """Выполняет функцию set_ef_search."""
+    cur.execute(
+        "SELECT set_config('hnsw.ef_search', %s, true)",
+        (str(ef_search_for_limit(limit, filtered=filtered)),),
+    )
+
+
+def _column_dimension(conn: connection, table: str) -> Optional[int]:
+    """Выполняет функцию _column_dimension."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT a.atttypmod
+            FROM pg_attribute a
+            WHERE a.attrelid = %s::regclass
+              AND a.attname = 'embeddings'
+              AND NOT a.attisdropped
+            """,
+            (table,),
+        )
+        row = cur.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _indexes_for_table(table: str) -> List[Tuple[str, str, Optional[str]]]:
+    """Выполняет функцию _indexes_for_table."""
+    return [spec for spec in HNSW_INDEXES if spec[1] == table]
+
+
+def ensure_vector_schema(
+    conn: connection,
+    model_repo_id: str = DEFAULT_MODEL_REPO_ID,
+    *,
+    alter: bool = False,
+    commit: bool = True,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Build HNSW cosine indexes for embeddings columns typed with the dimension
+    of the configured model (``EMBEDDING_MODEL``).
+
+    Changing a column type is destructive and only happens with ``alter=True``
+    (``python -m matching.vector_index`` or ``VECTOR_SCHEMA_AUTOMIGRATE``):
+    vectors of another dimension are reset to NULL (together with their source
+    hash) so they get recomputed by the next refresh. Without it a column of
+    another dimension is left untouched, logged and reported with
+    ``"pending": 1``.
+    """
+    dimension = dimension_for_model(model_repo_id)
+    report: Dict[str, Dict[str, int]] = {}
+    with conn.cursor() as cur:
+        for table in VECTOR_TABLES:
+            for column in ("embedding_source_hash", "embedding_model"):
+                cur.execute(
+                    sql.SQL("ALTER TABLE {} ADD COLUMN IF NOT EXISTS {} TEXT").format(
+                        sql.Identifier(table), sql.Identifier(column)
+                    )
+                )
+            current = _column_dimension(conn, table)
+            reset = 0
+            if current != dimension and not alter:
+                logger.warning(
+                    "%s.embeddings is vector(%s), model %s needs vector(%s); run "
+                    "`python -m matching.vector_index` to migrate (resets mismatching vectors)",
+                    table,
+                    current if current is not None else "",
+                    model_repo_id,
+                    dimension,
+                )
+                report[table] = {"dimension": current or 0, "reset": 0, "pending": 1}
+                continue
+            if current != dimension:
+                for index_name, _, _ in _indexes_for_table(table):
+                    cur.execute(
+                        sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(index_name))
+                    )
+                cur.execute(
+                    sql.SQL(
+                        "UPDATE {} SET embeddings = NULL, embedding_source_hash = NULL, "
+                        "embedding_model = NULL "
+                        "WHERE embeddings IS NOT NULL AND vector_dims(embeddings) <> %s"
+                    ).format(sql.Identifier(table)),
+                    (dimension,),
+                )
+                reset = cur.rowcount
+                cur.execute(
+                    sql.SQL(
+                        "ALTER TABLE {} ALTER COLUMN embeddings TYPE vector({})"
+                    ).format(sql.Identifier(table), sql.Literal(dimension))
+                )
+                logger.info(
+                    "Pinned %s.embeddings to vector(%s) (was %s), reset %s vectors",
+                    table,
+                    dimension,
+                    current,
+                    reset,
+                )
+            for index_name, _, predicate in _indexes_for_table(table):
+                statement = sql.SQL(
+                    "CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                    "USING hnsw (embeddings vector_cosine_ops) "
+                    "WITH (m = {m}, ef_construction = {ef})"
+                ).format(
+                    name=sql.Identifier(index_name),
+                    table=sql.Identifier(table),
+                    m=sql.Literal(HNSW_M),
+                    ef=sql.Literal(HNSW_EF_CONSTRUCTION),
+                )
+                if predicate:
+                    statement = statement + sql.SQL(" WHERE ") + sql.SQL(predicate)
+                cur.execute(statement)
+            report[table] = {"dimension": dimension, "reset": reset, "pending": 0}
+    if commit:
+        conn.commit()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Выполняет функцию main."""
+    from .db import get_conn
+
+    parser = argparse.ArgumentParser(description="Pin vector dimensions and build HNSW indexes.")
+    parser.add_argument(
+        "--model",
+        default=DEFAULT_MODEL_REPO_ID,
+        help="Active embedding model repo id (defaults to EMBEDDING_MODEL)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with get_conn() as conn:
+        report = ensure_vector_schema(conn, args.model, alter=True)
+    for table, stats in report.items():
+        print(f"{table}: vector({stats['dimension']}), reset={stats['reset']}")
+
+
+__all__ = [
+    "MODEL_DIMENSIONS",
+    "HNSW_INDEXES",
+    "dimension_for_model",
+    "ef_search_for_limit",
+    "set_ef_search",
+    "ensure_vector_schema",
+]
+
+
+if __name__ == "__main__":
+    main()
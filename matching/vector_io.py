@@ -0,0 +1,131 @@
+"""pgvector serialization for psycopg2: ``Vector`` query parameters and binary COPY writes."""
+from __future__ import annotations
+
+import io
+import struct
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2 import sql
+from psycopg2.extensions import ISQLQuote
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+_ROW_FORMATS: Dict[int, str] = {}
+
+VectorRow = Tuple[int, np.ndarray, Optional[str], Optional[str]]
+
+
+def _row_format(dimension: int) -> str:
+    """Выполняет функцию _row_format."""
+    fmt = _ROW_FORMATS.get(dimension)
+    if fmt is None:
+        fmt = ",".join(["%.9g"] * dimension)
+        _ROW_FORMATS[dimension] = fmt
+    return fmt
+
+
+def vector_literal(vector: Any) -> str:
+    """
+    Text form of a vector (``[x1,x2,...]``) built with one C-level format call
+    instead of formatting each component in Python.
+    """
+    values = np.asarray(vector, dtype=np.float32).ravel()
+    return "[" + (_row_format(values.shape[0]) % tuple(values.tolist())) + "]"
+
+
+def vector_binary(vector: Any) -> bytes:
+    """pgvector binary wire format: int16 dim, int16 unused, big-endian float4 values."""
+    values = np.asarray(vector, dtype=">f4").ravel()
+    return struct.pack("!hh", values.shape[0], 0) + values.tobytes()
+
+
+class Vector:
+    """
+    Query parameter for a vector column, quoted as a ``'[...]'::vector``
+    literal. Wrapping is explicit so other numpy arrays passed to psycopg2 keep
+    the default adaptation.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        """Выполняет функцию __init__."""
+        self.value = value
+
+    def __conform__(self, protocol: Any) -> Optional["Vector"]:
+        """Выполняет функцию __conform__."""
+        return self if protocol is ISQLQuote else None
+
+    def getquoted(self) -> bytes:
+        """Выполняет функцию getquoted."""
+        return ("'" + vector_literal(self.value) + "'::vector").encode("ascii")
+
+
+def _text_field(value: Optional[str]) -> bytes:
+    """Выполняет функцию _text_field."""
+    if value is None:
+        return struct.pack("!i", -1)
+    encoded = value.encode("utf-8")
+    return struct.pack("!i", len(encoded)) + encoded
+
+
+def encode_copy_rows(rows: Iterable[VectorRow]) -> bytes:
+    """Build a binary COPY payload for ``(id bigint, embedding vector, source_hash text, model text)``."""
+    parts = [_COPY_HEADER]
+    for entity_id, vector, source_hash, model in rows:
+        payload = vector_binary(vector)
+        parts.append(struct.pack("!hiq", 4, 8, int(entity_id)))
+        parts.append(struct.pack("!i", len(payload)))
+        parts.append(payload)
+        parts.append(_text_field(source_hash))
+        parts.append(_text_field(model))
+    parts.append(_COPY_TRAILER)
+    return b"".join(parts)
+
+
+def copy_update_vectors(cur, table: str, id_column: str, rows: Sequence[VectorRow]) -> int:
+    """
+    Stream ``rows`` into a session temp table with binary COPY, then apply them
+    with a single ``UPDATE ... FROM``. Returns the number of updated rows.
+    """
+    if not rows:
+        return 0
+    cur.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS _embedding_updates (
+          id BIGINT,
+          embedding VECTOR,
+          source_hash TEXT,
+          model TEXT
+        ) ON COMMIT DELETE ROWS
+        """
+    )
+    cur.execute("TRUNCATE _embedding_updates")
+    cur.copy_expert(
+        "COPY _embedding_updates (id, embedding, source_hash, model) FROM STDIN WITH (FORMAT BINARY)",
+        io.BytesIO(encode_copy_rows(rows)),
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            UPDATE {table} AS t
+            SET embeddings = v.embedding,
+                embedding_source_hash = v.source_hash,
+                embedding_model = v.model,
+                updated_at = now()
+            FROM _embedding_updates AS v
+            WHERE t.{id_column} = v.id
+            """
+        ).format(table=sql.Identifier(*table.split(".")), id_column=sql.Identifier(id_column))
+    )
+    return cur.rowcount
+
+
+__all__ = [
+    "vector_literal",
+    "vector_binary",
+    "Vector",
+    "encode_copy_rows",
+    "copy_update_vectors",
+]
@@ -18,7 +18,9 @@ CREATE TABLE users (
   username        TEXT,
   is_confirmed    BOOLEAN NOT NULL DEFAULT FALSE,
   role            VARCHAR(20) NOT NULL, -- 'student' | 'supervisor' | 'admin'
-  embeddings      VECTOR,
+  embeddings      VECTOR(768), -- dimension of the active model (multilingual-e5-base)
+  embedding_source_hash TEXT, -- sha256 of the text the vector was computed from
+  embedding_model TEXT,
   consent_personal BOOLEAN,
   consent_private  BOOLEAN,
   created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
@@ -26,6 +28,13 @@ CREATE TABLE users (
 );
 
 CREATE INDEX idx_users_role ON users(role);
+CREATE UNIQUE INDEX uq_users_email_role ON users ((LOWER(email)), role);
+CREATE INDEX idx_users_student_embeddings_hnsw ON users
+  USING hnsw (embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+  WHERE LOWER(role) = 'student';
+CREATE INDEX idx_users_supervisor_embeddings_hnsw ON users
+  USING hnsw (embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+  WHERE LOWER(role) = 'supervisor';
 
 CREATE TABLE student_profiles (
   user_id         BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
@@ -80,12 +89,28 @@ CREATE TABLE media_files (
   width            INTEGER,
   height           INTEGER,
   duration_seconds DOUBLE PRECISION,
+  status           VARCHAR(20) NOT NULL DEFAULT 'ready', -- 'pending' | 'fetching' | 'ready' | 'failed'
+  source_url       TEXT,                              -- original link for imported files
+  error            TEXT,                              -- last download error
+  attempts         INTEGER NOT NULL DEFAULT 0,
+  fetched_at       TIMESTAMPTZ,
   created_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
   CONSTRAINT chk_media_provider CHECK (provider IN ('s3','tg','local'))
 );
 
 CREATE INDEX idx_media_owner ON media_files(owner_user_id);
 CREATE INDEX idx_media_object_key ON media_files(object_key);
+CREATE INDEX idx_media_pending ON media_files(id) WHERE status = 'pending';
+CREATE INDEX idx_media_owner_source ON media_files(owner_user_id, source_url);
+
+-- Cached plaintext of stored documents (CV PDF/DOCX/TXT)
+CREATE TABLE media_texts (
+  media_id      BIGINT PRIMARY KEY REFERENCES media_files(id) ON DELETE CASCADE,
+  source_hash   TEXT NOT NULL,                      -- sha256(file name, size, mtime)
+  text          TEXT,                               -- NULL when nothing could be extracted
+  error         TEXT,
+  extracted_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
 
 -- =====================
 -- Topics & Candidates
@@ -100,7 +125,9 @@ CREATE TABLE topics (
   required_skills   TEXT,
   direction         SMALLINT,                      -- 9 | 11 | 45 (опционально)
   seeking_role      VARCHAR(20) NOT NULL, -- 'student' | 'supervisor'
-  embeddings        VECTOR,
+  embeddings        VECTOR(768),
+  embedding_source_hash TEXT,
+  embedding_model   TEXT,
   cover_media_id    BIGINT REFERENCES media_files(id) ON DELETE SET NULL,
   approved_supervisor_user_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
   is_active         BOOLEAN NOT NULL DEFAULT TRUE,
@@ -112,6 +139,10 @@ CREATE INDEX idx_topics_author ON topics(author_user_id);
 CREATE INDEX idx_topics_seeking_role ON topics(seeking_role);
 CREATE INDEX idx_topics_active ON topics(is_active);
 CREATE INDEX idx_topics_direction ON topics(direction);
+CREATE UNIQUE INDEX uq_topics_author_title_direction ON topics (author_user_id, title, (COALESCE(direction, 0)));
+CREATE INDEX idx_topics_supervisor_embeddings_hnsw ON topics
+  USING hnsw (embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+  WHERE is_active = TRUE AND seeking_role = 'supervisor';
 
 CREATE TABLE topic_candidates (
   topic_id      BIGINT NOT NULL REFERENCES topics(id) ON DELETE CASCADE,
@@ -121,6 +152,8 @@ CREATE TABLE topic_candidates (
   approved      BOOLEAN NOT NULL DEFAULT FALSE,
   rank          SMALLINT,
   created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  match_run_id  UUID,          -- run that produced this ranking
+  ranked_at     TIMESTAMPTZ,
   PRIMARY KEY (topic_id, user_id)
 );
 
@@ -155,13 +188,17 @@ CREATE TABLE roles (
   description     TEXT,
   required_skills TEXT,
   capacity        INTEGER,
-  embeddings      VECTOR,
+  embeddings      VECTOR(768), -- dimension of the active model (multilingual-e5-base)
+  embedding_source_hash TEXT, -- sha256 of the text the vector was computed from
+  embedding_model TEXT,
   approved_student_user_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
   created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
   updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
 CREATE INDEX idx_roles_topic ON roles(topic_id);
+CREATE INDEX idx_roles_embeddings_hnsw ON roles
+  USING hnsw (embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64);
 
 -- Students recommended for a role (matching: role -> students)
 CREATE TABLE role_candidates (
@@ -172,6 +209,8 @@ CREATE TABLE role_candidates (
   approved    BOOLEAN NOT NULL DEFAULT FALSE,
   rank        SMALLINT,
   created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  match_run_id UUID,  -- run that produced this ranking
+  ranked_at   TIMESTAMPTZ,
   PRIMARY KEY (role_id, user_id)
 );
 
@@ -186,6 +225,8 @@ CREATE TABLE student_candidates (
   approved    BOOLEAN NOT NULL DEFAULT FALSE,
   rank        SMALLINT,
   created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  match_run_id UUID,  -- run that produced this ranking
+  ranked_at   TIMESTAMPTZ,
   PRIMARY KEY (user_id, role_id)
 );
 
@@ -200,12 +241,86 @@ CREATE TABLE supervisor_candidates (
   approved    BOOLEAN NOT NULL DEFAULT FALSE,
   rank        SMALLINT,
   created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  match_run_id UUID,  -- run that produced this ranking
+  ranked_at   TIMESTAMPTZ,
   PRIMARY KEY (user_id, topic_id)
 );
 
 CREATE INDEX idx_sc_topic ON supervisor_candidates(topic_id);
 CREATE INDEX idx_sc_user_score2 ON supervisor_candidates(user_id, score DESC);
 
+-- =====================
+-- Embedding refresh outbox
+-- =====================
+
+-- Written in the same transaction as the entity change; drained by the
+-- matching service worker (FOR UPDATE SKIP LOCKED), rows are deleted when done.
+CREATE TABLE embedding_jobs (
+  id          BIGSERIAL PRIMARY KEY,
+  kind        VARCHAR(20) NOT NULL,                 -- 'student' | 'supervisor' | 'topic' | 'role'
+  entity_id   BIGINT NOT NULL,
+  status      VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending|processing|failed
+  attempts    INTEGER NOT NULL DEFAULT 0,
+  last_error  TEXT,
+  run_after   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  locked_at   TIMESTAMPTZ,
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  CONSTRAINT chk_embedding_job_kind CHECK (kind IN ('student','supervisor','topic','role'))
+);
+
+CREATE UNIQUE INDEX uq_embedding_jobs_pending ON embedding_jobs(kind, entity_id) WHERE status = 'pending';
+CREATE INDEX idx_embedding_jobs_ready ON embedding_jobs(status, run_after);
+
+-- LLM rerank results keyed by sha256(function, model, temperature, payload)
+CREATE TABLE llm_rank_cache (
+  cache_key     TEXT PRIMARY KEY,
+  function_name VARCHAR(64) NOT NULL,     -- rank_candidates | rank_topics | rank_roles
+  model         TEXT NOT NULL,
+  temperature   DOUBLE PRECISION NOT NULL,
+  result        JSONB NOT NULL,           -- parsed top-5 items
+  latency_ms    DOUBLE PRECISION,         -- duration of the original LLM call
+  hits          INTEGER NOT NULL DEFAULT 0,
+  created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_hit_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX idx_llm_rank_cache_last_hit ON llm_rank_cache(last_hit_at);
+
+-- Topics extracted by LLM from supervisor form blocks, keyed by sha256(model, temperature, text)
+CREATE TABLE llm_topic_cache (
+  text_hash   TEXT PRIMARY KEY,
+  model       TEXT NOT NULL,
+  result      JSONB NOT NULL,             -- [{title, description, expected_outcomes, required_skills}]
+  hits        INTEGER NOT NULL DEFAULT 0,
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- =====================
+-- Google Sheets import ledger
+-- =====================
+
+CREATE TABLE sheet_import_ledger (
+  source         VARCHAR(20) NOT NULL,      -- students | supervisors
+  spreadsheet_id TEXT NOT NULL,
+  sheet          TEXT NOT NULL,             -- worksheet title
+  row_key        TEXT NOT NULL,             -- form timestamp (or row position)
+  fingerprint    TEXT NOT NULL,             -- sha256 of headers + raw row
+  imported_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (source, spreadsheet_id, sheet, row_key)
+);
+
+-- =====================
+-- Bot state
+-- =====================
+
+CREATE TABLE bot_user_data (
+  user_id    BIGINT PRIMARY KEY,             -- Telegram user id
+  data       JSONB NOT NULL DEFAULT '{}'::jsonb, -- context.user_data
+  version    BIGINT NOT NULL DEFAULT 1,      -- bumped on every write
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 -- =====================
 -- Messages (Requests)
 -- =====================
@@ -0,0 +1,100 @@
+"""
+Нагрузочный тест чтения через API сервера.
+
+Гоняет конкурентные GET-запросы к ``/api/topics`` и ``/api/students/{id}`` и
+печатает RPS и p50/p99. Для сравнения с прямыми подключениями запустите сервер
+дважды: с ``DB_POOL_ENABLED=false`` и с включённым пулом (по умолчанию).
+
+    python server/benchmarks/load_test.py --base-url http://localhost:8000 \\
+        --concurrency 32 --duration 20 --student-ids 1 2 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence
+
+import httpx
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    """Возвращает перцентиль по отсортированной выборке."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _worker(
+    client: httpx.Client,
+    paths: Sequence[str],
+    deadline: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    lock: threading.Lock,
+) -> None:
+    """Отправляет запросы до истечения времени теста, собирая задержки."""
+    while time.perf_counter() < deadline:
+        path = random.choice(paths)
+        key = "/api/topics" if path.startswith("/api/topics") else "/api/students/{id}"
+        started = time.perf_counter()
+        try:
+            response = client.get(path)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000.0
+        with lock:
+            if ok:
+                latencies.setdefault(key, []).append(elapsed)
+            else:
+                errors[key] = errors.get(key, 0) + 1
+
+
+def run(base_url: str, *, concurrency: int, duration: float, student_ids: Sequence[int]) -> None:
+    """Запускает нагрузку и печатает сводку по каждому эндпоинту."""
+    paths = ["/api/topics?limit=10"] + [f"/api/students/{sid}" for sid in student_ids]
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    with httpx.Client(base_url=base_url, timeout=30, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(_worker, client, paths, deadline, latencies, errors, lock)
+        try:
+            pool_metrics = client.get("/metrics/db-pool").json()
+        except Exception:
+            pool_metrics = {}
+
+    for key in sorted(set(latencies) | set(errors)):
+        samples = latencies.get(key, [])
+        print(
+            f"{key:<22} rps={len(samples) / duration:8.1f} "
+            f"p50={_percentile(samples, 50):7.2f}ms p99={_percentile(samples, 99):7.2f}ms "
+            f"errors={errors.get(key, 0)}"
+        )
+    total = sum(len(v) for v in latencies.values())
+    print(f"{'total':<22} rps={total / duration:8.1f}")
+    if pool_metrics:
+        print(f"db pool: {pool_metrics}")
+
+
+def main() -> None:
+    """Разбирает аргументы командной строки и запускает тест."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--student-ids", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+    run(args.base_url, concurrency=args.concurrency, duration=args.duration, student_ids=args.student_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 import httpx
 
@@ -10,11 +10,11 @@ MATCHING_SERVICE_URL = os.getenv("MATCHING_SERVICE_URL", "http://matching:8300")
 logger = logging.getLogger(__name__)
 
 
-def _post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _post(path: str, payload: Dict[str, Any], *, timeout: float = 60) -> Dict[str, Any]:
     """Выполняет функцию _post."""
     url = f"{MATCHING_SERVICE_URL.rstrip('/')}{path}"
     try:
-        response = httpx.post(url, json=payload, timeout=60)
+        response = httpx.post(url, json=payload, timeout=timeout)
         response.raise_for_status()
         return response.json()
     except Exception as exc:                                        
@@ -54,6 +54,19 @@ def refresh_role_embedding(role_id: int, *, model_repo_id: Optional[str] = None)
     _post("/api/embeddings/role/refresh", payload)
 
 
+def refresh_embeddings_batch(
+    kind: str, ids: Iterable[int], *, model_repo_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Выполняет функцию refresh_embeddings_batch."""
+    unique_ids = list(dict.fromkeys(int(entity_id) for entity_id in ids))
+    if not unique_ids:
+        return {"status": "ok", "kind": kind, "updated": 0}
+    payload: Dict[str, Any] = {"kind": kind, "ids": unique_ids}
+    if model_repo_id:
+        payload["model_repo_id"] = model_repo_id
+    return _post("/api/embeddings/batch", payload, timeout=600)
+
+
 def match_topic(topic_id: int, *, target_role: Optional[str] = None) -> Dict[str, Any]:
     """Выполняет функцию match_topic."""
     payload: Dict[str, Any] = {"topic_id": topic_id}
@@ -82,6 +95,7 @@ __all__ = [
     "refresh_supervisor_embedding",
     "refresh_topic_embedding",
     "refresh_role_embedding",
+    "refresh_embeddings_batch",
     "match_topic",
     "match_role",
     "match_student",
@@ -1,19 +1,18 @@
 import os
-import json
 import logging
 from typing import Optional, List, Dict, Any
 from pathlib import Path
-from urllib import request as urllib_request
-from urllib import error as urllib_error
 
 from fastapi import FastAPI, Form, Query, HTTPException
 from fastapi.responses import JSONResponse, FileResponse
-import psycopg2
+import psycopg2.errors
 import psycopg2.extras
 from dotenv import load_dotenv
 from clients.google_data_client import sync_roles_sheet as trigger_roles_sheet_sync
+from db import close_pool, get_conn, pool_stats
 from embedding_queue import commit_with_refresh, enqueue_refresh
 from media_store import MEDIA_ROOT
+from notify_queue import bot_notifier
 from utils import parse_optional_int, normalize_optional_str, resolve_service_account_path
 
 from matching_router import create_matching_router
@@ -22,6 +21,7 @@ from services.topic_import import (
     extract_telegram_username,
     process_cv,
 )
+from services.views import role_view, topic_view, user_view
 
 def _configure_logging() -> int:
     """Настраивает уровень логирования, читая имя уровня из переменных окружения."""
@@ -57,24 +57,6 @@ def _sync_roles_sheet(
         logger.warning('Roles sheet sync request failed: %s', exc)
         return False
 
-def build_db_dsn() -> str:
-    """Формирует строку подключения к базе Postgres из переменных окружения."""
-    dsn = os.getenv('DATABASE_URL')
-    if dsn:
-        return dsn
-    user = os.getenv('POSTGRES_USER', 'mentormatch')
-    password = os.getenv('POSTGRES_PASSWORD', 'secret')
-    host = os.getenv('POSTGRES_HOST', 'localhost')
-    port = os.getenv('POSTGRES_PORT', '5432')
-    db = os.getenv('POSTGRES_DB', 'mentormatch')
-    return f'postgresql://{user}:{password}@{host}:{port}/{db}'
-
-
-def get_conn():
-    """Открывает соединение с базой данных используя сконструированный DSN."""
-    return psycopg2.connect(build_db_dsn())
-
-
 def _shorten(text: Optional[str], limit: int = 60) -> str:
     """Обрезает текст до заданной длины, добавляя многоточие при необходимости."""
     if text is None:
@@ -97,17 +79,7 @@ def _display_name(name: Optional[str], fallback_id: Optional[Any]) -> str:
 
 
 def _send_telegram_notification(telegram_id: Optional[Any], text: str, *, button_text: Optional[str] = None, callback_data: Optional[str] = None) -> bool:
-    """Отправляет уведомление в бота MentorMatch, формируя запрос к HTTP API."""
-    base_url = (
-        os.getenv('BOT_API_URL')
-        or os.getenv('BOT_INTERNAL_URL')
-        or os.getenv('BOT_BASE_URL')
-        or 'http://bot:5000'
-    )
-    if not base_url or not str(base_url).strip():
-        logger.warning('Skipping telegram notification: BOT_API_URL not configured')
-        return False
-    endpoint = str(base_url).rstrip('/') + '/notify'
+    """Ставит уведомление для бота MentorMatch в очередь фоновой пакетной отправки."""
     if telegram_id in (None, '', 0):
         return False
     try:
@@ -131,28 +103,7 @@ def _send_telegram_notification(telegram_id: Optional[Any], text: str, *, button
                 ]
             ]
         }
-    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
-    req = urllib_request.Request(endpoint, data=data, headers={'Content-Type': 'application/json'})
-    try:
-        with urllib_request.urlopen(req, timeout=10) as resp:
-            status = getattr(resp, 'status', None) or resp.getcode()
-            if 200 <= status < 300:
-                resp.read()
-                return True
-            logger.warning('Bot notification endpoint %s returned HTTP %s', endpoint, status)
-            return False
-    except urllib_error.HTTPError as exc:
-        logger.warning(
-            'Bot notification failed with HTTP %s for chat %s: %s',
-            getattr(exc, 'code', 'unknown'),
-            chat_id,
-            exc,
-        )
-    except urllib_error.URLError as exc:
-        logger.warning('Bot notification request error for chat %s: %s', chat_id, exc)
-    except Exception as exc:
-        logger.warning('Unexpected bot notification error for chat %s: %s', chat_id, exc)
-    return False
+    return bot_notifier.enqueue(payload)
 
 
 
@@ -160,6 +111,25 @@ def _send_telegram_notification(telegram_id: Optional[Any], text: str, *, button
 app = FastAPI(title='MentorMatch Server Service')
 app.include_router(create_matching_router())
 
+
+@app.on_event('shutdown')
+def _shutdown_event():
+    """Отправляет накопленные уведомления и закрывает пул соединений с базой данных при остановке сервиса."""
+    bot_notifier.stop()
+    close_pool()
+
+
+@app.get('/metrics/notifications', response_class=JSONResponse)
+def api_notification_metrics():
+    """Возвращает глубину очереди уведомлений для бота и счётчики отправки."""
+    return bot_notifier.stats()
+
+
+@app.get('/metrics/db-pool', response_class=JSONResponse)
+def api_db_pool_metrics():
+    """Возвращает метрики пула соединений с базой данных."""
+    return pool_stats()
+
 def _truthy(val: Optional[str]) -> bool:
     """Выполняет функцию _truthy."""
     return str(val or '').strip().lower() in ('1', 'true', 'yes', 'y', 'on')
@@ -267,14 +237,12 @@ def _maybe_test_import():
                     author_id = cur.fetchone()[0]
                     enqueue_refresh(conn, 'supervisor', author_id)
                                     
-                cur.execute('SELECT 1 FROM topics WHERE author_user_id=%s AND title=%s', (author_id, title))
-                if cur.fetchone():
-                    continue
                 cur.execute(
                     """
                     INSERT INTO topics(author_user_id, title, description, expected_outcomes, required_skills,
                                        seeking_role, is_active, created_at, updated_at)
                     VALUES (%s, %s, %s, %s, %s, %s, TRUE, now(), now())
+                    ON CONFLICT DO NOTHING
                     RETURNING id
                     """,
                     (
@@ -294,6 +262,59 @@ def _maybe_test_import():
         print(f"TEST_IMPORT failed: {e}")
 
 
+_MERGE_KEYS_SQL = '''
+DO $$
+DECLARE
+  duplicates BIGINT;
+BEGIN
+  SELECT COUNT(*) INTO duplicates FROM (
+    SELECT 1 FROM users WHERE email IS NOT NULL
+    GROUP BY LOWER(email), role HAVING COUNT(*) > 1
+  ) d;
+  IF duplicates > 0 THEN
+    RAISE WARNING 'uq_users_email_role not created: % duplicate (LOWER(email), role) groups in users', duplicates
+      USING HINT = 'SELECT LOWER(email), role, array_agg(id) FROM users WHERE email IS NOT NULL '
+                   'GROUP BY 1, 2 HAVING COUNT(*) > 1; merge these users and restart';
+  ELSE
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_users_email_role ON users ((LOWER(email)), role);
+  END IF;
+
+  SELECT COUNT(*) INTO duplicates FROM (
+    SELECT 1 FROM topics
+    GROUP BY author_user_id, title, COALESCE(direction, 0) HAVING COUNT(*) > 1
+  ) d;
+  IF duplicates > 0 THEN
+    RAISE WARNING 'uq_topics_author_title_direction not created: % duplicate topic groups', duplicates
+      USING HINT = 'SELECT author_user_id, title, COALESCE(direction, 0), array_agg(id) FROM topics '
+                   'GROUP BY 1, 2, 3 HAVING COUNT(*) > 1; merge these topics and restart';
+  ELSE
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_topics_author_title_direction
+      ON topics (author_user_id, title, (COALESCE(direction, 0)));
+  END IF;
+END $$;
+'''
+
+
+def _ensure_merge_keys() -> None:
+    """
+    Создаёт уникальные индексы, на которых держатся ``ON CONFLICT`` импорта из
+    Google Sheets. Дубли в существующих данных не удаляются автоматически (на
+    пользователей и темы ссылаются профили, роли и заявки): индекс не
+    создаётся, а в лог пишется предупреждение с запросом для поиска дублей.
+    Сервер при этом стартует; импорт из Google Sheets заработает после
+    объединения дублей и перезапуска.
+    """
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_MERGE_KEYS_SQL)
+            for notice in conn.notices:
+                logger.warning('Startup migration: %s', notice.strip())
+            del conn.notices[:]
+    except psycopg2.Error as exc:
+        logger.warning('Startup migration failed: %s', exc)
+
+
 @app.on_event('startup')
 async def _startup_event():
     """Выполняет функцию _startup_event."""
@@ -338,6 +359,16 @@ async def _startup_event():
                     cur.execute(f"ALTER TABLE {tbl} ADD COLUMN IF NOT EXISTS embeddings VECTOR")
                 except Exception:
                     pass
+                cur.execute(f"ALTER TABLE {tbl} ADD COLUMN IF NOT EXISTS embedding_source_hash TEXT")
+                cur.execute(f"ALTER TABLE {tbl} ADD COLUMN IF NOT EXISTS embedding_model TEXT")
+                cur.execute(
+                    "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                    "WHERE attrelid = %s::regclass AND attname = 'embeddings' AND NOT attisdropped",
+                    (tbl,),
+                )
+                column_type = cur.fetchone()
+                if column_type and str(column_type[0]).startswith('vector'):
+                    continue
                 try:
                     cur.execute(
                         f"""
@@ -398,6 +429,9 @@ async def _startup_event():
             )
             cur.execute("CREATE INDEX IF NOT EXISTS idx_sc_topic ON supervisor_candidates(topic_id)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_sc_user_score2 ON supervisor_candidates(user_id, score DESC)")
+            for tbl in ("topic_candidates", "role_candidates", "student_candidates", "supervisor_candidates"):
+                cur.execute(f"ALTER TABLE {tbl} ADD COLUMN IF NOT EXISTS match_run_id UUID")
+                cur.execute(f"ALTER TABLE {tbl} ADD COLUMN IF NOT EXISTS ranked_at TIMESTAMPTZ")
                                              
             try:
                 cur.execute("ALTER TABLE topics ADD COLUMN IF NOT EXISTS direction SMALLINT")
@@ -437,9 +471,99 @@ async def _startup_event():
             cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_receiver ON messages(receiver_user_id, status)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender_user_id, status)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_topic ON messages(topic_id)")
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS embedding_jobs (
+                  id BIGSERIAL PRIMARY KEY,
+                  kind VARCHAR(20) NOT NULL,
+                  entity_id BIGINT NOT NULL,
+                  status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                  attempts INTEGER NOT NULL DEFAULT 0,
+                  last_error TEXT,
+                  run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  locked_at TIMESTAMPTZ,
+                  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  CONSTRAINT chk_embedding_job_kind CHECK (kind IN ('student','supervisor','topic','role'))
+                )
+                '''
+            )
+            cur.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_embedding_jobs_pending ON embedding_jobs(kind, entity_id) WHERE status = 'pending'"
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_embedding_jobs_ready ON embedding_jobs(status, run_after)")
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS media_texts (
+                  media_id BIGINT PRIMARY KEY REFERENCES media_files(id) ON DELETE CASCADE,
+                  source_hash TEXT NOT NULL,
+                  text TEXT,
+                  error TEXT,
+                  extracted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                '''
+            )
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS llm_rank_cache (
+                  cache_key TEXT PRIMARY KEY,
+                  function_name VARCHAR(64) NOT NULL,
+                  model TEXT NOT NULL,
+                  temperature DOUBLE PRECISION NOT NULL,
+                  result JSONB NOT NULL,
+                  latency_ms DOUBLE PRECISION,
+                  hits INTEGER NOT NULL DEFAULT 0,
+                  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                '''
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_rank_cache_last_hit ON llm_rank_cache(last_hit_at)")
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS llm_topic_cache (
+                  text_hash TEXT PRIMARY KEY,
+                  model TEXT NOT NULL,
+                  result JSONB NOT NULL,
+                  hits INTEGER NOT NULL DEFAULT 0,
+                  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                '''
+            )
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS bot_user_data (
+                  user_id BIGINT PRIMARY KEY,
+                  data JSONB NOT NULL DEFAULT '{}'::jsonb,
+                  version BIGINT NOT NULL DEFAULT 1,
+                  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                '''
+            )
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS sheet_import_ledger (
+                  source VARCHAR(20) NOT NULL,
+                  spreadsheet_id TEXT NOT NULL,
+                  sheet TEXT NOT NULL,
+                  row_key TEXT NOT NULL,
+                  fingerprint TEXT NOT NULL,
+                  imported_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                  PRIMARY KEY (source, spreadsheet_id, sheet, row_key)
+                )
+                '''
+            )
+            cur.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'ready'")
+            cur.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS source_url TEXT")
+            cur.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS error TEXT")
+            cur.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0")
+            cur.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMPTZ")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_media_pending ON media_files(id) WHERE status = 'pending'")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_media_owner_source ON media_files(owner_user_id, source_url)")
             commit_with_refresh(conn)
     except Exception as e:
         print(f"Startup migration warning (user_candidates): {e}")
+    _ensure_merge_keys()
     _maybe_test_import()
     _sync_roles_sheet()
 
@@ -770,7 +894,26 @@ def api_self_register(
     tg_id_val = parse_optional_int(tg_id)
     tg_id_for_name = extract_telegram_username(username) or (str(tg_id).strip() if tg_id else '')
     full_name_val = (full_name or f'Telegram user {tg_id_for_name}').strip()
-    email_val = email or None
+    email_val = (email or '').strip() or None
+    try:
+        return _self_register(r, full_name_val, email_val, link, tg_id_val)
+    except psycopg2.errors.UniqueViolation:
+        # uq_users_email_role: email занят другим пользователем этой роли.
+        return {'status': 'error', 'message': 'duplicate email'}
+
+
+def _self_register(
+    r: str,
+    full_name_val: str,
+    email_val: Optional[str],
+    link: Optional[str],
+    tg_id_val: Optional[int],
+) -> Dict[str, Any]:
+    """
+    Находит пользователя по ``telegram_id`` или создаёт его. Если пользователь
+    с тем же email и ролью уже есть (например, импортирован из Google Sheets без
+    ``telegram_id``), регистрация привязывается к нему.
+    """
     with get_conn() as conn:
         existing_user = None
         if tg_id_val is not None:
@@ -825,24 +968,52 @@ def api_self_register(
             commit_with_refresh(conn)
             return {'status': 'ok', 'user_id': uid, 'role': role_to_return}
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            by_email = None
+            if email_val is not None:
+                cur.execute(
+                    '''
+                    SELECT id, telegram_id FROM users
+                    WHERE LOWER(email) = LOWER(%s) AND role = %s
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE
+                    ''',
+                    (email_val, r),
+                )
+                by_email = cur.fetchone()
+            if by_email is not None:
+                if by_email['telegram_id'] is not None and by_email['telegram_id'] != tg_id_val:
+                    # Email уже привязан к другому Telegram-аккаунту.
+                    return {'status': 'error', 'message': 'duplicate email'}
+                uid = by_email['id']
+                cur.execute(
+                    '''
+                    UPDATE users
+                    SET telegram_id = COALESCE(telegram_id, %s),
+                        username = COALESCE(%s, username),
+                        is_confirmed = TRUE,
+                        updated_at = now()
+                    WHERE id = %s
+                    ''',
+                    (tg_id_val, link, uid),
+                )
+            else:
+                cur.execute(
+                    '''
+                    INSERT INTO users(full_name, email, username, telegram_id, role, is_confirmed, created_at, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, TRUE, now(), now())
+                    RETURNING id
+                    ''',
+                    (full_name_val, email_val, link, tg_id_val, r),
+                )
+                uid = cur.fetchone()['id']
+            profile_table = 'student_profiles' if r == 'student' else 'supervisor_profiles'
             cur.execute(
-                '''
-                INSERT INTO users(full_name, email, username, telegram_id, role, is_confirmed, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, TRUE, now(), now())
-                RETURNING id
-                ''',
-                (full_name_val, email_val, link, tg_id_val, r),
+                f"INSERT INTO {profile_table}(user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING RETURNING user_id",
+                (uid,),
             )
-            uid_row = cur.fetchone()
-            uid = uid_row['id'] if uid_row else None
-            if uid is None:
-                raise HTTPException(status_code=500, detail='Unable to create user record')
-            if r == 'student':
-                cur.execute("INSERT INTO student_profiles(user_id) VALUES (%s)", (uid,))
-                enqueue_refresh(conn, 'student', uid)
-            else:
-                cur.execute("INSERT INTO supervisor_profiles(user_id) VALUES (%s)", (uid,))
-                enqueue_refresh(conn, 'supervisor', uid)
+            if cur.fetchone():
+                enqueue_refresh(conn, r, uid)
         commit_with_refresh(conn)
     return {'status': 'ok', 'user_id': uid, 'role': r}
 
@@ -1040,20 +1211,18 @@ def api_add_topic(
     required_val = normalize_optional_str(required_skills)
     direction_val = parse_optional_int(direction)
     with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            'SELECT 1 FROM topics WHERE author_user_id=%s AND title=%s AND (direction IS NOT DISTINCT FROM %s)',
-            (author_id_val, title_clean, direction_val),
-        )
-        if cur.fetchone():
-            return {'status': 'ok', 'message': 'duplicate'}
         cur.execute(
             '''
             INSERT INTO topics(author_user_id, title, description, expected_outcomes, required_skills, direction, seeking_role, is_active, created_at, updated_at)
             VALUES (%s, %s, %s, %s, %s, %s, %s, TRUE, now(), now())
+            ON CONFLICT DO NOTHING
             RETURNING id
             ''', (author_id_val, title_clean, description_val, expected_val, required_val, direction_val, seeking_role),
         )
-        tid = cur.fetchone()[0]
+        inserted = cur.fetchone()
+        if not inserted:
+            return {'status': 'ok', 'message': 'duplicate'}
+        tid = inserted[0]
         enqueue_refresh(conn, 'topic', tid)
         commit_with_refresh(conn)
     return {'status': 'ok', 'topic_id': tid}
@@ -1179,24 +1348,29 @@ def api_update_topic(
         else:
             active_val = _truthy(is_active)
 
-        cur.execute(
-            '''
-            UPDATE topics
-            SET title=%s, description=%s, expected_outcomes=%s, required_skills=%s,
-                direction=%s, seeking_role=%s, is_active=%s, updated_at=now()
-            WHERE id=%s
-            ''',
-            (
-                title_val,
-                description_val,
-                expected_val,
-                required_val,
-                direction_value,
-                seeking_role_val,
-                active_val,
-                topic_id,
-            ),
-        )
+        try:
+            cur.execute(
+                '''
+                UPDATE topics
+                SET title=%s, description=%s, expected_outcomes=%s, required_skills=%s,
+                    direction=%s, seeking_role=%s, is_active=%s, updated_at=now()
+                WHERE id=%s
+                ''',
+                (
+                    title_val,
+                    description_val,
+                    expected_val,
+                    required_val,
+                    direction_value,
+                    seeking_role_val,
+                    active_val,
+                    topic_id,
+                ),
+            )
+        except psycopg2.errors.UniqueViolation:
+            # uq_topics_author_title_direction: у автора уже есть тема с таким названием.
+            conn.rollback()
+            return {'status': 'error', 'message': 'duplicate'}
         enqueue_refresh(conn, 'topic', topic_id)
         commit_with_refresh(conn)
     return {'status': 'ok', 'topic_id': topic_id}
@@ -1320,11 +1494,14 @@ def serve_media(media_id: int):
     """Выполняет функцию serve_media."""
     try:
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute('SELECT object_key, mime_type FROM media_files WHERE id=%s', (media_id,))
+            cur.execute('SELECT object_key, mime_type, status FROM media_files WHERE id=%s', (media_id,))
             row = cur.fetchone()
         if not row:
             return JSONResponse({'error': 'Not found'}, status_code=404)
-        object_key, mime_type = row
+        object_key, mime_type, status = row
+        if not object_key:
+            # Резюме из импорта ещё не скачано фоновым фетчером google_data.
+            return JSONResponse({'error': 'File not fetched yet', 'status': status}, status_code=404)
         file_path = (MEDIA_ROOT / object_key).resolve()
         if not file_path.exists():
             return JSONResponse({'error': 'File missing'}, status_code=404)
@@ -1460,6 +1637,36 @@ def api_role_candidates(role_id: int, limit: int = Query(5, ge=1, le=50)):
         return [dict(r) for r in rows]
 
 
+@app.get('/api/views/topic/{topic_id}', response_class=JSONResponse)
+def api_view_topic(topic_id: int, roles_limit: int = Query(50, ge=1, le=200)):
+    """Возвращает тему вместе со списком её ролей одним запросом."""
+    with get_conn() as conn:
+        view = topic_view(conn, topic_id, roles_limit=roles_limit)
+    if not view:
+        return JSONResponse({'error': 'Not found'}, status_code=404)
+    return view
+
+
+@app.get('/api/views/role/{role_id}', response_class=JSONResponse)
+def api_view_role(role_id: int, limit: int = Query(5, ge=1, le=50)):
+    """Возвращает роль, её тему и лучших кандидатов-студентов одним запросом."""
+    with get_conn() as conn:
+        view = role_view(conn, role_id, candidates_limit=limit)
+    if not view:
+        return JSONResponse({'error': 'Not found'}, status_code=404)
+    return view
+
+
+@app.get('/api/views/user/{user_id}', response_class=JSONResponse)
+def api_view_user(user_id: int, limit: int = Query(5, ge=1, le=50)):
+    """Возвращает профиль пользователя и его рекомендации одним запросом."""
+    with get_conn() as conn:
+        view = user_view(conn, user_id, candidates_limit=limit)
+    if not view:
+        return JSONResponse({'error': 'Not found'}, status_code=404)
+    return view
+
+
                                
                      
                                
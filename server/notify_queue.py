@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib import error as urllib_error
+from urllib import request as urllib_request
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_BATCH_SIZE = int(os.getenv('NOTIFY_BATCH_SIZE', '50'))
+NOTIFY_FLUSH_SECONDS = float(os.getenv('NOTIFY_FLUSH_SECONDS', '0.2'))
+NOTIFY_MAX_QUEUE = int(os.getenv('NOTIFY_MAX_QUEUE', '10000'))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '3'))
+
+
+def bot_base_url() -> Optional[str]:
+    """Возвращает адрес внутреннего HTTP API бота из переменных окружения."""
+    base_url = (
+        os.getenv('BOT_API_URL')
+        or os.getenv('BOT_INTERNAL_URL')
+        or os.getenv('BOT_BASE_URL')
+        or 'http://bot:5000'
+    )
+    base_url = str(base_url).strip()
+    return base_url.rstrip('/') if base_url else None
+
+
+class BotNotifier:
+    """
+    Фоновая отправка уведомлений в бота пачками через ``/notify/batch``.
+
+    Обработчики API только кладут уведомление в очередь и не ждут ответа бота;
+    поток-отправитель собирает до ``NOTIFY_BATCH_SIZE`` сообщений (ожидая не
+    дольше ``NOTIFY_FLUSH_SECONDS``) и повторяет запрос при сетевых ошибках.
+    Соблюдение лимитов Telegram — на стороне диспетчера бота.
+    """
+
+    def __init__(self) -> None:
+        """Создаёт очередь и счётчики; поток запускается при первом уведомлении."""
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=max(1, NOTIFY_MAX_QUEUE))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        """Ставит уведомление в очередь; возвращает False, если очередь переполнена."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('Notification queue is full, dropping message for chat %s', payload.get('chat_id'))
+            return False
+        return True
+
+    def _ensure_thread(self) -> None:
+        """Запускает поток-отправитель, если он ещё не работает."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='bot-notifier', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Останавливает поток, дав ему отправить накопленные уведомления."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        """Собирает очередную пачку уведомлений."""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + NOTIFY_FLUSH_SECONDS
+        while len(batch) < NOTIFY_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        """Основной цикл потока: собирает пачки и отправляет их в бота."""
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._deliver(batch)
+
+    def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        """Отправляет пачку в ``/notify/batch`` с повторами при сетевых ошибках."""
+        base_url = bot_base_url()
+        if not base_url:
+            logger.warning('Skipping telegram notifications: BOT_API_URL not configured')
+            self.failed += len(batch)
+            return
+        endpoint = base_url + '/notify/batch'
+        data = json.dumps({'messages': batch}, ensure_ascii=False).encode('utf-8')
+        for attempt in range(1, max(1, NOTIFY_MAX_ATTEMPTS) + 1):
+            req = urllib_request.Request(endpoint, data=data, headers={'Content-Type': 'application/json'})
+            try:
+                with urllib_request.urlopen(req, timeout=10) as resp:
+                    result = json.loads(resp.read() or b'{}')
+                rejected = result.get('rejected') or []
+                for item in rejected:
+                    logger.warning('Bot rejected notification #%s: %s', item.get('index'), item.get('message'))
+                self.batches += 1
+                self.sent += len(batch) - len(rejected)
+                self.failed += len(rejected)
+                return
+            except urllib_error.HTTPError as exc:
+                if 400 <= getattr(exc, 'code', 500) < 500:
+                    logger.warning('Bot notification batch rejected with HTTP %s: %s', exc.code, exc)
+                    break
+                logger.warning('Bot notification batch failed with HTTP %s (attempt %s)', exc.code, attempt)
+            except Exception as exc:
+                logger.warning('Bot notification batch error (attempt %s): %s', attempt, exc)
+            if self._stop.is_set() and attempt > 1:
+                # При остановке сервиса не тянем повторы дольше одной попытки.
+                break
+            self._stop.wait(min(5.0, 0.5 * 2 ** attempt))
+        self.failed += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает состояние очереди и счётчики отправки."""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'depth': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'batches': self.batches,
+        }
+
+
+bot_notifier = BotNotifier()
+
+
+__all__ = ['BotNotifier', 'bot_notifier', 'bot_base_url']
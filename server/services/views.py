@@ -0,0 +1,131 @@
+"""
+Screen-sized read models for the Telegram bot.
+
+Each ``*_view`` function returns everything one bot screen needs (the entity
+plus its roles or ranked candidates) from a single SQL statement that builds
+the response with ``json_build_object``/``json_agg``, so a click costs one
+HTTP request and one database round-trip instead of a waterfall.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from psycopg2.extensions import connection
+
+_ROLE_COLUMNS = """
+    'id', r.id, 'topic_id', r.topic_id, 'name', r.name, 'description', r.description,
+    'required_skills', r.required_skills, 'capacity', r.capacity,
+    'approved_student_user_id', r.approved_student_user_id,
+    'created_at', r.created_at, 'updated_at', r.updated_at
+"""
+
+_TOPIC_VIEW_SQL = f"""
+SELECT json_build_object(
+    'topic', json_build_object(
+        'id', t.id, 'title', t.title, 'description', t.description,
+        'seeking_role', t.seeking_role, 'created_at', t.created_at,
+        'author', u.full_name, 'expected_outcomes', t.expected_outcomes,
+        'required_skills', t.required_skills, 'direction', t.direction,
+        'author_user_id', t.author_user_id
+    ),
+    'roles', COALESCE((
+        SELECT json_agg(json_build_object({_ROLE_COLUMNS}) ORDER BY r.created_at DESC)
+        FROM (SELECT * FROM roles WHERE topic_id = t.id ORDER BY created_at DESC LIMIT %(roles_limit)s) r
+    ), '[]'::json)
+)
+FROM topics t
+JOIN users u ON u.id = t.author_user_id
+WHERE t.id = %(id)s AND t.is_active = TRUE
+"""
+
+_ROLE_VIEW_SQL = f"""
+SELECT json_build_object(
+    'role', json_build_object(
+        {_ROLE_COLUMNS},
+        'topic_title', t.title, 'author_user_id', t.author_user_id, 'author', u.full_name
+    ),
+    'candidates', COALESCE((
+        SELECT json_agg(c ORDER BY c.rank ASC NULLS LAST, c.score DESC NULLS LAST, c.created_at DESC)
+        FROM (
+            SELECT rc.user_id, su.full_name, su.username, rc.score, rc.rank, su.created_at
+            FROM role_candidates rc
+            JOIN users su ON su.id = rc.user_id AND su.role = 'student'
+            WHERE rc.role_id = r.id
+            ORDER BY rc.rank ASC NULLS LAST, rc.score DESC NULLS LAST, su.created_at DESC
+            LIMIT %(candidates_limit)s
+        ) c
+    ), '[]'::json)
+)
+FROM roles r
+JOIN topics t ON t.id = r.topic_id
+JOIN users u ON u.id = t.author_user_id
+WHERE r.id = %(id)s
+"""
+
+_USER_VIEW_SQL = """
+SELECT json_build_object(
+    'user', json_build_object(
+        'id', u.id, 'full_name', u.full_name, 'username', u.username, 'email', u.email,
+        'role', u.role, 'created_at', u.created_at,
+        'program', sp.program, 'skills', sp.skills, 'interests', COALESCE(sp.interests, sup.interests),
+        'cv', sp.cv, 'position', sup.position, 'degree', sup.degree,
+        'capacity', sup.capacity, 'requirements', sup.requirements
+    ),
+    'candidates', CASE WHEN u.role = 'student' THEN COALESCE((
+        SELECT json_agg(c ORDER BY c.rank ASC NULLS LAST, c.score DESC NULLS LAST, c.created_at DESC)
+        FROM (
+            SELECT sc.role_id, r.name AS role_name, sc.score, sc.rank, r.topic_id,
+                   t.title AS topic_title, t.created_at
+            FROM student_candidates sc
+            JOIN roles r ON r.id = sc.role_id
+            JOIN topics t ON t.id = r.topic_id
+            WHERE sc.user_id = u.id
+            ORDER BY sc.rank ASC NULLS LAST, sc.score DESC NULLS LAST, t.created_at DESC
+            LIMIT %(candidates_limit)s
+        ) c
+    ), '[]'::json) ELSE COALESCE((
+        SELECT json_agg(c ORDER BY c.rank ASC NULLS LAST, c.score DESC NULLS LAST, c.created_at DESC)
+        FROM (
+            SELECT sc.topic_id, t.title, sc.score, sc.rank, t.created_at
+            FROM supervisor_candidates sc
+            JOIN topics t ON t.id = sc.topic_id
+            WHERE sc.user_id = u.id
+            ORDER BY sc.rank ASC NULLS LAST, sc.score DESC NULLS LAST, t.created_at DESC
+            LIMIT %(candidates_limit)s
+        ) c
+    ), '[]'::json) END
+)
+FROM users u
+LEFT JOIN student_profiles sp ON sp.user_id = u.id
+LEFT JOIN supervisor_profiles sup ON sup.user_id = u.id
+WHERE u.id = %(id)s
+"""
+
+
+def _fetch_view(conn: connection, sql: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Выполняет функцию _fetch_view."""
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def topic_view(conn: connection, topic_id: int, *, roles_limit: int = 50) -> Optional[Dict[str, Any]]:
+    """Active topic with its roles (newest first), or None."""
+    return _fetch_view(conn, _TOPIC_VIEW_SQL, {"id": topic_id, "roles_limit": roles_limit})
+
+
+def role_view(conn: connection, role_id: int, *, candidates_limit: int = 5) -> Optional[Dict[str, Any]]:
+    """Role with its topic/author and top student candidates, or None."""
+    return _fetch_view(conn, _ROLE_VIEW_SQL, {"id": role_id, "candidates_limit": candidates_limit})
+
+
+def user_view(conn: connection, user_id: int, *, candidates_limit: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    User profile with its ranked candidates: roles for students (same shape as
+    ``/api/user-candidates``), topics for everyone else. None when absent.
+    """
+    return _fetch_view(conn, _USER_VIEW_SQL, {"id": user_id, "candidates_limit": candidates_limit})
+
+
+__all__ = ["topic_view", "role_view", "user_view"]